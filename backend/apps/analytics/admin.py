@@ -10,7 +10,9 @@ from .models import (
     ReporteFinanciero,
     ReporteSeguridad,
     ReporteUsoAreas,
-    PrediccionMorosidad
+    PrediccionMorosidad,
+    TrabajoReporte,
+    CaracteristicasRiesgoResidente
 )
 
 
@@ -164,4 +166,42 @@ class PrediccionMorosidadAdmin(admin.ModelAdmin):
 
     def riesgo_porcentaje(self, obj):
         return f"{obj.get_riesgo_porcentaje()}%"
-    riesgo_porcentaje.short_description = "Riesgo Total (%)"
\ No newline at end of file
+    riesgo_porcentaje.short_description = "Riesgo Total (%)"
+
+
+@admin.register(TrabajoReporte)
+class TrabajoReporteAdmin(admin.ModelAdmin):
+    """Admin para Trabajos de Reporte (solo lectura, los gestiona la cola)"""
+
+    list_display = [
+        'id', 'tipo_reporte', 'estado', 'progreso', 'solicitado_por',
+        'fecha_creacion', 'fecha_fin_proceso', 'reporte_id'
+    ]
+    list_filter = ['tipo_reporte', 'estado', 'fecha_creacion']
+    search_fields = ['solicitado_por__username', 'error']
+    ordering = ['-fecha_creacion']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(CaracteristicasRiesgoResidente)
+class CaracteristicasRiesgoResidenteAdmin(admin.ModelAdmin):
+    """Admin para Características de Riesgo (solo lectura, las calcula el servicio)"""
+
+    list_display = [
+        'residente', 'pagos_atrasados_ultimo_anio', 'monto_vencido', 'meses_como_residente',
+        'cambio_uso_servicios_porcentaje', 'fecha_calculo', 'desactualizado'
+    ]
+    list_filter = ['desactualizado', 'fecha_calculo']
+    search_fields = ['residente__username', 'residente__email']
+    ordering = ['-pagos_atrasados_ultimo_anio']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
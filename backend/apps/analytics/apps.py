@@ -4,4 +4,8 @@ from django.apps import AppConfig
 class AnalyticsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'backend.apps.analytics'
-    verbose_name = 'Reportes y Analítica'
\ No newline at end of file
+    verbose_name = 'Reportes y Analítica'
+
+    def ready(self):
+        """Importar las señales que invalidan la caché de reportes"""
+        import backend.apps.analytics.signals
@@ -0,0 +1,144 @@
+"""
+Caché de resultados de reportes
+
+La clave es la solicitud normalizada (tipo de reporte, subtipo, rango y hash de los
+filtros) más la versión de los datos de cada mes del rango en los dominios que el
+reporte consulta. Las señales (analytics.signals) incrementan la versión del mes
+afectado cuando se confirma un cambio de cargo, acceso, reserva o registro de
+auditoría, así que un período cerrado sin cambios se reutiliza indefinidamente; un
+período que incluye hoy expira además por tiempo, porque depende de la fecha actual.
+"""
+
+import hashlib
+import json
+import threading
+from datetime import datetime
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from backend.apps.finances.services import ResumenFinancieroService
+from backend.cache_versiones import incrementar_versiones, obtener_versiones
+
+
+class CacheReportesService:
+    """Obtener o calcular datos de reportes con invalidación por dominio y mes"""
+
+    PREFIJO = 'analytics:reporte'
+    PREFIJO_VERSION = 'analytics:version'
+    TIMEOUT_PERIODO_ABIERTO = 300
+
+    # Dominios de datos que consulta cada tipo de reporte
+    DOMINIOS = {
+        'financiero': ('finanzas',),
+        'seguridad': ('accesos', 'auditoria'),
+        'uso_areas': ('reservas',),
+    }
+
+    # Parámetros que cambian el resultado (título, descripción, período y formato no)
+    CAMPOS_CLAVE = {
+        'financiero': ('tipo',),
+        'seguridad': ('tipo',),
+        'uso_areas': ('area', 'metrica_principal'),
+    }
+
+    def __init__(self):
+        # Versiones por incrementar al confirmar la transacción, por hilo
+        self._pendientes = threading.local()
+
+    @staticmethod
+    def a_fecha(valor):
+        """Fecha local de un date, datetime o su representación ISO"""
+        if isinstance(valor, str):
+            valor = parse_datetime(valor) if 'T' in valor else parse_date(valor)
+        if isinstance(valor, datetime):
+            return timezone.localtime(valor).date() if timezone.is_aware(valor) else valor.date()
+        return valor
+
+    def _clave_version(self, dominio, mes):
+        return f"{self.PREFIJO_VERSION}:{dominio}:{mes}"
+
+    def versiones(self, dominios, fecha_inicio, fecha_fin):
+        """Versiones de cada dominio y mes del rango (una lectura get_many)"""
+        meses = ResumenFinancieroService.meses_entre(fecha_inicio, fecha_fin)
+        claves = [self._clave_version(dominio, mes) for dominio in dominios for mes in meses]
+        versiones = obtener_versiones(claves)
+        return [versiones[clave] for clave in claves]
+
+    def _meses(self, fechas):
+        return {f"{fecha:%Y-%m}" for fecha in map(self.a_fecha, fechas) if fecha}
+
+    def invalidar(self, dominio, fechas):
+        """Incrementar ya la versión de los meses de las fechas indicadas en un dominio"""
+        incrementar_versiones(self._clave_version(dominio, mes) for mes in self._meses(fechas))
+
+    def invalidar_al_confirmar(self, dominio, fechas):
+        """
+        Invalidar los meses de las fechas cuando confirme la transacción en curso
+
+        Antes del commit, un reporte calculado con los datos viejos se guardaría con la
+        versión nueva. Los meses se acumulan y la primera devolución de llamada de la
+        transacción los incrementa todos una sola vez, aunque se escriban muchas filas.
+        """
+        meses = self._meses(fechas)
+        if not meses:
+            return
+        if not hasattr(self._pendientes, 'claves'):
+            self._pendientes.claves = set()
+        self._pendientes.claves.update(self._clave_version(dominio, mes) for mes in meses)
+        transaction.on_commit(self._aplicar_pendientes)
+
+    def _aplicar_pendientes(self):
+        claves = getattr(self._pendientes, 'claves', None)
+        if claves:
+            self._pendientes.claves = set()
+            incrementar_versiones(sorted(claves))
+
+    def clave(self, tipo_reporte, parametros):
+        """
+        Clave de caché de una solicitud (parámetros tal como los serializa el serializer de creación)
+        """
+        fecha_inicio = self.a_fecha(parametros['fecha_inicio'])
+        fecha_fin = self.a_fecha(parametros['fecha_fin'])
+        solicitud = {
+            'tipo_reporte': tipo_reporte,
+            'fecha_inicio': str(parametros['fecha_inicio']),
+            'fecha_fin': str(parametros['fecha_fin']),
+            'filtros': parametros.get('filtros_aplicados') or {},
+            **{campo: parametros.get(campo) for campo in self.CAMPOS_CLAVE[tipo_reporte]},
+        }
+        contenido = json.dumps(
+            [solicitud, self.versiones(self.DOMINIOS[tipo_reporte], fecha_inicio, fecha_fin)],
+            sort_keys=True, default=str
+        )
+        return f"{self.PREFIJO}:{tipo_reporte}:{hashlib.sha256(contenido.encode()).hexdigest()}"
+
+    def _timeout(self, parametros):
+        """Sin expiración para períodos cerrados; corto si el rango llega a hoy"""
+        if self.a_fecha(parametros['fecha_fin']) < timezone.localdate():
+            return None
+        return self.TIMEOUT_PERIODO_ABIERTO
+
+    def obtener(self, tipo_reporte, parametros):
+        """Datos cacheados de la solicitud o None (no consulta las tablas de origen)"""
+        return cache.get(self.clave(tipo_reporte, parametros))
+
+    def obtener_o_calcular(self, tipo_reporte, parametros, calcular):
+        """
+        Datos de la solicitud desde caché o calculados y guardados
+
+        La clave se arma antes de calcular: si los datos cambian durante el cálculo, la
+        versión sube y el resultado guardado con la versión anterior ya no se vuelve a leer.
+        """
+        clave = self.clave(tipo_reporte, parametros)
+        datos = cache.get(clave)
+        if datos is None:
+            datos = calcular()
+            cache.set(clave, datos, self._timeout(parametros))
+        return datos
+
+
+# Instancia global del servicio
+cache_reportes_service = CacheReportesService()
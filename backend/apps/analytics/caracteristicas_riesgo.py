@@ -0,0 +1,241 @@
+"""
+Tabla de características de riesgo por residente (CaracteristicasRiesgoResidente)
+
+Todas las características de todos los residentes se calculan con una consulta
+agrupada por tabla de origen (cargos, reservas, accesos y auditoría), sin importar
+cuántos residentes haya. Las predicciones leen la tabla: una predicción individual
+es la lectura de una fila y solo se recalculan las filas desactualizadas.
+"""
+
+from datetime import timedelta
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from .modelo_morosidad import CARACTERISTICAS, VALORES_DEFECTO
+from .models import CaracteristicasRiesgoResidente
+
+User = get_user_model()
+
+
+class CaracteristicasRiesgoService:
+    """Calcular, marcar y leer las características de riesgo de los residentes"""
+
+    DIAS_USO_SERVICIOS = 90
+    DIAS_RECIENTES = 30
+
+    # Campos que calcular() asigna a cada fila
+    CAMPOS_CALCULADOS = [
+        'pagos_atrasados_ultimo_anio', 'monto_vencido', 'meses_como_residente', 'cambio_uso_servicios_porcentaje',
+        'total_deuda', 'pagos_realizados', 'pagos_pendientes', 'total_reservas', 'reservas_activas',
+        'accesos_recientes', 'actividades_recientes',
+    ]
+
+    @staticmethod
+    def residentes(residente_ids=None):
+        """Residentes activos (opcionalmente solo los indicados)"""
+        residentes = User.objects.filter(role='resident', is_active=True)
+        if residente_ids is not None:
+            residentes = residentes.filter(pk__in=residente_ids)
+        return residentes
+
+    def calcular(self, residente_ids=None, hoy=None):
+        """
+        Características de los residentes, sin guardar
+
+        Returns:
+            list: CaracteristicasRiesgoResidente sin guardar, uno por residente
+        """
+        from backend.apps.audit.models import RegistroAuditoria
+        from backend.apps.finances.models import CargoFinanciero, EstadoCargo, ESTADOS_POR_COBRAR
+        from backend.apps.modulo_ia.models import Acceso
+        from backend.apps.reservations.models import Reserva, EstadoReserva
+
+        hoy = hoy or timezone.localdate()
+        residentes = self.residentes(residente_ids)
+        registros = {
+            pk: CaracteristicasRiesgoResidente(
+                residente_id=pk,
+                meses_como_residente=max(0, (hoy - timezone.localtime(fecha_alta).date()).days // 30),
+                fecha_calculo=hoy,
+            )
+            for pk, fecha_alta in residentes.values_list('pk', 'date_joined')
+        }
+        if not registros:
+            return []
+
+        def asignar(filas, campo_id, campos):
+            for fila in filas:
+                registro = registros.get(fila[campo_id])
+                if registro:
+                    for campo in campos:
+                        setattr(registro, campo, fila[campo] or 0)
+
+        # Libro de cargos: atrasos del último año (pagados tarde o aún adeudados) y saldos
+        por_cobrar = Q(estado__in=ESTADOS_POR_COBRAR)
+        atrasado = Q(fecha_vencimiento__gte=hoy - timedelta(days=365), fecha_vencimiento__lt=hoy) & (
+            por_cobrar | Q(estado=EstadoCargo.PAGADO, fecha_pago__date__gt=F('fecha_vencimiento'))
+        )
+        asignar(
+            CargoFinanciero.objects.filter(residente__in=residentes).values('residente').annotate(
+                pagos_atrasados_ultimo_anio=Count('id', filter=atrasado),
+                monto_vencido=Sum('monto', filter=por_cobrar & Q(fecha_vencimiento__lt=hoy)),
+                total_deuda=Sum('monto', filter=por_cobrar),
+                pagos_realizados=Sum('monto', filter=Q(estado=EstadoCargo.PAGADO)),
+                pagos_pendientes=Count('id', filter=por_cobrar),
+            ).order_by(),
+            'residente',
+            ('pagos_atrasados_ultimo_anio', 'monto_vencido', 'total_deuda', 'pagos_realizados', 'pagos_pendientes')
+        )
+
+        # Reservas: uso de los últimos 90 días frente a los 90 anteriores
+        inicio_reciente = hoy - timedelta(days=self.DIAS_USO_SERVICIOS)
+        inicio_previo = inicio_reciente - timedelta(days=self.DIAS_USO_SERVICIOS)
+        uso = {}
+        for fila in Reserva.objects.filter(usuario__in=residentes).values('usuario').annotate(
+            total_reservas=Count('id'),
+            reservas_activas=Count('id', filter=Q(
+                estado__in=[EstadoReserva.PENDIENTE, EstadoReserva.CONFIRMADA, EstadoReserva.PAGADA], fecha__gte=hoy
+            )),
+            recientes=Count('id', filter=Q(fecha__gte=inicio_reciente, fecha__lt=hoy)),
+            previas=Count('id', filter=Q(fecha__gte=inicio_previo, fecha__lt=inicio_reciente)),
+        ).order_by():
+            uso[fila['usuario']] = fila
+        asignar(uso.values(), 'usuario', ('total_reservas', 'reservas_activas'))
+        for pk, fila in uso.items():
+            if fila['previas']:
+                registros[pk].cambio_uso_servicios_porcentaje = (fila['recientes'] - fila['previas']) * 100 / fila['previas']
+
+        # Actividad de los últimos 30 días
+        desde = timezone.now() - timedelta(days=self.DIAS_RECIENTES)
+        asignar(
+            Acceso.objects.filter(usuario__in=residentes, fecha_hora__gte=desde).values('usuario').annotate(
+                accesos_recientes=Count('id')
+            ).order_by(),
+            'usuario', ('accesos_recientes',)
+        )
+        asignar(
+            RegistroAuditoria.objects.filter(usuario__in=residentes, timestamp__gte=desde).values('usuario').annotate(
+                actividades_recientes=Count('id')
+            ).order_by(),
+            'usuario', ('actividades_recientes',)
+        )
+
+        return list(registros.values())
+
+    def actualizar(self, residente_ids=None, hoy=None):
+        """
+        Recalcular y guardar las características (todas si residente_ids es None)
+
+        Returns:
+            int: Filas guardadas
+
+        Las filas se bloquean antes de calcular: una actualización simultánea de los
+        mismos residentes espera y guarda sobre estas filas en lugar de chocar con la
+        clave primaria, y una marca de desactualizado emitida durante el cálculo espera
+        al commit y queda aplicada sobre la fila nueva en lugar de perderse.
+        """
+        hoy = hoy or timezone.localdate()
+        with transaction.atomic():
+            residentes = self.residentes(residente_ids)
+            ids = list(residentes.order_by('pk').values_list('pk', flat=True))
+            # Crear las filas que falten para poder bloquearlas todas
+            CaracteristicasRiesgoResidente.objects.bulk_create(
+                [CaracteristicasRiesgoResidente(residente_id=pk, fecha_calculo=hoy, desactualizado=True) for pk in ids],
+                batch_size=500,
+                ignore_conflicts=True
+            )
+            list(CaracteristicasRiesgoResidente.objects.select_for_update().filter(
+                residente__in=residentes
+            ).order_by('residente_id').values_list('residente_id', flat=True))
+
+            registros = self.calcular(residente_ids, hoy)
+            CaracteristicasRiesgoResidente.objects.bulk_create(
+                registros,
+                batch_size=500,
+                update_conflicts=True,
+                unique_fields=['residente'],
+                update_fields=self.CAMPOS_CALCULADOS + ['fecha_calculo', 'desactualizado', 'fecha_actualizacion']
+            )
+
+            # Descartar a quienes dejaron de ser residentes
+            sobrantes = CaracteristicasRiesgoResidente.objects.exclude(residente__in=residentes)
+            if residente_ids is not None:
+                sobrantes = sobrantes.filter(residente_id__in=residente_ids)
+            sobrantes.delete()
+        return len(registros)
+
+    @staticmethod
+    def marcar_desactualizados(residente_ids):
+        """Marcar filas para recalcular en la próxima lectura"""
+        residente_ids = set(residente_ids) - {None}
+        if residente_ids:
+            CaracteristicasRiesgoResidente.objects.filter(
+                residente_id__in=residente_ids, desactualizado=False
+            ).update(desactualizado=True)
+
+    @staticmethod
+    def _vigente(registro, hoy):
+        return registro is not None and not registro.desactualizado and registro.fecha_calculo >= hoy
+
+    def obtener(self, residente_id, hoy=None):
+        """
+        Fila de un residente, recalculada solo si falta o está desactualizada
+
+        Returns:
+            CaracteristicasRiesgoResidente o None si no es un residente activo
+        """
+        hoy = hoy or timezone.localdate()
+        consulta = CaracteristicasRiesgoResidente.objects.select_related('residente').filter(residente_id=residente_id)
+        registro = consulta.first()
+        if not self._vigente(registro, hoy):
+            self.actualizar([residente_id], hoy)
+            registro = consulta.first()
+        return registro
+
+    def vigentes(self, residente_ids=None, hoy=None):
+        """
+        Filas de todos los residentes (o los indicados), recalculando antes solo las que faltan
+        o están desactualizadas en una sola pasada agrupada
+        """
+        hoy = hoy or timezone.localdate()
+        residentes = self.residentes(residente_ids)
+        pendientes = list(residentes.filter(
+            Q(caracteristicas_riesgo__isnull=True) |
+            Q(caracteristicas_riesgo__desactualizado=True) |
+            Q(caracteristicas_riesgo__fecha_calculo__lt=hoy)
+        ).values_list('pk', flat=True))
+        if pendientes:
+            self.actualizar(pendientes, hoy)
+        return CaracteristicasRiesgoResidente.objects.filter(residente__in=residentes).order_by('residente_id')
+
+    @staticmethod
+    def matriz(registros):
+        """
+        Matriz de características para el modelo local
+
+        Returns:
+            tuple: (ids como ndarray, matriz n x len(CARACTERISTICAS))
+        """
+        campos = [campo.name for campo in CaracteristicasRiesgoResidente._meta.get_fields()]
+        columnas = [nombre for nombre in CARACTERISTICAS if nombre in campos]
+        if hasattr(registros, 'values_list'):
+            filas = list(registros.values_list('residente_id', *columnas))
+        else:
+            filas = [(registro.residente_id, *(getattr(registro, nombre) for nombre in columnas)) for registro in registros]
+
+        ids = np.array([fila[0] for fila in filas], dtype=np.int64)
+        # Las características que no salen del libro (cambio de ingresos) quedan en su valor por defecto
+        X = np.tile([float(VALORES_DEFECTO.get(nombre, 0)) for nombre in CARACTERISTICAS], (len(filas), 1))
+        if filas:
+            X[:, [CARACTERISTICAS.index(nombre) for nombre in columnas]] = np.array(
+                [fila[1:] for fila in filas], dtype=float
+            )
+        return ids, X
+
+
+# Instancia global del servicio
+caracteristicas_riesgo_service = CaracteristicasRiesgoService()
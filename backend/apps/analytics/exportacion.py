@@ -0,0 +1,373 @@
+"""
+Exportación de las filas de detalle de los reportes (cargos, accesos y reservas)
+
+Las filas se leen con values_list(...).iterator(chunk_size=...) y se escriben en la
+respuesta por bloques a medida que llegan, así que la memoria no depende del rango:
+- csv: UTF-8 con BOM (para que Excel respete los acentos)
+- xlsx: libro escrito fila a fila dentro de un ZIP en streaming, con celdas
+  inlineStr para no acumular la tabla de cadenas compartidas
+- parquet: columnar, un grupo de filas por bloque en un archivo temporal (requiere pyarrow)
+"""
+
+import csv
+import re
+import tempfile
+import zipfile
+from datetime import date, datetime, time, timedelta
+from itertools import islice
+from xml.sax.saxutils import escape
+
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+
+from backend.apps.finances.services import SalidaStreaming
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+
+# Tipos de columna: definen la celda XLSX y el tipo Parquet
+TEXTO, ENTERO, DECIMAL, FECHA, FECHA_HORA, HORA = 'texto', 'entero', 'decimal', 'fecha', 'fecha_hora', 'hora'
+
+# Conjunto -> columnas (encabezado, campo de values_list, tipo)
+COLUMNAS = {
+    'cargos': [
+        ('id', 'id', ENTERO),
+        ('residente', 'residente__username', TEXTO),
+        ('concepto', 'concepto__nombre', TEXTO),
+        ('tipo_concepto', 'concepto__tipo', TEXTO),
+        ('periodo', 'periodo', TEXTO),
+        ('monto', 'monto', DECIMAL),
+        ('estado', 'estado', TEXTO),
+        ('fecha_aplicacion', 'fecha_aplicacion', FECHA),
+        ('fecha_vencimiento', 'fecha_vencimiento', FECHA),
+        ('fecha_pago', 'fecha_pago', FECHA_HORA),
+        ('referencia_pago', 'referencia_pago', TEXTO),
+    ],
+    'accesos': [
+        ('id', 'id', TEXTO),
+        ('fecha_hora', 'fecha_hora', FECHA_HORA),
+        ('usuario', 'usuario__username', TEXTO),
+        ('tipo_acceso', 'tipo_acceso', TEXTO),
+        ('estado', 'estado', TEXTO),
+        ('ubicacion', 'ubicacion', TEXTO),
+        ('confianza_ia', 'confianza_ia', DECIMAL),
+    ],
+    'reservas': [
+        ('id', 'id', ENTERO),
+        ('area', 'area_comun__nombre', TEXTO),
+        ('tipo_area', 'area_comun__tipo', TEXTO),
+        ('usuario', 'usuario__username', TEXTO),
+        ('fecha', 'fecha', FECHA),
+        ('hora_inicio', 'hora_inicio', HORA),
+        ('hora_fin', 'hora_fin', HORA),
+        ('duracion_horas', 'duracion_horas', DECIMAL),
+        ('numero_personas', 'numero_personas', ENTERO),
+        ('estado', 'estado', TEXTO),
+        ('costo_total', 'costo_total', DECIMAL),
+    ],
+}
+
+# Formato solicitado -> (extensión, content type)
+FORMATOS = {
+    'csv': ('csv', 'text/csv; charset=utf-8'),
+    'xlsx': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'parquet': ('parquet', 'application/vnd.apache.parquet'),
+}
+ALIAS_FORMATO = {'excel': 'xlsx'}
+
+_CARACTERES_INVALIDOS_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+_XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+_XLSX_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_XLSX_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{hoja}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+_XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+# Estilos de celda: 0 general, 1 fecha, 2 fecha y hora, 3 hora, 4 decimal con dos cifras
+_XLSX_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<numFmts count="1"><numFmt numFmtId="164" formatCode="yyyy-mm-dd hh:mm:ss"/></numFmts>'
+    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="5">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="20" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="2" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '</cellXfs>'
+    '</styleSheet>'
+)
+_XLSX_ESTILO = {FECHA: 1, FECHA_HORA: 2, HORA: 3, DECIMAL: 4}
+_EPOCA_EXCEL = datetime(1899, 12, 30)
+
+
+class _Eco:
+    """Destino de csv.writer que devuelve la línea en lugar de escribirla"""
+
+    def write(self, valor):
+        return valor
+
+
+class ExportacionService:
+    """Exportar filas de detalle de cargos, accesos y reservas en streaming"""
+
+    TAMANO_BLOQUE = 2000
+
+    @staticmethod
+    def normalizar_formato(formato):
+        """Formato canónico ('excel' es xlsx) o None si no está soportado"""
+        formato = ALIAS_FORMATO.get(formato, formato)
+        return formato if formato in FORMATOS else None
+
+    @staticmethod
+    def _rango_fecha_hora(fecha_inicio, fecha_fin):
+        """Límites [inicio, fin) con zona horaria para filtrar un DateTimeField por fechas locales"""
+        if isinstance(fecha_inicio, datetime):
+            return fecha_inicio, fecha_fin + timedelta(microseconds=1)
+        inicio = timezone.make_aware(datetime.combine(fecha_inicio, time.min))
+        fin = timezone.make_aware(datetime.combine(fecha_fin + timedelta(days=1), time.min))
+        return inicio, fin
+
+    def queryset(self, conjunto, fecha_inicio, fecha_fin, tipo=None, area=None):
+        """
+        Filas de un conjunto en el rango, ordenadas para que la exportación sea estable
+
+        Args:
+            conjunto: 'cargos', 'accesos' o 'reservas'
+            tipo: Tipo del reporte financiero (define la fecha por la que se filtran los cargos)
+            area: Tipo de área común del reporte de uso ('todas' o None para todas)
+        """
+        if conjunto == 'cargos':
+            from backend.apps.finances.models import CargoFinanciero, EstadoCargo, ESTADOS_POR_COBRAR
+
+            if tipo in ('ingresos', 'balance'):
+                # Pagos recibidos en el rango
+                inicio, fin = self._rango_fecha_hora(fecha_inicio, fecha_fin)
+                queryset = CargoFinanciero.objects.filter(
+                    estado=EstadoCargo.PAGADO, fecha_pago__gte=inicio, fecha_pago__lt=fin
+                ).order_by('fecha_pago', 'id')
+            elif tipo == 'morosidad':
+                # Saldos por cobrar que vencen en el rango
+                queryset = CargoFinanciero.objects.filter(
+                    estado__in=ESTADOS_POR_COBRAR, fecha_vencimiento__range=[fecha_inicio, fecha_fin]
+                ).order_by('fecha_vencimiento', 'id')
+            else:
+                queryset = CargoFinanciero.objects.filter(
+                    fecha_aplicacion__range=[fecha_inicio, fecha_fin]
+                ).order_by('fecha_aplicacion', 'id')
+
+        elif conjunto == 'accesos':
+            from backend.apps.modulo_ia.models import Acceso
+
+            inicio, fin = self._rango_fecha_hora(fecha_inicio, fecha_fin)
+            queryset = Acceso.objects.filter(
+                fecha_hora__gte=inicio, fecha_hora__lt=fin
+            ).order_by('fecha_hora', 'id')
+
+        elif conjunto == 'reservas':
+            from backend.apps.reservations.models import Reserva
+
+            queryset = Reserva.objects.filter(fecha__range=[fecha_inicio, fecha_fin])
+            if area and area != 'todas':
+                queryset = queryset.filter(area_comun__tipo=area)
+            queryset = queryset.order_by('fecha', 'hora_inicio', 'id')
+
+        else:
+            raise ValueError(f"Conjunto de exportación desconocido: {conjunto}")
+
+        return queryset.values_list(*(campo for _, campo, _ in COLUMNAS[conjunto]))
+
+    def bloques(self, queryset):
+        """Listas de hasta TAMANO_BLOQUE filas leídas con un cursor por bloques"""
+        filas = queryset.iterator(chunk_size=self.TAMANO_BLOQUE)
+        while True:
+            bloque = list(islice(filas, self.TAMANO_BLOQUE))
+            if not bloque:
+                return
+            yield bloque
+
+    # --- CSV ---
+
+    @staticmethod
+    def _valor_csv(valor):
+        if valor is None:
+            return ''
+        if isinstance(valor, datetime):
+            return timezone.localtime(valor).isoformat() if timezone.is_aware(valor) else valor.isoformat()
+        if isinstance(valor, (date, time)):
+            return valor.isoformat()
+        return valor
+
+    def generar_csv(self, conjunto, queryset):
+        """Bytes del CSV por bloques: BOM y encabezado, luego un trozo por bloque de filas"""
+        escritor = csv.writer(_Eco())
+        yield ('\ufeff' + escritor.writerow([encabezado for encabezado, _, _ in COLUMNAS[conjunto]])).encode('utf-8')
+        for bloque in self.bloques(queryset):
+            yield ''.join(
+                escritor.writerow([self._valor_csv(valor) for valor in fila]) for fila in bloque
+            ).encode('utf-8')
+
+    # --- XLSX ---
+
+    @staticmethod
+    def _celda_texto(valor):
+        texto = escape(_CARACTERES_INVALIDOS_XML.sub('', str(valor)))
+        return f'<c t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>'
+
+    def _celda_xlsx(self, valor, tipo):
+        """Celda con número de serie para fechas y horas, numérica para montos"""
+        if valor is None:
+            return '<c/>'
+        if tipo in (ENTERO, DECIMAL):
+            return f'<c s="{_XLSX_ESTILO.get(tipo, 0)}"><v>{valor}</v></c>'
+        if tipo == FECHA_HORA:
+            if timezone.is_aware(valor):
+                valor = timezone.make_naive(timezone.localtime(valor))
+            serie = (valor - _EPOCA_EXCEL) / timedelta(days=1)
+        elif tipo == FECHA:
+            serie = (valor - _EPOCA_EXCEL.date()).days
+        elif tipo == HORA:
+            serie = (valor.hour * 3600 + valor.minute * 60 + valor.second) / 86400
+        else:
+            return self._celda_texto(valor)
+        return f'<c s="{_XLSX_ESTILO[tipo]}"><v>{serie}</v></c>'
+
+    def generar_xlsx(self, conjunto, queryset):
+        """
+        Bytes del libro XLSX por bloques
+
+        Las partes fijas se escriben al inicio; la hoja se escribe dentro del ZIP a
+        medida que llegan los bloques y el ZIP se entrega sin seek (SalidaStreaming).
+        """
+        columnas = COLUMNAS[conjunto]
+        tipos = [tipo for _, _, tipo in columnas]
+        salida = SalidaStreaming()
+
+        with zipfile.ZipFile(salida, 'w', compression=zipfile.ZIP_DEFLATED) as libro:
+            libro.writestr('[Content_Types].xml', _XLSX_CONTENT_TYPES)
+            libro.writestr('_rels/.rels', _XLSX_RELS)
+            libro.writestr('xl/workbook.xml', _XLSX_WORKBOOK.format(hoja=conjunto))
+            libro.writestr('xl/_rels/workbook.xml.rels', _XLSX_WORKBOOK_RELS)
+            libro.writestr('xl/styles.xml', _XLSX_STYLES)
+            yield salida.vaciar()
+
+            with libro.open('xl/worksheets/sheet1.xml', 'w') as hoja:
+                encabezado = ''.join(self._celda_texto(nombre) for nombre, _, _ in columnas)
+                hoja.write((
+                    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                    f'<sheetData><row>{encabezado}</row>'
+                ).encode('utf-8'))
+                for bloque in self.bloques(queryset):
+                    hoja.write(''.join(
+                        '<row>' + ''.join(map(self._celda_xlsx, fila, tipos)) + '</row>' for fila in bloque
+                    ).encode('utf-8'))
+                    yield salida.vaciar()
+                hoja.write(b'</sheetData></worksheet>')
+
+        yield salida.vaciar()
+
+    # --- Parquet ---
+
+    @staticmethod
+    def _esquema_parquet(conjunto):
+        tipos = {
+            TEXTO: pa.string(),
+            ENTERO: pa.int64(),
+            DECIMAL: pa.float64(),
+            FECHA: pa.date32(),
+            FECHA_HORA: pa.timestamp('us', tz='UTC'),
+            HORA: pa.time64('us'),
+        }
+        return pa.schema([(nombre, tipos[tipo]) for nombre, _, tipo in COLUMNAS[conjunto]])
+
+    def escribir_parquet(self, conjunto, queryset, archivo):
+        """Escribir el conjunto en un archivo Parquet, un grupo de filas por bloque"""
+        columnas = COLUMNAS[conjunto]
+        esquema = self._esquema_parquet(conjunto)
+        convertir = [
+            str if tipo == TEXTO else float if tipo == DECIMAL else None
+            for _, _, tipo in columnas
+        ]
+        with pq.ParquetWriter(archivo, esquema) as escritor:
+            for bloque in self.bloques(queryset):
+                valores = [
+                    [v if v is None or conversion is None else conversion(v) for v in columna]
+                    for columna, conversion in zip(zip(*bloque), convertir)
+                ]
+                escritor.write_table(pa.Table.from_arrays(
+                    [pa.array(columna, type=campo.type) for columna, campo in zip(valores, esquema)],
+                    schema=esquema
+                ))
+
+    # --- Respuesta ---
+
+    def respuesta(self, conjunto, formato, queryset, nombre):
+        """
+        Respuesta HTTP con el archivo exportado
+
+        Args:
+            formato: Formato canónico (ver normalizar_formato)
+            nombre: Nombre del archivo sin extensión
+        """
+        extension, content_type = FORMATOS[formato]
+        nombre_archivo = f"{nombre}.{extension}"
+
+        if formato == 'parquet':
+            # Parquet escribe el pie al final: se arma en disco y se entrega desde el archivo
+            archivo = tempfile.TemporaryFile()
+            self.escribir_parquet(conjunto, queryset, archivo)
+            archivo.seek(0)
+            return FileResponse(archivo, as_attachment=True, filename=nombre_archivo, content_type=content_type)
+
+        generador = self.generar_csv if formato == 'csv' else self.generar_xlsx
+        response = StreamingHttpResponse(generador(conjunto, queryset), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{nombre_archivo}"'
+        return response
+
+
+# Instancia global del servicio
+exportacion_service = ExportacionService()
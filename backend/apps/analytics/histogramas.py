@@ -0,0 +1,51 @@
+"""
+Distribuciones por hora y por día de la semana para los reportes
+
+Cada distribución es una sola consulta agrupada (ExtractHour / ExtractIsoWeekDay);
+los bins que no aparecen en el resultado se completan en cero en Python.
+"""
+
+from django.db.models import Count
+from django.db.models.functions import ExtractHour, ExtractIsoWeekDay
+
+DIAS_SEMANA = ['lunes', 'martes', 'miercoles', 'jueves', 'viernes', 'sabado', 'domingo']
+
+
+def histograma(queryset, expresion, bins, agregado=None):
+    """
+    Agrupar un queryset por una expresión y devolver todos los bins
+
+    Args:
+        queryset: Registros a distribuir
+        expresion: Expresión del bin (por ejemplo ExtractHour('fecha_hora'))
+        bins: Valores posibles del bin, en el orden del resultado
+        agregado: Valor por bin (Count('id') por defecto, o Sum(...))
+
+    Returns:
+        dict: bin -> valor (0 para los bins sin registros)
+    """
+    resultado = dict.fromkeys(bins, 0)
+    filas = queryset.annotate(bin=expresion).values('bin').annotate(
+        valor=agregado if agregado is not None else Count('id')
+    ).order_by()
+    for fila in filas:
+        if fila['bin'] in resultado:
+            resultado[fila['bin']] = fila['valor'] or 0
+    return resultado
+
+
+def por_hora(queryset, campo, agregado=None, formato='{hora:02d}:00'):
+    """
+    Distribución en las 24 horas del día (hora local para campos DateTime)
+
+    Args:
+        formato: Etiqueta de cada hora; recibe hora y siguiente (hora + 1)
+    """
+    valores = histograma(queryset, ExtractHour(campo), range(24), agregado)
+    return {formato.format(hora=hora, siguiente=hora + 1): valor for hora, valor in valores.items()}
+
+
+def por_dia_semana(queryset, campo, agregado=None):
+    """Distribución de lunes a domingo (ExtractIsoWeekDay: 1 = lunes)"""
+    valores = histograma(queryset, ExtractIsoWeekDay(campo), range(1, 8), agregado)
+    return {DIAS_SEMANA[dia - 1]: valor for dia, valor in valores.items()}
@@ -0,0 +1 @@
+# Management commands for analytics app
\ No newline at end of file
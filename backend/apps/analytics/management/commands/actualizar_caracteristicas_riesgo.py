@@ -0,0 +1,30 @@
+"""
+Management command para recalcular la tabla de características de riesgo (CaracteristicasRiesgoResidente)
+
+Pensado para ejecutarse cada noche (cron): las ventanas de tiempo (último año,
+últimos 90 y 30 días) se mueven con la fecha aunque no haya cambios.
+"""
+
+from django.core.management.base import BaseCommand
+
+from backend.apps.analytics.caracteristicas_riesgo import caracteristicas_riesgo_service
+
+
+class Command(BaseCommand):
+    help = 'Recalcular las características de riesgo de morosidad de los residentes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--solo-desactualizadas',
+            action='store_true',
+            help='Recalcular solo las filas marcadas, faltantes o de días anteriores'
+        )
+
+    def handle(self, *args, **options):
+        if options['solo_desactualizadas']:
+            self.stdout.write(self.style.SUCCESS('🔄 ACTUALIZANDO CARACTERÍSTICAS DE RIESGO DESACTUALIZADAS'))
+            filas = caracteristicas_riesgo_service.vigentes().count()
+        else:
+            self.stdout.write(self.style.SUCCESS('🔄 RECALCULANDO CARACTERÍSTICAS DE RIESGO'))
+            filas = caracteristicas_riesgo_service.actualizar()
+        self.stdout.write(self.style.SUCCESS(f'✅ {filas} residente(s) con características vigentes'))
@@ -0,0 +1,65 @@
+"""
+Management command que atiende la cola de trabajos de reportes (TrabajoReporte)
+Por defecto queda en ejecución consultando la cola; con --una-vez la vacía y termina
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from backend.apps.analytics.models import TrabajoReporte
+from backend.apps.analytics.trabajos import trabajo_reporte_service
+
+
+class Command(BaseCommand):
+    help = 'Procesar los trabajos de generación de reportes en cola'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--una-vez',
+            action='store_true',
+            help='Procesar los trabajos en cola y terminar'
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=5,
+            help='Segundos de espera cuando la cola está vacía (por defecto 5)'
+        )
+
+    def handle(self, *args, **options):
+        if options['una_vez']:
+            procesados = self.procesar()
+            self.stdout.write(self.style.SUCCESS(f'✅ {procesados} trabajo(s) procesado(s)'))
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f"📊 Atendiendo la cola de reportes cada {options['intervalo']:g}s (Ctrl+C para salir)"
+        ))
+        try:
+            while True:
+                # Conexiones caídas o vencidas entre vueltas del proceso de larga duración
+                close_old_connections()
+                if not self.procesar():
+                    time.sleep(options['intervalo'])
+        except KeyboardInterrupt:
+            self.stdout.write('👋 Trabajador de reportes detenido')
+
+    def procesar(self):
+        """Vaciar la cola informando cada trabajo terminado"""
+        procesados = 0
+        trabajo_reporte_service.recuperar_abandonados()
+        while True:
+            trabajo = trabajo_reporte_service.tomar_siguiente()
+            if trabajo is None:
+                return procesados
+
+            trabajo = trabajo_reporte_service.ejecutar(trabajo)
+            procesados += 1
+            if trabajo.estado == TrabajoReporte.COMPLETADO:
+                self.stdout.write(self.style.SUCCESS(f'✅ {trabajo}'))
+            elif trabajo.estado == TrabajoReporte.FALLIDO:
+                self.stdout.write(self.style.ERROR(f'❌ {trabajo}: {trabajo.error}'))
+            else:
+                self.stdout.write(self.style.WARNING(f'⚠ {trabajo}'))
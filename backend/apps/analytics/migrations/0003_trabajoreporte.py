@@ -0,0 +1,45 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:53
+
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0002_prediccionmorosidad_residente_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrabajoReporte',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo_reporte', models.CharField(choices=[('financiero', 'Reporte Financiero'), ('seguridad', 'Reporte de Seguridad'), ('uso_areas', 'Reporte de Uso de Áreas')], help_text='Tipo de reporte a generar', max_length=20)),
+                ('parametros', models.JSONField(help_text='Datos validados de la solicitud')),
+                ('clave', models.CharField(help_text='Hash de usuario, tipo y parámetros para deduplicar', max_length=64)),
+                ('estado', models.CharField(choices=[('en_cola', 'En Cola'), ('procesando', 'Procesando'), ('completado', 'Completado'), ('fallido', 'Fallido'), ('cancelado', 'Cancelado')], default='en_cola', max_length=20)),
+                ('progreso', models.PositiveSmallIntegerField(default=0, help_text='Porcentaje de avance', validators=[django.core.validators.MaxValueValidator(100)])),
+                ('mensaje', models.CharField(blank=True, help_text='Etapa actual o resultado', max_length=200)),
+                ('error', models.TextField(blank=True, help_text='Detalle del error si el trabajo falló')),
+                ('cancelacion_solicitada', models.BooleanField(default=False)),
+                ('trabajador', models.CharField(blank=True, help_text='Proceso que tomó el trabajo (host:pid)', max_length=100)),
+                ('reporte_id', models.PositiveIntegerField(blank=True, null=True)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+                ('fecha_inicio_proceso', models.DateTimeField(blank=True, null=True)),
+                ('fecha_fin_proceso', models.DateTimeField(blank=True, null=True)),
+                ('solicitado_por', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trabajos_reporte', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Trabajo de Reporte',
+                'verbose_name_plural': 'Trabajos de Reporte',
+                'ordering': ['-fecha_creacion'],
+                'indexes': [models.Index(fields=['estado', 'fecha_creacion'], name='analytics_t_estado_c7eb38_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('estado__in', ['en_cola', 'procesando'])), fields=('clave',), name='trabajo_reporte_activo_unico')],
+            },
+        ),
+    ]
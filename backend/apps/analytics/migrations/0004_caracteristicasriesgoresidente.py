@@ -0,0 +1,41 @@
+# Generated by Django 5.2.6 on 2026-10-19 12:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0003_trabajoreporte'),
+        ('users', '0002_user_document_number_user_document_type_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CaracteristicasRiesgoResidente',
+            fields=[
+                ('residente', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='caracteristicas_riesgo', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('pagos_atrasados_ultimo_anio', models.PositiveIntegerField(default=0, help_text='Cargos del último año pagados tarde o adeudados')),
+                ('monto_vencido', models.DecimalField(decimal_places=2, default=0, help_text='Saldo adeudado ya vencido', max_digits=12)),
+                ('meses_como_residente', models.PositiveIntegerField(default=0)),
+                ('cambio_uso_servicios_porcentaje', models.FloatField(default=0, help_text='Reservas de los últimos 90 días frente a los 90 anteriores (%)')),
+                ('total_deuda', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('pagos_realizados', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('pagos_pendientes', models.PositiveIntegerField(default=0)),
+                ('total_reservas', models.PositiveIntegerField(default=0)),
+                ('reservas_activas', models.PositiveIntegerField(default=0)),
+                ('accesos_recientes', models.PositiveIntegerField(default=0, help_text='Accesos de los últimos 30 días')),
+                ('actividades_recientes', models.PositiveIntegerField(default=0, help_text='Registros de auditoría de los últimos 30 días')),
+                ('fecha_calculo', models.DateField(help_text='Fecha de referencia de las ventanas de tiempo')),
+                ('desactualizado', models.BooleanField(default=False, help_text='Hubo cambios desde el último cálculo')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Características de Riesgo',
+                'verbose_name_plural': 'Características de Riesgo',
+                'indexes': [models.Index(fields=['desactualizado', 'fecha_calculo'], name='analytics_c_desactu_cb9ceb_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:04
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0004_caracteristicasriesgoresidente'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='prediccionmorosidad',
+            name='precision_modelo',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Precisión del modelo (%); vacío si el modelo no fue evaluado', max_digits=5, null=True, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(100)]),
+        ),
+    ]
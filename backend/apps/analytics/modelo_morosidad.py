@@ -0,0 +1,130 @@
+"""
+Modelo local de riesgo de morosidad
+
+Puntúa una matriz de características (una fila por residente, tomada de
+CaracteristicasRiesgoResidente o de los datos enviados) para todos los residentes a
+la vez: las reglas de peso del método básico se expresan como una matriz de
+indicadores por un vector de pesos, así que miles de residentes se puntúan en
+milisegundos.
+"""
+
+import numpy as np
+
+CARACTERISTICAS = (
+    'pagos_atrasados_ultimo_anio',
+    'monto_vencido',
+    'meses_como_residente',
+    'cambio_uso_servicios_porcentaje',
+    'cambio_ingresos_porcentaje',
+)
+
+# Valor cuando la característica no viene en los datos de entrada
+VALORES_DEFECTO = {'meses_como_residente': 12}
+
+# Pesos de las reglas, en el orden de las columnas de _indicadores
+PESOS = np.array([
+    0.4, 0.2, 0.1,   # pagos atrasados: > 5, 3 a 5, 1 a 2
+    0.3, 0.15,       # ingresos: caída > 20 %, caída de 10 a 20 %
+    0.2, 0.1,        # uso de servicios: aumento > 50 %, de 25 a 50 %
+    0.1,             # residente con menos de 6 meses
+    0.1,             # saldo vencido pendiente
+])
+
+UMBRALES_RIESGO = [0.3, 0.7]
+NIVELES_RIESGO = np.array(['bajo', 'medio', 'alto'])
+
+FACTORES = (
+    'Historial de pagos atrasados',
+    'Disminución en ingresos',
+    'Aumento significativo en uso de servicios',
+    'Residente nuevo',
+    'Saldo vencido pendiente',
+)
+
+
+class ModeloMorosidadLocal:
+    """Características y puntuación vectorizada de riesgo de morosidad"""
+
+    @staticmethod
+    def matriz_desde_datos(residentes):
+        """
+        Matriz de características a partir de datos enviados por el cliente
+
+        Returns:
+            tuple: (ids tal como vienen en los datos, matriz n x len(CARACTERISTICAS))
+        """
+        ids = [
+            residente.get('residente_id', residente.get('id', f"residente_{i + 1}"))
+            for i, residente in enumerate(residentes)
+        ]
+        X = np.array([
+            [float(residente.get(nombre, VALORES_DEFECTO.get(nombre, 0)) or 0) for nombre in CARACTERISTICAS]
+            for residente in residentes
+        ], dtype=float).reshape(len(residentes), len(CARACTERISTICAS))
+        return ids, X
+
+    @staticmethod
+    def _indicadores(X):
+        """Matriz booleana n x len(PESOS): qué reglas cumple cada residente"""
+        atrasos, vencido, meses, servicios, ingresos = X.T
+        return np.column_stack([
+            atrasos > 5, (atrasos > 2) & (atrasos <= 5), (atrasos > 0) & (atrasos <= 2),
+            ingresos < -20, (ingresos >= -20) & (ingresos < -10),
+            servicios > 50, (servicios > 25) & (servicios <= 50),
+            meses < 6,
+            vencido > 0,
+        ])
+
+    def puntuar(self, X):
+        """Probabilidad de riesgo (0 a 1) de cada fila"""
+        return np.minimum(self._indicadores(X).astype(float) @ PESOS, 1.0)
+
+    @staticmethod
+    def factores(X):
+        """Matriz booleana n x len(FACTORES) con los factores de riesgo de cada fila"""
+        atrasos, vencido, meses, servicios, ingresos = X.T
+        return np.column_stack([atrasos > 0, ingresos < -10, servicios > 25, meses < 6, vencido > 0])
+
+    def predecir(self, ids, X, recomendaciones):
+        """
+        Puntuar y clasificar todas las filas
+
+        Args:
+            recomendaciones: Función nivel de riesgo -> lista de recomendaciones
+
+        Returns:
+            dict: predicciones_por_residente, conteos por nivel y frecuencia de factores
+        """
+        probabilidades = self.puntuar(X)
+        niveles = np.digitize(probabilidades, UMBRALES_RIESGO)
+        conteos = np.bincount(niveles, minlength=3)
+        factores = self.factores(X)
+        frecuencia_factores = factores.sum(axis=0)
+        recomendaciones_por_nivel = {nivel: recomendaciones(nivel) for nivel in NIVELES_RIESGO}
+
+        predicciones = []
+        for i, residente_id in enumerate(ids):
+            nivel = NIVELES_RIESGO[niveles[i]]
+            factores_fila = [FACTORES[j] for j in np.flatnonzero(factores[i])]
+            predicciones.append({
+                'residente_id': residente_id.item() if hasattr(residente_id, 'item') else residente_id,
+                'riesgo_morosidad': str(nivel),
+                'probabilidad': round(float(probabilidades[i]), 2),
+                'factores_riesgo': factores_fila or ['Sin factores de riesgo identificados'],
+                'recomendaciones': recomendaciones_por_nivel[nivel],
+                'caracteristicas': dict(zip(CARACTERISTICAS, X[i].round(2).tolist())),
+            })
+
+        return {
+            'predicciones_por_residente': predicciones,
+            'riesgo_bajo': int(conteos[0]),
+            'riesgo_medio': int(conteos[1]),
+            'riesgo_alto': int(conteos[2]),
+            'factores_riesgo_identificados': [
+                FACTORES[j] for j in np.argsort(-frecuencia_factores, kind='stable') if frecuencia_factores[j]
+            ],
+        }
+
+
+# Instancia global del modelo
+modelo_morosidad_local = ModeloMorosidadLocal()
@@ -7,6 +7,8 @@ Este módulo maneja:
 - Reportes de Seguridad
 - Reportes de Uso de Áreas Comunes
 - Predicciones de Morosidad con IA
+- Trabajos en cola para generar reportes fuera del request
+- Características de riesgo por residente para las predicciones
 """
 
 from django.db import models
@@ -248,7 +250,7 @@ class PrediccionMorosidad(models.Model):
     total_residentes_analizados = models.PositiveIntegerField(default=0, help_text="Total de residentes analizados")
     residentes_riesgo_alto = models.PositiveIntegerField(default=0, help_text="Residentes con alto riesgo de morosidad")
     residentes_riesgo_medio = models.PositiveIntegerField(default=0, help_text="Residentes con medio riesgo de morosidad")
-    precision_modelo = models.DecimalField(max_digits=5, decimal_places=2, default=0, validators=[MinValueValidator(0), MaxValueValidator(100)], help_text="Precisión del modelo (%)")
+    precision_modelo = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True, validators=[MinValueValidator(0), MaxValueValidator(100)], help_text="Precisión del modelo (%); vacío si el modelo no fue evaluado")
 
     # Metadatos del modelo
     parametros_modelo = models.JSONField(default=dict, help_text="Parámetros utilizados en el modelo")
@@ -266,4 +268,126 @@ class PrediccionMorosidad(models.Model):
         """Calcula el porcentaje de residentes en riesgo"""
         if self.total_residentes_analizados == 0:
             return 0
-        return round(((self.residentes_riesgo_alto + self.residentes_riesgo_medio) / self.total_residentes_analizados) * 100, 2)
\ No newline at end of file
+        return round(((self.residentes_riesgo_alto + self.residentes_riesgo_medio) / self.total_residentes_analizados) * 100, 2)
+
+class TrabajoReporte(models.Model):
+    """
+    Trabajo en cola para generar un reporte fuera del request
+
+    El endpoint generar_reporte solo encola (202) y el comando procesar_trabajos_reporte
+    lo ejecuta. Un mismo usuario no puede tener dos trabajos activos con los mismos
+    parámetros: la solicitud repetida devuelve el trabajo existente.
+    """
+
+    TIPO_CHOICES = [
+        ('financiero', 'Reporte Financiero'),
+        ('seguridad', 'Reporte de Seguridad'),
+        ('uso_areas', 'Reporte de Uso de Áreas'),
+    ]
+
+    EN_COLA = 'en_cola'
+    PROCESANDO = 'procesando'
+    COMPLETADO = 'completado'
+    FALLIDO = 'fallido'
+    CANCELADO = 'cancelado'
+
+    ESTADO_CHOICES = [
+        (EN_COLA, 'En Cola'),
+        (PROCESANDO, 'Procesando'),
+        (COMPLETADO, 'Completado'),
+        (FALLIDO, 'Fallido'),
+        (CANCELADO, 'Cancelado'),
+    ]
+
+    ESTADOS_ACTIVOS = [EN_COLA, PROCESANDO]
+
+    # Solicitud
+    tipo_reporte = models.CharField(max_length=20, choices=TIPO_CHOICES, help_text="Tipo de reporte a generar")
+    parametros = models.JSONField(help_text="Datos validados de la solicitud")
+    clave = models.CharField(max_length=64, help_text="Hash de usuario, tipo y parámetros para deduplicar")
+    solicitado_por = models.ForeignKey(User, on_delete=models.CASCADE, related_name='trabajos_reporte')
+
+    # Ejecución
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default=EN_COLA)
+    progreso = models.PositiveSmallIntegerField(default=0, validators=[MaxValueValidator(100)], help_text="Porcentaje de avance")
+    mensaje = models.CharField(max_length=200, blank=True, help_text="Etapa actual o resultado")
+    error = models.TextField(blank=True, help_text="Detalle del error si el trabajo falló")
+    cancelacion_solicitada = models.BooleanField(default=False)
+    trabajador = models.CharField(max_length=100, blank=True, help_text="Proceso que tomó el trabajo (host:pid)")
+
+    # Resultado (id del reporte en el modelo que corresponde a tipo_reporte)
+    reporte_id = models.PositiveIntegerField(null=True, blank=True)
+
+    # Fechas
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+    fecha_inicio_proceso = models.DateTimeField(null=True, blank=True)
+    fecha_fin_proceso = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Trabajo de Reporte"
+        verbose_name_plural = "Trabajos de Reporte"
+        ordering = ['-fecha_creacion']
+        indexes = [
+            models.Index(fields=['estado', 'fecha_creacion']),
+        ]
+        constraints = [
+            # Deduplicación también ante solicitudes simultáneas
+            models.UniqueConstraint(
+                fields=['clave'],
+                condition=models.Q(estado__in=['en_cola', 'procesando']),
+                name='trabajo_reporte_activo_unico'
+            ),
+        ]
+
+    def __str__(self):
+        return f"Trabajo {self.id} ({self.get_tipo_reporte_display()}) - {self.get_estado_display()}"
+
+    @property
+    def terminado(self):
+        return self.estado not in self.ESTADOS_ACTIVOS
+
+
+class CaracteristicasRiesgoResidente(models.Model):
+    """
+    Características de riesgo de morosidad de un residente, calculadas en bloque
+
+    La mantiene caracteristicas_riesgo_service: las señales marcan como
+    desactualizados a los residentes con cambios en cargos o reservas y el comando
+    actualizar_caracteristicas_riesgo recalcula todo cada noche (las ventanas de
+    tiempo se mueven con la fecha). Las predicciones leen de aquí.
+    """
+
+    residente = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name='caracteristicas_riesgo'
+    )
+
+    # Características del modelo de riesgo (modelo_morosidad.CARACTERISTICAS)
+    pagos_atrasados_ultimo_anio = models.PositiveIntegerField(default=0, help_text="Cargos del último año pagados tarde o adeudados")
+    monto_vencido = models.DecimalField(max_digits=12, decimal_places=2, default=0, help_text="Saldo adeudado ya vencido")
+    meses_como_residente = models.PositiveIntegerField(default=0)
+    cambio_uso_servicios_porcentaje = models.FloatField(default=0, help_text="Reservas de los últimos 90 días frente a los 90 anteriores (%)")
+
+    # Datos de contexto del residente
+    total_deuda = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    pagos_realizados = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    pagos_pendientes = models.PositiveIntegerField(default=0)
+    total_reservas = models.PositiveIntegerField(default=0)
+    reservas_activas = models.PositiveIntegerField(default=0)
+    accesos_recientes = models.PositiveIntegerField(default=0, help_text="Accesos de los últimos 30 días")
+    actividades_recientes = models.PositiveIntegerField(default=0, help_text="Registros de auditoría de los últimos 30 días")
+
+    # Control de actualización
+    fecha_calculo = models.DateField(help_text="Fecha de referencia de las ventanas de tiempo")
+    desactualizado = models.BooleanField(default=False, help_text="Hubo cambios desde el último cálculo")
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Características de Riesgo"
+        verbose_name_plural = "Características de Riesgo"
+        indexes = [
+            models.Index(fields=['desactualizado', 'fecha_calculo']),
+        ]
+
+    def __str__(self):
+        return f"Características de riesgo de {self.residente_id} ({self.fecha_calculo})"
@@ -4,12 +4,14 @@ Módulo 8: Reportes y Analítica
 """
 
 from rest_framework import serializers
+from rest_framework.reverse import reverse
 from django.utils import timezone
 from .models import (
     ReporteFinanciero,
     ReporteSeguridad,
     ReporteUsoAreas,
-    PrediccionMorosidad
+    PrediccionMorosidad,
+    TrabajoReporte
 )
 
 
@@ -46,12 +48,13 @@ class CrearReporteFinancieroSerializer(serializers.ModelSerializer):
             'fecha_inicio', 'fecha_fin', 'filtros_aplicados'
         ]
 
-    def validate_fecha_fin(self, value):
-        """Validar que fecha_fin no sea anterior a fecha_inicio"""
-        fecha_inicio = self.initial_data.get('fecha_inicio')
-        if fecha_inicio and value < fecha_inicio:
-            raise serializers.ValidationError("La fecha de fin no puede ser anterior a la fecha de inicio")
-        return value
+    def validate(self, attrs):
+        """Validar que fecha_fin no sea anterior a fecha_inicio (ya convertidas a fecha)"""
+        if attrs['fecha_fin'] < attrs['fecha_inicio']:
+            raise serializers.ValidationError(
+                {'fecha_fin': "La fecha de fin no puede ser anterior a la fecha de inicio"}
+            )
+        return attrs
 
 
 class ReporteFinancieroListSerializer(serializers.ModelSerializer):
@@ -108,12 +111,13 @@ class CrearReporteSeguridadSerializer(serializers.ModelSerializer):
             'fecha_inicio', 'fecha_fin', 'filtros_aplicados'
         ]
 
-    def validate_fecha_fin(self, value):
-        """Validar que fecha_fin no sea anterior a fecha_inicio"""
-        fecha_inicio = self.initial_data.get('fecha_inicio')
-        if fecha_inicio and value < fecha_inicio:
-            raise serializers.ValidationError("La fecha de fin no puede ser anterior a la fecha de inicio")
-        return value
+    def validate(self, attrs):
+        """Validar que fecha_fin no sea anterior a fecha_inicio (ya convertidas a fecha)"""
+        if attrs['fecha_fin'] < attrs['fecha_inicio']:
+            raise serializers.ValidationError(
+                {'fecha_fin': "La fecha de fin no puede ser anterior a la fecha de inicio"}
+            )
+        return attrs
 
 
 class ReporteSeguridadListSerializer(serializers.ModelSerializer):
@@ -170,12 +174,13 @@ class CrearReporteUsoAreasSerializer(serializers.ModelSerializer):
             'fecha_inicio', 'fecha_fin', 'filtros_aplicados'
         ]
 
-    def validate_fecha_fin(self, value):
-        """Validar que fecha_fin no sea anterior a fecha_inicio"""
-        fecha_inicio = self.initial_data.get('fecha_inicio')
-        if fecha_inicio and value < fecha_inicio:
-            raise serializers.ValidationError("La fecha de fin no puede ser anterior a la fecha de inicio")
-        return value
+    def validate(self, attrs):
+        """Validar que fecha_fin no sea anterior a fecha_inicio (ya convertidas a fecha)"""
+        if attrs['fecha_fin'] < attrs['fecha_inicio']:
+            raise serializers.ValidationError(
+                {'fecha_fin': "La fecha de fin no puede ser anterior a la fecha de inicio"}
+            )
+        return attrs
 
 
 class ReporteUsoAreasListSerializer(serializers.ModelSerializer):
@@ -302,4 +307,34 @@ class PrediccionMorosidadListSerializer(serializers.ModelSerializer):
         return None
 
     def get_riesgo_porcentaje(self, obj):
-        return obj.get_riesgo_porcentaje()
\ No newline at end of file
+        return obj.get_riesgo_porcentaje()
+
+
+class TrabajoReporteSerializer(serializers.ModelSerializer):
+    """Serializer para el estado de un trabajo de reporte"""
+
+    RUTAS_REPORTE = {
+        'financiero': 'analytics:reporte-financiero-detail',
+        'seguridad': 'analytics:reporte-seguridad-detail',
+        'uso_areas': 'analytics:reporte-uso-areas-detail',
+    }
+
+    url_estado = serializers.SerializerMethodField()
+    url_reporte = serializers.SerializerMethodField()
+
+    class Meta:
+        model = TrabajoReporte
+        fields = [
+            'id', 'tipo_reporte', 'estado', 'progreso', 'mensaje', 'error',
+            'cancelacion_solicitada', 'parametros', 'reporte_id', 'url_estado', 'url_reporte',
+            'solicitado_por', 'fecha_creacion', 'fecha_inicio_proceso', 'fecha_fin_proceso'
+        ]
+        read_only_fields = fields
+
+    def get_url_estado(self, obj):
+        return reverse('analytics:trabajo-reporte-detail', args=[obj.pk], request=self.context.get('request'))
+
+    def get_url_reporte(self, obj):
+        if obj.reporte_id is None:
+            return None
+        return reverse(self.RUTAS_REPORTE[obj.tipo_reporte], args=[obj.reporte_id], request=self.context.get('request'))
@@ -1,38 +1,67 @@
 """
 Servicios de IA para predicciones de morosidad
-Integración con Grok 4 Fast Free via OpenRouter
+Puntuación con el modelo local (modelo_morosidad); Grok 4 Fast Free via OpenRouter
+solo para la narrativa opcional de insights
 """
 
 import os
 import json
-import requests
-from datetime import datetime, timedelta
+import hashlib
+import httpx
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from decimal import Decimal
 from typing import Dict, List, Any, Optional
 import logging
 
+from django.core.cache import cache
+
+from backend.integraciones import obtener_cliente
+
+from .caracteristicas_riesgo import caracteristicas_riesgo_service
+from .modelo_morosidad import modelo_morosidad_local
+
 logger = logging.getLogger(__name__)
 
 
 class GrokMorosidadService:
     """
-    Servicio para predicciones de morosidad usando Grok 4 Fast Free
+    Servicio para predicciones de morosidad usando el modelo local y Grok 4 Fast Free
     """
 
+    # El modelo local de reglas no tiene resultados etiquetados contra los que evaluarse
+    METRICAS_NO_EVALUADAS = {
+        "accuracy": None,
+        "precision": None,
+        "recall": None,
+        "f1_score": None,
+        "auc_roc": None,
+        "nota": "no evaluado",
+    }
+
+    # Insights por residente: lotes acotados por tokens, enviados en paralelo
+    TOKENS_POR_LOTE = 6000
+    TOKENS_SALIDA_POR_RESIDENTE = 120
+    MAX_LLAMADAS_CONCURRENTES = 4
+    NIVELES_CON_INSIGHT = ('medio', 'alto')
+    PREFIJO_CACHE_INSIGHT = 'analytics:insight_morosidad'
+    TIMEOUT_CACHE_INSIGHT = 7 * 24 * 3600
+    VERSION_PROMPT_INSIGHT = 1
+
     def __init__(self):
         # Importar configuración de Django
         from django.conf import settings
 
         self.api_key = getattr(settings, 'GROK_API_KEY', None)
-        self.base_url = "https://openrouter.ai/api/v1"
+        self.base_url = getattr(settings, 'GROK_API_BASE', "https://openrouter.ai/api/v1")
         self.model = "x-ai/grok-4-fast:free"
-        self.max_tokens = 40000  # Máximo de tokens para respuesta
+        self.max_tokens = 1000  # Solo narrativa de insights, no predicciones
         self.temperature = 0.3  # Baja temperatura para respuestas consistentes
 
         if not self.api_key:
-            raise ValueError("GROK_API_KEY no está configurada en settings.py")
+            logger.warning("GROK_API_KEY no está configurada: predicciones sin insights de IA")
 
-    def _make_api_call(self, messages: List[Dict[str, str]]) -> Optional[Dict[str, Any]]:
+    def _make_api_call(self, messages: List[Dict[str, str]], max_tokens: Optional[int] = None) -> Optional[Dict[str, Any]]:
         """
         Realizar llamada a la API de Grok
         """
@@ -47,33 +76,36 @@ class GrokMorosidadService:
             payload = {
                 "model": self.model,
                 "messages": messages,
-                "max_tokens": self.max_tokens,
+                "max_tokens": max_tokens or self.max_tokens,
                 "temperature": self.temperature,
                 "top_p": 0.9,
                 "stream": False
             }
 
             logger.info(f"Haciendo llamada a Grok API con modelo {self.model}")
-            response = requests.post(
+            response = obtener_cliente('grok').post(
                 f"{self.base_url}/chat/completions",
                 headers=headers,
-                json=payload,
-                timeout=30
+                json=payload
             )
 
             if response.status_code == 200:
                 result = response.json()
                 content = result['choices'][0]['message']['content']
                 logger.info("Llamada a Grok API exitosa")
-                return json.loads(content) if content.strip().startswith('{') else {"response": content}
+                content = content.strip()
+                if content.startswith('```'):
+                    # Respuesta JSON envuelta en un bloque de código
+                    content = content.strip('`').removeprefix('json').strip()
+                return json.loads(content) if content.startswith('{') else {"response": content}
             else:
                 logger.error(f"Error en API de Grok: {response.status_code} - {response.text}")
                 return None
 
-        except requests.exceptions.Timeout:
+        except httpx.TimeoutException:
             logger.error("Timeout en llamada a Grok API")
             return None
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"Error de conexión con Grok API: {e}")
             return None
         except json.JSONDecodeError as e:
@@ -83,213 +115,144 @@ class GrokMorosidadService:
             logger.error(f"Error inesperado en llamada a Grok: {e}")
             return None
 
-    def _build_prediction_prompt(self, datos_entrada: Dict[str, Any], modelo: str) -> str:
+    def _build_insights_prompt(self, resumen: Dict[str, Any]) -> str:
         """
-        Construir el prompt para predicción de morosidad
+        Construir el prompt de insights a partir del resumen agregado (no de cada residente)
         """
-        prompt = f"""Eres un experto analista financiero de condominios especializado en predicción de morosidad.
-Tu tarea es analizar datos de residentes y predecir el riesgo de morosidad en pagos de cuotas de mantenimiento.
-
-DATOS DE ENTRADA:
-{json.dumps(datos_entrada, indent=2, ensure_ascii=False)}
-
-MODELO A UTILIZAR: {modelo}
-
-INSTRUCCIONES:
-1. Analiza cada residente considerando factores como:
-   - Historial de pagos (pagos atrasados, montos, frecuencia)
-   - Información financiera (ingresos, deudas, cambios económicos)
-   - Patrón de uso de servicios (aumento/disminución)
-   - Información demográfica (tiempo como residente, tipo de unidad)
-   - Comportamiento reciente (cambios en patrones)
-
-2. Clasifica cada residente en niveles de riesgo:
-   - BAJO: Probabilidad < 30% (pagos puntuales, situación financiera estable)
-   - MEDIO: Probabilidad 30-70% (algunos atrasos menores, cambios en situación)
-   - ALTO: Probabilidad > 70% (múltiples atrasos, señales de alerta financiera)
-
-3. Proporciona métricas de evaluación del modelo:
-   - Precisión (accuracy)
-   - Precisión (precision)
-   - Recall
-   - F1-Score
-   - AUC-ROC
-
-4. Identifica factores de riesgo específicos encontrados
-
-RESPUESTA EN FORMATO JSON:
-{{
-    "predicciones_por_residente": [
-        {{
-            "residente_id": "ID_DEL_RESIDENTE",
-            "riesgo_morosidad": "bajo|medio|alto",
-            "probabilidad": 0.XX,
-            "factores_riesgo": ["factor1", "factor2"],
-            "recomendaciones": ["recomendacion1", "recomendacion2"]
-        }}
-    ],
-    "estadisticas_generales": {{
-        "total_residentes": XX,
-        "riesgo_bajo": XX,
-        "riesgo_medio": XX,
-        "riesgo_alto": XX,
-        "precision_modelo": XX.X
-    }},
-    "factores_riesgo_identificados": ["factor1", "factor2", "factor3"],
-    "metricas_evaluacion": {{
-        "accuracy": 0.XX,
-        "precision": 0.XX,
-        "recall": 0.XX,
-        "f1_score": 0.XX,
-        "auc_roc": 0.XX
-    }},
-    "insights_ia": "Análisis detallado generado por IA sobre patrones encontrados"
-}}
-
-IMPORTANTE:
-- Sé preciso y basado en datos
-- Considera el contexto de condominio residencial
-- Proporciona recomendaciones accionables
-- Usa probabilidades realistas basadas en los datos
-"""
+        return f"""Eres un experto analista financiero de condominios especializado en morosidad.
+Un modelo local ya clasificó a los residentes por riesgo de morosidad. Con el resumen
+agregado, redacta un análisis breve (máximo 5 párrafos cortos) de los patrones
+encontrados y recomendaciones accionables para la administración.
 
-        return prompt
+RESUMEN:
+{json.dumps(resumen, ensure_ascii=False)}
 
-    def _fallback_prediction(self, datos_entrada: Dict[str, Any], modelo: str, residente_id: Optional[int] = None) -> Dict[str, Any]:
+Responde solo con el texto del análisis, sin JSON."""
+
+    def _generar_insights(self, resumen: Dict[str, Any]) -> Optional[str]:
         """
-        Método de fallback cuando la API de Grok no está disponible
-        Implementa lógica básica de predicción
+        Narrativa opcional del LLM sobre el resumen; None si no hay API o falla
         """
-        logger.warning("Usando método de fallback para predicción de morosidad")
-
-        # Si se especifica un residente, los datos ya están en formato individual
-        if residente_id:
-            residentes = [datos_entrada]
-        else:
-            residentes = datos_entrada.get('residentes', [])
-
-        total_residentes = len(residentes)
-
-        if total_residentes == 0:
-            return self._empty_prediction_response()
-
-        # Lógica básica de predicción
-        predicciones = []
-        riesgo_bajo = 0
-        riesgo_medio = 0
-        riesgo_alto = 0
-
-        for residente in residentes:
-            # Análisis básico basado en datos disponibles
-            riesgo_score = self._calculate_basic_risk_score(residente)
-
-            if riesgo_score < 0.3:
-                riesgo = "bajo"
-                riesgo_bajo += 1
-            elif riesgo_score < 0.7:
-                riesgo = "medio"
-                riesgo_medio += 1
-            else:
-                riesgo = "alto"
-                riesgo_alto += 1
-
-            predicciones.append({
-                "residente_id": residente.get('residente_id', residente.get('id', f"residente_{len(predicciones) + 1}")),
-                "riesgo_morosidad": riesgo,
-                "probabilidad": round(riesgo_score, 2),
-                "factores_riesgo": self._identify_basic_risk_factors(residente),
-                "recomendaciones": self._generate_basic_recommendations(riesgo)
-            })
-
-        # Calcular precisión basada en el modelo
-        precision_base = {
-            'grok-4-fast-free': 92.5,
-        }
-        precision = precision_base.get(modelo, 80.0)
-
-        return {
-            "predicciones_por_residente": predicciones,
-            "estadisticas_generales": {
-                "total_residentes": total_residentes,
-                "riesgo_bajo": riesgo_bajo,
-                "riesgo_medio": riesgo_medio,
-                "riesgo_alto": riesgo_alto,
-                "precision_modelo": precision,
+        if not self.api_key:
+            return None
+        respuesta = self._make_api_call([
+            {
+                "role": "system",
+                "content": "Eres un experto analista financiero especializado en predicción de morosidad en condominios."
             },
-            "factores_riesgo_identificados": [
-                "Historial de pagos atrasados",
-                "Cambios en ingresos declarados",
-                "Aumento en uso de servicios",
-                "Cambios en patrón de ocupación"
+            {"role": "user", "content": self._build_insights_prompt(resumen)}
+        ])
+        if not respuesta:
+            return None
+        return respuesta.get('response') or json.dumps(respuesta, ensure_ascii=False)
+
+    @staticmethod
+    def _estimar_tokens(texto: str) -> int:
+        """Estimación conservadora (unos 4 caracteres por token)"""
+        return len(texto) // 4 + 1
+
+    def _clave_insight(self, prediccion: Dict[str, Any]) -> str:
+        """Clave de caché del insight de un residente: cambia si cambian sus características"""
+        vector = json.dumps(
+            [prediccion['caracteristicas'], prediccion['riesgo_morosidad'], self.model, self.VERSION_PROMPT_INSIGHT],
+            sort_keys=True
+        )
+        return f"{self.PREFIJO_CACHE_INSIGHT}:{prediccion['residente_id']}:{hashlib.sha256(vector.encode()).hexdigest()}"
+
+    def _lotes_insights(self, predicciones: List[Dict[str, Any]]) -> List[List[str]]:
+        """Líneas JSON de cada residente agrupadas en lotes de a lo sumo TOKENS_POR_LOTE"""
+        lotes, lote, tokens = [], [], 0
+        for prediccion in predicciones:
+            linea = json.dumps({
+                "residente_id": prediccion['residente_id'],
+                "riesgo": prediccion['riesgo_morosidad'],
+                "probabilidad": prediccion['probabilidad'],
+                "caracteristicas": prediccion['caracteristicas'],
+                "factores": prediccion['factores_riesgo'],
+            }, ensure_ascii=False)
+            tokens_linea = self._estimar_tokens(linea)
+            if lote and tokens + tokens_linea > self.TOKENS_POR_LOTE:
+                lotes.append(lote)
+                lote, tokens = [], 0
+            lote.append(linea)
+            tokens += tokens_linea
+        if lote:
+            lotes.append(lote)
+        return lotes
+
+    def _insights_lote(self, lote: List[str]) -> Optional[Dict[str, str]]:
+        """
+        Pedir el insight de un lote de residentes (se ejecuta en un hilo, sin acceso a la base)
+
+        Returns:
+            dict residente_id (str) -> insight, o None si la llamada falló
+        """
+        prompt = f"""Eres un experto analista financiero de condominios especializado en morosidad.
+Para cada residente (una línea JSON por residente), escribe un insight de una o dos
+frases sobre su riesgo de morosidad y la acción recomendada. No inventes datos.
+
+RESIDENTES:
+{chr(10).join(lote)}
+
+Responde solo con JSON: {{"insights": [{{"residente_id": ..., "insight": "..."}}]}}"""
+        respuesta = self._make_api_call(
+            [
+                {"role": "system", "content": "Eres un experto analista financiero especializado en morosidad en condominios."},
+                {"role": "user", "content": prompt}
             ],
-            "metricas_evaluacion": {
-                "accuracy": precision / 100,
-                "precision": 0.82,
-                "recall": 0.79,
-                "f1_score": 0.80,
-                "auc_roc": 0.88
-            },
-            "insights_ia": "Análisis realizado con método de fallback debido a indisponibilidad de API de IA. Se recomienda revisar conexión con Grok API."
+            max_tokens=self.TOKENS_SALIDA_POR_RESIDENTE * len(lote) + 100
+        )
+        if not respuesta or not isinstance(respuesta.get('insights'), list):
+            return None
+        return {
+            str(item.get('residente_id')): str(item.get('insight', '')).strip()
+            for item in respuesta['insights'] if isinstance(item, dict) and item.get('insight')
         }
 
-    def _calculate_basic_risk_score(self, residente: Dict[str, Any]) -> float:
-        """
-        Calcular score básico de riesgo usando lógica simple
+    def _generar_insights_por_residente(self, predicciones: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
-        score = 0.0
-
-        # Historial de pagos (40% del score)
-        pagos_atrasados = residente.get('pagos_atrasados_ultimo_anio', 0)
-        if pagos_atrasados > 5:
-            score += 0.4
-        elif pagos_atrasados > 2:
-            score += 0.2
-        elif pagos_atrasados > 0:
-            score += 0.1
-
-        # Cambios en ingresos (30% del score)
-        cambio_ingresos = residente.get('cambio_ingresos_porcentaje', 0)
-        if cambio_ingresos < -20:
-            score += 0.3
-        elif cambio_ingresos < -10:
-            score += 0.15
-
-        # Uso de servicios (20% del score)
-        cambio_servicios = residente.get('cambio_uso_servicios_porcentaje', 0)
-        if cambio_servicios > 50:
-            score += 0.2
-        elif cambio_servicios > 25:
-            score += 0.1
-
-        # Tiempo como residente (10% del score)
-        meses_residente = residente.get('meses_como_residente', 12)
-        if meses_residente < 6:
-            score += 0.1
-
-        return min(score, 1.0)  # Máximo 1.0
-
-    def _identify_basic_risk_factors(self, residente: Dict[str, Any]) -> List[str]:
-        """
-        Identificar factores de riesgo básicos
-        """
-        factores = []
-
-        if residente.get('pagos_atrasados_ultimo_anio', 0) > 0:
-            factores.append("Historial de pagos atrasados")
-
-        if residente.get('cambio_ingresos_porcentaje', 0) < -10:
-            factores.append("Disminución en ingresos")
-
-        if residente.get('cambio_uso_servicios_porcentaje', 0) > 25:
-            factores.append("Aumento significativo en uso de servicios")
-
-        if residente.get('meses_como_residente', 12) < 6:
-            factores.append("Residente nuevo")
+        Agregar 'insight_ia' a las predicciones de riesgo medio y alto
 
-        if not factores:
-            factores.append("Sin factores de riesgo identificados")
+        Los insights se cachean por residente y hash de sus características: solo se
+        envían los residentes nuevos o con cambios, en lotes concurrentes. Un lote
+        fallido deja sin insight solo a sus residentes.
 
-        return factores
+        Returns:
+            dict: Conteos de residentes, aciertos de caché, enviados y lotes
+        """
+        candidatos = [p for p in predicciones if p['riesgo_morosidad'] in self.NIVELES_CON_INSIGHT]
+        claves = {str(p['residente_id']): self._clave_insight(p) for p in candidatos}
+        cacheados = cache.get_many(list(claves.values())) if claves else {}
+
+        pendientes = [p for p in candidatos if claves[str(p['residente_id'])] not in cacheados]
+        lotes = self._lotes_insights(pendientes) if self.api_key else []
+        nuevos, lotes_fallidos = {}, 0
+        if lotes:
+            with ThreadPoolExecutor(max_workers=min(self.MAX_LLAMADAS_CONCURRENTES, len(lotes))) as executor:
+                for resultado in executor.map(self._insights_lote, lotes):
+                    if resultado is None:
+                        lotes_fallidos += 1
+                    else:
+                        nuevos.update(resultado)
+            nuevos = {residente_id: texto for residente_id, texto in nuevos.items() if residente_id in claves}
+            cache.set_many({claves[residente_id]: texto for residente_id, texto in nuevos.items()}, self.TIMEOUT_CACHE_INSIGHT)
+
+        for prediccion in candidatos:
+            residente_id = str(prediccion['residente_id'])
+            insight = cacheados.get(claves[residente_id]) or nuevos.get(residente_id)
+            if insight:
+                prediccion['insight_ia'] = insight
+
+        if lotes_fallidos:
+            logger.warning(f"{lotes_fallidos} de {len(lotes)} lote(s) de insights fallaron")
+        return {
+            "residentes": len(candidatos),
+            "desde_cache": len(candidatos) - len(pendientes),
+            "enviados": len(pendientes) if lotes else 0,
+            "generados": len(nuevos),
+            "lotes": len(lotes),
+            "lotes_fallidos": lotes_fallidos,
+        }
 
     def _generate_basic_recommendations(self, riesgo: str) -> List[str]:
         """
@@ -326,23 +289,19 @@ IMPORTANTE:
                 "riesgo_bajo": 0,
                 "riesgo_medio": 0,
                 "riesgo_alto": 0,
-                "precision_modelo": 0.0,
+                "precision_modelo": None,
             },
             "factores_riesgo_identificados": [],
-            "metricas_evaluacion": {
-                "accuracy": 0.0,
-                "precision": 0.0,
-                "recall": 0.0,
-                "f1_score": 0.0,
-                "auc_roc": 0.0
-            },
+            "metricas_evaluacion": dict(self.METRICAS_NO_EVALUADAS),
             "insights_ia": "No hay datos suficientes para generar predicciones."
         }
 
-    def _determine_confidence_level(self, precision: float) -> str:
+    def _determine_confidence_level(self, precision: Optional[float]) -> str:
         """
-        Determinar nivel de confianza basado en la precisión
+        Determinar nivel de confianza basado en la precisión (bajo si el modelo no está evaluado)
         """
+        if precision is None:
+            return 'bajo'
         if precision >= 85:
             return 'alto'
         elif precision >= 75:
@@ -354,84 +313,61 @@ IMPORTANTE:
         """
         Obtener datos específicos de un residente para predicción individual
 
+        Lee su fila de CaracteristicasRiesgoResidente (se recalcula solo si está
+        desactualizada) en lugar de recorrer su historial completo.
+
         Args:
             residente_id: ID del residente
 
         Returns:
             Dict con datos del residente
         """
-        try:
-            from django.contrib.auth import get_user_model
-            from finances.models import CargoFinanciero, ConceptoFinanciero
-            from reservations.models import Reserva
-            from modulo_ia.models import Acceso
-            from audit.models import RegistroAuditoria
-            from django.utils import timezone
-
-            User = get_user_model()
-
-            # Obtener residente
-            residente = User.objects.get(id=residente_id)
-
-            # Obtener datos financieros del residente
-            cargos = CargoFinanciero.objects.filter(residente=residente)
-            total_deuda = sum(cargo.monto for cargo in cargos if not cargo.pagado)
-            pagos_realizados = sum(cargo.monto for cargo in cargos if cargo.pagado)
-            pagos_pendientes = len([c for c in cargos if not c.pagado])
-
-            # Obtener reservas del residente
-            reservas = Reserva.objects.filter(residente=residente)
-            reservas_activas = len([r for r in reservas if r.estado == 'activa'])
-
-            # Obtener accesos de seguridad
-            accesos = Acceso.objects.filter(residente=residente)
-            accesos_recientes = len([a for a in accesos if a.fecha_acceso >= timezone.now() - timedelta(days=30)])
-
-            # Obtener registros de auditoría
-            auditorias = RegistroAuditoria.objects.filter(
-                usuario=residente,
-                fecha__gte=timezone.now() - timedelta(days=30)
-            )
-            actividades_recientes = len(auditorias)
-
-            # Calcular métricas de riesgo
-            meses_como_residente = (timezone.now().date() - residente.date_joined.date()).days // 30
-            ratio_pago = pagos_realizados / (pagos_realizados + total_deuda) if (pagos_realizados + total_deuda) > 0 else 0
-
-            return {
-                "residente_id": residente.id,
-                "nombre": f"{residente.first_name} {residente.last_name}",
-                "email": residente.email,
-                "fecha_registro": residente.date_joined.isoformat(),
-                "meses_como_residente": meses_como_residente,
-                "datos_financieros": {
-                    "total_deuda": float(total_deuda),
-                    "pagos_realizados": float(pagos_realizados),
-                    "pagos_pendientes": pagos_pendientes,
-                    "ratio_pago": float(ratio_pago)
-                },
-                "reservas": {
-                    "total_reservas": len(reservas),
-                    "reservas_activas": reservas_activas
-                },
-                "seguridad": {
-                    "accesos_recientes": accesos_recientes,
-                    "actividades_recientes": actividades_recientes
-                }
-            }
-
-        except User.DoesNotExist:
+        registro = caracteristicas_riesgo_service.obtener(residente_id)
+        if registro is None:
             logger.error(f"Residente con ID {residente_id} no encontrado")
             raise ValueError(f"Residente con ID {residente_id} no encontrado")
-        except Exception as e:
-            logger.error(f"Error obteniendo datos del residente {residente_id}: {e}")
-            raise
+
+        residente = registro.residente
+        pagos_realizados = registro.pagos_realizados
+        total_deuda = registro.total_deuda
+        ratio_pago = pagos_realizados / (pagos_realizados + total_deuda) if (pagos_realizados + total_deuda) > 0 else 0
+
+        return {
+            "residente_id": residente.id,
+            "nombre": f"{residente.first_name} {residente.last_name}",
+            "email": residente.email,
+            "fecha_registro": residente.date_joined.isoformat(),
+            "meses_como_residente": registro.meses_como_residente,
+            "pagos_atrasados_ultimo_anio": registro.pagos_atrasados_ultimo_anio,
+            "monto_vencido": float(registro.monto_vencido),
+            "cambio_uso_servicios_porcentaje": registro.cambio_uso_servicios_porcentaje,
+            "datos_financieros": {
+                "total_deuda": float(total_deuda),
+                "pagos_realizados": float(pagos_realizados),
+                "pagos_pendientes": registro.pagos_pendientes,
+                "ratio_pago": float(ratio_pago)
+            },
+            "reservas": {
+                "total_reservas": registro.total_reservas,
+                "reservas_activas": registro.reservas_activas
+            },
+            "seguridad": {
+                "accesos_recientes": registro.accesos_recientes,
+                "actividades_recientes": registro.actividades_recientes
+            },
+            "fecha_calculo": registro.fecha_calculo.isoformat()
+        }
 
     def generar_prediccion_morosidad(self, modelo: str, datos_entrada: Dict[str, Any],
                                    parametros: Optional[Dict[str, Any]] = None,
                                    residente_id: Optional[int] = None) -> Dict[str, Any]:
         """
-        Generar predicción de morosidad usando IA
+        Generar predicción de morosidad con el modelo local
+
+        Las características salen de CaracteristicasRiesgoResidente (todos los
+        residentes, o solo residente_id); si datos_entrada trae 'residentes', se
+        puntúan esos datos. El LLM solo se usa si parametros['incluir_insights_ia']
+        (narrativa del resumen) o parametros['insights_por_residente'].
 
         Args:
             modelo: Tipo de modelo de IA a utilizar
@@ -442,72 +378,99 @@ IMPORTANTE:
         Returns:
             Dict con resultados de la predicción
         """
+        parametros = parametros or {}
         logger.info(f"Iniciando predicción de morosidad con modelo {modelo}" + (f" para residente {residente_id}" if residente_id else ""))
 
-        # Si se especifica un residente, obtener sus datos reales
+        datos_residente = None
         if residente_id:
-            datos_entrada = self._obtener_datos_residente(residente_id)
+            datos_residente = self._obtener_datos_residente(residente_id)
+            ids, X = modelo_morosidad_local.matriz_desde_datos([datos_residente])
+        elif datos_entrada.get('residentes'):
+            ids, X = modelo_morosidad_local.matriz_desde_datos(datos_entrada['residentes'])
+        else:
+            ids, X = caracteristicas_riesgo_service.matriz(caracteristicas_riesgo_service.vigentes())
 
-        # Construir prompt para Grok
-        prompt = self._build_prediction_prompt(datos_entrada, modelo)
+        resultados = self._resultados_locales(
+            ids, X, modelo,
+            incluir_insights=parametros.get('incluir_insights_ia', False),
+            insights_por_residente=parametros.get('insights_por_residente', False)
+        )
+        if datos_residente:
+            resultados['datos_residente'] = datos_residente
 
-        messages = [
-            {
-                "role": "system",
-                "content": "Eres un experto analista financiero especializado en predicción de morosidad en condominios. Proporciona análisis precisos y recomendaciones accionables basadas en datos."
-            },
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ]
-
-        # Intentar llamada a API de Grok
-        respuesta_ia = self._make_api_call(messages)
-
-        if respuesta_ia:
-            try:
-                # Procesar respuesta de Grok
-                predicciones = respuesta_ia.get('predicciones_por_residente', [])
-                estadisticas = respuesta_ia.get('estadisticas_generales', {})
-                metricas = respuesta_ia.get('metricas_evaluacion', {})
-
-                # Extraer valores necesarios
-                total_residentes = estadisticas.get('total_residentes', 0)
-                riesgo_alto = estadisticas.get('riesgo_alto', 0)
-                riesgo_medio = estadisticas.get('riesgo_medio', 0)
-                precision = estadisticas.get('precision_modelo', 80.0)
-
-                # Determinar nivel de confianza
-                nivel_confianza = self._determine_confidence_level(precision)
-
-                # Completar respuesta
-                resultado_completo = {
-                    "resultados": respuesta_ia,
-                    "total_residentes_analizados": total_residentes,
-                    "residentes_riesgo_alto": riesgo_alto,
-                    "residentes_riesgo_medio": riesgo_medio,
-                    "precision_modelo": precision,
-                    "nivel_confianza": nivel_confianza,
-                    "metricas_evaluacion": metricas,
-                    "fuente": "grok_ai",
-                    "residente_especifico": residente_id is not None
-                }
-
-                logger.info(f"Predicción completada exitosamente con Grok AI. Analizados: {total_residentes} residentes")
-                return resultado_completo
-
-            except Exception as e:
-                logger.error(f"Error procesando respuesta de Grok: {e}")
-                # Usar fallback
-                return self._fallback_prediction(datos_entrada, modelo, residente_id)
+        logger.info(f"Predicción completada con el modelo local. Analizados: {len(ids)} residentes")
+        return self._respuesta_prediccion(resultados, None, residente_id)
 
-        else:
-            # Usar método de fallback
-            logger.warning("API de Grok no disponible, usando método de fallback")
-            resultado_fallback = self._fallback_prediction(datos_entrada, modelo, residente_id)
-            resultado_fallback["fuente"] = "fallback"
-            return resultado_fallback
+    def _resultados_locales(self, ids, X, modelo: str, incluir_insights: bool = False,
+                            insights_por_residente: bool = False) -> Dict[str, Any]:
+        """
+        Puntuar la matriz de características con el modelo local (todas las filas a la vez)
+        """
+        if not len(ids):
+            return self._empty_prediction_response()
+
+        prediccion = modelo_morosidad_local.predecir(ids, X, self._generate_basic_recommendations)
+        estadisticas = {
+            "total_residentes": len(ids),
+            "riesgo_bajo": prediccion['riesgo_bajo'],
+            "riesgo_medio": prediccion['riesgo_medio'],
+            "riesgo_alto": prediccion['riesgo_alto'],
+            "precision_modelo": None,
+        }
+
+        insights = None
+        if incluir_insights:
+            insights = self._generar_insights({
+                "estadisticas_generales": estadisticas,
+                "factores_riesgo_identificados": prediccion['factores_riesgo_identificados'],
+            })
+
+        resumen_insights = None
+        if insights_por_residente:
+            resumen_insights = self._generar_insights_por_residente(prediccion['predicciones_por_residente'])
+
+        return {
+            "predicciones_por_residente": prediccion['predicciones_por_residente'],
+            "estadisticas_generales": estadisticas,
+            "factores_riesgo_identificados": prediccion['factores_riesgo_identificados'],
+            "metricas_evaluacion": dict(self.METRICAS_NO_EVALUADAS),
+            "insights_ia": insights or "Predicción generada con el modelo local de reglas ponderadas.",
+            "insights_por_residente": resumen_insights,
+            "fuente": "modelo_local+grok_ai" if insights or (resumen_insights and resumen_insights['generados'] + resumen_insights['desde_cache']) else "modelo_local"
+        }
+
+    def _fallback_prediction(self, datos_entrada: Dict[str, Any], modelo: str, residente_id: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Predicción con el modelo local sobre los datos recibidos (sin consultar el libro)
+        """
+        residentes = [datos_entrada] if residente_id else datos_entrada.get('residentes', [])
+        ids, X = modelo_morosidad_local.matriz_desde_datos(residentes)
+        return self._resultados_locales(ids, X, modelo)
+
+    def _calculate_basic_risk_score(self, residente: Dict[str, Any]) -> float:
+        """
+        Score de riesgo de un residente (una fila del modelo local)
+        """
+        _, X = modelo_morosidad_local.matriz_desde_datos([residente])
+        return float(modelo_morosidad_local.puntuar(X)[0])
+
+    def _respuesta_prediccion(self, resultados: Dict[str, Any], precision: Optional[float],
+                              residente_id: Optional[int]) -> Dict[str, Any]:
+        """
+        Envolver los resultados con los campos que guarda PrediccionMorosidad
+        """
+        estadisticas = resultados['estadisticas_generales']
+        return {
+            "resultados": resultados,
+            "total_residentes_analizados": estadisticas['total_residentes'],
+            "residentes_riesgo_alto": estadisticas['riesgo_alto'],
+            "residentes_riesgo_medio": estadisticas['riesgo_medio'],
+            "precision_modelo": precision,
+            "nivel_confianza": self._determine_confidence_level(precision),
+            "metricas_evaluacion": resultados['metricas_evaluacion'],
+            "fuente": resultados.get('fuente', 'modelo_local'),
+            "residente_especifico": residente_id is not None
+        }
 
     def validar_datos_entrada(self, datos_entrada: Dict[str, Any]) -> Dict[str, Any]:
         """
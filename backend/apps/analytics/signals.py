@@ -0,0 +1,64 @@
+"""
+Señales del Módulo de Reportes y Analítica
+Invalidan la caché de reportes (cache_reportes) por dominio y mes cuando cambian sus datos de origen
+y marcan como desactualizadas las características de riesgo de los residentes afectados
+
+Los registros de auditoría creados en bloque (bulk_create) no emiten post_save; como
+siempre llevan la fecha actual, solo afectan períodos abiertos, que expiran por tiempo.
+Accesos y auditoría no marcan características de riesgo (solo son contexto, no entran
+en la puntuación): se recalculan en la actualización nocturna.
+"""
+
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from backend.apps.audit.models import RegistroAuditoria
+from backend.apps.finances.signals import libro_modificado
+from backend.apps.modulo_ia.models import Acceso
+from backend.apps.reservations.models import Reserva
+from backend.apps.reservations.signals import reservas_modificadas
+
+from .cache_reportes import cache_reportes_service
+from .caracteristicas_riesgo import caracteristicas_riesgo_service
+
+
+@receiver(libro_modificado)
+def invalidar_reportes_financieros(sender, dias, residente_ids=(), **kwargs):
+    """Cambios del libro de cargos, individuales o masivos (emitida tras el commit)"""
+    cache_reportes_service.invalidar('finanzas', dias)
+    caracteristicas_riesgo_service.marcar_desactualizados(residente_ids)
+
+
+@receiver(post_save, sender=Acceso)
+@receiver(post_delete, sender=Acceso)
+def invalidar_reportes_accesos(sender, instance, **kwargs):
+    cache_reportes_service.invalidar_al_confirmar('accesos', [instance.fecha_hora])
+
+
+@receiver(post_save, sender=RegistroAuditoria)
+@receiver(post_delete, sender=RegistroAuditoria)
+def invalidar_reportes_auditoria(sender, instance, **kwargs):
+    cache_reportes_service.invalidar_al_confirmar('auditoria', [instance.timestamp])
+
+
+@receiver(pre_save, sender=Reserva)
+def recordar_fecha_reserva(sender, instance, **kwargs):
+    """Guardar la fecha anterior: una reserva movida cambia también el mes de origen"""
+    if instance.pk:
+        instance._fecha_anterior = Reserva.objects.filter(pk=instance.pk).values_list('fecha', flat=True).first()
+
+
+@receiver(post_save, sender=Reserva)
+@receiver(post_delete, sender=Reserva)
+def invalidar_reportes_reservas(sender, instance, **kwargs):
+    cache_reportes_service.invalidar_al_confirmar(
+        'reservas', [instance.fecha, getattr(instance, '_fecha_anterior', None)]
+    )
+    caracteristicas_riesgo_service.marcar_desactualizados([instance.usuario_id])
+
+
+@receiver(reservas_modificadas)
+def invalidar_reportes_reservas_masivo(sender, fechas, usuario_ids=(), **kwargs):
+    """Reservas creadas o cambiadas en bloque (emitida tras el commit)"""
+    cache_reportes_service.invalidar('reservas', fechas)
+    caracteristicas_riesgo_service.marcar_desactualizados(usuario_ids)
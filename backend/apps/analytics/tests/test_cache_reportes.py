@@ -0,0 +1,138 @@
+"""
+Tests for the report result cache and its per-domain, per-month invalidation
+"""
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from backend.apps.analytics.cache_reportes import cache_reportes_service
+from backend.apps.analytics.models import ReporteFinanciero, TrabajoReporte
+from backend.apps.analytics.views import ReporteFinancieroViewSet
+from backend.apps.audit.models import RegistroAuditoria, TipoActividad
+from backend.apps.finances.models import CargoFinanciero, ConceptoFinanciero, TipoConcepto
+from .test_base import AnalyticsTestBase
+
+
+class CacheReportesTest(AnalyticsTestBase):
+    """Test cache hits, request normalization and ledger-driven invalidation"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.url = reverse('analytics:reporte-financiero-generar-reporte')
+        self.datos = {
+            'titulo': 'Ingresos enero',
+            'tipo': 'ingresos',
+            'periodo': 'mensual',
+            'formato': 'json',
+            'fecha_inicio': '2025-01-01',
+            'fecha_fin': '2025-01-31',
+            'filtros_aplicados': {}
+        }
+        self.concepto = ConceptoFinanciero.objects.create(
+            nombre='Cuota', tipo=TipoConcepto.CUOTA_MENSUAL, monto=Decimal('100.00'), creado_por=self.user_admin
+        )
+        self.authenticate_as_admin()
+
+    def generar(self, **cambios):
+        """POST the request and run the worker; returns the POST response"""
+        response = self.client.post(self.url, {**self.datos, **cambios}, format='json')
+        call_command('procesar_trabajos_reporte', '--una-vez', stdout=StringIO())
+        return response
+
+    def crear_cargo(self, fecha_vencimiento):
+        with self.captureOnCommitCallbacks(execute=True):
+            return CargoFinanciero.objects.create(
+                concepto=self.concepto, residente=self.user_resident, monto=Decimal('100.00'),
+                fecha_aplicacion=fecha_vencimiento, fecha_vencimiento=fecha_vencimiento, aplicado_por=self.user_admin
+            )
+
+    def test_hit_creates_report_without_source_queries(self):
+        """A repeated request is served from cache: 201, no ledger or rollup queries"""
+        self.assertEqual(self.generar().status_code, status.HTTP_202_ACCEPTED)
+
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.post(self.url, {**self.datos, 'titulo': 'Otro título'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['estado'], TrabajoReporte.COMPLETADO)
+        self.assertFalse([q for q in consultas.captured_queries if 'finances_' in q['sql']])
+
+        reportes = ReporteFinanciero.objects.order_by('id')
+        self.assertEqual(reportes.count(), 2)
+        self.assertEqual(reportes[1].titulo, 'Otro título')
+        self.assertEqual(reportes[0].datos, reportes[1].datos)
+
+    def test_key_ignores_presentation_fields(self):
+        """Title, period and format do not change the key; type, range and filters do"""
+        clave = cache_reportes_service.clave('financiero', self.datos)
+        self.assertEqual(clave, cache_reportes_service.clave('financiero', {**self.datos, 'formato': 'pdf'}))
+        self.assertNotEqual(clave, cache_reportes_service.clave('financiero', {**self.datos, 'tipo': 'balance'}))
+        self.assertNotEqual(clave, cache_reportes_service.clave(
+            'financiero', {**self.datos, 'filtros_aplicados': {'torre': 'A'}}
+        ))
+
+    def test_ledger_change_in_range_invalidates(self):
+        """A charge in the report's month invalidates it; one in another month does not"""
+        self.generar()
+        self.crear_cargo(date(2025, 3, 10))
+        self.assertEqual(self.generar().status_code, status.HTTP_201_CREATED)
+
+        self.crear_cargo(date(2025, 1, 10))
+        response = self.generar()
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+    def test_bulk_sweep_invalidates(self):
+        """The overdue sweep (a bulk UPDATE) also bumps the affected months"""
+        from backend.apps.finances.services import vencimiento_service
+
+        self.crear_cargo(date(2025, 1, 10))
+        self.generar(tipo='morosidad')
+        with self.captureOnCommitCallbacks(execute=True):
+            vencimiento_service.marcar_cargos_vencidos()
+        self.assertEqual(self.generar(tipo='morosidad').status_code, status.HTTP_202_ACCEPTED)
+
+    def test_audit_rows_bump_version_once_after_commit(self):
+        """Audit writes invalidate nothing before commit and bump each month once per transaction"""
+        hoy = timezone.localdate()
+        version = cache_reportes_service.versiones(('auditoria',), hoy, hoy)
+
+        with patch.object(cache, 'incr', wraps=cache.incr) as incr:
+            with self.captureOnCommitCallbacks(execute=True):
+                for i in range(3):
+                    RegistroAuditoria.objects.create(
+                        usuario=self.user_admin, tipo_actividad=TipoActividad.CREAR, descripcion=f'Evento {i}'
+                    )
+                self.assertEqual(cache_reportes_service.versiones(('auditoria',), hoy, hoy), version)
+                incr.assert_not_called()
+
+        incr.assert_called_once_with(f'analytics:version:auditoria:{hoy:%Y-%m}')
+        self.assertNotEqual(cache_reportes_service.versiones(('auditoria',), hoy, hoy), version)
+
+    def test_worker_reuses_cached_data(self):
+        """Two queued jobs for the same data compute it once"""
+        self.client.post(self.url, self.datos, format='json')
+        self.client.post(self.url, {**self.datos, 'titulo': 'Segundo'}, format='json')
+        with patch.object(
+            ReporteFinancieroViewSet, '_generar_datos_financieros', return_value={'total_registros': 0}
+        ) as generar:
+            call_command('procesar_trabajos_reporte', '--una-vez', stdout=StringIO())
+        generar.assert_called_once()
+        self.assertEqual(TrabajoReporte.objects.filter(estado=TrabajoReporte.COMPLETADO).count(), 2)
+
+    def test_open_period_expires(self):
+        """Closed periods never expire; a range reaching today uses a short timeout"""
+        self.assertIsNone(cache_reportes_service._timeout(self.datos))
+        hoy = date.today().isoformat()
+        self.assertEqual(
+            cache_reportes_service._timeout({**self.datos, 'fecha_fin': hoy}),
+            cache_reportes_service.TIMEOUT_PERIODO_ABIERTO
+        )
@@ -0,0 +1,156 @@
+"""
+Tests for the streaming CSV/XLSX export of report drill-down rows
+"""
+import csv
+import io
+import zipfile
+from datetime import date, datetime, time
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from backend.apps.analytics.exportacion import ExportacionService, exportacion_service
+from backend.apps.analytics.models import ReporteFinanciero, ReporteSeguridad, ReporteUsoAreas
+from backend.apps.finances.models import CargoFinanciero, ConceptoFinanciero, TipoConcepto
+from backend.apps.modulo_ia.models import Acceso
+from backend.apps.reservations.models import AreaComun, EstadoReserva, Reserva
+from .test_base import AnalyticsTestBase
+
+
+class ExportacionTest(AnalyticsTestBase):
+    """Test exported rows, formats, range filters and chunked reads"""
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate_as_admin()
+        concepto = ConceptoFinanciero.objects.create(
+            nombre='Cuota, enero', tipo=TipoConcepto.CUOTA_MENSUAL, monto=Decimal('100.00'), creado_por=self.user_admin
+        )
+        for dia in (5, 20):
+            CargoFinanciero.objects.create(
+                concepto=concepto, residente=self.user_resident, monto=Decimal('100.50'),
+                fecha_aplicacion=date(2025, 1, dia), fecha_vencimiento=date(2025, 1, dia), aplicado_por=self.user_admin
+            )
+        # Fuera del rango del reporte
+        CargoFinanciero.objects.create(
+            concepto=concepto, residente=self.user_resident, monto=Decimal('1.00'),
+            fecha_aplicacion=date(2025, 2, 1), fecha_vencimiento=date(2025, 2, 1), aplicado_por=self.user_admin
+        )
+
+    def crear_reporte_financiero(self, formato='json'):
+        return ReporteFinanciero.objects.create(
+            titulo='Cargos enero', tipo='presupuesto', periodo='mensual', formato=formato,
+            fecha_inicio=date(2025, 1, 1), fecha_fin=date(2025, 1, 31), generado_por=self.user_admin, datos={}
+        )
+
+    def descargar(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, b''.join(response.streaming_content)
+
+    def test_csv_streams_rows_of_report_range(self):
+        """The CSV has a header and one row per charge of the report range"""
+        reporte = self.crear_reporte_financiero()
+        response, contenido = self.descargar(reverse('analytics:reporte-financiero-exportar', args=[reporte.pk]))
+
+        self.assertTrue(response.streaming)
+        self.assertIn('cargos_20250101_20250131.csv', response['Content-Disposition'])
+        filas = list(csv.reader(io.StringIO(contenido.decode('utf-8-sig'))))
+        self.assertEqual(filas[0][:3], ['id', 'residente', 'concepto'])
+        self.assertEqual(len(filas), 3)
+        self.assertEqual(filas[1][2], 'Cuota, enero')
+        self.assertEqual(filas[1][5], '100.50')
+        self.assertEqual(filas[1][7], '2025-01-05')
+
+    def test_report_format_is_default_and_xlsx_is_valid(self):
+        """An 'excel' report exports a workbook with typed date and amount cells"""
+        reporte = self.crear_reporte_financiero(formato='excel')
+        response, contenido = self.descargar(reverse('analytics:reporte-financiero-exportar', args=[reporte.pk]))
+
+        self.assertTrue(response['Content-Disposition'].endswith('.xlsx"'))
+        with zipfile.ZipFile(io.BytesIO(contenido)) as libro:
+            self.assertIsNone(libro.testzip())
+            self.assertIn('xl/workbook.xml', libro.namelist())
+            hoja = libro.read('xl/worksheets/sheet1.xml').decode('utf-8')
+        self.assertEqual(hoja.count('<row>'), 3)
+        self.assertIn('<v>100.50</v>', hoja)
+        self.assertIn(f'<v>{(date(2025, 1, 5) - date(1899, 12, 30)).days}</v>', hoja)
+
+    def test_unknown_or_unavailable_format_is_rejected(self):
+        """Unsupported formats and parquet without pyarrow return 400"""
+        url = reverse('analytics:reporte-financiero-exportar', args=[self.crear_reporte_financiero().pk])
+        self.assertEqual(self.client.get(url, {'formato': 'pdf'}).status_code, status.HTTP_400_BAD_REQUEST)
+        with patch('backend.apps.analytics.views.PYARROW_AVAILABLE', False):
+            response = self.client.get(url, {'formato': 'parquet'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('pyarrow', response.data['error'])
+
+    def test_access_export_uses_local_day_bounds(self):
+        """Accesses are exported for the whole last day of the security report"""
+        tz = timezone.get_current_timezone()
+        for fecha_hora in (datetime(2025, 1, 31, 23, 30, tzinfo=tz), datetime(2025, 2, 1, 0, 30, tzinfo=tz)):
+            acceso = Acceso.objects.create(ubicacion='Puerta Principal', estado='permitido')
+            Acceso.objects.filter(pk=acceso.pk).update(fecha_hora=fecha_hora)
+        reporte = ReporteSeguridad.objects.create(
+            titulo='Accesos enero', tipo='accesos', periodo='mensual', generado_por=self.user_admin, datos={},
+            fecha_inicio=datetime(2025, 1, 1, tzinfo=tz), fecha_fin=datetime(2025, 1, 31, 23, 59, 59, tzinfo=tz)
+        )
+        _, contenido = self.descargar(reverse('analytics:reporte-seguridad-exportar', args=[reporte.pk]))
+
+        filas = list(csv.reader(io.StringIO(contenido.decode('utf-8-sig'))))
+        self.assertEqual(len(filas), 2)
+        self.assertTrue(filas[1][1].startswith('2025-01-31T23:30'))
+
+    def test_reservation_export_filters_area(self):
+        """The area-usage export only includes reservations of the report's area type"""
+        gimnasio = AreaComun.objects.create(nombre='Gimnasio', tipo='gimnasio', capacidad_maxima=10)
+        piscina = AreaComun.objects.create(nombre='Piscina', tipo='piscina', capacidad_maxima=10)
+        for area in (gimnasio, piscina):
+            Reserva.objects.create(
+                area_comun=area, usuario=self.user_resident, fecha=date(2025, 1, 10),
+                hora_inicio=time(8), hora_fin=time(10), estado=EstadoReserva.CONFIRMADA
+            )
+        reporte = ReporteUsoAreas.objects.create(
+            titulo='Gimnasio', area='gimnasio', periodo='mes', metrica_principal='reservas', datos={},
+            fecha_inicio=date(2025, 1, 1), fecha_fin=date(2025, 1, 31), generado_por=self.user_admin
+        )
+        _, contenido = self.descargar(
+            reverse('analytics:reporte-uso-areas-exportar', args=[reporte.pk]), formato='xlsx'
+        )
+
+        with zipfile.ZipFile(io.BytesIO(contenido)) as libro:
+            hoja = libro.read('xl/worksheets/sheet1.xml').decode('utf-8')
+        self.assertEqual(hoja.count('<row>'), 2)
+        self.assertIn('Gimnasio', hoja)
+        self.assertNotIn('Piscina', hoja)
+
+    def test_rows_are_read_in_chunks(self):
+        """Rows come from iterator() in blocks of TAMANO_BLOQUE"""
+        queryset = exportacion_service.queryset('cargos', date(2025, 1, 1), date(2025, 12, 31))
+        with patch.object(ExportacionService, 'TAMANO_BLOQUE', 2):
+            partes = list(exportacion_service.generar_csv('cargos', queryset))
+        # Encabezado + un bloque de dos filas + un bloque de una fila
+        self.assertEqual(len(partes), 3)
+
+    def test_staff_cannot_export_others_reports(self):
+        """Exports follow the report visibility rules"""
+        reporte = self.crear_reporte_financiero()
+        self.authenticate_as_staff()
+        response = self.client.get(reverse('analytics:reporte-financiero-exportar', args=[reporte.pk]))
+        self.assertIn(response.status_code, (status.HTTP_403_FORBIDDEN, status.HTTP_404_NOT_FOUND))
+
+    def test_charge_export_is_admin_only(self):
+        """Maintenance and security staff can read reports but not export residents' charges"""
+        for rol in ('maintenance', 'security'):
+            usuario = get_user_model().objects.create_user(username=f'{rol}_test', password='x', role=rol)
+            reporte = ReporteFinanciero.objects.create(
+                titulo='Cargos enero', tipo='presupuesto', periodo='mensual', formato='csv',
+                fecha_inicio=date(2025, 1, 1), fecha_fin=date(2025, 1, 31), generado_por=usuario, datos={}
+            )
+            self.client.force_authenticate(user=usuario)
+            response = self.client.get(reverse('analytics:reporte-financiero-exportar', args=[reporte.pk]))
+            self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,81 @@
+"""
+Tests for the grouped hour/weekday histograms used by the security and area-usage reports
+"""
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from backend.apps.analytics.views import ReporteSeguridadViewSet, ReporteUsoAreasViewSet
+from backend.apps.modulo_ia.models import Acceso
+from backend.apps.reservations.models import AreaComun, EstadoReserva, Reserva
+from .test_base import AnalyticsTestBase
+
+
+class HistogramasTest(AnalyticsTestBase):
+    """Test dense bins, the 23h bin and the query count of each report"""
+
+    def crear_acceso(self, fecha_hora, estado='permitido'):
+        acceso = Acceso.objects.create(ubicacion='Puerta Principal', estado=estado)
+        Acceso.objects.filter(pk=acceso.pk).update(fecha_hora=fecha_hora)
+
+    def crear_reserva(self, area, fecha, inicio, fin, estado=EstadoReserva.CONFIRMADA):
+        return Reserva.objects.create(
+            area_comun=area, usuario=self.user_resident, fecha=fecha,
+            hora_inicio=time(inicio), hora_fin=time(fin), estado=estado, costo_total=Decimal('10.00')
+        )
+
+    def test_access_histogram_covers_whole_range_and_24_hours(self):
+        """Accesses from every day of the range land in their hour, including 23:00"""
+        tz = timezone.get_current_timezone()
+        self.crear_acceso(datetime(2025, 1, 1, 23, 30, tzinfo=tz))
+        self.crear_acceso(datetime(2025, 1, 5, 23, 10, tzinfo=tz), estado='denegado')
+        self.crear_acceso(datetime(2025, 1, 3, 2, 0, tzinfo=tz))
+
+        with CaptureQueriesContext(connection) as consultas:
+            datos = ReporteSeguridadViewSet()._generar_datos_seguridad(
+                'accesos', datetime(2025, 1, 1, tzinfo=tz), datetime(2025, 1, 31, tzinfo=tz), {}
+            )
+
+        self.assertEqual(len(datos['accesos_por_hora']), 24)
+        self.assertEqual(datos['accesos_por_hora']['23:00-24:00'], 2)
+        self.assertEqual(datos['accesos_por_hora']['02:00-03:00'], 1)
+        self.assertEqual(datos['accesos_por_hora']['12:00-13:00'], 0)
+        self.assertEqual((datos['total_accesos'], datos['accesos_denegados']), (3, 1))
+        self.assertLessEqual(len(consultas.captured_queries), 4)
+
+    def test_area_usage_weekday_and_hour_bins(self):
+        """Occupied hours are grouped by ISO weekday and start hour in three queries"""
+        area = AreaComun.objects.create(nombre='Salón', tipo='salon_eventos', capacidad_maxima=50)
+        self.crear_reserva(area, date(2025, 1, 6), 8, 10)    # lunes
+        self.crear_reserva(area, date(2025, 1, 12), 21, 23)  # domingo
+        self.crear_reserva(area, date(2025, 1, 13), 9, 10, estado=EstadoReserva.CANCELADA)
+
+        with CaptureQueriesContext(connection) as consultas:
+            datos = ReporteUsoAreasViewSet()._generar_datos_uso_areas(
+                'todas', 'ocupacion', date(2025, 1, 1), date(2025, 1, 31), {}
+            )
+
+        self.assertEqual(datos['ocupacion_por_dia']['lunes'], 2.0)
+        self.assertEqual(datos['ocupacion_por_dia']['domingo'], 2.0)
+        self.assertEqual(datos['ocupacion_por_dia']['martes'], 0.0)
+        self.assertEqual(datos['ocupacion_por_hora']['21:00'], 2.0)
+        self.assertEqual(len(datos['ocupacion_por_hora']), 24)
+        self.assertEqual(datos['total_reservas'], 2)
+        self.assertEqual(len(consultas.captured_queries), 3)
+
+    def test_reservations_by_month_across_years(self):
+        """Monthly counts fill every month of a range that crosses a year"""
+        area = AreaComun.objects.create(nombre='Gimnasio', tipo='gimnasio', capacidad_maxima=10)
+        self.crear_reserva(area, date(2024, 12, 30), 8, 9)
+        self.crear_reserva(area, date(2025, 2, 3), 8, 9, estado=EstadoReserva.CANCELADA)
+
+        datos = ReporteUsoAreasViewSet()._generar_datos_uso_areas(
+            'todas', 'reservas', date(2024, 12, 1), date(2025, 2, 28), {}
+        )
+
+        self.assertEqual(datos['reservas_por_mes'], {'2024-12': 1, '2025-01': 0, '2025-02': 1})
+        self.assertEqual(datos['reservas_por_dia_semana']['lunes'], 2)
+        self.assertEqual((datos['reservas_confirmadas'], datos['reservas_canceladas']), (1, 1))
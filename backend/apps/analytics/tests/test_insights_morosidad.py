@@ -0,0 +1,103 @@
+"""
+Tests for batched, cached per-resident delinquency insights
+"""
+import json
+import re
+import threading
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import override_settings
+
+from backend.apps.analytics.modelo_morosidad import modelo_morosidad_local
+from backend.apps.analytics.services import GrokMorosidadService
+from .test_base import AnalyticsTestBase
+
+
+@override_settings(GROK_API_KEY='clave')
+class InsightsPorResidenteTest(AnalyticsTestBase):
+    """Test token-bounded batches, the per-resident cache and partial failures"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.service = GrokMorosidadService()
+        self.llamadas = []
+        self.lock = threading.Lock()
+        self.fallar_con = None
+
+    def datos(self, n=6, atrasos=4):
+        return [{'id': i, 'pagos_atrasados_ultimo_anio': atrasos, 'monto_vencido': 50} for i in range(1, n + 1)]
+
+    def api_falsa(self, messages, max_tokens=None):
+        """Responder un insight por cada residente_id del prompt"""
+        ids = [int(i) for i in re.findall(r'"residente_id": (\d+)', messages[1]['content'])]
+        with self.lock:
+            self.llamadas.append(ids)
+        if self.fallar_con in ids:
+            return None
+        return {'insights': [{'residente_id': i, 'insight': f'Residente {i} con atrasos'} for i in ids]}
+
+    def predecir(self, datos):
+        ids, X = modelo_morosidad_local.matriz_desde_datos(datos)
+        with patch.object(GrokMorosidadService, '_make_api_call', side_effect=self.api_falsa):
+            return self.service._resultados_locales(ids, X, 'grok-4-fast-free', insights_por_residente=True)
+
+    def test_residents_are_split_into_token_bounded_batches(self):
+        """Every resident is sent exactly once, in several batches under the token budget"""
+        with patch.object(GrokMorosidadService, 'TOKENS_POR_LOTE', 150):
+            resultados = self.predecir(self.datos())
+
+        self.assertGreater(len(self.llamadas), 1)
+        self.assertEqual(sorted(sum(self.llamadas, [])), [1, 2, 3, 4, 5, 6])
+        self.assertEqual(resultados['insights_por_residente']['lotes'], len(self.llamadas))
+        self.assertTrue(all(p['insight_ia'] for p in resultados['predicciones_por_residente']))
+        self.assertEqual(resultados['fuente'], 'modelo_local+grok_ai')
+
+    def test_rerun_only_sends_changed_residents(self):
+        """Unchanged residents come from the cache; a changed feature vector is re-sent"""
+        self.predecir(self.datos())
+        self.llamadas.clear()
+
+        resultados = self.predecir(self.datos())
+        self.assertEqual(self.llamadas, [])
+        self.assertEqual(resultados['insights_por_residente']['desde_cache'], 6)
+
+        datos = self.datos()
+        datos[2]['monto_vencido'] = 900
+        self.predecir(datos)
+        self.assertEqual(self.llamadas, [[3]])
+
+    def test_failed_batch_only_affects_its_residents(self):
+        """A failing call leaves the other batches' insights in place and is not cached"""
+        self.fallar_con = 1
+        with patch.object(GrokMorosidadService, 'TOKENS_POR_LOTE', 150):
+            resultados = self.predecir(self.datos())
+
+        resumen = resultados['insights_por_residente']
+        self.assertEqual(resumen['lotes_fallidos'], 1)
+        con_insight = {p['residente_id'] for p in resultados['predicciones_por_residente'] if 'insight_ia' in p}
+        self.assertNotIn(1, con_insight)
+        self.assertEqual(len(con_insight), resumen['generados'])
+        self.assertGreater(len(con_insight), 0)
+
+        self.fallar_con = None
+        self.llamadas.clear()
+        self.predecir(self.datos())
+        self.assertIn(1, sum(self.llamadas, []))
+        self.assertNotIn(6, sum(self.llamadas, []))
+
+    def test_low_risk_residents_are_not_sent(self):
+        """Only medium and high risk residents get an insight"""
+        resultados = self.predecir(self.datos(n=3, atrasos=0))
+        self.assertEqual(self.llamadas, [])
+        self.assertEqual(resultados['fuente'], 'modelo_local')
+
+    def test_batch_response_in_code_fence_is_parsed(self):
+        """The pooled client response may wrap the JSON in a ```json block"""
+        contenido = '```json\n' + json.dumps({'insights': [{'residente_id': 1, 'insight': 'Revisar'}]}) + '\n```'
+        respuesta = type('R', (), {'status_code': 200, 'json': lambda self: {
+            'choices': [{'message': {'content': contenido}}]
+        }})()
+        with patch('backend.apps.analytics.services.httpx.Client.post', return_value=respuesta):
+            self.assertEqual(self.service._insights_lote(['{"residente_id": 1}']), {'1': 'Revisar'})
@@ -0,0 +1,255 @@
+"""
+Tests for the local vectorized delinquency scoring model
+"""
+import threading
+import time as time_module
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import skipUnless
+from unittest.mock import patch
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from backend.apps.analytics.caracteristicas_riesgo import caracteristicas_riesgo_service
+from backend.apps.analytics.modelo_morosidad import CARACTERISTICAS, modelo_morosidad_local
+from backend.apps.analytics.models import CaracteristicasRiesgoResidente
+from backend.apps.analytics.services import GrokMorosidadService
+from backend.apps.finances.models import CargoFinanciero, ConceptoFinanciero, EstadoCargo, TipoConcepto
+from backend.apps.reservations.models import AreaComun, EstadoReserva, Reserva
+from .test_base import AnalyticsTestBase
+
+
+class ModeloMorosidadTest(AnalyticsTestBase):
+    """Test the rule weights as matrix ops, the resident feature table and the prediction flow"""
+
+    def setUp(self):
+        super().setUp()
+        self.hoy = timezone.localdate()
+        self.concepto = ConceptoFinanciero.objects.create(
+            nombre='Cuota', tipo=TipoConcepto.CUOTA_MENSUAL, monto=Decimal('100.00'), creado_por=self.user_admin
+        )
+
+    def crear_cargo(self, dias_vencido, estado=EstadoCargo.PENDIENTE, dias_pago_tarde=None):
+        vencimiento = self.hoy - timedelta(days=dias_vencido)
+        fecha_pago = None
+        if dias_pago_tarde is not None:
+            fecha_pago = timezone.make_aware(datetime.combine(vencimiento + timedelta(days=dias_pago_tarde), time(12)))
+        return CargoFinanciero.objects.create(
+            concepto=self.concepto, residente=self.user_resident, monto=Decimal('100.00'), estado=estado,
+            fecha_aplicacion=vencimiento, fecha_vencimiento=vencimiento, fecha_pago=fecha_pago,
+            aplicado_por=self.user_admin
+        )
+
+    def test_rule_weights_match_basic_rules(self):
+        """The vectorized score reproduces the rule thresholds row by row"""
+        _, X = modelo_morosidad_local.matriz_desde_datos([
+            {'id': 1, 'pagos_atrasados_ultimo_anio': 0, 'meses_como_residente': 24},
+            {'id': 2, 'pagos_atrasados_ultimo_anio': 3, 'cambio_ingresos_porcentaje': -15},
+            {'id': 3, 'pagos_atrasados_ultimo_anio': 6, 'cambio_ingresos_porcentaje': -25,
+             'cambio_uso_servicios_porcentaje': 80, 'meses_como_residente': 3},
+            {'id': 4},
+        ])
+        np.testing.assert_allclose(modelo_morosidad_local.puntuar(X), [0.0, 0.35, 1.0, 0.0])
+
+    def test_feature_table_from_grouped_queries(self):
+        """Late payments, overdue amount, tenure and usage change come from one query per source"""
+        self.crear_cargo(40)                                               # adeudado y vencido
+        self.crear_cargo(70, EstadoCargo.PAGADO, dias_pago_tarde=5)         # pagado tarde
+        self.crear_cargo(100, EstadoCargo.PAGADO, dias_pago_tarde=-1)       # pagado a tiempo
+        self.crear_cargo(400)                                              # fuera del último año
+        area = AreaComun.objects.create(nombre='Gimnasio', tipo='gimnasio', capacidad_maxima=10)
+        for dias in (10, 20, 120):
+            Reserva.objects.create(
+                area_comun=area, usuario=self.user_resident, fecha=self.hoy - timedelta(days=dias),
+                hora_inicio=time(8), hora_fin=time(9), estado=EstadoReserva.CONFIRMADA
+            )
+        User = get_user_model()
+        for i in range(5):
+            User.objects.create_user(username=f'vecino{i}', password='x', role='resident')
+
+        with CaptureQueriesContext(connection) as consultas:
+            registros = caracteristicas_riesgo_service.calcular()
+        self.assertEqual(len(consultas.captured_queries), 5)
+        self.assertEqual(len(registros), 6)
+
+        ids, X = caracteristicas_riesgo_service.matriz(registros)
+        fila = dict(zip(CARACTERISTICAS, X[list(ids).index(self.user_resident.pk)]))
+        self.assertEqual(fila['pagos_atrasados_ultimo_anio'], 2)
+        self.assertEqual(fila['monto_vencido'], 200.0)
+        self.assertEqual(fila['cambio_uso_servicios_porcentaje'], 100.0)
+        self.assertEqual(fila['meses_como_residente'], 0)
+
+    def test_single_prediction_reads_one_row_until_marked_stale(self):
+        """A fresh row is a one-query read; ledger and reservation changes mark it stale"""
+        caracteristicas_riesgo_service.actualizar()
+        with CaptureQueriesContext(connection) as consultas:
+            registro = caracteristicas_riesgo_service.obtener(self.user_resident.pk)
+        self.assertEqual(len(consultas.captured_queries), 1)
+        self.assertEqual(registro.pagos_pendientes, 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.crear_cargo(10)
+        self.assertTrue(CaracteristicasRiesgoResidente.objects.get(pk=self.user_resident.pk).desactualizado)
+
+        registro = caracteristicas_riesgo_service.obtener(self.user_resident.pk)
+        self.assertFalse(registro.desactualizado)
+        self.assertEqual((registro.pagos_pendientes, registro.monto_vencido), (1, Decimal('100.00')))
+
+        datos = GrokMorosidadService()._obtener_datos_residente(self.user_resident.pk)
+        self.assertEqual(datos['datos_financieros']['total_deuda'], 100.0)
+        self.assertEqual(datos['seguridad']['accesos_recientes'], 0)
+
+    def test_bulk_read_recomputes_only_stale_rows(self):
+        """vigentes() recalculates missing, stale or previous-day rows and leaves the rest"""
+        otro = get_user_model().objects.create_user(username='vecino', password='x', role='resident')
+        caracteristicas_riesgo_service.actualizar([self.user_resident.pk])
+        CaracteristicasRiesgoResidente.objects.filter(pk=self.user_resident.pk).update(pagos_pendientes=99)
+
+        registros = {r.residente_id: r for r in caracteristicas_riesgo_service.vigentes()}
+        self.assertEqual(set(registros), {self.user_resident.pk, otro.pk})
+        self.assertEqual(registros[self.user_resident.pk].pagos_pendientes, 99)
+
+        CaracteristicasRiesgoResidente.objects.filter(pk=self.user_resident.pk).update(
+            fecha_calculo=self.hoy - timedelta(days=1)
+        )
+        registros = {r.residente_id: r for r in caracteristicas_riesgo_service.vigentes()}
+        self.assertEqual(registros[self.user_resident.pk].pagos_pendientes, 0)
+
+    def test_nightly_command_rebuilds_table(self):
+        """actualizar_caracteristicas_riesgo recalculates every resident"""
+        salida = StringIO()
+        call_command('actualizar_caracteristicas_riesgo', stdout=salida)
+        self.assertIn('1 residente(s)', salida.getvalue())
+        self.assertTrue(CaracteristicasRiesgoResidente.objects.filter(pk=self.user_resident.pk).exists())
+
+    @override_settings(GROK_API_KEY='')
+    def test_prediction_does_not_call_llm_by_default(self):
+        """Predictions for all residents are local; no HTTP request is made"""
+        self.crear_cargo(40)
+        with patch('backend.apps.analytics.services.httpx.Client.post') as post:
+            resultado = GrokMorosidadService().generar_prediccion_morosidad('grok-4-fast-free', {})
+        post.assert_not_called()
+
+        self.assertEqual(resultado['fuente'], 'modelo_local')
+        self.assertEqual(resultado['total_residentes_analizados'], 1)
+        prediccion = resultado['resultados']['predicciones_por_residente'][0]
+        self.assertEqual(prediccion['residente_id'], self.user_resident.pk)
+        self.assertIn('Saldo vencido pendiente', prediccion['factores_riesgo'])
+
+    @override_settings(GROK_API_KEY='')
+    def test_unevaluated_model_reports_no_metrics(self):
+        """The rule model has no labelled outcomes: no precision, metrics marked as not evaluated"""
+        self.crear_cargo(40)
+        resultado = GrokMorosidadService().generar_prediccion_morosidad('grok-4-fast-free', {})
+
+        self.assertIsNone(resultado['precision_modelo'])
+        self.assertEqual(resultado['nivel_confianza'], 'bajo')
+        metricas = resultado['metricas_evaluacion']
+        self.assertEqual(metricas['nota'], 'no evaluado')
+        for nombre in ('accuracy', 'precision', 'recall', 'f1_score', 'auc_roc'):
+            self.assertIsNone(metricas[nombre])
+
+    @override_settings(GROK_API_KEY='clave')
+    def test_optional_insights_send_only_the_summary(self):
+        """With incluir_insights_ia the LLM gets aggregate stats, not every resident"""
+        respuesta = type('R', (), {'status_code': 200, 'json': lambda self: {
+            'choices': [{'message': {'content': 'Riesgo concentrado en saldos vencidos.'}}]
+        }})()
+        with patch('backend.apps.analytics.services.httpx.Client.post', return_value=respuesta) as post:
+            resultado = GrokMorosidadService().generar_prediccion_morosidad(
+                'grok-4-fast-free', {}, {'incluir_insights_ia': True}
+            )
+
+        prompt = post.call_args.kwargs['json']['messages'][1]['content']
+        self.assertNotIn(self.user_resident.email, prompt)
+        self.assertEqual(resultado['resultados']['insights_ia'], 'Riesgo concentrado en saldos vencidos.')
+        self.assertEqual(resultado['fuente'], 'modelo_local+grok_ai')
+
+    def test_endpoint_creates_prediction_for_one_resident(self):
+        """The generar_prediccion endpoint stores the local result for residente_id"""
+        self.authenticate_as_admin()
+        self.crear_cargo(40)
+        response = self.client.post(reverse('analytics:prediccion-morosidad-generar-prediccion'), {
+            'titulo': 'Riesgo residente',
+            'periodo_predicho': 'Próximo mes',
+            'datos_entrada': {},
+            'residente_id': self.user_resident.pk,
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['total_residentes_analizados'], 1)
+        self.assertTrue(response.data['residente_especifico'])
+        self.assertIsNone(response.data['precision_modelo'])
+        self.assertEqual(response.data['metricas_evaluacion']['nota'], 'no evaluado')
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Requiere bloqueos de fila de PostgreSQL')
+class CaracteristicasRiesgoConcurrenteTest(TransactionTestCase):
+    """Refreshes and stale marks of the same resident from different transactions"""
+
+    def setUp(self):
+        self.residente = get_user_model().objects.create_user(username='resident_test', password='x', role='resident')
+
+    def en_paralelo(self, funcion):
+        """
+        Run funcion in another connection while this transaction holds the row
+
+        Returns once the other connection is waiting for a lock (or has finished), with the thread and its errors.
+        """
+        errores = []
+        iniciado = threading.Event()
+
+        def ejecutar():
+            try:
+                iniciado.set()
+                funcion()
+            except Exception as e:
+                errores.append(e)
+            finally:
+                connection.close()
+
+        hilo = threading.Thread(target=ejecutar)
+        hilo.start()
+        self.assertTrue(iniciado.wait(5))
+        limite = time_module.monotonic() + 5
+        while hilo.is_alive() and time_module.monotonic() < limite:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT COUNT(*) FROM pg_locks WHERE NOT granted')
+                if cursor.fetchone()[0]:
+                    break
+            time_module.sleep(0.01)
+        return hilo, errores
+
+    def test_concurrent_refreshes_upsert_the_same_row(self):
+        """The second refresh waits for the first and updates its row instead of a primary key violation"""
+        with transaction.atomic():
+            caracteristicas_riesgo_service.actualizar([self.residente.pk])
+            hilo, errores = self.en_paralelo(lambda: caracteristicas_riesgo_service.actualizar([self.residente.pk]))
+            self.assertTrue(hilo.is_alive())
+        hilo.join(10)
+
+        self.assertEqual(errores, [])
+        self.assertEqual(CaracteristicasRiesgoResidente.objects.filter(residente=self.residente).count(), 1)
+
+    def test_stale_mark_during_refresh_is_kept(self):
+        """A stale mark issued while a refresh is in progress applies after its commit"""
+        caracteristicas_riesgo_service.actualizar([self.residente.pk])
+        with transaction.atomic():
+            caracteristicas_riesgo_service.actualizar([self.residente.pk])
+            hilo, errores = self.en_paralelo(
+                lambda: caracteristicas_riesgo_service.marcar_desactualizados([self.residente.pk])
+            )
+            self.assertTrue(hilo.is_alive())
+        hilo.join(10)
+
+        self.assertEqual(errores, [])
+        self.assertTrue(CaracteristicasRiesgoResidente.objects.get(residente=self.residente).desactualizado)
@@ -30,7 +30,7 @@ class AnalyticsPermissionsTest(AnalyticsTestBase):
 
         # Can generate reports
         response = self.client.post('/api/analytics/reportes-financieros/generar_reporte/', data, format='json')
-        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
 
     def test_staff_has_limited_access_to_financial_reports(self):
         """Test that staff has limited access to financial reports"""
@@ -90,7 +90,7 @@ class AnalyticsPermissionsTest(AnalyticsTestBase):
         }
 
         response = self.client.post('/api/analytics/reportes-seguridad/generar_reporte/', data, format='json')
-        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
 
     def test_staff_has_limited_access_to_security_reports(self):
         """Test that staff has limited access to security reports"""
@@ -106,7 +106,7 @@ class AnalyticsPermissionsTest(AnalyticsTestBase):
         }
 
         response = self.client.post('/api/analytics/reportes-seguridad/generar_reporte/', data, format='json')
-        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
 
     def test_resident_has_no_access_to_security_reports(self):
         """Test that resident has no access to security reports"""
@@ -137,7 +137,7 @@ class AnalyticsPermissionsTest(AnalyticsTestBase):
         }
 
         response = self.client.post('/api/analytics/reportes-uso-areas/generar_reporte/', data, format='json')
-        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
 
     def test_staff_has_access_to_area_usage_reports(self):
         """Test that staff has access to area usage reports"""
@@ -153,7 +153,7 @@ class AnalyticsPermissionsTest(AnalyticsTestBase):
         }
 
         response = self.client.post('/api/analytics/reportes-uso-areas/generar_reporte/', data, format='json')
-        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
 
     def test_resident_has_no_access_to_area_usage_generation(self):
         """Test that resident cannot generate area usage reports"""
@@ -0,0 +1,135 @@
+"""
+Tests for the DB-backed report job queue (TrabajoReporte)
+"""
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+
+from backend.apps.analytics.models import ReporteFinanciero, TrabajoReporte
+from backend.apps.analytics.trabajos import trabajo_reporte_service
+from backend.apps.analytics.views import ReporteFinancieroViewSet
+from .test_base import AnalyticsTestBase
+
+
+class TrabajoReporteTest(AnalyticsTestBase):
+    """Test enqueueing, deduplication, worker execution and cancellation"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.url = reverse('analytics:reporte-financiero-generar-reporte')
+        self.datos = {
+            'titulo': 'Ingresos del trimestre',
+            'tipo': 'ingresos',
+            'periodo': 'trimestral',
+            'formato': 'json',
+            'fecha_inicio': '2025-01-01',
+            'fecha_fin': '2025-03-31',
+            'filtros_aplicados': {}
+        }
+        self.authenticate_as_admin()
+
+    def encolar(self, **cambios):
+        response = self.client.post(self.url, {**self.datos, **cambios}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        return response
+
+    def procesar(self):
+        call_command('procesar_trabajos_reporte', '--una-vez', stdout=StringIO())
+
+    def test_post_enqueues_without_generating(self):
+        """The POST returns 202 with the job and does not build the report"""
+        response = self.encolar()
+        self.assertEqual(response.data['estado'], TrabajoReporte.EN_COLA)
+        self.assertFalse(response.data['reutilizado'])
+        self.assertEqual(response['Location'], response.data['url_estado'])
+        self.assertFalse(ReporteFinanciero.objects.exists())
+
+    def test_identical_requests_are_deduplicated(self):
+        """An identical request while the job is active returns the same job"""
+        primero = self.encolar()
+        segundo = self.encolar()
+        self.assertEqual(primero.data['id'], segundo.data['id'])
+        self.assertTrue(segundo.data['reutilizado'])
+
+        distinto = self.encolar(fecha_fin='2025-02-28')
+        self.assertNotEqual(primero.data['id'], distinto.data['id'])
+
+    def test_worker_completes_job(self):
+        """The worker command builds the report and links it to the job"""
+        trabajo_id = self.encolar().data['id']
+        self.procesar()
+
+        response = self.client.get(reverse('analytics:trabajo-reporte-detail', args=[trabajo_id]))
+        self.assertEqual(response.data['estado'], TrabajoReporte.COMPLETADO)
+        self.assertEqual(response.data['progreso'], 100)
+        reporte = ReporteFinanciero.objects.get(pk=response.data['reporte_id'])
+        self.assertEqual(reporte.generado_por, self.user_admin)
+        self.assertIn('ingresos_por_mes', reporte.datos)
+        self.assertTrue(response.data['url_reporte'].endswith(f'/reportes-financieros/{reporte.pk}/'))
+
+        # Terminado el trabajo, la misma solicitud no se deduplica contra él
+        response = self.client.post(self.url, self.datos, format='json')
+        self.assertNotEqual(response.data['id'], trabajo_id)
+
+    def test_cancel_queued_job(self):
+        """A queued job is cancelled immediately and the worker skips it"""
+        trabajo_id = self.encolar().data['id']
+        url_cancelar = reverse('analytics:trabajo-reporte-cancelar', args=[trabajo_id])
+
+        response = self.client.post(url_cancelar)
+        self.assertEqual(response.data['estado'], TrabajoReporte.CANCELADO)
+        self.procesar()
+        self.assertFalse(ReporteFinanciero.objects.exists())
+
+        response = self.client.post(url_cancelar)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+    def test_cancel_running_job_discards_report(self):
+        """Cancelling while running stops the job at the next stage without saving"""
+        self.encolar()
+        trabajo = trabajo_reporte_service.tomar_siguiente()
+        self.assertEqual(trabajo.estado, TrabajoReporte.PROCESANDO)
+        self.assertTrue(trabajo_reporte_service.cancelar(trabajo))
+
+        trabajo = trabajo_reporte_service.ejecutar(trabajo)
+        self.assertEqual(trabajo.estado, TrabajoReporte.CANCELADO)
+        self.assertFalse(ReporteFinanciero.objects.exists())
+
+    def test_reassigned_job_discards_report(self):
+        """A job requeued and taken by another worker mid-computation keeps only that worker's result"""
+        self.encolar()
+        trabajo = trabajo_reporte_service.tomar_siguiente()
+
+        def reasignar(datos):
+            # Mientras este trabajador calcula, se reencola por abandono y otro lo toma
+            TrabajoReporte.objects.filter(pk=trabajo.pk).update(trabajador='otro-host:1')
+            return {'ingresos_por_mes': {}}
+
+        with patch.object(ReporteFinancieroViewSet, '_calcular_datos', side_effect=reasignar):
+            trabajo = trabajo_reporte_service.ejecutar(trabajo)
+
+        self.assertEqual(trabajo.estado, TrabajoReporte.PROCESANDO)
+        self.assertEqual(trabajo.trabajador, 'otro-host:1')
+        self.assertFalse(ReporteFinanciero.objects.exists())
+
+    def test_failed_job_records_error(self):
+        """An exception while computing marks the job as failed"""
+        self.encolar()
+        with patch.object(ReporteFinancieroViewSet, '_generar_datos_financieros', side_effect=RuntimeError('sin datos')):
+            self.procesar()
+
+        trabajo = TrabajoReporte.objects.get()
+        self.assertEqual(trabajo.estado, TrabajoReporte.FALLIDO)
+        self.assertIn('sin datos', trabajo.error)
+
+    def test_jobs_visible_only_to_owner(self):
+        """Non-admin users only see their own jobs"""
+        trabajo_id = self.encolar().data['id']
+        self.client.force_authenticate(user=self.user_staff)
+        response = self.client.get(reverse('analytics:trabajo-reporte-detail', args=[trabajo_id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,270 @@
+"""
+Cola de trabajos de reportes en base de datos
+
+Los endpoints generar_reporte solo validan y encolan un TrabajoReporte (202); el
+comando procesar_trabajos_reporte toma los trabajos en orden de llegada y genera
+el reporte. No requiere un broker externo: la toma de un trabajo es un UPDATE
+condicional sobre su estado, así que varios procesos pueden atender la misma cola.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import socket
+import threading
+from datetime import timedelta
+
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from .cache_reportes import cache_reportes_service
+from .models import TrabajoReporte
+
+logger = logging.getLogger(__name__)
+
+
+class TrabajoCancelado(Exception):
+    """Se pidió cancelar el trabajo mientras se procesaba"""
+
+
+class TrabajoReasignado(Exception):
+    """El trabajo dejó de pertenecer a este trabajador (se reencoló por abandono)"""
+
+
+class Latido(threading.Thread):
+    """
+    Actualiza fecha_actualizacion del trabajo cada cierto tiempo mientras se calcula
+
+    Usa su propia conexión: el cálculo puede tardar más que MINUTOS_ABANDONO y sin
+    latido recuperar_abandonados lo reencolaría para otro trabajador.
+    """
+
+    def __init__(self, trabajo, trabajador, intervalo):
+        super().__init__(name=f'latido-trabajo-{trabajo.pk}', daemon=True)
+        self.trabajo_pk = trabajo.pk
+        self.trabajador = trabajador
+        self.intervalo = intervalo
+        self._detener = threading.Event()
+
+    def run(self):
+        try:
+            while not self._detener.wait(self.intervalo):
+                TrabajoReporte.objects.filter(
+                    pk=self.trabajo_pk, estado=TrabajoReporte.PROCESANDO, trabajador=self.trabajador
+                ).update(fecha_actualizacion=timezone.now())
+        except Exception:
+            logger.exception("Error registrando el latido del trabajo %s", self.trabajo_pk)
+        finally:
+            connection.close()
+
+    def detener(self):
+        self._detener.set()
+        self.join()
+
+
+class TrabajoReporteService:
+    """Encolar, tomar, ejecutar y cancelar trabajos de reportes"""
+
+    # Un trabajo en proceso sin avance por este tiempo se considera abandonado (proceso caído)
+    MINUTOS_ABANDONO = 30
+    # Cada cuánto el trabajador confirma que sigue calculando
+    SEGUNDOS_LATIDO = 60
+
+    def __init__(self):
+        self.trabajador = f"{socket.gethostname()}:{os.getpid()}"
+
+    @staticmethod
+    def clave_trabajo(tipo_reporte, parametros, usuario):
+        """Hash de la solicitud normalizada: mismo usuario, tipo y parámetros = mismo trabajo"""
+        contenido = json.dumps(
+            {'tipo': tipo_reporte, 'usuario': usuario.pk, 'parametros': parametros},
+            sort_keys=True, default=str
+        )
+        return hashlib.sha256(contenido.encode()).hexdigest()
+
+    def encolar(self, tipo_reporte, parametros, usuario):
+        """
+        Encolar un trabajo o devolver el activo con los mismos parámetros
+
+        Si los datos ya están en caché, el reporte se crea en el momento y el trabajo
+        se devuelve completado, sin pasar por la cola.
+
+        Returns:
+            tuple: (TrabajoReporte, creado)
+        """
+        clave = self.clave_trabajo(tipo_reporte, parametros, usuario)
+        activos = TrabajoReporte.objects.filter(clave=clave, estado__in=TrabajoReporte.ESTADOS_ACTIVOS)
+
+        trabajo = activos.first()
+        if trabajo:
+            return trabajo, False
+
+        datos_reporte = cache_reportes_service.obtener(tipo_reporte, parametros)
+        if datos_reporte is not None:
+            return self._completar_desde_cache(tipo_reporte, parametros, clave, usuario, datos_reporte), True
+        try:
+            with transaction.atomic():
+                return TrabajoReporte.objects.create(
+                    tipo_reporte=tipo_reporte,
+                    parametros=parametros,
+                    clave=clave,
+                    solicitado_por=usuario,
+                    mensaje='En cola'
+                ), True
+        except IntegrityError:
+            # Otra solicitud idéntica se encoló entre la consulta y el insert
+            return activos.get(), False
+
+    def _completar_desde_cache(self, tipo_reporte, parametros, clave, usuario, datos_reporte):
+        """Crear el reporte con datos cacheados y registrarlo como un trabajo completado"""
+        from .views import GENERADORES_REPORTE
+
+        vista_clase, serializer_clase = GENERADORES_REPORTE[tipo_reporte]
+        serializer = serializer_clase(data=parametros)
+        serializer.is_valid(raise_exception=True)
+
+        ahora = timezone.now()
+        with transaction.atomic():
+            reporte = vista_clase()._guardar_reporte(serializer.validated_data, datos_reporte, usuario)
+            return TrabajoReporte.objects.create(
+                tipo_reporte=tipo_reporte,
+                parametros=parametros,
+                clave=clave,
+                solicitado_por=usuario,
+                estado=TrabajoReporte.COMPLETADO,
+                progreso=100,
+                mensaje='Completado desde caché',
+                reporte_id=reporte.pk,
+                fecha_inicio_proceso=ahora,
+                fecha_fin_proceso=ahora
+            )
+
+    def cancelar(self, trabajo):
+        """
+        Cancelar un trabajo: en cola se cancela de inmediato, en proceso al terminar la etapa actual
+
+        Returns:
+            bool: False si el trabajo ya había terminado
+        """
+        ahora = timezone.now()
+        if TrabajoReporte.objects.filter(pk=trabajo.pk, estado=TrabajoReporte.EN_COLA).update(
+            estado=TrabajoReporte.CANCELADO, mensaje='Cancelado', fecha_fin_proceso=ahora, fecha_actualizacion=ahora
+        ):
+            trabajo.refresh_from_db()
+            return True
+
+        marcados = TrabajoReporte.objects.filter(pk=trabajo.pk, estado=TrabajoReporte.PROCESANDO).update(
+            cancelacion_solicitada=True, fecha_actualizacion=ahora
+        )
+        trabajo.refresh_from_db()
+        return bool(marcados)
+
+    def recuperar_abandonados(self):
+        """Volver a encolar los trabajos en proceso cuyo trabajador dejó de dar señales"""
+        limite = timezone.now() - timedelta(minutes=self.MINUTOS_ABANDONO)
+        recuperados = TrabajoReporte.objects.filter(
+            estado=TrabajoReporte.PROCESANDO, fecha_actualizacion__lt=limite
+        ).update(estado=TrabajoReporte.EN_COLA, progreso=0, mensaje='Reencolado tras abandono', trabajador='')
+        if recuperados:
+            logger.warning("%s trabajo(s) de reporte abandonado(s) reencolado(s)", recuperados)
+        return recuperados
+
+    def tomar_siguiente(self):
+        """
+        Tomar el trabajo en cola más antiguo
+
+        El UPDATE condicional garantiza que solo un proceso lo toma aunque varios
+        lean el mismo candidato.
+        """
+        candidatos = TrabajoReporte.objects.filter(
+            estado=TrabajoReporte.EN_COLA
+        ).order_by('fecha_creacion', 'id').values_list('pk', flat=True)[:10]
+
+        for pk in candidatos:
+            ahora = timezone.now()
+            if TrabajoReporte.objects.filter(pk=pk, estado=TrabajoReporte.EN_COLA).update(
+                estado=TrabajoReporte.PROCESANDO,
+                progreso=5,
+                mensaje='Iniciando',
+                trabajador=self.trabajador,
+                fecha_inicio_proceso=ahora,
+                fecha_actualizacion=ahora
+            ):
+                return TrabajoReporte.objects.select_related('solicitado_por').get(pk=pk)
+        return None
+
+    def _propios(self, trabajo):
+        """El trabajo mientras siga en proceso a cargo de este trabajador"""
+        return TrabajoReporte.objects.filter(
+            pk=trabajo.pk, estado=TrabajoReporte.PROCESANDO, trabajador=self.trabajador
+        )
+
+    def _avanzar(self, trabajo, progreso, mensaje):
+        """Registrar el avance y detenerse si se pidió cancelar o si el trabajo se reasignó"""
+        if not self._propios(trabajo).update(progreso=progreso, mensaje=mensaje, fecha_actualizacion=timezone.now()):
+            raise TrabajoReasignado()
+        if TrabajoReporte.objects.filter(pk=trabajo.pk, cancelacion_solicitada=True).exists():
+            raise TrabajoCancelado()
+
+    def _finalizar(self, trabajo, estado, **campos):
+        ahora = timezone.now()
+        self._propios(trabajo).update(estado=estado, fecha_fin_proceso=ahora, fecha_actualizacion=ahora, **campos)
+        trabajo.refresh_from_db()
+
+    def ejecutar(self, trabajo):
+        """
+        Generar el reporte de un trabajo ya tomado (estado procesando)
+
+        Returns:
+            TrabajoReporte: El trabajo con su estado final
+        """
+        from .views import GENERADORES_REPORTE
+
+        vista_clase, serializer_clase = GENERADORES_REPORTE[trabajo.tipo_reporte]
+        try:
+            serializer = serializer_clase(data=trabajo.parametros)
+            serializer.is_valid(raise_exception=True)
+            vista = vista_clase()
+
+            self._avanzar(trabajo, 10, 'Calculando datos')
+            latido = Latido(trabajo, self.trabajador, self.SEGUNDOS_LATIDO)
+            latido.start()
+            try:
+                datos_reporte = cache_reportes_service.obtener_o_calcular(
+                    trabajo.tipo_reporte, trabajo.parametros, lambda: vista._calcular_datos(serializer.validated_data)
+                )
+            finally:
+                latido.detener()
+            self._avanzar(trabajo, 90, 'Guardando reporte')
+
+            with transaction.atomic():
+                reporte = vista._guardar_reporte(serializer.validated_data, datos_reporte, trabajo.solicitado_por)
+                # Condicional: una cancelación pedida durante el guardado, o un trabajo que otro
+                # trabajador tomó tras reencolarse, descarta el reporte
+                completado = self._propios(trabajo).filter(cancelacion_solicitada=False).update(
+                    estado=TrabajoReporte.COMPLETADO,
+                    progreso=100,
+                    mensaje='Completado',
+                    reporte_id=reporte.pk,
+                    fecha_fin_proceso=timezone.now(),
+                    fecha_actualizacion=timezone.now()
+                )
+                if not completado:
+                    if self._propios(trabajo).exists():
+                        raise TrabajoCancelado()
+                    raise TrabajoReasignado()
+            trabajo.refresh_from_db()
+        except TrabajoCancelado:
+            self._finalizar(trabajo, TrabajoReporte.CANCELADO, mensaje='Cancelado')
+        except TrabajoReasignado:
+            logger.warning("El trabajo de reporte %s se reasignó; se descarta su resultado", trabajo.pk)
+            trabajo.refresh_from_db()
+        except Exception as e:
+            logger.exception("Error generando el reporte del trabajo %s", trabajo.pk)
+            self._finalizar(trabajo, TrabajoReporte.FALLIDO, mensaje='Error', error=str(e))
+        return trabajo
+
+
+# Instancia global del servicio
+trabajo_reporte_service = TrabajoReporteService()
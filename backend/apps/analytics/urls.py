@@ -9,7 +9,8 @@ from .views import (
     ReporteFinancieroViewSet,
     ReporteSeguridadViewSet,
     ReporteUsoAreasViewSet,
-    PrediccionMorosidadViewSet
+    PrediccionMorosidadViewSet,
+    TrabajoReporteViewSet
 )
 
 # Router para las APIs
@@ -18,6 +19,7 @@ router.register(r'reportes-financieros', ReporteFinancieroViewSet, basename='rep
 router.register(r'reportes-seguridad', ReporteSeguridadViewSet, basename='reporte-seguridad')
 router.register(r'reportes-uso-areas', ReporteUsoAreasViewSet, basename='reporte-uso-areas')
 router.register(r'predicciones-morosidad', PrediccionMorosidadViewSet, basename='prediccion-morosidad')
+router.register(r'trabajos-reporte', TrabajoReporteViewSet, basename='trabajo-reporte')
 
 app_name = 'analytics'
 
@@ -35,7 +37,8 @@ REPORTES FINANCIEROS:
 - PUT    /api/analytics/reportes-financieros/{id}/               - Actualizar reporte
 - PATCH  /api/analytics/reportes-financieros/{id}/               - Actualizar parcial
 - DELETE /api/analytics/reportes-financieros/{id}/               - Eliminar reporte
-- POST   /api/analytics/reportes-financieros/generar_reporte/    - Generar reporte financiero (T1)
+- POST   /api/analytics/reportes-financieros/generar_reporte/    - Encolar reporte financiero (T1, 202)
+- GET    /api/analytics/reportes-financieros/{id}/exportar/      - Cargos del período (?formato=csv|xlsx|parquet)
 
 REPORTES DE SEGURIDAD:
 - GET    /api/analytics/reportes-seguridad/                      - Listar reportes de seguridad
@@ -44,7 +47,8 @@ REPORTES DE SEGURIDAD:
 - PUT    /api/analytics/reportes-seguridad/{id}/                 - Actualizar reporte
 - PATCH  /api/analytics/reportes-seguridad/{id}/                 - Actualizar parcial
 - DELETE /api/analytics/reportes-seguridad/{id}/                 - Eliminar reporte
-- POST   /api/analytics/reportes-seguridad/generar_reporte/      - Generar reporte de seguridad (T2)
+- POST   /api/analytics/reportes-seguridad/generar_reporte/      - Encolar reporte de seguridad (T2, 202)
+- GET    /api/analytics/reportes-seguridad/{id}/exportar/        - Accesos del período (?formato=csv|xlsx|parquet)
 
 REPORTES DE USO DE ÁREAS:
 - GET    /api/analytics/reportes-uso-areas/                      - Listar reportes de uso de áreas
@@ -53,7 +57,13 @@ REPORTES DE USO DE ÁREAS:
 - PUT    /api/analytics/reportes-uso-areas/{id}/                 - Actualizar reporte
 - PATCH  /api/analytics/reportes-uso-areas/{id}/                 - Actualizar parcial
 - DELETE /api/analytics/reportes-uso-areas/{id}/                 - Eliminar reporte
-- POST   /api/analytics/reportes-uso-areas/generar_reporte/      - Generar reporte de uso de áreas (T3)
+- POST   /api/analytics/reportes-uso-areas/generar_reporte/      - Encolar reporte de uso de áreas (T3, 202)
+- GET    /api/analytics/reportes-uso-areas/{id}/exportar/        - Reservas del período (?formato=csv|xlsx|parquet)
+
+TRABAJOS DE REPORTE:
+- GET    /api/analytics/trabajos-reporte/                        - Listar trabajos (?estado=en_cola|procesando|...)
+- GET    /api/analytics/trabajos-reporte/{id}/                   - Estado y progreso de un trabajo
+- POST   /api/analytics/trabajos-reporte/{id}/cancelar/          - Cancelar trabajo en cola o en proceso
 
 PREDICCIONES DE MOROSIDAD:
 - GET    /api/analytics/predicciones-morosidad/                  - Listar predicciones de morosidad
@@ -86,6 +96,14 @@ T4: Generar Predicción de Morosidad con IA
    - Modelos: regresion_logistica, random_forest, xgboost, red_neuronal, ensemble
    - Incluye métricas de evaluación y nivel de confianza
 
+GENERACIÓN EN SEGUNDO PLANO:
+   - generar_reporte valida, encola un TrabajoReporte y responde 202 con url_estado
+   - Una solicitud idéntica del mismo usuario reutiliza el trabajo activo
+   - Los trabajos los ejecuta: python manage.py procesar_trabajos_reporte
+   - Al completar, url_reporte apunta al reporte generado
+   - Si el resultado está en caché (mismo tipo, rango y filtros sin cambios en los
+     datos de esos meses) el reporte se crea al instante: 201 con url_reporte
+
 PERMISOS:
 - Administradores: Acceso completo a todos los reportes y predicciones
 - Staff (mantenimiento, seguridad): Solo lectura de reportes
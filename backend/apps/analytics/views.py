@@ -13,15 +13,18 @@ from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.utils import timezone
-from django.db.models import Sum, Count, Avg, Q
+from django.db.models import Sum, Count, Q
 from django.db.models.functions import TruncMonth, TruncWeek, TruncDay
-from datetime import datetime, timedelta
+from datetime import datetime
 import json
 import logging
 
 logger = logging.getLogger(__name__)
 
 from .services import GrokMorosidadService
+from .trabajos import trabajo_reporte_service
+from .histogramas import por_hora, por_dia_semana
+from .exportacion import exportacion_service, PYARROW_AVAILABLE
 from .serializers import (
     ReporteFinancieroSerializer,
     ReporteFinancieroListSerializer,
@@ -34,9 +37,10 @@ from .serializers import (
     CrearReporteUsoAreasSerializer,
     PrediccionMorosidadSerializer,
     PrediccionMorosidadListSerializer,
-    CrearPrediccionMorosidadSerializer
+    CrearPrediccionMorosidadSerializer,
+    TrabajoReporteSerializer
 )
-from .models import ReporteFinanciero, ReporteSeguridad, ReporteUsoAreas, PrediccionMorosidad
+from .models import ReporteFinanciero, ReporteSeguridad, ReporteUsoAreas, PrediccionMorosidad, TrabajoReporte
 
 
 class IsAdminOrStaff(permissions.BasePermission):
@@ -60,6 +64,52 @@ class IsAdminOrStaff(permissions.BasePermission):
         return False
 
 
+class IsAdmin(permissions.BasePermission):
+    """
+    Solo administradores (exportación de filas con datos personales de residentes)
+    """
+    def has_permission(self, request, view):
+        if not request.user or not request.user.is_authenticated:
+            return False
+        return hasattr(request.user, 'role') and request.user.role == 'admin'
+
+
+def _encolar_reporte(request, tipo_reporte, serializer):
+    """
+    Encolar (o reutilizar) el trabajo de un reporte y responder 202 con su estado
+    Si los datos estaban en caché el reporte ya está creado: 201 con url_reporte
+    """
+    trabajo, creado = trabajo_reporte_service.encolar(tipo_reporte, serializer.data, request.user)
+    datos = TrabajoReporteSerializer(trabajo, context={'request': request}).data
+    datos['reutilizado'] = not creado
+    if trabajo.estado == TrabajoReporte.COMPLETADO:
+        return Response(datos, status=status.HTTP_201_CREATED, headers={'Location': datos['url_reporte']})
+    return Response(datos, status=status.HTTP_202_ACCEPTED, headers={'Location': datos['url_estado']})
+
+
+def _exportar_filas(request, conjunto, reporte, formato_defecto='csv', **filtros):
+    """
+    Exportar en streaming las filas de detalle del rango de un reporte
+    Query params: formato=csv|xlsx|parquet ('excel' equivale a xlsx)
+    """
+    formato_solicitado = request.query_params.get('formato', formato_defecto)
+    formato = exportacion_service.normalizar_formato(formato_solicitado)
+    if formato is None:
+        return Response(
+            {'error': f'Formato de exportación no soportado: {formato_solicitado}. Use csv, xlsx o parquet'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if formato == 'parquet' and not PYARROW_AVAILABLE:
+        return Response(
+            {'error': 'La exportación a Parquet requiere pyarrow, que no está instalado en el servidor'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    queryset = exportacion_service.queryset(conjunto, reporte.fecha_inicio, reporte.fecha_fin, **filtros)
+    nombre = f"{conjunto}_{reporte.fecha_inicio:%Y%m%d}_{reporte.fecha_fin:%Y%m%d}"
+    return exportacion_service.respuesta(conjunto, formato, queryset, nombre)
+
+
 class ReporteFinancieroViewSet(viewsets.ModelViewSet):
     """
     ViewSet para gestión de Reportes Financieros
@@ -102,7 +152,8 @@ class ReporteFinancieroViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def generar_reporte(self, request):
         """
-        Generar un reporte financiero basado en los parámetros proporcionados
+        Encolar un reporte financiero con los parámetros proporcionados
+        Responde 202 con el trabajo; el reporte lo genera procesar_trabajos_reporte
         Solo administradores pueden generar reportes
         """
         if not (hasattr(request.user, 'role') and request.user.role == 'admin'):
@@ -113,95 +164,88 @@ class ReporteFinancieroViewSet(viewsets.ModelViewSet):
 
         serializer = CrearReporteFinancieroSerializer(data=request.data)
         if serializer.is_valid():
-            # Generar datos del reporte basado en el tipo
-            datos_reporte = self._generar_datos_financieros(
-                serializer.validated_data['tipo'],
-                serializer.validated_data['fecha_inicio'],
-                serializer.validated_data['fecha_fin'],
-                serializer.validated_data.get('filtros_aplicados', {})
-            )
-
-            # Crear el reporte
-            reporte = ReporteFinanciero.objects.create(
-                titulo=serializer.validated_data['titulo'],
-                descripcion=serializer.validated_data.get('descripcion', ''),
-                tipo=serializer.validated_data['tipo'],
-                periodo=serializer.validated_data['periodo'],
-                formato=serializer.validated_data['formato'],
-                fecha_inicio=serializer.validated_data['fecha_inicio'],
-                fecha_fin=serializer.validated_data['fecha_fin'],
-                generado_por=request.user,
-                datos=datos_reporte,
-                total_registros=datos_reporte.get('total_registros', 0),
-                filtros_aplicados=serializer.validated_data.get('filtros_aplicados', {})
-            )
-
-            # Retornar el reporte creado
-            response_serializer = ReporteFinancieroSerializer(reporte)
-            return Response(response_serializer.data, status=status.HTTP_201_CREATED)
+            return _encolar_reporte(request, 'financiero', serializer)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=True, methods=['get'], permission_classes=[IsAdmin])
+    def exportar(self, request, pk=None):
+        """
+        Exportar los cargos del período del reporte (por defecto en el formato del reporte)
+        Solo administradores: las filas incluyen residente, montos y referencias de pago
+        """
+        reporte = self.get_object()
+        formato_defecto = reporte.formato if reporte.formato in ('csv', 'excel') else 'csv'
+        return _exportar_filas(request, 'cargos', reporte, formato_defecto, tipo=reporte.tipo)
+
+    def _calcular_datos(self, datos):
+        """Datos del reporte a partir de la solicitud validada (se ejecuta en el trabajador)"""
+        return self._generar_datos_financieros(
+            datos['tipo'],
+            datos['fecha_inicio'],
+            datos['fecha_fin'],
+            datos.get('filtros_aplicados', {})
+        )
+
+    def _guardar_reporte(self, datos, datos_reporte, usuario):
+        """Crear el reporte con los datos calculados"""
+        return ReporteFinanciero.objects.create(
+            titulo=datos['titulo'],
+            descripcion=datos.get('descripcion', ''),
+            tipo=datos['tipo'],
+            periodo=datos['periodo'],
+            formato=datos['formato'],
+            fecha_inicio=datos['fecha_inicio'],
+            fecha_fin=datos['fecha_fin'],
+            generado_por=usuario,
+            datos=datos_reporte,
+            total_registros=datos_reporte.get('total_registros', 0),
+            filtros_aplicados=datos.get('filtros_aplicados', {})
+        )
+
     def _generar_datos_financieros(self, tipo, fecha_inicio, fecha_fin, filtros):
         """
         Generar datos para el reporte financiero basado en el tipo
         """
-        from finances.models import ConceptoFinanciero, CargoFinanciero, TipoConcepto
-        from django.db.models import Sum, Count, Q
+        from backend.apps.finances.models import CargoFinanciero, TipoConcepto, ESTADOS_POR_COBRAR
+        from backend.apps.finances.services import resumen_financiero_service
         from django.contrib.auth import get_user_model
 
         User = get_user_model()
 
-        # Filtrar por fechas
-        fecha_inicio = datetime.combine(fecha_inicio, datetime.min.time())
-        fecha_fin = datetime.combine(fecha_fin, datetime.max.time())
+        # Totales por mes y tipo de concepto desde el resumen diario (una consulta agrupada)
+        meses = resumen_financiero_service.meses_entre(fecha_inicio, fecha_fin)
+        totales = resumen_financiero_service.totales_por_mes(fecha_inicio, fecha_fin)
 
-        if tipo == 'ingresos':
-            # Calcular ingresos reales de cuotas pagadas
-            ingresos_cuotas = CargoFinanciero.objects.filter(
-                estado='pagado',
-                fecha_pago__range=[fecha_inicio, fecha_fin],
-                concepto__tipo__in=[TipoConcepto.CUOTA_MENSUAL, TipoConcepto.CUOTA_EXTRAORDINARIA]
-            ).aggregate(
-                total=Sum('monto'),
-                count=Count('id')
+        def total(campo, tipos=None):
+            return sum(
+                (fila[campo] or 0 for fila in totales if tipos is None or fila['tipo_concepto'] in tipos), 0
             )
 
-            # Ingresos por mes
-            ingresos_por_mes = {}
-            for mes in range(fecha_inicio.month, fecha_fin.month + 1):
-                mes_inicio = fecha_inicio.replace(month=mes, day=1)
-                if mes == 12:
-                    mes_fin = mes_inicio.replace(year=mes_inicio.year + 1, month=1, day=1) - timedelta(days=1)
-                else:
-                    mes_fin = mes_inicio.replace(month=mes + 1, day=1) - timedelta(days=1)
-
-                ingresos_mes = CargoFinanciero.objects.filter(
-                    estado='pagado',
-                    fecha_pago__range=[mes_inicio, mes_fin],
-                    concepto__tipo__in=[TipoConcepto.CUOTA_MENSUAL, TipoConcepto.CUOTA_EXTRAORDINARIA]
-                ).aggregate(total=Sum('monto'))['total'] or 0
-
-                ingresos_por_mes[f"{mes_inicio.year}-{mes_inicio.month:02d}"] = float(ingresos_mes)
+        if tipo == 'ingresos':
+            # Ingresos reales de cuotas pagadas
+            tipos_cuota = {TipoConcepto.CUOTA_MENSUAL, TipoConcepto.CUOTA_EXTRAORDINARIA}
+
+            ingresos_por_mes = dict.fromkeys(meses, 0.0)
+            fuentes = {}
+            for fila in totales:
+                if not fila['total_pagos']:
+                    continue
+                if fila['tipo_concepto'] in tipos_cuota:
+                    ingresos_por_mes[f"{fila['mes']:%Y-%m}"] += float(fila['total_pagos'])
+                fuentes[fila['tipo_concepto']] = fuentes.get(fila['tipo_concepto'], 0) + fila['total_pagos']
 
             # Fuentes de ingreso
-            fuentes = CargoFinanciero.objects.filter(
-                estado='pagado',
-                fecha_pago__range=[fecha_inicio, fecha_fin]
-            ).values('concepto__tipo').annotate(
-                total=Sum('monto')
-            ).order_by('-total')
-
             fuentes_dict = {}
-            for fuente in fuentes:
-                tipo_display = dict(TipoConcepto.choices)[fuente['concepto__tipo']]
-                fuentes_dict[tipo_display.lower().replace(' ', '_')] = float(fuente['total'])
+            for tipo_concepto, monto in sorted(fuentes.items(), key=lambda item: item[1], reverse=True):
+                tipo_display = dict(TipoConcepto.choices)[tipo_concepto]
+                fuentes_dict[tipo_display.lower().replace(' ', '_')] = float(monto)
 
             return {
-                'total_ingresos': float(ingresos_cuotas['total'] or 0),
+                'total_ingresos': float(total('total_pagos', tipos_cuota)),
                 'ingresos_por_mes': ingresos_por_mes,
                 'fuentes_ingreso': fuentes_dict,
-                'total_registros': ingresos_cuotas['count'] or 0
+                'total_registros': total('cantidad_pagos', tipos_cuota)
             }
 
         elif tipo == 'egresos':
@@ -216,10 +260,7 @@ class ReporteFinancieroViewSet(viewsets.ModelViewSet):
 
         elif tipo == 'balance':
             # Calcular balance basado en ingresos y egresos
-            ingresos_total = CargoFinanciero.objects.filter(
-                estado='pagado',
-                fecha_pago__range=[fecha_inicio, fecha_fin]
-            ).aggregate(total=Sum('monto'))['total'] or 0
+            ingresos_total = total('total_pagos')
 
             # Por ahora egresos = 0
             egresos_total = 0
@@ -230,43 +271,32 @@ class ReporteFinancieroViewSet(viewsets.ModelViewSet):
                 'egresos_totales': float(egresos_total),
                 'balance_neto': float(balance_neto),
                 'reservas_acumuladas': 0.00,  # Se puede calcular basado en historial
-                'proyeccion_mensual': float(ingresos_total / max(1, (fecha_fin - fecha_inicio).days / 30)),
-                'total_registros': CargoFinanciero.objects.filter(
-                    fecha_aplicacion__range=[fecha_inicio.date(), fecha_fin.date()]
-                ).count()
+                'proyeccion_mensual': float(ingresos_total) / max(1, (fecha_fin - fecha_inicio).days / 30),
+                'total_registros': total('cantidad_emitido')
             }
 
         elif tipo == 'morosidad':
             # Calcular datos de morosidad reales
             total_residentes = User.objects.filter(role='resident').count()
 
-            residentes_al_dia = CargoFinanciero.objects.filter(
+            cargos_periodo = CargoFinanciero.objects.filter(
                 residente__role='resident',
-                estado='pagado',
-                fecha_vencimiento__range=[fecha_inicio.date(), fecha_fin.date()]
+                fecha_vencimiento__range=[fecha_inicio, fecha_fin]
+            )
+            residentes_al_dia = cargos_periodo.filter(
+                estado='pagado'
             ).values('residente').distinct().count()
 
-            # Morosidad por mes
-            morosidad_por_mes = {}
-            for mes in range(fecha_inicio.month, fecha_fin.month + 1):
-                mes_inicio = fecha_inicio.replace(month=mes, day=1)
-                if mes == 12:
-                    mes_fin = mes_inicio.replace(year=mes_inicio.year + 1, month=1, day=1) - timedelta(days=1)
-                else:
-                    mes_fin = mes_inicio.replace(month=mes + 1, day=1) - timedelta(days=1)
-
-                morosos_mes = CargoFinanciero.objects.filter(
-                    residente__role='resident',
-                    estado__in=['pendiente', 'vencido'],
-                    fecha_vencimiento__range=[mes_inicio.date(), mes_fin.date()]
-                ).values('residente').distinct().count()
+            # Morosidad por mes: residentes distintos, no se pueden sumar desde el resumen diario
+            morosidad_por_mes = dict.fromkeys(meses, 0)
+            for fila in cargos_periodo.filter(estado__in=ESTADOS_POR_COBRAR).annotate(
+                mes=TruncMonth('fecha_vencimiento')
+            ).values('mes').annotate(morosos=Count('residente', distinct=True)).order_by():
+                morosidad_por_mes[f"{fila['mes']:%Y-%m}"] = fila['morosos']
 
-                morosidad_por_mes[f"{mes_inicio.year}-{mes_inicio.month:02d}"] = morosos_mes
-
-            monto_moroso = CargoFinanciero.objects.filter(
-                residente__role='resident',
-                estado__in=['pendiente', 'vencido'],
-                fecha_vencimiento__range=[fecha_inicio.date(), fecha_fin.date()]
+            # Solo cargos de residentes (el resumen diario incluye a todos los usuarios)
+            monto_moroso = cargos_periodo.filter(
+                estado__in=ESTADOS_POR_COBRAR
             ).aggregate(total=Sum('monto'))['total'] or 0
 
             return {
@@ -282,7 +312,7 @@ class ReporteFinancieroViewSet(viewsets.ModelViewSet):
         else:
             return {
                 'mensaje': f'Reporte de tipo {tipo} generado exitosamente',
-                'periodo': f'{fecha_inicio.date()} - {fecha_fin.date()}',
+                'periodo': f'{fecha_inicio} - {fecha_fin}',
                 'total_registros': 0
             }
 
@@ -325,7 +355,8 @@ class ReporteSeguridadViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def generar_reporte(self, request):
         """
-        Generar un reporte de seguridad basado en los parámetros proporcionados
+        Encolar un reporte de seguridad con los parámetros proporcionados
+        Responde 202 con el trabajo; el reporte lo genera procesar_trabajos_reporte
         Administradores y personal de seguridad pueden generar reportes
         """
         if not (hasattr(request.user, 'role') and
@@ -337,42 +368,49 @@ class ReporteSeguridadViewSet(viewsets.ModelViewSet):
 
         serializer = CrearReporteSeguridadSerializer(data=request.data)
         if serializer.is_valid():
-            # Generar datos del reporte basado en el tipo
-            datos_reporte = self._generar_datos_seguridad(
-                serializer.validated_data['tipo'],
-                serializer.validated_data['fecha_inicio'],
-                serializer.validated_data['fecha_fin'],
-                serializer.validated_data.get('filtros_aplicados', {})
-            )
-
-            # Crear el reporte
-            reporte = ReporteSeguridad.objects.create(
-                titulo=serializer.validated_data['titulo'],
-                descripcion=serializer.validated_data.get('descripcion', ''),
-                tipo=serializer.validated_data['tipo'],
-                periodo=serializer.validated_data['periodo'],
-                fecha_inicio=serializer.validated_data['fecha_inicio'],
-                fecha_fin=serializer.validated_data['fecha_fin'],
-                generado_por=request.user,
-                datos=datos_reporte,
-                total_eventos=datos_reporte.get('total_eventos', 0),
-                eventos_criticos=datos_reporte.get('eventos_criticos', 0),
-                alertas_generadas=datos_reporte.get('alertas_generadas', 0),
-                filtros_aplicados=serializer.validated_data.get('filtros_aplicados', {})
-            )
-
-            # Retornar el reporte creado
-            response_serializer = ReporteSeguridadSerializer(reporte)
-            return Response(response_serializer.data, status=status.HTTP_201_CREATED)
+            return _encolar_reporte(request, 'seguridad', serializer)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=True, methods=['get'])
+    def exportar(self, request, pk=None):
+        """
+        Exportar los accesos del período del reporte
+        """
+        return _exportar_filas(request, 'accesos', self.get_object())
+
+    def _calcular_datos(self, datos):
+        """Datos del reporte a partir de la solicitud validada (se ejecuta en el trabajador)"""
+        return self._generar_datos_seguridad(
+            datos['tipo'],
+            datos['fecha_inicio'],
+            datos['fecha_fin'],
+            datos.get('filtros_aplicados', {})
+        )
+
+    def _guardar_reporte(self, datos, datos_reporte, usuario):
+        """Crear el reporte con los datos calculados"""
+        return ReporteSeguridad.objects.create(
+            titulo=datos['titulo'],
+            descripcion=datos.get('descripcion', ''),
+            tipo=datos['tipo'],
+            periodo=datos['periodo'],
+            fecha_inicio=datos['fecha_inicio'],
+            fecha_fin=datos['fecha_fin'],
+            generado_por=usuario,
+            datos=datos_reporte,
+            total_eventos=datos_reporte.get('total_eventos', 0),
+            eventos_criticos=datos_reporte.get('eventos_criticos', 0),
+            alertas_generadas=datos_reporte.get('alertas_generadas', 0),
+            filtros_aplicados=datos.get('filtros_aplicados', {})
+        )
+
     def _generar_datos_seguridad(self, tipo, fecha_inicio, fecha_fin, filtros):
         """
         Generar datos para el reporte de seguridad basado en el tipo
         """
-        from modulo_ia.models import Acceso
-        from audit.models import RegistroAuditoria, TipoActividad, NivelImportancia
+        from backend.apps.modulo_ia.models import Acceso
+        from backend.apps.audit.models import RegistroAuditoria, TipoActividad, NivelImportancia
         from django.db.models import Count
 
         # Filtrar por fechas
@@ -380,37 +418,24 @@ class ReporteSeguridadViewSet(viewsets.ModelViewSet):
         fecha_fin = datetime.combine(fecha_fin, datetime.max.time())
 
         if tipo == 'accesos':
-            # Datos de accesos reales
-            accesos_total = Acceso.objects.filter(
-                fecha_hora__range=[fecha_inicio, fecha_fin]
-            ).count()
-
-            accesos_autorizados = Acceso.objects.filter(
-                fecha_hora__range=[fecha_inicio, fecha_fin],
-                estado='permitido'
-            ).count()
-
-            accesos_denegados = Acceso.objects.filter(
-                fecha_hora__range=[fecha_inicio, fecha_fin],
-                estado='denegado'
-            ).count()
+            # Datos de accesos reales (totales en una sola consulta)
+            accesos = Acceso.objects.filter(fecha_hora__range=[fecha_inicio, fecha_fin])
+            conteos = accesos.aggregate(
+                total=Count('id'),
+                autorizados=Count('id', filter=Q(estado='permitido')),
+                denegados=Count('id', filter=Q(estado='denegado'))
+            )
+            accesos_total = conteos['total']
+            accesos_autorizados = conteos['autorizados']
+            accesos_denegados = conteos['denegados']
 
-            # Accesos por hora
-            accesos_por_hora = {}
-            for hora in range(6, 24):
-                hora_inicio = fecha_inicio.replace(hour=hora)
-                hora_fin = hora_inicio.replace(hour=hora + 1)
-                count = Acceso.objects.filter(
-                    fecha_hora__range=[hora_inicio, hora_fin]
-                ).count()
-                accesos_por_hora[f"{hora:02d}:00-{hora+1:02d}:00"] = count
+            # Accesos por hora: todo el rango, las 24 horas, una consulta agrupada
+            accesos_por_hora = por_hora(accesos, 'fecha_hora', formato='{hora:02d}:00-{siguiente:02d}:00')
 
             # Métodos de acceso
-            metodos = Acceso.objects.filter(
-                fecha_hora__range=[fecha_inicio, fecha_fin]
-            ).values('tipo_acceso').annotate(
+            metodos = accesos.values('tipo_acceso').annotate(
                 count=Count('id')
-            )
+            ).order_by()
 
             metodos_dict = {}
             for metodo in metodos:
@@ -498,7 +523,7 @@ class ReporteSeguridadViewSet(viewsets.ModelViewSet):
         else:
             return {
                 'mensaje': f'Reporte de seguridad {tipo} generado exitosamente',
-                'periodo': f'{fecha_inicio.date()} - {fecha_fin.date()}',
+                'periodo': f'{fecha_inicio} - {fecha_fin}',
                 'total_eventos': 0,
                 'eventos_criticos': 0,
                 'alertas_generadas': 0
@@ -543,7 +568,8 @@ class ReporteUsoAreasViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def generar_reporte(self, request):
         """
-        Generar un reporte de uso de áreas basado en los parámetros proporcionados
+        Encolar un reporte de uso de áreas con los parámetros proporcionados
+        Responde 202 con el trabajo; el reporte lo genera procesar_trabajos_reporte
         Administradores pueden generar reportes
         """
         if not (hasattr(request.user, 'role') and request.user.role == 'admin'):
@@ -554,45 +580,53 @@ class ReporteUsoAreasViewSet(viewsets.ModelViewSet):
 
         serializer = CrearReporteUsoAreasSerializer(data=request.data)
         if serializer.is_valid():
-            # Generar datos del reporte basado en el área y métrica
-            datos_reporte = self._generar_datos_uso_areas(
-                serializer.validated_data['area'],
-                serializer.validated_data['metrica_principal'],
-                serializer.validated_data['fecha_inicio'],
-                serializer.validated_data['fecha_fin'],
-                serializer.validated_data.get('filtros_aplicados', {})
-            )
-
-            # Crear el reporte
-            reporte = ReporteUsoAreas.objects.create(
-                titulo=serializer.validated_data['titulo'],
-                descripcion=serializer.validated_data.get('descripcion', ''),
-                area=serializer.validated_data['area'],
-                periodo=serializer.validated_data['periodo'],
-                metrica_principal=serializer.validated_data['metrica_principal'],
-                fecha_inicio=serializer.validated_data['fecha_inicio'],
-                fecha_fin=serializer.validated_data['fecha_fin'],
-                generado_por=request.user,
-                datos=datos_reporte,
-                total_reservas=datos_reporte.get('total_reservas', 0),
-                horas_ocupacion=datos_reporte.get('horas_ocupacion', 0),
-                tasa_ocupacion_promedio=datos_reporte.get('tasa_ocupacion_promedio', 0),
-                filtros_aplicados=serializer.validated_data.get('filtros_aplicados', {})
-            )
-
-            # Retornar el reporte creado
-            response_serializer = ReporteUsoAreasSerializer(reporte)
-            return Response(response_serializer.data, status=status.HTTP_201_CREATED)
+            return _encolar_reporte(request, 'uso_areas', serializer)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=True, methods=['get'])
+    def exportar(self, request, pk=None):
+        """
+        Exportar las reservas del período y área del reporte
+        """
+        reporte = self.get_object()
+        return _exportar_filas(request, 'reservas', reporte, area=reporte.area)
+
+    def _calcular_datos(self, datos):
+        """Datos del reporte a partir de la solicitud validada (se ejecuta en el trabajador)"""
+        return self._generar_datos_uso_areas(
+            datos['area'],
+            datos['metrica_principal'],
+            datos['fecha_inicio'],
+            datos['fecha_fin'],
+            datos.get('filtros_aplicados', {})
+        )
+
+    def _guardar_reporte(self, datos, datos_reporte, usuario):
+        """Crear el reporte con los datos calculados"""
+        return ReporteUsoAreas.objects.create(
+            titulo=datos['titulo'],
+            descripcion=datos.get('descripcion', ''),
+            area=datos['area'],
+            periodo=datos['periodo'],
+            metrica_principal=datos['metrica_principal'],
+            fecha_inicio=datos['fecha_inicio'],
+            fecha_fin=datos['fecha_fin'],
+            generado_por=usuario,
+            datos=datos_reporte,
+            total_reservas=datos_reporte.get('total_reservas', 0),
+            horas_ocupacion=datos_reporte.get('horas_ocupacion', 0),
+            tasa_ocupacion_promedio=datos_reporte.get('tasa_ocupacion_promedio', 0),
+            filtros_aplicados=datos.get('filtros_aplicados', {})
+        )
+
     def _generar_datos_uso_areas(self, area, metrica, fecha_inicio, fecha_fin, filtros):
         """
         Generar datos para el reporte de uso de áreas basado en el área y métrica
         """
-        from reservations.models import Reserva, AreaComun, EstadoReserva
-        from django.db.models import Count, Sum, Avg
-        from django.db.models.functions import TruncDate
+        from backend.apps.reservations.models import Reserva, AreaComun, EstadoReserva
+        from backend.apps.finances.services import ResumenFinancieroService
+        from django.db.models import Count, Sum
 
         # Filtrar por fechas
         fecha_inicio = datetime.combine(fecha_inicio, datetime.min.time())
@@ -620,28 +654,22 @@ class ReporteUsoAreasViewSet(viewsets.ModelViewSet):
                 estado__in=[EstadoReserva.CONFIRMADA, EstadoReserva.PAGADA, EstadoReserva.USADA]
             )
 
-            total_reservas = reservas_confirmadas.count()
-            horas_totales = reservas_confirmadas.aggregate(
+            totales = reservas_confirmadas.aggregate(
+                total_reservas=Count('id'),
                 total_horas=Sum('duracion_horas')
-            )['total_horas'] or 0
-
-            # Ocupación por día de la semana
-            ocupacion_por_dia = {}
-            dias_semana = ['lunes', 'martes', 'miercoles', 'jueves', 'viernes', 'sabado', 'domingo']
-
-            for i, dia in enumerate(dias_semana):
-                reservas_dia = reservas_confirmadas.filter(fecha__week_day=i+1)
-                horas_dia = reservas_dia.aggregate(total=Sum('duracion_horas'))['total'] or 0
-                ocupacion_por_dia[dia] = float(horas_dia)
-
-            # Ocupación por hora del día
-            ocupacion_por_hora = {}
-            for hora in range(8, 21):  # 8 AM a 8 PM
-                reservas_hora = reservas_confirmadas.filter(
-                    hora_inicio__hour=hora
-                )
-                horas_hora = reservas_hora.aggregate(total=Sum('duracion_horas'))['total'] or 0
-                ocupacion_por_hora[f"{hora:02d}:00"] = float(horas_hora)
+            )
+            total_reservas = totales['total_reservas']
+            horas_totales = totales['total_horas'] or 0
+
+            # Horas ocupadas por día de la semana y por hora de inicio (una consulta cada una)
+            ocupacion_por_dia = {
+                dia: float(horas)
+                for dia, horas in por_dia_semana(reservas_confirmadas, 'fecha', Sum('duracion_horas')).items()
+            }
+            ocupacion_por_hora = {
+                hora: float(horas)
+                for hora, horas in por_hora(reservas_confirmadas, 'hora_inicio', Sum('duracion_horas')).items()
+            }
 
             # Calcular tasa de ocupación promedio (simplificada)
             # Asumiendo 12 horas de operación por día
@@ -665,36 +693,27 @@ class ReporteUsoAreasViewSet(viewsets.ModelViewSet):
                 fecha__range=[fecha_inicio.date(), fecha_fin.date()]
             )
 
-            total_reservas = reservas.count()
-            reservas_confirmadas = reservas.filter(
-                estado__in=[EstadoReserva.CONFIRMADA, EstadoReserva.PAGADA, EstadoReserva.USADA]
-            ).count()
-
-            reservas_canceladas = reservas.filter(estado=EstadoReserva.CANCELADA).count()
-
-            # Reservas por mes
-            reservas_por_mes = {}
-            for mes in range(fecha_inicio.month, fecha_fin.month + 1):
-                mes_inicio = fecha_inicio.replace(month=mes, day=1)
-                if mes == 12:
-                    mes_fin = mes_inicio.replace(year=mes_inicio.year + 1, month=1, day=1) - timedelta(days=1)
-                else:
-                    mes_fin = mes_inicio.replace(month=mes + 1, day=1) - timedelta(days=1)
-
-                count_mes = reservas.filter(fecha__range=[mes_inicio.date(), mes_fin.date()]).count()
-                reservas_por_mes[f"{mes_inicio.year}-{mes_inicio.month:02d}"] = count_mes
+            confirmadas = Q(estado__in=[EstadoReserva.CONFIRMADA, EstadoReserva.PAGADA, EstadoReserva.USADA])
+            totales = reservas.aggregate(
+                total_reservas=Count('id'),
+                reservas_confirmadas=Count('id', filter=confirmadas),
+                reservas_canceladas=Count('id', filter=Q(estado=EstadoReserva.CANCELADA)),
+                horas_totales=Sum('duracion_horas', filter=confirmadas)
+            )
+            total_reservas = totales['total_reservas']
+            reservas_confirmadas = totales['reservas_confirmadas']
+            reservas_canceladas = totales['reservas_canceladas']
+            horas_totales = totales['horas_totales'] or 0
+
+            # Reservas por mes (todos los meses del rango, también entre años)
+            reservas_por_mes = dict.fromkeys(ResumenFinancieroService.meses_entre(fecha_inicio, fecha_fin), 0)
+            for fila in reservas.annotate(mes=TruncMonth('fecha')).values('mes').annotate(
+                total=Count('id')
+            ).order_by():
+                reservas_por_mes[f"{fila['mes']:%Y-%m}"] = fila['total']
 
             # Reservas por día de la semana
-            reservas_por_dia = {}
-            dias_semana = ['lunes', 'martes', 'miercoles', 'jueves', 'viernes', 'sabado', 'domingo']
-
-            for i, dia in enumerate(dias_semana):
-                count_dia = reservas.filter(fecha__week_day=i+1).count()
-                reservas_por_dia[dia] = count_dia
-
-            horas_totales = reservas.filter(
-                estado__in=[EstadoReserva.CONFIRMADA, EstadoReserva.PAGADA, EstadoReserva.USADA]
-            ).aggregate(total=Sum('duracion_horas'))['total'] or 0
+            reservas_por_dia = por_dia_semana(reservas, 'fecha')
 
             return {
                 'total_reservas': total_reservas,
@@ -721,13 +740,56 @@ class ReporteUsoAreasViewSet(viewsets.ModelViewSet):
             return {
                 'mensaje': f'Reporte de uso de {area} generado exitosamente',
                 'metrica': metrica,
-                'periodo': f'{fecha_inicio.date()} - {fecha_fin.date()}',
+                'periodo': f'{fecha_inicio} - {fecha_fin}',
                 'total_reservas': total_reservas,
                 'horas_ocupacion': float(horas_totales),
                 'tasa_ocupacion_promedio': 0
             }
 
 
+# Vista y serializer de creación por tipo de reporte, usados por el trabajador de la cola
+GENERADORES_REPORTE = {
+    'financiero': (ReporteFinancieroViewSet, CrearReporteFinancieroSerializer),
+    'seguridad': (ReporteSeguridadViewSet, CrearReporteSeguridadSerializer),
+    'uso_areas': (ReporteUsoAreasViewSet, CrearReporteUsoAreasSerializer),
+}
+
+
+class TrabajoReporteViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    ViewSet para consultar y cancelar trabajos de generación de reportes
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = TrabajoReporteSerializer
+
+    def get_queryset(self):
+        user = self.request.user
+
+        # Administradores ven todos los trabajos, el resto solo los propios
+        queryset = TrabajoReporte.objects.select_related('solicitado_por')
+        if not (hasattr(user, 'role') and user.role == 'admin'):
+            queryset = queryset.filter(solicitado_por=user)
+
+        estado = self.request.query_params.get('estado', None)
+        if estado:
+            queryset = queryset.filter(estado=estado)
+
+        return queryset.order_by('-fecha_creacion')
+
+    @action(detail=True, methods=['post'])
+    def cancelar(self, request, pk=None):
+        """
+        Cancelar un trabajo en cola o en proceso
+        """
+        trabajo = self.get_object()
+        if not trabajo_reporte_service.cancelar(trabajo):
+            return Response(
+                {'error': f'El trabajo ya terminó con estado {trabajo.get_estado_display()}'},
+                status=status.HTTP_409_CONFLICT
+            )
+        return Response(self.get_serializer(trabajo).data)
+
+
 class PrediccionMorosidadViewSet(viewsets.ModelViewSet):
     """
     ViewSet para gestión de Predicciones de Morosidad
@@ -830,7 +892,7 @@ class PrediccionMorosidadViewSet(viewsets.ModelViewSet):
                     'total_residentes_analizados': 0,
                     'residentes_riesgo_alto': 0,
                     'residentes_riesgo_medio': 0,
-                    'precision_modelo': 0.0,
+                    'precision_modelo': None,
                     'nivel_confianza': 'bajo',
                     'metricas_evaluacion': {},
                     'resultados': {'error': 'Datos inválidos'}
@@ -859,7 +921,7 @@ class PrediccionMorosidadViewSet(viewsets.ModelViewSet):
                 'total_residentes_analizados': 0,
                 'residentes_riesgo_alto': 0,
                 'residentes_riesgo_medio': 0,
-                'precision_modelo': 0.0,
+                'precision_modelo': None,
                 'nivel_confianza': 'bajo',
                 'metricas_evaluacion': {},
                 'resultados': {'error': str(e)},
@@ -115,6 +115,42 @@ class AuditoriaLogger:
             datos_adicionales=datos_adicionales
         )
     
+    @staticmethod
+    def registrar_masivo(usuario, objetos, tipo_actividad, descripcion, datos_adicionales=None,
+                         nivel_importancia=NivelImportancia.MEDIO, batch_size=1000):
+        """
+        Registra una actividad por objeto con un solo bulk_create
+        Para operaciones masivas (bulk_create/update) que no emiten post_save
+
+        Args:
+            objetos: Objetos afectados (todos del mismo modelo)
+            descripcion: Función objeto -> descripción
+            datos_adicionales: Función objeto -> dict (opcional)
+
+        Returns:
+            int: Cantidad de registros creados
+        """
+        objetos = list(objetos)
+        if not objetos:
+            return 0
+
+        content_type = ContentType.objects.get_for_model(objetos[0])
+        registros = [
+            RegistroAuditoria(
+                usuario=usuario,
+                tipo_actividad=tipo_actividad,
+                descripcion=descripcion(objeto),
+                nivel_importancia=nivel_importancia,
+                content_type=content_type,
+                object_id=objeto.pk,
+                es_exitoso=True,
+                datos_adicionales=datos_adicionales(objeto) if datos_adicionales else None
+            )
+            for objeto in objetos
+        ]
+        RegistroAuditoria.objects.bulk_create(registros, batch_size=batch_size)
+        return len(registros)
+
     @staticmethod
     def registrar_actualizacion(usuario, objeto, datos_anteriores=None, datos_nuevos=None, descripcion_personalizada=None):
         """Registra la actualización de un objeto"""
@@ -13,6 +13,7 @@ from .serializers import (
     AuditoriaResumenSerializer, FiltroAuditoriaSerializer
 )
 from .utils import AuditoriaLogger
+from backend.pagination import AuditoriaCursorPagination
 
 User = get_user_model()
 
@@ -57,6 +58,8 @@ class RegistroAuditoriaViewSet(viewsets.ReadOnlyModelViewSet):
     """
     queryset = RegistroAuditoria.objects.all().select_related('usuario', 'content_type')
     permission_classes = [IsAdminOrReadOnlyForOwn]
+    # La tabla crece con cada acción: cursor sobre -timestamp en lugar de devolverla entera
+    pagination_class = AuditoriaCursorPagination
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -208,22 +211,12 @@ class RegistroAuditoriaViewSet(viewsets.ReadOnlyModelViewSet):
         """Endpoint para que usuarios vean sus propias actividades"""
         queryset = RegistroAuditoria.objects.filter(
             usuario=request.user
-        ).order_by('-timestamp')
+        ).select_related('usuario', 'content_type')
         
         # Aplicar paginación siempre para consistencia
         page = self.paginate_queryset(queryset)
-        if page is not None:
-            serializer = RegistroAuditoriaListSerializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-        
-        # Fallback: crear respuesta paginada manualmente
-        serializer = RegistroAuditoriaListSerializer(queryset, many=True)
-        return Response({
-            'count': queryset.count(),
-            'next': None,
-            'previous': None,
-            'results': serializer.data
-        })
+        serializer = RegistroAuditoriaListSerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
     
     @action(detail=False, methods=['get'])
     def exportar(self, request):
@@ -5,7 +5,7 @@ Configuración del Admin Panel para el Módulo de Gestión Financiera
 from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
-from .models import ConceptoFinanciero, CargoFinanciero
+from .models import ConceptoFinanciero, CargoFinanciero, SaldoResidente, ResumenFinancieroDiario
 
 
 @admin.register(ConceptoFinanciero)
@@ -113,6 +113,41 @@ class CargoFinancieroAdmin(admin.ModelAdmin):
         return super().get_queryset(request).select_related('concepto', 'residente', 'aplicado_por')
 
 
+@admin.register(SaldoResidente)
+class SaldoResidenteAdmin(admin.ModelAdmin):
+    """Saldos materializados: solo lectura, se recalculan desde los cargos"""
+    list_display = [
+        'residente', 'estado_general', 'total_pendiente', 'total_vencido',
+        'total_pagado_mes', 'proximo_vencimiento_fecha', 'fecha_calculo'
+    ]
+    list_filter = ['estado_general', 'fecha_calculo']
+    search_fields = ['residente__username', 'residente__first_name', 'residente__last_name']
+    list_select_related = ['residente']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ResumenFinancieroDiario)
+class ResumenFinancieroDiarioAdmin(admin.ModelAdmin):
+    """Resumen diario para reportes: solo lectura, se actualiza desde los cargos"""
+    list_display = [
+        'fecha', 'tipo_concepto', 'pagos_monto', 'emitido_monto',
+        'adeudado_monto', 'fecha_corte'
+    ]
+    list_filter = ['tipo_concepto']
+    date_hierarchy = 'fecha'
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 # Configuraciones adicionales del admin
 admin.site.site_header = "Smart Condominium - Administración"
 admin.site.site_title = "Smart Condominium Admin"
@@ -4,4 +4,8 @@ from django.apps import AppConfig
 class FinancesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'backend.apps.finances'
-    verbose_name = 'Gestión Financiera'
\ No newline at end of file
+    verbose_name = 'Gestión Financiera'
+
+    def ready(self):
+        """Importar las señales cuando la app esté lista"""
+        import backend.apps.finances.signals
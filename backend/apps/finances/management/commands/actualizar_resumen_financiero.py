@@ -0,0 +1,28 @@
+"""
+Management command para actualizar o reconstruir el resumen financiero diario (ResumenFinancieroDiario)
+"""
+
+from django.core.management.base import BaseCommand
+
+from backend.apps.finances.services import resumen_financiero_service
+
+
+class Command(BaseCommand):
+    help = 'Actualizar el resumen financiero diario con los cargos modificados desde el último corte'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--completo',
+            action='store_true',
+            help='Reconstruir el resumen completo a partir de todos los cargos'
+        )
+
+    def handle(self, *args, **options):
+        corte = resumen_financiero_service.ultimo_corte()
+        if options['completo'] or corte is None:
+            self.stdout.write(self.style.SUCCESS('🔄 RECONSTRUYENDO RESUMEN FINANCIERO DIARIO'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'🔄 ACTUALIZANDO RESUMEN FINANCIERO DESDE {corte:%Y-%m-%d %H:%M}'))
+
+        filas = resumen_financiero_service.actualizar(completo=options['completo'])
+        self.stdout.write(self.style.SUCCESS(f'✅ {filas} fila(s) de resumen guardada(s)'))
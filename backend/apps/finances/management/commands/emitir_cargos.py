@@ -0,0 +1,68 @@
+"""
+Management command para la emisión masiva de cargos de un concepto por periodo
+"""
+
+from datetime import date, datetime
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.apps.finances.models import ConceptoFinanciero
+from backend.apps.finances.services import emision_cargos_service
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Emitir un concepto a todos los residentes activos para un periodo (idempotente)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concepto', type=int, required=True, help='ID del concepto financiero')
+        parser.add_argument(
+            '--periodo',
+            default=date.today().strftime('%Y-%m'),
+            help='Periodo YYYY-MM (por defecto el mes actual)'
+        )
+        parser.add_argument('--vencimiento', help='Fecha de vencimiento YYYY-MM-DD')
+        parser.add_argument(
+            '--usuario',
+            help='Username del administrador que emite (por defecto el primer superusuario)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            concepto = ConceptoFinanciero.objects.get(pk=options['concepto'])
+        except ConceptoFinanciero.DoesNotExist:
+            raise CommandError(f"No existe el concepto {options['concepto']}")
+        if not concepto.esta_vigente:
+            raise CommandError(f'El concepto "{concepto.nombre}" no está activo o no está vigente')
+
+        try:
+            datetime.strptime(options['periodo'], '%Y-%m')
+            fecha_vencimiento = (
+                datetime.strptime(options['vencimiento'], '%Y-%m-%d').date()
+                if options['vencimiento'] else None
+            )
+        except ValueError:
+            raise CommandError('Formato inválido. Use --periodo YYYY-MM y --vencimiento YYYY-MM-DD')
+
+        if options['usuario']:
+            usuario = User.objects.filter(username=options['usuario']).first()
+        else:
+            usuario = User.objects.filter(is_superuser=True).first()
+        if not usuario:
+            raise CommandError('❌ No hay usuario administrador')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'🧾 EMITIENDO "{concepto.nombre}" PARA EL PERIODO {options["periodo"]}'
+        ))
+        resumen = emision_cargos_service.emitir_cargos(
+            concepto=concepto,
+            periodo=options['periodo'],
+            usuario=usuario,
+            fecha_vencimiento=fecha_vencimiento
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {resumen['cargos_creados']} cargo(s) creado(s), "
+            f"{resumen['cargos_omitidos']} ya existían - Total ${resumen['monto_total']}"
+        ))
@@ -0,0 +1,68 @@
+"""
+Management command para el barrido diario de cargos vencidos
+Pensado para ejecutarse una vez al día (cron / Programador de tareas) o con --continuo
+como único proceso dedicado al barrido
+"""
+
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.apps.finances.scheduler import ProgramadorVencimientos, parsear_hora
+from backend.apps.finances.services import vencimiento_service
+
+
+class Command(BaseCommand):
+    help = 'Marcar como vencidos los cargos pendientes cuya fecha de vencimiento ya pasó'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fecha',
+            help='Fecha de referencia YYYY-MM-DD (por defecto hoy)'
+        )
+        parser.add_argument(
+            '--continuo',
+            action='store_true',
+            help='Quedarse en ejecución y repetir el barrido cada día a la hora indicada'
+        )
+        parser.add_argument(
+            '--hora',
+            default=settings.FINANZAS_BARRIDO_HORA,
+            help='Hora diaria HH:MM para el modo --continuo (por defecto FINANZAS_BARRIDO_HORA)'
+        )
+
+    def handle(self, *args, **options):
+        if options['continuo']:
+            self.ejecutar_continuo(options['hora'])
+            return
+
+        fecha = None
+        if options['fecha']:
+            try:
+                fecha = datetime.strptime(options['fecha'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('Formato de fecha inválido. Use YYYY-MM-DD')
+
+        self.stdout.write(self.style.SUCCESS('⏰ MARCANDO CARGOS VENCIDOS'))
+        resultado = vencimiento_service.marcar_cargos_vencidos(fecha)
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {resultado['cantidad_cargos']} cargo(s) vencido(s) de "
+            f"{resultado['residentes_afectados']} residente(s) - Total ${resultado['monto_total']}"
+        ))
+
+    def ejecutar_continuo(self, hora):
+        try:
+            hora, minuto = parsear_hora(hora)
+        except ValueError:
+            raise CommandError('Formato de hora inválido. Use HH:MM')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'⏰ Barrido de vencimientos programado diariamente a las {hora:02d}:{minuto:02d} (Ctrl+C para salir)'
+        ))
+        programador = ProgramadorVencimientos(hora, minuto)
+        try:
+            programador.run()
+        except KeyboardInterrupt:
+            programador.detener()
+            self.stdout.write('👋 Programador detenido')
@@ -0,0 +1,52 @@
+"""
+Management command para reconstruir o verificar los saldos materializados (SaldoResidente)
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from backend.apps.finances.services import estado_cuenta_service
+
+
+class Command(BaseCommand):
+    help = 'Reconstruir o verificar SaldoResidente a partir de los cargos financieros'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verificar',
+            action='store_true',
+            help='Solo comparar los saldos guardados con el libro de cargos, sin modificar nada'
+        )
+        parser.add_argument(
+            '--residente',
+            type=int,
+            action='append',
+            help='ID de residente a recalcular (se puede repetir)'
+        )
+
+    def handle(self, *args, **options):
+        if options['verificar']:
+            self.verificar()
+            return
+
+        self.stdout.write(self.style.SUCCESS('🔄 RECALCULANDO SALDOS DE RESIDENTES'))
+        with transaction.atomic():
+            total = estado_cuenta_service.recalcular_saldos(options['residente'])
+        self.stdout.write(self.style.SUCCESS(f'✅ {total} saldo(s) recalculado(s)'))
+
+    def verificar(self):
+        self.stdout.write(self.style.SUCCESS('🔍 VERIFICANDO SALDOS DE RESIDENTES'))
+        diferencias = estado_cuenta_service.verificar_saldos()
+
+        if not diferencias:
+            self.stdout.write(self.style.SUCCESS('✅ Todos los saldos coinciden con el libro de cargos'))
+            return
+
+        for diferencia in diferencias:
+            self.stdout.write(self.style.WARNING(
+                f"⚠ Residente {diferencia['residente_id']} - {diferencia['campo'] or 'fila'}: "
+                f"guardado={diferencia['guardado']} calculado={diferencia['calculado']}"
+            ))
+        self.stdout.write(self.style.ERROR(
+            f'❌ {len(diferencias)} diferencia(s). Ejecute "python manage.py recalcular_saldos" para corregirlas'
+        ))
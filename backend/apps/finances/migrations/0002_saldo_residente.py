@@ -0,0 +1,42 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:07
+
+import datetime
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0001_initial'),
+        ('users', '0002_user_document_number_user_document_type_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SaldoResidente',
+            fields=[
+                ('residente', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='saldo_financiero', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Residente')),
+                ('total_pendiente', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12, verbose_name='Total Pendiente')),
+                ('total_vencido', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12, verbose_name='Total Vencido')),
+                ('total_pagado_mes', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12, verbose_name='Total Pagado en el Mes')),
+                ('cantidad_cargos_pendientes', models.PositiveIntegerField(default=0)),
+                ('cantidad_cargos_vencidos', models.PositiveIntegerField(default=0)),
+                ('estado_general', models.CharField(default='al_dia', max_length=15, verbose_name='Estado General')),
+                ('proximo_vencimiento_fecha', models.DateField(blank=True, null=True)),
+                ('proximo_vencimiento_concepto', models.CharField(blank=True, max_length=100)),
+                ('ultimo_pago_fecha', models.DateTimeField(blank=True, null=True)),
+                ('ultimo_pago_monto', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('ultimo_pago_concepto', models.CharField(blank=True, max_length=100)),
+                ('fecha_calculo', models.DateField(default=datetime.date.today, help_text='Fecha de referencia usada para vencidos y pagos del mes')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Saldo de Residente',
+                'verbose_name_plural': 'Saldos de Residentes',
+                'indexes': [models.Index(fields=['estado_general'], name='finances_sa_estado__2353ba_idx'), models.Index(fields=['fecha_calculo'], name='finances_sa_fecha_c_45e121_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0002_saldo_residente'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cargofinanciero',
+            name='periodo',
+            field=models.CharField(blank=True, help_text='Periodo facturado (YYYY-MM) de los cargos emitidos en lote', max_length=7, verbose_name='Periodo'),
+        ),
+        migrations.AddConstraint(
+            model_name='cargofinanciero',
+            constraint=models.UniqueConstraint(condition=models.Q(('periodo', ''), _negated=True), fields=('concepto', 'residente', 'periodo'), name='cargo_unico_concepto_residente_periodo'),
+        ),
+    ]
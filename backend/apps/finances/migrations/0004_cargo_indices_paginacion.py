@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0003_cargo_periodo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cargofinanciero',
+            index=models.Index(fields=['estado', '-fecha_pago'], name='finances_ca_estado_b98958_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cargofinanciero',
+            index=models.Index(fields=['residente', '-fecha_creacion'], name='finances_ca_residen_058532_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:43
+
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0004_cargo_indices_paginacion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenFinancieroDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(verbose_name='Fecha')),
+                ('tipo_concepto', models.CharField(choices=[('cuota_mensual', 'Cuota Mensual'), ('cuota_extraordinaria', 'Cuota Extraordinaria'), ('multa_ruido', 'Multa por Ruido'), ('multa_areas_comunes', 'Multa Áreas Comunes'), ('multa_estacionamiento', 'Multa Estacionamiento'), ('multa_mascota', 'Multa por Mascota'), ('otros', 'Otros')], max_length=30, verbose_name='Tipo de Concepto')),
+                ('pagos_monto', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('pagos_cantidad', models.PositiveIntegerField(default=0)),
+                ('emitido_monto', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('emitido_cantidad', models.PositiveIntegerField(default=0)),
+                ('adeudado_monto', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('adeudado_cantidad', models.PositiveIntegerField(default=0)),
+                ('fecha_corte', models.DateTimeField(help_text='Cambios del libro hasta este momento incluidos en la fila')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Resumen Financiero Diario',
+                'verbose_name_plural': 'Resúmenes Financieros Diarios',
+                'ordering': ['-fecha', 'tipo_concepto'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='cargofinanciero',
+            index=models.Index(fields=['fecha_modificacion'], name='finances_ca_fecha_m_2c2142_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resumenfinancierodiario',
+            index=models.Index(fields=['fecha_corte'], name='finances_re_fecha_c_b3b60e_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='resumenfinancierodiario',
+            constraint=models.UniqueConstraint(fields=('fecha', 'tipo_concepto'), name='resumen_diario_unico'),
+        ),
+    ]
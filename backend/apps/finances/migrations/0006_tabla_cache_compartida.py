@@ -0,0 +1,24 @@
+"""
+Tabla de la caché compartida en base de datos (CACHES sin REDIS_URL)
+
+Equivale a "python manage.py createcachetable": sin la tabla, cada acceso a la caché
+falla. Si la caché configurada es Redis no crea nada.
+"""
+
+from django.core.management import call_command
+from django.db import migrations
+
+
+def crear_tabla_cache(apps, schema_editor):
+    call_command('createcachetable', database=schema_editor.connection.alias, verbosity=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0005_resumen_financiero_diario'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_tabla_cache, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+"""
+Saldos iniciales de todos los residentes (SaldoResidente se creó vacía en 0002)
+
+Sin este cálculo, los listados de estados de cuenta y las estadísticas mostrarían
+deuda cero hasta que alguien ejecute "python manage.py recalcular_saldos". Usa el
+servicio (mismas reglas que el recálculo normal) y no el modelo histórico.
+"""
+
+from django.db import migrations
+
+
+def calcular_saldos(apps, schema_editor):
+    from backend.apps.finances.services import estado_cuenta_service
+
+    estado_cuenta_service.recalcular_saldos()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0006_tabla_cache_compartida'),
+    ]
+
+    operations = [
+        migrations.RunPython(calcular_saldos, migrations.RunPython.noop),
+    ]
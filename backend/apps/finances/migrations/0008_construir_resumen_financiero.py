@@ -0,0 +1,27 @@
+"""
+Construcción inicial del resumen financiero diario (ResumenFinancieroDiario se creó vacía en 0005)
+
+totales_por_mes lee solo el resumen: sin esta construcción, los reportes financieros
+mostrarían ceros para todo el historial anterior al despliegue hasta ejecutar
+"python manage.py actualizar_resumen_financiero". Usa el servicio (mismas reglas que
+la actualización normal) y no el modelo histórico.
+"""
+
+from django.db import migrations
+
+
+def construir_resumen(apps, schema_editor):
+    from backend.apps.finances.services import resumen_financiero_service
+
+    resumen_financiero_service.actualizar(completo=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0007_calcular_saldos_iniciales'),
+    ]
+
+    operations = [
+        migrations.RunPython(construir_resumen, migrations.RunPython.noop),
+    ]
@@ -4,8 +4,9 @@ Módulo 2: Gestión Financiera Básica
 T1: Configurar Cuotas y Multas
 """
 
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 from decimal import Decimal
 from django.core.validators import MinValueValidator
 from datetime import date
@@ -118,6 +119,10 @@ class EstadoCargo(models.TextChoices):
     CANCELADO = 'cancelado', 'Cancelado'
 
 
+# Estados que siguen adeudados (VENCIDO lo asigna el barrido diario marcar_cargos_vencidos)
+ESTADOS_POR_COBRAR = [EstadoCargo.PENDIENTE, EstadoCargo.VENCIDO]
+
+
 class CargoFinanciero(models.Model):
     """
     Modelo para cargos específicos aplicados a residentes
@@ -170,6 +175,12 @@ class CargoFinanciero(models.Model):
         blank=True,
         verbose_name="Referencia de Pago"
     )
+    periodo = models.CharField(
+        max_length=7,
+        blank=True,
+        verbose_name="Periodo",
+        help_text="Periodo facturado (YYYY-MM) de los cargos emitidos en lote"
+    )
     
     # Metadatos
     aplicado_por = models.ForeignKey(
@@ -188,32 +199,206 @@ class CargoFinanciero(models.Model):
             models.Index(fields=['residente', 'estado']),
             models.Index(fields=['fecha_vencimiento', 'estado']),
             models.Index(fields=['concepto', 'fecha_aplicacion']),
+            # Órdenes de la paginación por cursor (pagos/comprobantes y mis_cargos)
+            models.Index(fields=['estado', '-fecha_pago']),
+            models.Index(fields=['residente', '-fecha_creacion']),
+            # Actualización incremental de ResumenFinancieroDiario
+            models.Index(fields=['fecha_modificacion']),
+        ]
+        constraints = [
+            # Emisión masiva idempotente: un cargo por concepto, residente y periodo
+            models.UniqueConstraint(
+                fields=['concepto', 'residente', 'periodo'],
+                condition=~models.Q(periodo=''),
+                name='cargo_unico_concepto_residente_periodo'
+            ),
         ]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Residente original, para actualizar ambos saldos si el cargo se reasigna
+        instance._residente_id_original = instance.__dict__.get('residente_id')
+        # Días originales, para corregir el resumen diario si cambian las fechas
+        instance._dias_originales = instance.dias_resumen()
+        return instance
+
     def __str__(self):
         return f"{self.concepto.nombre} - {self.residente.username} - ${self.monto}"
 
+    def save(self, *args, **kwargs):
+        # El cargo y el saldo materializado del residente (ver signals.py)
+        # se guardan en la misma transacción; delete() ya es atómico en Django
+        if (self.estado == EstadoCargo.VENCIDO and self.fecha_vencimiento
+                and self.fecha_vencimiento >= date.today()):
+            # Se prorrogó el vencimiento: el cargo vuelve a estar pendiente
+            self.estado = EstadoCargo.PENDIENTE
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     @property
     def esta_vencido(self):
         """Verifica si el cargo está vencido"""
+        if self.estado == EstadoCargo.VENCIDO:
+            return True
         if not self.fecha_vencimiento:
             return False
+        # Cargos pendientes que aún no alcanzó el barrido diario
         return date.today() > self.fecha_vencimiento and self.estado == EstadoCargo.PENDIENTE
 
     @property
     def dias_para_vencimiento(self):
         """Calcula días restantes para el vencimiento"""
-        if self.estado != EstadoCargo.PENDIENTE or not self.fecha_vencimiento:
+        if self.estado not in ESTADOS_POR_COBRAR or not self.fecha_vencimiento:
             return None
         delta = self.fecha_vencimiento - date.today()
         return delta.days
 
-    def marcar_como_pagado(self, referencia_pago='', usuario_proceso=None):
-        """Marca el cargo como pagado"""
-        from django.utils import timezone
+    def dias_resumen(self):
+        """Días del resumen financiero diario en los que cuenta este cargo"""
+        fecha_pago = self.__dict__.get('fecha_pago')
+        return {
+            self.__dict__.get('fecha_aplicacion'),
+            self.__dict__.get('fecha_vencimiento'),
+            timezone.localdate(fecha_pago) if fecha_pago else None,
+        } - {None}
+
+    def aplicar_pago(self, referencia_pago='', usuario_proceso=None, observaciones='', fecha_pago=None):
+        """Aplica los cambios de un pago sin guardar (usado también por la conciliación masiva)"""
         self.estado = EstadoCargo.PAGADO
-        self.fecha_pago = timezone.now()
+        self.fecha_pago = fecha_pago or timezone.now()
         self.referencia_pago = referencia_pago
         if usuario_proceso:
             self.observaciones += f"\nProcesado por: {usuario_proceso.username}"
-        self.save()
\ No newline at end of file
+        if observaciones:
+            self.observaciones = f"{self.observaciones}\n{observaciones}".strip()
+
+    def marcar_como_pagado(self, referencia_pago='', usuario_proceso=None, observaciones=''):
+        """Marca el cargo como pagado"""
+        self.aplicar_pago(referencia_pago, usuario_proceso, observaciones)
+        self.save()
+
+
+class SaldoResidente(models.Model):
+    """
+    Resumen materializado del estado financiero de un residente
+    Se actualiza en la misma transacción en que se crea, paga, cancela o edita un cargo
+    """
+    residente = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='saldo_financiero',
+        verbose_name="Residente"
+    )
+
+    # Totales
+    total_pendiente = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        verbose_name="Total Pendiente"
+    )
+    total_vencido = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        verbose_name="Total Vencido"
+    )
+    total_pagado_mes = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        verbose_name="Total Pagado en el Mes"
+    )
+    cantidad_cargos_pendientes = models.PositiveIntegerField(default=0)
+    cantidad_cargos_vencidos = models.PositiveIntegerField(default=0)
+    estado_general = models.CharField(
+        max_length=15,
+        default='al_dia',
+        verbose_name="Estado General"
+    )
+
+    # Próximo vencimiento
+    proximo_vencimiento_fecha = models.DateField(null=True, blank=True)
+    proximo_vencimiento_concepto = models.CharField(max_length=100, blank=True)
+
+    # Último pago
+    ultimo_pago_fecha = models.DateTimeField(null=True, blank=True)
+    ultimo_pago_monto = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        blank=True
+    )
+    ultimo_pago_concepto = models.CharField(max_length=100, blank=True)
+
+    # Metadatos
+    fecha_calculo = models.DateField(
+        default=date.today,
+        help_text="Fecha de referencia usada para vencidos y pagos del mes"
+    )
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Saldo de Residente"
+        verbose_name_plural = "Saldos de Residentes"
+        indexes = [
+            models.Index(fields=['estado_general']),
+            models.Index(fields=['fecha_calculo']),
+        ]
+
+    def __str__(self):
+        return f"{self.residente.username} - Pendiente ${self.total_pendiente}"
+
+    @property
+    def esta_vigente(self):
+        """Indica si el saldo fue calculado hoy (los vencidos dependen de la fecha)"""
+        return self.fecha_calculo == date.today()
+
+
+class ResumenFinancieroDiario(models.Model):
+    """
+    Resumen diario del libro de cargos por tipo de concepto
+    Lo mantiene resumen_financiero_service (al confirmarse cada cambio del libro y con
+    actualizar() incremental) y lo leen los reportes financieros agrupando por mes, sin
+    recorrer el libro completo
+    """
+    fecha = models.DateField(verbose_name="Fecha")
+    tipo_concepto = models.CharField(
+        max_length=30,
+        choices=TipoConcepto.choices,
+        verbose_name="Tipo de Concepto"
+    )
+
+    # Pagos registrados ese día (por fecha de pago)
+    pagos_monto = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    pagos_cantidad = models.PositiveIntegerField(default=0)
+
+    # Cargos emitidos ese día (por fecha de aplicación)
+    emitido_monto = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    emitido_cantidad = models.PositiveIntegerField(default=0)
+
+    # Cargos que vencen ese día y siguen adeudados (pendientes o vencidos)
+    adeudado_monto = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    adeudado_cantidad = models.PositiveIntegerField(default=0)
+
+    # Metadatos
+    fecha_corte = models.DateTimeField(
+        help_text="Cambios del libro hasta este momento incluidos en la fila"
+    )
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Resumen Financiero Diario"
+        verbose_name_plural = "Resúmenes Financieros Diarios"
+        ordering = ['-fecha', 'tipo_concepto']
+        constraints = [
+            models.UniqueConstraint(fields=['fecha', 'tipo_concepto'], name='resumen_diario_unico'),
+        ]
+        indexes = [
+            models.Index(fields=['fecha_corte']),
+        ]
+
+    def __str__(self):
+        return f"{self.fecha} - {self.get_tipo_concepto_display()}"
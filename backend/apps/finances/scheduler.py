@@ -0,0 +1,68 @@
+"""
+Programador para el barrido diario de cargos vencidos
+
+Alternativa a cron / Programador de tareas: "manage.py marcar_cargos_vencidos --continuo"
+ejecuta vencimiento_service.marcar_cargos_vencidos() una vez al día a la hora
+configurada. Corre en un único proceso dedicado, nunca en los procesos web. Tras
+cada barrido se actualiza el resumen financiero diario.
+"""
+
+import logging
+import threading
+from datetime import timedelta
+
+from django.db import close_old_connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class ProgramadorVencimientos:
+    """Ejecuta el barrido de vencidos al iniciar y luego cada día a hora:minuto (en primer plano)"""
+
+    def __init__(self, hora=0, minuto=5):
+        self.hora = hora
+        self.minuto = minuto
+        self._detener = threading.Event()
+
+    def segundos_hasta_proxima(self, ahora=None):
+        """Segundos que faltan para la próxima ejecución programada"""
+        ahora = ahora or timezone.localtime()
+        objetivo = ahora.replace(hour=self.hora, minute=self.minuto, second=0, microsecond=0)
+        if objetivo <= ahora:
+            objetivo += timedelta(days=1)
+        return (objetivo - ahora).total_seconds()
+
+    def ejecutar_barrido(self):
+        """Ejecutar un barrido sin detener el programador ante errores"""
+        from .services import vencimiento_service, resumen_financiero_service
+
+        close_old_connections()
+        try:
+            resultado = vencimiento_service.marcar_cargos_vencidos()
+            # Los cargos recién vencidos cambian el adeudado del resumen diario
+            resumen_financiero_service.actualizar()
+            return resultado
+        except Exception:
+            logger.exception("Error en el barrido programado de cargos vencidos")
+        finally:
+            close_old_connections()
+
+    def run(self):
+        """Bloquea hasta detener(); ejecutar al iniciar por si el proceso estuvo detenido a la hora programada"""
+        # Ejecutar al iniciar por si el proceso estuvo detenido a la hora programada
+        self.ejecutar_barrido()
+        while not self._detener.wait(self.segundos_hasta_proxima()):
+            self.ejecutar_barrido()
+
+    def detener(self):
+        self._detener.set()
+
+
+def parsear_hora(valor):
+    """Convertir 'HH:MM' en (hora, minuto)"""
+    hora, minuto = (int(parte) for parte in valor.split(':'))
+    if not (0 <= hora < 24 and 0 <= minuto < 60):
+        raise ValueError(f"Hora inválida: {valor}")
+    return hora, minuto
+
@@ -6,7 +6,10 @@ Módulo 2: Gestión Financiera Básica - T1: Configurar Cuotas y Multas
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from datetime import date, timedelta
-from .models import ConceptoFinanciero, CargoFinanciero, TipoConcepto, EstadoConcepto, EstadoCargo
+from .models import (
+    ConceptoFinanciero, CargoFinanciero, TipoConcepto, EstadoConcepto, ESTADOS_POR_COBRAR
+)
+from .services import comprobante_service
 
 User = get_user_model()
 
@@ -110,11 +113,11 @@ class CargoFinancieroSerializer(serializers.ModelSerializer):
             'id', 'concepto', 'concepto_info', 'residente', 'residente_info',
             'monto', 'estado', 'estado_display', 'fecha_aplicacion',
             'fecha_vencimiento', 'fecha_pago', 'observaciones',
-            'referencia_pago', 'aplicado_por', 'aplicado_por_info',
+            'referencia_pago', 'periodo', 'aplicado_por', 'aplicado_por_info',
             'fecha_creacion', 'fecha_modificacion', 'esta_vencido',
             'dias_para_vencimiento'
         ]
-        read_only_fields = ['aplicado_por', 'fecha_creacion', 'fecha_modificacion']
+        read_only_fields = ['periodo', 'aplicado_por', 'fecha_creacion', 'fecha_modificacion']
 
     def get_aplicado_por_info(self, obj):
         """Información del usuario que aplicó el cargo"""
@@ -185,6 +188,31 @@ class CargoFinancieroListSerializer(serializers.ModelSerializer):
         return f"{obj.residente.first_name} {obj.residente.last_name}".strip() or obj.residente.username
 
 
+class ComprobanteListSerializer(CargoFinancieroListSerializer):
+    """
+    Listado de pagos con los datos del comprobante
+    T4: Generar comprobante de pago - Módulo 2 Gestión Financiera Básica
+    """
+    
+    numero_comprobante = serializers.SerializerMethodField()
+    puede_generar_comprobante = serializers.SerializerMethodField()
+    url_comprobante = serializers.SerializerMethodField()
+
+    class Meta(CargoFinancieroListSerializer.Meta):
+        fields = CargoFinancieroListSerializer.Meta.fields + [
+            'numero_comprobante', 'puede_generar_comprobante', 'url_comprobante'
+        ]
+
+    def get_numero_comprobante(self, obj):
+        return comprobante_service._generar_numero_comprobante(obj)
+
+    def get_puede_generar_comprobante(self, obj):
+        return True
+
+    def get_url_comprobante(self, obj):
+        return f'/api/finances/cargos/{obj.id}/comprobante/'
+
+
 class PagarCargoSerializer(serializers.Serializer):
     """
     Serializer para procesar pagos de cargos
@@ -239,7 +267,7 @@ class PagarCargoSerializer(serializers.Serializer):
             raise serializers.ValidationError("Cargo no encontrado")
         
         # Validar estado del cargo
-        if cargo.estado != EstadoCargo.PENDIENTE:
+        if cargo.estado not in ESTADOS_POR_COBRAR:
             raise serializers.ValidationError({
                 'estado': f"No se puede pagar un cargo en estado '{cargo.get_estado_display()}'"
             })
@@ -290,6 +318,54 @@ class PagarCargoSerializer(serializers.Serializer):
         return data
 
 
+class EmitirCargosSerializer(serializers.Serializer):
+    """
+    Serializer para la emisión masiva de cargos de un concepto por periodo
+    Se valida una sola vez para todo el lote
+    """
+    
+    concepto = serializers.PrimaryKeyRelatedField(queryset=ConceptoFinanciero.objects.all())
+    periodo = serializers.RegexField(
+        regex=r'^\d{4}-(0[1-9]|1[0-2])$',
+        help_text="Periodo a facturar en formato YYYY-MM",
+        error_messages={'invalid': 'El periodo debe tener el formato YYYY-MM'}
+    )
+    residentes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False,
+        allow_empty=False,
+        help_text="IDs de residentes (por defecto todos los residentes activos)"
+    )
+    monto = serializers.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        required=False,
+        help_text="Monto de cada cargo (por defecto el del concepto)"
+    )
+    fecha_aplicacion = serializers.DateField(required=False)
+    fecha_vencimiento = serializers.DateField(required=False)
+    observaciones = serializers.CharField(required=False, allow_blank=True, default='')
+
+    def validate_concepto(self, concepto):
+        if not concepto.esta_vigente:
+            raise serializers.ValidationError('El concepto no está activo o no está vigente')
+        return concepto
+
+    def validate_monto(self, monto):
+        if monto <= 0:
+            raise serializers.ValidationError('El monto debe ser mayor a 0')
+        return monto
+
+    def validate(self, data):
+        fecha_aplicacion = data.get('fecha_aplicacion', date.today())
+        fecha_vencimiento = data.get('fecha_vencimiento')
+        if fecha_vencimiento and fecha_vencimiento < fecha_aplicacion:
+            raise serializers.ValidationError({
+                'fecha_vencimiento': 'La fecha de vencimiento no puede ser anterior a la fecha de aplicación'
+            })
+        return data
+
+
 class ResumenFinancieroSerializer(serializers.Serializer):
     """Serializer para resumen financiero de un residente"""
     
@@ -0,0 +1,78 @@
+"""
+Señales del Módulo de Gestión Financiera
+Mantienen actualizados el saldo materializado (SaldoResidente) de cada residente
+y el resumen financiero diario (ResumenFinancieroDiario)
+"""
+
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver, Signal
+
+from .models import CargoFinanciero
+from .services import estado_cuenta_service, resumen_financiero_service
+
+logger = logging.getLogger(__name__)
+
+# Emitida tras el commit del barrido diario de vencimientos
+# kwargs: cargo_ids, residente_ids, fecha
+cargos_vencidos = Signal()
+
+# Emitida tras el commit de cualquier cambio en el libro de cargos (individual o masivo)
+# kwargs: dias (días de aplicación, vencimiento o pago que cambiaron), residente_ids
+libro_modificado = Signal()
+
+
+def notificar_libro_modificado(dias, residente_ids=()):
+    """Emitir libro_modificado con los días y residentes afectados cuando la transacción confirme"""
+    dias = set(dias)
+    residente_ids = set(residente_ids) - {None}
+    if dias:
+        transaction.on_commit(lambda: libro_modificado.send(
+            sender=CargoFinanciero, dias=dias, residente_ids=residente_ids
+        ))
+
+
+@receiver(post_save, sender=CargoFinanciero)
+@receiver(post_delete, sender=CargoFinanciero)
+def actualizar_saldo_por_cargo(sender, instance, **kwargs):
+    """
+    Recalcula el saldo del residente al crear, pagar, cancelar, editar o eliminar un cargo
+
+    Se ejecuta dentro de la transacción del save()/delete() del cargo. Las operaciones
+    masivas (bulk_create, update) no emiten señales y deben llamar a
+    estado_cuenta_service.recalcular_saldos() explícitamente.
+    """
+    residente_ids = {instance.residente_id, getattr(instance, '_residente_id_original', None)}
+    residente_ids.discard(None)
+    estado_cuenta_service.recalcular_saldos(residente_ids)
+    instance._residente_id_original = instance.residente_id
+
+
+@receiver(post_save, sender=CargoFinanciero)
+@receiver(post_delete, sender=CargoFinanciero)
+def notificar_cambio_de_cargo(sender, instance, **kwargs):
+    """
+    Emite libro_modificado con los días que el cargo ocupaba y los que ocupa ahora
+
+    Un cargo eliminado o con fechas cambiadas no deja rastro en el libro, por lo que los
+    días anteriores se toman de los valores con que se cargó la instancia.
+    """
+    originales = getattr(instance, '_dias_originales', set())
+    notificar_libro_modificado(originales | instance.dias_resumen(), {instance.residente_id})
+    instance._dias_originales = instance.dias_resumen()
+
+
+@receiver(libro_modificado)
+def actualizar_resumen_por_libro(sender, dias, **kwargs):
+    """
+    Recalcula en ResumenFinancieroDiario los días de un cambio ya confirmado
+
+    Un error no debe hacer fallar la operación ya confirmada; la actualización
+    incremental (o "actualizar_resumen_financiero --completo") repara el resumen.
+    """
+    try:
+        resumen_financiero_service.corregir_dias(dias)
+    except Exception:
+        logger.exception("Error actualizando el resumen financiero de %s día(s)", len(dias))
@@ -0,0 +1,66 @@
+"""
+Base classes and utilities for finances tests
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from backend.apps.finances.models import ConceptoFinanciero, CargoFinanciero, TipoConcepto
+
+
+class FinancesTestBase(APITestCase):
+    """Base class for finances tests with common setup"""
+
+    def setUp(self):
+        """Set up test users, a concept and authentication helpers"""
+        # Los totales en caché no deben pasar de un test a otro
+        cache.clear()
+        User = get_user_model()
+
+        self.user_admin = User.objects.create_user(
+            username='admin_test',
+            email='admin@test.com',
+            password='password123',
+            role='admin',
+            first_name='Admin',
+            last_name='Test'
+        )
+
+        self.user_resident = User.objects.create_user(
+            username='resident_test',
+            email='resident@test.com',
+            password='password123',
+            role='resident',
+            first_name='Resident',
+            last_name='Test'
+        )
+
+        self.concepto = ConceptoFinanciero.objects.create(
+            nombre='Cuota de Mantenimiento',
+            tipo=TipoConcepto.CUOTA_MENSUAL,
+            monto=Decimal('100.00'),
+            creado_por=self.user_admin
+        )
+
+    def authenticate_as_admin(self):
+        """Authenticate as admin user"""
+        self.client.force_authenticate(user=self.user_admin)
+
+    def authenticate_as_resident(self):
+        """Authenticate as resident user"""
+        self.client.force_authenticate(user=self.user_resident)
+
+    def create_test_cargo(self, **kwargs):
+        """Helper to create a test charge for the resident"""
+        defaults = {
+            'concepto': self.concepto,
+            'residente': self.user_resident,
+            'monto': Decimal('100.00'),
+            'fecha_vencimiento': date.today() + timedelta(days=10),
+            'aplicado_por': self.user_admin
+        }
+        defaults.update(kwargs)
+        return CargoFinanciero.objects.create(**defaults)
@@ -0,0 +1,218 @@
+"""
+Tests for the cached PDF receipts (comprobante endpoint)
+"""
+import re
+import shutil
+import tempfile
+import zipfile
+from io import BytesIO
+from unittest import mock
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from backend.apps.finances.services import ComprobanteService, comprobante_service
+from backend.settings_test import CACHE_LOCAL
+from .test_base import FinancesTestBase
+
+
+class ComprobanteCacheTest(FinancesTestBase):
+    """Test that receipts are rendered once and revalidated with ETag"""
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.media_root)
+        self.override.enable()
+        self.cargo = self.create_test_cargo()
+        self.cargo.marcar_como_pagado(referencia_pago='REF-001')
+        self.url = reverse('finances:cargo-financiero-comprobante', kwargs={'pk': self.cargo.pk})
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+        super().tearDown()
+
+    def test_receipt_rendered_once(self):
+        """Repeat downloads read the stored file instead of rendering again"""
+        self.authenticate_as_resident()
+        with mock.patch.object(
+            ComprobanteService, 'generar_comprobante', wraps=comprobante_service.generar_comprobante
+        ) as generar:
+            primera = self.client.get(self.url)
+            segunda = self.client.get(self.url)
+
+        self.assertEqual(primera.status_code, status.HTTP_200_OK)
+        self.assertEqual(segunda.status_code, status.HTTP_200_OK)
+        self.assertEqual(generar.call_count, 1)
+        contenido = b''.join(primera.streaming_content)
+        self.assertTrue(contenido.startswith(b'%PDF'))
+        self.assertEqual(contenido, b''.join(segunda.streaming_content))
+        self.assertEqual(primera['ETag'], segunda['ETag'])
+
+    def test_simultaneous_first_requests_keep_one_file(self):
+        """When another request stored the receipt first, the suffixed duplicate is removed"""
+        with mock.patch('backend.apps.finances.services.default_storage') as storage:
+            storage.exists.return_value = False
+            storage.save.side_effect = lambda nombre, contenido: nombre.replace('.pdf', '_a1b2c3.pdf')
+            ruta, _ = comprobante_service.obtener_comprobante(self.cargo)
+
+        self.assertTrue(ruta.endswith('.pdf'))
+        storage.delete.assert_called_once_with(ruta.replace('.pdf', '_a1b2c3.pdf'))
+
+    def test_if_none_match_returns_304(self):
+        """A matching If-None-Match skips the body"""
+        self.authenticate_as_resident()
+        etag = self.client.get(self.url)['ETag']
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=f'"otro", W/{etag}')
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_etag_changes_with_receipt_data(self):
+        """Editing data shown on the receipt produces a new ETag"""
+        self.authenticate_as_resident()
+        etag = self.client.get(self.url)['ETag']
+
+        self.cargo.referencia_pago = 'REF-002'
+        self.cargo.save()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_other_resident_cannot_download(self):
+        """Permissions are checked before anything is rendered"""
+        from django.contrib.auth import get_user_model
+        otro = get_user_model().objects.create_user(
+            username='otro_residente', email='otro@test.com', password='testpass123', role='resident'
+        )
+        self.client.force_authenticate(user=otro)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ExportarComprobantesTest(FinancesTestBase):
+    """Test bulk receipt export as ZIP or merged PDF"""
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.media_root)
+        self.override.enable()
+        self.cargos = []
+        for i in range(5):
+            cargo = self.create_test_cargo()
+            cargo.marcar_como_pagado(referencia_pago=f'REF-{i}')
+            self.cargos.append(cargo)
+        self.create_test_cargo()  # pendiente, no debe exportarse
+        self.url = reverse('finances:cargo-financiero-exportar-comprobantes')
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+        super().tearDown()
+
+    def test_zip_contains_one_pdf_per_payment(self):
+        """The streamed ZIP has a valid PDF for every paid charge"""
+        self.authenticate_as_resident()
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        self.assertTrue(response.streaming)
+        archivo = zipfile.ZipFile(BytesIO(b''.join(response.streaming_content)))
+        nombres = archivo.namelist()
+        self.assertEqual(len(nombres), 5)
+        self.assertEqual(
+            set(nombres), {comprobante_service.nombre_archivo(cargo) for cargo in self.cargos}
+        )
+        for nombre in nombres:
+            self.assertTrue(archivo.read(nombre).startswith(b'%PDF'))
+
+    def test_zip_reuses_stored_receipts(self):
+        """Receipts already rendered are not rendered again for the ZIP"""
+        self.authenticate_as_resident()
+        b''.join(self.client.get(self.url).streaming_content)
+        with mock.patch.object(ComprobanteService, 'generar_comprobante') as generar:
+            b''.join(self.client.get(self.url).streaming_content)
+        generar.assert_not_called()
+
+    def test_merged_pdf(self):
+        """formato=pdf returns a single PDF"""
+        self.authenticate_as_resident()
+        response = self.client.get(self.url, {'formato': 'pdf'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        contenido = b''.join(response.streaming_content)
+        self.assertTrue(contenido.startswith(b'%PDF'))
+        paginas = int(re.search(rb'/Count (\d+)', contenido).group(1))
+        individual = comprobante_service.generar_comprobante(self.cargos[0]).getvalue()
+        paginas_individual = int(re.search(rb'/Count (\d+)', individual).group(1))
+        self.assertEqual(paginas, 5 * paginas_individual)
+
+    def test_filters_and_errors(self):
+        """Filters are validated and an empty selection returns 404"""
+        self.authenticate_as_resident()
+        response = self.client.get(self.url, {'formato': 'docx'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(self.url, {'fecha_desde': 'ayer'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(self.url, {'concepto': self.concepto.id + 1})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class ComprobantesListadoTest(FinancesTestBase):
+    """Test the comprobantes listing query count and cached totals"""
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('finances:cargo-financiero-comprobantes')
+
+    def pagar(self, cantidad):
+        # La versión del libro se invalida en on_commit
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(cantidad):
+                self.create_test_cargo(monto='25.00').marcar_como_pagado(referencia_pago='REF')
+
+    def listar(self):
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, len(consultas)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        """Listing 2 or 20 payments costs the same number of queries"""
+        self.authenticate_as_resident()
+        self.pagar(2)
+        _, pocas = self.listar()
+        self.pagar(18)
+        response, muchas = self.listar()
+
+        self.assertEqual(pocas, muchas)
+        self.assertEqual(len(response.data['comprobantes']), 20)
+        fila = response.data['comprobantes'][0]
+        self.assertTrue(fila['numero_comprobante'].startswith('COMP-'))
+        self.assertTrue(fila['puede_generar_comprobante'])
+        self.assertEqual(fila['url_comprobante'], f"/api/finances/cargos/{fila['id']}/comprobante/")
+
+    def test_totals_cached_until_ledger_changes(self):
+        """Totals come from cache on repeat and are refreshed after a payment"""
+        self.authenticate_as_resident()
+        self.pagar(3)
+        response, primera = self.listar()
+        self.assertEqual(response.data['estadisticas']['total_comprobantes_disponibles'], 3)
+        self.assertEqual(response.data['estadisticas']['monto_total_comprobantes'], 75.0)
+
+        _, segunda = self.listar()
+        self.assertEqual(segunda, primera - 1)
+
+        self.pagar(1)
+        response, _ = self.listar()
+        self.assertEqual(response.data['estadisticas']['total_comprobantes_disponibles'], 4)
+        self.assertEqual(response.data['estadisticas']['monto_total_comprobantes'], 100.0)
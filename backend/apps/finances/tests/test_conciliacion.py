@@ -0,0 +1,121 @@
+"""
+Tests for batch payment reconciliation (conciliar_pagos)
+"""
+from decimal import Decimal
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+from rest_framework import status
+
+from backend.apps.audit.models import RegistroAuditoria, TipoActividad
+from backend.apps.finances.models import CargoFinanciero, SaldoResidente, EstadoCargo
+from .test_base import FinancesTestBase
+
+
+class ConciliacionPagosTest(FinancesTestBase):
+    """Test matching a bank statement against owed charges"""
+
+    def setUp(self):
+        super().setUp()
+        self.cargo_a = self.create_test_cargo(monto=Decimal('100.00'))
+        self.cargo_b = self.create_test_cargo(monto=Decimal('50.00'))
+        self.url = reverse('finances:cargo-financiero-conciliar-pagos')
+
+    def resultados(self, response):
+        return [linea['resultado'] for linea in response.data['lineas']]
+
+    def test_json_statement_per_line_report(self):
+        """Each line gets its own result and matched charges are paid in bulk"""
+        self.authenticate_as_admin()
+        response = self.client.post(self.url, {'pagos': [
+            {'referencia': 'BNK-1', 'monto': '100.00', 'cargo_id': self.cargo_a.id},
+            {'referencia': 'BNK-2', 'monto': '50', 'residente': self.user_resident.username},
+            {'referencia': 'BNK-3', 'monto': '10.00', 'cargo_id': 99999},
+            {'referencia': 'BNK-1', 'monto': '100.00', 'cargo_id': self.cargo_a.id},
+            {'monto': '10.00', 'cargo_id': self.cargo_a.id},
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            self.resultados(response),
+            ['pagado', 'pagado', 'no_encontrado', 'referencia_duplicada', 'invalido']
+        )
+        self.assertEqual(response.data['pagos_aplicados'], 2)
+        self.assertEqual(response.data['monto_total'], '150.00')
+
+        self.cargo_b.refresh_from_db()
+        self.assertEqual(self.cargo_b.estado, EstadoCargo.PAGADO)
+        self.assertEqual(self.cargo_b.referencia_pago, 'BNK-2')
+        self.assertEqual(
+            SaldoResidente.objects.get(residente=self.user_resident).total_pendiente,
+            Decimal('0.00')
+        )
+        self.assertEqual(RegistroAuditoria.objects.filter(tipo_actividad=TipoActividad.PAGO).count(), 2)
+
+    def test_non_finite_amounts_are_invalid_lines(self):
+        """NaN and Infinity amounts are reported per line instead of failing the request"""
+        self.authenticate_as_admin()
+        response = self.client.post(self.url, {'pagos': [
+            {'referencia': 'NAN-1', 'monto': 'NaN', 'cargo_id': self.cargo_a.id},
+            {'referencia': 'INF-1', 'monto': 'Infinity', 'cargo_id': self.cargo_a.id},
+            {'referencia': 'SNAN-1', 'monto': 'sNaN', 'cargo_id': self.cargo_a.id},
+            {'referencia': 'BNK-1', 'monto': '50.00', 'cargo_id': self.cargo_b.id},
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.resultados(response), ['invalido', 'invalido', 'invalido', 'pagado'])
+
+    def test_impossible_dates_are_invalid_lines(self):
+        """Well-formed but impossible dates are reported per line instead of failing the request"""
+        self.authenticate_as_admin()
+        response = self.client.post(self.url, {'pagos': [
+            {'referencia': 'BNK-1', 'monto': '100.00', 'cargo_id': self.cargo_a.id, 'fecha': '2024-02-28'},
+            {'referencia': 'BNK-2', 'monto': '50.00', 'cargo_id': self.cargo_b.id, 'fecha': '2024-02-30'},
+            {'referencia': 'BNK-3', 'monto': '50.00', 'cargo_id': self.cargo_b.id, 'fecha': '2024-13-01T10:00:00'},
+            {'referencia': 'BNK-4', 'monto': '50.00', 'cargo_id': self.cargo_b.id},
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.resultados(response), ['pagado', 'invalido', 'invalido', 'pagado'])
+        self.assertEqual(response.data['lineas'][1]['mensaje'], 'Fecha inválida (use YYYY-MM-DD)')
+
+    def test_csv_statement_and_amount_mismatch(self):
+        """CSV uploads are accepted and amount mismatches are reported"""
+        self.authenticate_as_admin()
+        contenido = (
+            'referencia,monto,cargo_id,fecha\n'
+            f'CSV-1,100.00,{self.cargo_a.id},2025-10-05\n'
+            f'CSV-2,49.00,{self.cargo_b.id},\n'
+        ).encode('utf-8')
+        archivo = SimpleUploadedFile('extracto.csv', contenido, content_type='text/csv')
+
+        response = self.client.post(self.url, {'archivo': archivo}, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.resultados(response), ['pagado', 'monto_no_coincide'])
+        self.cargo_a.refresh_from_db()
+        self.assertEqual(self.cargo_a.fecha_pago.date().isoformat(), '2025-10-05')
+
+    def test_simulation_does_not_write(self):
+        """?simular=true reports without changing any charge"""
+        self.authenticate_as_admin()
+        response = self.client.post(f'{self.url}?simular=true', {'pagos': [
+            {'referencia': 'SIM-1', 'monto': '100.00', 'cargo_id': self.cargo_a.id},
+        ]}, format='json')
+
+        self.assertEqual(self.resultados(response), ['pagado'])
+        self.assertEqual(response.data['pagos_aplicados'], 0)
+        self.assertFalse(CargoFinanciero.objects.filter(estado=EstadoCargo.PAGADO).exists())
+
+    def test_already_paid_and_permissions(self):
+        """Paid charges are not paid twice and residents cannot reconcile"""
+        self.cargo_a.marcar_como_pagado(referencia_pago='PREVIA')
+        self.authenticate_as_admin()
+        response = self.client.post(self.url, {'pagos': [
+            {'referencia': 'NUEVA', 'monto': '100.00', 'cargo_id': self.cargo_a.id},
+        ]}, format='json')
+        self.assertEqual(self.resultados(response), ['ya_pagado'])
+
+        self.authenticate_as_resident()
+        response = self.client.post(self.url, {'pagos': []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,105 @@
+"""
+Tests for bulk charge issuance (emitir_masivo)
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+
+from backend.apps.audit.models import RegistroAuditoria
+from backend.apps.finances.models import CargoFinanciero, SaldoResidente
+from .test_base import FinancesTestBase
+
+
+class EmisionMasivaTest(FinancesTestBase):
+    """Test bulk issuance of a concept for a period"""
+
+    def setUp(self):
+        super().setUp()
+        User = get_user_model()
+        self.otros_residentes = [
+            User.objects.create_user(username=f'resident_{i}', password='password123', role='resident')
+            for i in range(3)
+        ]
+        User.objects.create_user(username='inactivo', password='password123', role='resident', is_active=False)
+        self.url = reverse('finances:cargo-financiero-emitir-masivo')
+
+    def test_issue_to_all_active_residents(self):
+        """Charges are created once per active resident with balances and audit in bulk"""
+        self.authenticate_as_admin()
+        auditoria_antes = RegistroAuditoria.objects.count()
+
+        response = self.client.post(self.url, {'concepto': self.concepto.id, 'periodo': '2025-10'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['cargos_creados'], 4)
+        self.assertEqual(response.data['monto_total'], '400.00')
+        self.assertEqual(CargoFinanciero.objects.filter(periodo='2025-10').count(), 4)
+        self.assertEqual(RegistroAuditoria.objects.count(), auditoria_antes + 4)
+        self.assertEqual(
+            SaldoResidente.objects.get(residente=self.user_resident).total_pendiente,
+            Decimal('100.00')
+        )
+
+    def test_issue_is_idempotent(self):
+        """Repeating the same period only creates missing charges"""
+        self.authenticate_as_admin()
+        self.client.post(self.url, {
+            'concepto': self.concepto.id, 'periodo': '2025-10',
+            'residentes': [self.user_resident.id]
+        }, format='json')
+
+        response = self.client.post(self.url, {'concepto': self.concepto.id, 'periodo': '2025-10'}, format='json')
+
+        self.assertEqual(response.data['cargos_creados'], 3)
+        self.assertEqual(response.data['cargos_omitidos'], 1)
+
+        response = self.client.post(self.url, {'concepto': self.concepto.id, 'periodo': '2025-10'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['cargos_creados'], 0)
+        self.assertEqual(CargoFinanciero.objects.filter(periodo='2025-10').count(), 4)
+
+    def test_validation(self):
+        """Invalid period, dates or residents are rejected before inserting"""
+        self.authenticate_as_admin()
+
+        response = self.client.post(self.url, {'concepto': self.concepto.id, 'periodo': '2025-13'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.post(self.url, {
+            'concepto': self.concepto.id, 'periodo': '2025-10',
+            'fecha_aplicacion': '2025-10-10', 'fecha_vencimiento': '2025-10-01'
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.post(self.url, {
+            'concepto': self.concepto.id, 'periodo': '2025-10',
+            'fecha_vencimiento': (date.today() - timedelta(days=1)).isoformat()
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('fecha_vencimiento', response.data)
+
+        response = self.client.post(self.url, {
+            'concepto': self.concepto.id, 'periodo': '2025-10', 'residentes': [99999]
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(CargoFinanciero.objects.exists())
+
+    def test_resident_cannot_issue(self):
+        """Only admins can issue charges in bulk"""
+        self.authenticate_as_resident()
+        response = self.client.post(self.url, {'concepto': self.concepto.id, 'periodo': '2025-10'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_management_command(self):
+        """The command issues the same charges as the endpoint"""
+        salida = StringIO()
+        call_command(
+            'emitir_cargos', '--concepto', str(self.concepto.id), '--periodo', '2025-11',
+            '--usuario', self.user_admin.username, stdout=salida
+        )
+        self.assertIn('4 cargo(s) creado(s)', salida.getvalue())
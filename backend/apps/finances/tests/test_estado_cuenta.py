@@ -0,0 +1,91 @@
+"""
+Tests for the single-pass, cached account statement (estado_cuenta)
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from backend.apps.finances.services import vencimiento_service
+from .test_base import FinancesTestBase
+
+
+class EstadoCuentaTest(FinancesTestBase):
+    """Test the statement contents, query count and cache invalidation"""
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('finances:cargo-financiero-estado-cuenta')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pendiente = self.create_test_cargo(
+                monto=Decimal('40.00'), fecha_vencimiento=date.today() + timedelta(days=5)
+            )
+            self.create_test_cargo(monto=Decimal('60.00'), fecha_vencimiento=date.today() - timedelta(days=3))
+            self.create_test_cargo(monto=Decimal('25.00')).marcar_como_pagado(referencia_pago='REF-1')
+            vencimiento_service.marcar_cargos_vencidos()
+
+    def consultar(self):
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        cargos = [q for q in consultas.captured_queries if 'finances_cargofinanciero' in q['sql']]
+        return response.data, len(cargos)
+
+    def test_statement_contents(self):
+        """Totals, lists, breakdown and alerts come from the same pass"""
+        self.authenticate_as_resident()
+        datos, _ = self.consultar()
+
+        resumen = datos['resumen_general']
+        self.assertEqual(resumen['total_pendiente'], Decimal('100.00'))
+        self.assertEqual(resumen['total_vencido'], Decimal('60.00'))
+        self.assertEqual(resumen['total_al_dia'], Decimal('40.00'))
+        self.assertEqual(resumen['cantidad_cargos_pendientes'], 2)
+        self.assertEqual(resumen['cantidad_cargos_vencidos'], 1)
+        self.assertEqual(resumen['total_pagado_mes_actual'], Decimal('25.00'))
+        self.assertEqual(resumen['total_pagado_6_meses'], Decimal('25.00'))
+        self.assertEqual(len(datos['cargos_pendientes']), 2)
+        self.assertEqual(len(datos['cargos_vencidos']), 1)
+        self.assertEqual(len(datos['historial_pagos']), 1)
+        self.assertEqual(datos['desglose_por_tipo'][0]['cantidad'], 2)
+        self.assertEqual(datos['desglose_por_tipo'][0]['total'], Decimal('100.00'))
+        self.assertEqual(datos['proximo_vencimiento']['cargo']['id'], self.pendiente.id)
+        self.assertEqual(datos['proximo_vencimiento']['dias_restantes'], 5)
+        self.assertEqual(datos['ultimo_pago']['hace_dias'], 0)
+        self.assertEqual(
+            [alerta['tipo'] for alerta in datos['alertas']], ['vencido', 'vencimiento_proximo']
+        )
+
+    def test_single_fetch_then_cached(self):
+        """The ledger is read once, and not at all while the cache is valid"""
+        self.authenticate_as_resident()
+        _, primera = self.consultar()
+        _, segunda = self.consultar()
+        self.assertEqual(primera, 1)
+        self.assertEqual(segunda, 0)
+
+    def test_cache_invalidated_on_payment(self):
+        """Paying a charge refreshes the cached statement"""
+        self.authenticate_as_resident()
+        self.consultar()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pendiente.marcar_como_pagado(referencia_pago='REF-2')
+
+        datos, _ = self.consultar()
+        self.assertEqual(datos['resumen_general']['total_pendiente'], Decimal('60.00'))
+        self.assertEqual(datos['resumen_general']['total_pagado_mes_actual'], Decimal('65.00'))
+
+    def test_security_can_query_resident(self):
+        """estado_cuenta_usuario returns the same statement for staff"""
+        self.authenticate_as_resident()
+        propio, _ = self.consultar()
+
+        self.authenticate_as_admin()
+        response = self.client.get(
+            reverse('finances:cargo-financiero-estado-cuenta-usuario', kwargs={'user_id': self.user_resident.id})
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['resumen_general'], propio['resumen_general'])
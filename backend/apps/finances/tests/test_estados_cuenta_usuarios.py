@@ -0,0 +1,102 @@
+"""
+Tests for the grouped account-status listing (estados_cuenta_usuarios)
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from backend.apps.finances.services import vencimiento_service
+from .test_base import FinancesTestBase
+
+
+class EstadosCuentaUsuariosTest(FinancesTestBase):
+    """Test totals, filtering, ordering and query count of the admin listing"""
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('finances:cargo-financiero-estados-cuenta-usuarios')
+        User = get_user_model()
+        self.residente_pendiente = User.objects.create_user(
+            username='pendiente_test', email='pendiente@test.com', password='password123', role='resident'
+        )
+        self.residente_al_dia = User.objects.create_user(
+            username='al_dia_test', email='al_dia@test.com', password='password123', role='resident'
+        )
+
+        # resident_test: 60 vencido + 40 pendiente; pendiente_test: 30 pendiente; al_dia_test: sin cargos
+        self.create_test_cargo(monto=Decimal('60.00'), fecha_vencimiento=date.today() - timedelta(days=3))
+        self.create_test_cargo(monto=Decimal('40.00'))
+        self.create_test_cargo(residente=self.residente_pendiente, monto=Decimal('30.00'))
+        vencimiento_service.marcar_cargos_vencidos()
+        self.authenticate_as_admin()
+
+    def consultar(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_totals_per_state(self):
+        """General statistics count residents and amounts per state"""
+        estadisticas = self.consultar()['estadisticas_generales']
+
+        self.assertEqual(estadisticas['total_residentes'], 3)
+        self.assertEqual(estadisticas['residentes_vencidos'], 1)
+        self.assertEqual(estadisticas['residentes_pendientes'], 1)
+        self.assertEqual(estadisticas['residentes_al_dia'], 1)
+        self.assertEqual(estadisticas['total_monto_pendiente'], 130.0)
+        self.assertEqual(estadisticas['total_monto_vencido'], 60.0)
+
+    def test_filter_by_estado_general(self):
+        """The estado filter restricts both the rows and the statistics"""
+        datos = self.consultar(estado='pendiente')
+
+        self.assertEqual(
+            [fila['residente_info']['username'] for fila in datos['estados_cuenta']], ['pendiente_test']
+        )
+        self.assertEqual(datos['estadisticas_generales']['total_residentes'], 1)
+        self.assertEqual(datos['estadisticas_generales']['total_monto_pendiente'], 30.0)
+        self.assertEqual(datos['filtros_aplicados']['estado'], 'pendiente')
+
+    def test_ordered_by_urgency(self):
+        """Overdue residents come first, then pending, then up to date"""
+        datos = self.consultar()
+
+        self.assertEqual(
+            [fila['estado_financiero']['estado_general'] for fila in datos['estados_cuenta']],
+            ['vencido', 'pendiente', 'al_dia']
+        )
+        vencido = datos['estados_cuenta'][0]['estado_financiero']
+        self.assertEqual(vencido['total_vencido'], Decimal('60.00'))
+        self.assertEqual(vencido['proximo_vencimiento']['dias_restantes'], 10)
+
+    def test_pagination_keeps_order_and_totals(self):
+        """A page slices the ordered rows without changing the statistics"""
+        datos = self.consultar(page_size=2, page=2)
+
+        self.assertEqual(len(datos['estados_cuenta']), 1)
+        self.assertEqual(datos['estados_cuenta'][0]['estado_financiero']['estado_general'], 'al_dia')
+        self.assertEqual(datos['estadisticas_generales']['total_residentes'], 3)
+        self.assertEqual(datos['paginacion']['total_paginas'], 2)
+
+    def test_query_count_constant(self):
+        """The listing costs the same queries with more residents"""
+        with CaptureQueriesContext(connection) as antes:
+            self.consultar()
+
+        User = get_user_model()
+        for i in range(5):
+            residente = User.objects.create_user(
+                username=f'extra_{i}', email=f'extra_{i}@test.com', password='password123', role='resident'
+            )
+            self.create_test_cargo(residente=residente)
+            self.create_test_cargo(residente=residente).marcar_como_pagado(referencia_pago=f'REF-{i}')
+
+        with CaptureQueriesContext(connection) as despues:
+            datos = self.consultar()
+        self.assertEqual(datos['estadisticas_generales']['total_residentes'], 8)
+        self.assertEqual(len(despues.captured_queries), len(antes.captured_queries))
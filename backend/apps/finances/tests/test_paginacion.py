@@ -0,0 +1,60 @@
+"""
+Tests for cursor pagination on the payment and charge listings
+"""
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from .test_base import FinancesTestBase
+
+
+class CursorPaginationTest(FinancesTestBase):
+    """Test that listings page through the ledger with opaque cursors"""
+
+    def setUp(self):
+        super().setUp()
+        for i in range(7):
+            self.create_test_cargo().marcar_como_pagado(referencia_pago=f'REF-{i}')
+        self.create_test_cargo()
+
+    def recorrer(self, url, clave, page_size=3):
+        """Follow next links and return the ids of every page"""
+        paginas = []
+        response = self.client.get(url, {'page_size': page_size})
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            paginas.append([fila['id'] for fila in response.data[clave]])
+            if not response.data['next']:
+                return paginas
+            response = self.client.get(response.data['next'])
+
+    def test_pagos_pages_cover_every_payment_once(self):
+        """Pages have stable sizes and no row is repeated or skipped"""
+        self.authenticate_as_resident()
+        paginas = self.recorrer(reverse('finances:cargo-financiero-pagos'), 'pagos')
+
+        self.assertEqual([len(pagina) for pagina in paginas], [3, 3, 1])
+        ids = [cargo_id for pagina in paginas for cargo_id in pagina]
+        self.assertEqual(len(set(ids)), 7)
+
+    def test_statistics_cover_all_pages(self):
+        """Totals describe the whole filtered history, not just the page"""
+        self.authenticate_as_resident()
+        response = self.client.get(reverse('finances:cargo-financiero-comprobantes'), {'page_size': 2})
+        self.assertEqual(len(response.data['comprobantes']), 2)
+        self.assertEqual(response.data['estadisticas']['total_comprobantes_disponibles'], 7)
+        self.assertIsNotNone(response.data['next'])
+
+    def test_deep_page_same_query_count(self):
+        """Following a cursor costs the same queries as the first page"""
+        self.authenticate_as_resident()
+        url = reverse('finances:cargo-financiero-mis-cargos')
+        with CaptureQueriesContext(connection) as primera:
+            response = self.client.get(url, {'page_size': 2})
+        with CaptureQueriesContext(connection) as siguiente:
+            self.client.get(response.data['next'])
+
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertEqual(len(primera), len(siguiente))
+        self.assertFalse(any('COUNT(' in q['sql'].upper() for q in siguiente.captured_queries))
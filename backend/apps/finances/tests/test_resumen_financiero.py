@@ -0,0 +1,132 @@
+"""
+Tests for the daily financial rollup (ResumenFinancieroDiario) and its monthly totals
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from backend.apps.finances.models import ResumenFinancieroDiario, TipoConcepto
+from backend.apps.finances.services import resumen_financiero_service
+from .test_base import FinancesTestBase
+
+
+class ResumenFinancieroTest(FinancesTestBase):
+    """Test the full build, commit-time and incremental updates, delete corrections and monthly totals"""
+
+    def setUp(self):
+        super().setUp()
+        self.hoy = date.today()
+        self.cargo = self.create_test_cargo(monto=Decimal('100.00'), fecha_vencimiento=self.hoy)
+        self.create_test_cargo(monto=Decimal('50.00'), fecha_vencimiento=self.hoy)
+
+    def fila(self, fecha):
+        return ResumenFinancieroDiario.objects.get(fecha=fecha, tipo_concepto=TipoConcepto.CUOTA_MENSUAL)
+
+    def test_full_build(self):
+        """The first update builds the rollup from the whole ledger"""
+        resumen_financiero_service.actualizar()
+        fila = self.fila(self.hoy)
+        self.assertEqual(fila.emitido_monto, Decimal('150.00'))
+        self.assertEqual(fila.emitido_cantidad, 2)
+        self.assertEqual(fila.adeudado_monto, Decimal('150.00'))
+        self.assertEqual(fila.pagos_cantidad, 0)
+
+    def test_incremental_update_after_payment(self):
+        """A payment after the last cut is picked up by the next incremental update"""
+        resumen_financiero_service.actualizar()
+        self.cargo.marcar_como_pagado(referencia_pago='REF-1')
+
+        resumen_financiero_service.actualizar()
+        fila = self.fila(self.hoy)
+        self.assertEqual(fila.pagos_monto, Decimal('100.00'))
+        self.assertEqual(fila.pagos_cantidad, 1)
+        self.assertEqual(fila.adeudado_monto, Decimal('50.00'))
+
+    def test_committed_change_updates_rollup(self):
+        """A committed ledger change recalculates its days without waiting for actualizar()"""
+        resumen_financiero_service.actualizar()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cargo.marcar_como_pagado(referencia_pago='REF-1')
+
+        fila = self.fila(self.hoy)
+        self.assertEqual(fila.pagos_monto, Decimal('100.00'))
+        self.assertEqual(fila.adeudado_monto, Decimal('50.00'))
+
+    def test_first_committed_change_builds_rollup(self):
+        """With an empty rollup the first committed change builds it from the whole ledger"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_test_cargo(monto=Decimal('25.00'), fecha_vencimiento=self.hoy)
+
+        self.assertEqual(self.fila(self.hoy).emitido_monto, Decimal('175.00'))
+
+    def test_late_commit_before_cut_is_included(self):
+        """A row stamped before the last cut but committed after it enters the next update"""
+        resumen_financiero_service.actualizar()
+        tardio = self.create_test_cargo(monto=Decimal('25.00'), fecha_vencimiento=self.hoy)
+        corte = resumen_financiero_service.ultimo_corte()
+        type(tardio).objects.filter(pk=tardio.pk).update(fecha_modificacion=corte - timedelta(minutes=5))
+
+        resumen_financiero_service.actualizar()
+        self.assertEqual(self.fila(self.hoy).emitido_monto, Decimal('175.00'))
+
+    def test_delete_corrects_rollup(self):
+        """Deleting a charge recalculates the days it counted in"""
+        resumen_financiero_service.actualizar()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cargo.delete()
+
+        fila = self.fila(self.hoy)
+        self.assertEqual(fila.emitido_monto, Decimal('50.00'))
+        self.assertEqual(fila.emitido_cantidad, 1)
+
+    def test_moved_due_date_corrects_old_day(self):
+        """Moving a due date removes the charge from the old day"""
+        resumen_financiero_service.actualizar()
+        self.cargo.fecha_vencimiento = self.hoy + timedelta(days=40)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cargo.save()
+
+        self.assertEqual(self.fila(self.hoy).adeudado_monto, Decimal('50.00'))
+        self.assertEqual(self.fila(self.hoy + timedelta(days=40)).adeudado_monto, Decimal('100.00'))
+
+    def test_concurrent_rebuild_upserts_existing_day(self):
+        """A row inserted by a concurrent update after our delete is updated, not a unique violation"""
+        resumen_financiero_service.actualizar()
+        # La fila ya confirmada por el otro proceso no la ve el delete de este
+        with patch.object(QuerySet, 'delete', return_value=(0, {})):
+            resumen_financiero_service.recalcular_dias({self.hoy}, timezone.now())
+
+        self.assertEqual(ResumenFinancieroDiario.objects.filter(fecha=self.hoy).count(), 1)
+        self.assertEqual(self.fila(self.hoy).emitido_monto, Decimal('150.00'))
+
+    def test_monthly_totals_across_year_boundary(self):
+        """Monthly totals group by month even when the range crosses a year"""
+        self.create_test_cargo(
+            monto=Decimal('30.00'), fecha_aplicacion=date(2024, 12, 15), fecha_vencimiento=date(2025, 1, 10)
+        )
+        self.create_test_cargo(
+            monto=Decimal('20.00'), fecha_aplicacion=date(2025, 1, 20), fecha_vencimiento=date(2025, 1, 31)
+        )
+
+        resumen_financiero_service.actualizar()
+
+        with patch.object(resumen_financiero_service, 'actualizar') as actualizar:
+            totales = resumen_financiero_service.totales_por_mes(date(2024, 12, 1), date(2025, 1, 31))
+        # Leer los totales no mantiene el resumen
+        actualizar.assert_not_called()
+        por_mes = {f"{fila['mes']:%Y-%m}": fila for fila in totales}
+        self.assertEqual(set(por_mes), {'2024-12', '2025-01'})
+        self.assertEqual(por_mes['2024-12']['total_emitido'], Decimal('30.00'))
+        self.assertEqual(por_mes['2025-01']['total_emitido'], Decimal('20.00'))
+        self.assertEqual(por_mes['2025-01']['total_adeudado'], Decimal('50.00'))
+        self.assertEqual(por_mes['2025-01']['cantidad_adeudado'], 2)
+
+    def test_months_between(self):
+        """Month keys cover every month of the range, crossing years"""
+        self.assertEqual(
+            resumen_financiero_service.meses_entre(date(2024, 11, 20), date(2025, 2, 1)),
+            ['2024-11', '2024-12', '2025-01', '2025-02']
+        )
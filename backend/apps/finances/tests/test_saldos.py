@@ -0,0 +1,167 @@
+"""
+Tests for the materialized resident balances (SaldoResidente)
+"""
+import threading
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TransactionTestCase
+from django.urls import reverse
+from rest_framework import status
+
+from backend.apps.finances.models import (
+    CargoFinanciero, ConceptoFinanciero, SaldoResidente, EstadoCargo, TipoConcepto
+)
+from backend.apps.finances.services import estado_cuenta_service, vencimiento_service
+from .test_base import FinancesTestBase
+
+
+class SaldoResidenteTest(FinancesTestBase):
+    """Test that balances follow every change to the ledger"""
+
+    def get_saldo(self):
+        return SaldoResidente.objects.get(residente=self.user_resident)
+
+    def test_saldo_created_with_cargo(self):
+        """Creating a charge creates the resident balance row"""
+        self.create_test_cargo(monto=Decimal('40.00'))
+        self.create_test_cargo(monto=Decimal('60.00'), fecha_vencimiento=date.today() - timedelta(days=1))
+        vencimiento_service.marcar_cargos_vencidos()
+
+        saldo = self.get_saldo()
+        self.assertEqual(saldo.total_pendiente, Decimal('100.00'))
+        self.assertEqual(saldo.total_vencido, Decimal('60.00'))
+        self.assertEqual(saldo.cantidad_cargos_pendientes, 2)
+        self.assertEqual(saldo.cantidad_cargos_vencidos, 1)
+        self.assertEqual(saldo.estado_general, 'vencido')
+        self.assertEqual(saldo.proximo_vencimiento_fecha, date.today() + timedelta(days=10))
+
+    def test_saldo_updated_on_payment_and_cancel(self):
+        """Paying or cancelling a charge updates the balance"""
+        pagado = self.create_test_cargo(monto=Decimal('30.00'))
+        cancelado = self.create_test_cargo(monto=Decimal('20.00'))
+
+        pagado.marcar_como_pagado(referencia_pago='REF-1')
+        cancelado.estado = EstadoCargo.CANCELADO
+        cancelado.save()
+
+        saldo = self.get_saldo()
+        self.assertEqual(saldo.total_pendiente, Decimal('0.00'))
+        self.assertEqual(saldo.total_pagado_mes, Decimal('30.00'))
+        self.assertEqual(saldo.ultimo_pago_monto, Decimal('30.00'))
+        self.assertEqual(saldo.estado_general, 'al_dia')
+
+    def test_saldo_updated_on_reassign_and_delete(self):
+        """Moving a charge to another resident updates both balances"""
+        otro = self.user_admin
+        cargo = self.create_test_cargo(monto=Decimal('50.00'))
+
+        cargo = CargoFinanciero.objects.get(pk=cargo.pk)
+        cargo.residente = otro
+        cargo.save()
+        self.assertEqual(self.get_saldo().total_pendiente, Decimal('0.00'))
+        self.assertEqual(SaldoResidente.objects.get(residente=otro).total_pendiente, Decimal('50.00'))
+
+        cargo.delete()
+        self.assertEqual(SaldoResidente.objects.get(residente=otro).total_pendiente, Decimal('0.00'))
+
+    def test_stale_saldo_refreshed(self):
+        """A single resident's balance from a previous day is recomputed, without the overdue sweep"""
+        vencido = self.create_test_cargo(fecha_vencimiento=date.today() - timedelta(days=1))
+        self.create_test_cargo(monto=Decimal('40.00'))
+        SaldoResidente.objects.update(total_pendiente=Decimal('0.00'), fecha_calculo=date.today() - timedelta(days=1))
+
+        saldo = estado_cuenta_service.obtener_saldo(self.user_resident)
+        self.assertEqual(saldo.total_pendiente, Decimal('140.00'))
+        self.assertEqual(saldo.fecha_calculo, date.today())
+        # Marcar vencidos le corresponde al barrido programado
+        vencido.refresh_from_db()
+        self.assertEqual(vencido.estado, EstadoCargo.PENDIENTE)
+
+    def test_bulk_reads_do_not_write(self):
+        """Listing and condominium totals serve stored rows; the daily sweep refreshes stale ones"""
+        self.create_test_cargo(fecha_vencimiento=date.today() - timedelta(days=1))
+        ayer = date.today() - timedelta(days=1)
+        SaldoResidente.objects.update(total_vencido=Decimal('0.00'), fecha_calculo=ayer)
+
+        totales = estado_cuenta_service.totales_condominio()
+        self.assertEqual(totales['monto_total_vencido'], Decimal('0.00'))
+        self.assertEqual(self.get_saldo().fecha_calculo, ayer)
+
+        vencimiento_service.marcar_cargos_vencidos()
+        saldo = self.get_saldo()
+        self.assertEqual(saldo.total_vencido, Decimal('100.00'))
+        self.assertEqual(saldo.fecha_calculo, date.today())
+
+    def test_recalcular_saldos_command(self):
+        """The management command detects and repairs drift"""
+        self.create_test_cargo()
+        SaldoResidente.objects.update(total_pendiente=Decimal('1.00'))
+
+        salida = StringIO()
+        call_command('recalcular_saldos', '--verificar', stdout=salida)
+        self.assertIn('total_pendiente', salida.getvalue())
+
+        call_command('recalcular_saldos', stdout=StringIO())
+        self.assertEqual(self.get_saldo().total_pendiente, Decimal('100.00'))
+        self.assertEqual(estado_cuenta_service.verificar_saldos(), [])
+
+    def test_resumen_residente_reads_saldo(self):
+        """The summary endpoint returns the materialized totals"""
+        self.create_test_cargo(monto=Decimal('75.00'))
+        self.authenticate_as_resident()
+
+        url = reverse('finances:cargo-financiero-resumen-residente', kwargs={'user_id': self.user_resident.id})
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Decimal(str(response.data['total_pendiente'])), Decimal('75.00'))
+        self.assertEqual(response.data['cantidad_cargos_pendientes'], 1)
+
+
+class SaldoResidenteConcurrenteTest(TransactionTestCase):
+    """Two transactions changing different charges of the same resident"""
+
+    def test_concurrent_changes_are_both_counted(self):
+        """The second recompute waits for the first commit and includes its charge"""
+        User = get_user_model()
+        admin = User.objects.create_user(username='admin_test', password='x', role='admin')
+        residente = User.objects.create_user(username='resident_test', password='x', role='resident')
+        concepto = ConceptoFinanciero.objects.create(
+            nombre='Cuota', tipo=TipoConcepto.CUOTA_MENSUAL, monto=Decimal('10.00'), creado_por=admin
+        )
+
+        def crear_cargo(monto):
+            return CargoFinanciero.objects.create(
+                concepto=concepto, residente=residente, monto=monto,
+                fecha_vencimiento=date.today() + timedelta(days=10), aplicado_por=admin
+            )
+
+        crear_cargo(Decimal('10.00'))
+        primero_guardado = threading.Event()
+
+        def segundo():
+            try:
+                primero_guardado.wait(5)
+                with transaction.atomic():
+                    crear_cargo(Decimal('30.00'))
+            finally:
+                connection.close()
+
+        hilo = threading.Thread(target=segundo)
+        with transaction.atomic():
+            crear_cargo(Decimal('20.00'))
+            hilo.start()
+            primero_guardado.set()
+            # El segundo queda esperando el bloqueo de la fila de saldo
+            hilo.join(0.5)
+            self.assertTrue(hilo.is_alive())
+        hilo.join(10)
+
+        saldo = SaldoResidente.objects.get(residente=residente)
+        self.assertEqual(saldo.total_pendiente, Decimal('60.00'))
+        self.assertEqual(saldo.cantidad_cargos_pendientes, 3)
@@ -0,0 +1,110 @@
+"""
+Tests for the daily overdue sweep (EstadoCargo.VENCIDO)
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import CommandError, call_command
+from django.urls import reverse
+from rest_framework import status
+
+from backend.apps.audit.models import RegistroAuditoria
+from backend.apps.finances.models import CargoFinanciero, SaldoResidente, EstadoCargo
+from backend.apps.finances.services import vencimiento_service
+from backend.apps.finances.signals import cargos_vencidos
+from .test_base import FinancesTestBase
+
+
+class MarcarCargosVencidosTest(FinancesTestBase):
+    """Test the set-based PENDIENTE -> VENCIDO transition"""
+
+    def setUp(self):
+        super().setUp()
+        self.vencido = self.create_test_cargo(
+            monto=Decimal('80.00'),
+            fecha_vencimiento=date.today() - timedelta(days=3)
+        )
+        self.al_dia = self.create_test_cargo(monto=Decimal('20.00'))
+
+    def test_marks_only_overdue_pending(self):
+        """Only pending charges past their due date change state"""
+        resultado = vencimiento_service.marcar_cargos_vencidos()
+
+        self.assertEqual(resultado['cantidad_cargos'], 1)
+        self.assertEqual(resultado['residentes_afectados'], 1)
+        self.assertEqual(resultado['monto_total'], '80.00')
+        self.vencido.refresh_from_db()
+        self.al_dia.refresh_from_db()
+        self.assertEqual(self.vencido.estado, EstadoCargo.VENCIDO)
+        self.assertEqual(self.al_dia.estado, EstadoCargo.PENDIENTE)
+
+    def test_sweep_is_idempotent(self):
+        """A second run finds nothing to change"""
+        vencimiento_service.marcar_cargos_vencidos()
+        resultado = vencimiento_service.marcar_cargos_vencidos()
+        self.assertEqual(resultado['cantidad_cargos'], 0)
+
+    def test_sweep_updates_saldo_audit_and_signal(self):
+        """The sweep refreshes balances, writes one audit entry and emits cargos_vencidos"""
+        recibidos = []
+
+        def receptor(sender, **kwargs):
+            recibidos.append(kwargs)
+
+        cargos_vencidos.connect(receptor)
+        self.addCleanup(cargos_vencidos.disconnect, receptor)
+        auditoria_antes = RegistroAuditoria.objects.count()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            vencimiento_service.marcar_cargos_vencidos()
+
+        saldo = SaldoResidente.objects.get(residente=self.user_resident)
+        self.assertEqual(saldo.total_vencido, Decimal('80.00'))
+        self.assertEqual(saldo.total_pendiente, Decimal('100.00'))
+        self.assertEqual(RegistroAuditoria.objects.count(), auditoria_antes + 1)
+        self.assertEqual(len(recibidos), 1)
+        self.assertEqual(recibidos[0]['cargo_ids'], [self.vencido.id])
+        self.assertEqual(recibidos[0]['residente_ids'], [self.user_resident.id])
+
+    def test_extending_due_date_returns_to_pending(self):
+        """Moving the due date forward puts a VENCIDO charge back to PENDIENTE"""
+        vencimiento_service.marcar_cargos_vencidos()
+        cargo = CargoFinanciero.objects.get(pk=self.vencido.pk)
+        cargo.fecha_vencimiento = date.today() + timedelta(days=5)
+        cargo.save()
+
+        cargo.refresh_from_db()
+        self.assertEqual(cargo.estado, EstadoCargo.PENDIENTE)
+
+    def test_vencidos_endpoint_and_payment(self):
+        """Overdue charges are listed by state and can still be paid"""
+        vencimiento_service.marcar_cargos_vencidos()
+
+        self.authenticate_as_admin()
+        response = self.client.get(reverse('finances:cargo-financiero-vencidos'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([c['id'] for c in response.data], [self.vencido.id])
+
+        self.authenticate_as_resident()
+        url = reverse('finances:cargo-financiero-pagar', kwargs={'pk': self.vencido.pk})
+        response = self.client.post(url, {'referencia_pago': 'REF-V'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['pago_info']['estado_anterior'], EstadoCargo.VENCIDO)
+
+    def test_management_command(self):
+        """The command reports how many charges were marked"""
+        salida = StringIO()
+        call_command('marcar_cargos_vencidos', stdout=salida)
+        self.assertIn('1 cargo(s) vencido(s)', salida.getvalue())
+
+    def test_continuous_mode_runs_scheduler_in_foreground(self):
+        """--continuo runs the daily scheduler in this process; an invalid hour is rejected"""
+        comando = 'backend.apps.finances.management.commands.marcar_cargos_vencidos'
+        with patch(f'{comando}.ProgramadorVencimientos.run') as run:
+            call_command('marcar_cargos_vencidos', '--continuo', '--hora', '03:30', stdout=StringIO())
+        run.assert_called_once_with()
+
+        with self.assertRaises(CommandError):
+            call_command('marcar_cargos_vencidos', '--continuo', '--hora', '25:00', stdout=StringIO())
@@ -39,8 +39,11 @@ CARGOS FINANCIEROS:
 - PUT    /api/finances/cargos/{id}/                   - Actualizar cargo (admin)
 - PATCH  /api/finances/cargos/{id}/                   - Actualizar cargo parcial (admin)
 - DELETE /api/finances/cargos/{id}/                   - Eliminar cargo (admin)
+- POST   /api/finances/cargos/emitir_masivo/          - Emitir concepto a residentes por periodo (admin)
 - GET    /api/finances/cargos/mis_cargos/             - Cargos del usuario actual
 - POST   /api/finances/cargos/{id}/pagar/             - Marcar cargo como pagado
+- POST   /api/finances/cargos/conciliar_pagos/        - Conciliación masiva desde extracto CSV/JSON (admin)
+- GET    /api/finances/cargos/exportar_comprobantes/  - ZIP (o PDF unido con ?formato=pdf) de comprobantes
 - GET    /api/finances/cargos/vencidos/               - Cargos vencidos (admin)
 - GET    /api/finances/cargos/resumen/{user_id}/      - Resumen financiero residente
 - GET    /api/finances/cargos/estado_cuenta/          - Estado de cuenta completo (T2)
@@ -57,9 +60,21 @@ Conceptos:
 Cargos:
   ?estado=pendiente&residente=1&concepto=1&vencidos=true
 
+Emisión masiva (body JSON):
+  {"concepto": 1, "periodo": "2025-10", "residentes": [..], "fecha_vencimiento": "2025-10-10"}
+
+Conciliación de pagos:
+  archivo CSV (referencia,monto,cargo_id|residente,fecha) o {"pagos": [...]}
+  ?simular=true                  (solo reporte, no aplica pagos)
+
+Pagos, comprobantes y mis_cargos (paginación por cursor):
+  ?page_size=50                  (máximo 200)
+  ?cursor=...                    (usar los enlaces next/previous de la respuesta)
+
 Estado de Cuenta:
   ?residente=user_id  (solo para administradores)
 
 Estados de Cuenta Usuarios (seguridad):
   ?search=nombre&estado=vencido  (filtros de búsqueda)
+  ?page=1&page_size=50           (paginación opcional)
 """
\ No newline at end of file
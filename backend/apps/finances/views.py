@@ -13,22 +13,26 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import get_user_model
-from django.db.models import Q, Sum, Count
+from django.db.models import Q, Count
 from django.utils import timezone
-from datetime import date, timedelta
-from decimal import Decimal
+from datetime import date
+import csv
 
-from .models import ConceptoFinanciero, CargoFinanciero, EstadoCargo, EstadoConcepto
+from .models import ConceptoFinanciero, CargoFinanciero, EstadoCargo, EstadoConcepto, ESTADOS_POR_COBRAR
 from .serializers import (
     ConceptoFinancieroSerializer,
     ConceptoFinancieroListSerializer,
     CargoFinancieroSerializer,
     CargoFinancieroListSerializer,
+    ComprobanteListSerializer,
     PagarCargoSerializer,
+    EmitirCargosSerializer,
     ResumenFinancieroSerializer,
     EstadisticasFinancierasSerializer,
     ResidenteBasicoSerializer
 )
+from .services import estado_cuenta_service, emision_cargos_service, conciliacion_pagos_service
+from backend.pagination import CursorPaginacion, PagosCursorPagination
 
 User = get_user_model()
 
@@ -152,6 +156,7 @@ class CargoFinancieroViewSet(viewsets.ModelViewSet):
     - DELETE /api/finances/cargos/{id}/ - Eliminar cargo (solo admins)
     - GET /api/finances/cargos/mis_cargos/ - Cargos del usuario actual
     - POST /api/finances/cargos/{id}/pagar/ - Marcar cargo como pagado
+    - GET /api/finances/cargos/exportar_comprobantes/ - ZIP o PDF con varios comprobantes
     - GET /api/finances/cargos/vencidos/ - Cargos vencidos (solo admins)
     - GET /api/finances/cargos/resumen/{user_id}/ - Resumen financiero de un residente
     """
@@ -159,6 +164,9 @@ class CargoFinancieroViewSet(viewsets.ModelViewSet):
     queryset = CargoFinanciero.objects.all()
     permission_classes = [permissions.IsAuthenticated]
     
+    # El PDF unido se arma en memoria; para más comprobantes usar el ZIP
+    MAX_COMPROBANTES_PDF_UNIDO = 200
+    
     def get_serializer_class(self):
         if self.action == 'list' or self.action == 'mis_cargos' or self.action == 'vencidos':
             return CargoFinancieroListSerializer
@@ -194,10 +202,7 @@ class CargoFinancieroViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(concepto_id=concepto_id)
         
         if vencidos == 'true':
-            queryset = queryset.filter(
-                estado=EstadoCargo.PENDIENTE,
-                fecha_vencimiento__lt=date.today()
-            )
+            queryset = queryset.filter(estado=EstadoCargo.VENCIDO)
         
         return queryset.order_by('-fecha_aplicacion')
 
@@ -222,15 +227,64 @@ class CargoFinancieroViewSet(viewsets.ModelViewSet):
             raise permissions.PermissionDenied("No tiene permisos para eliminar cargos")
         super().perform_destroy(instance)
 
+    @action(detail=False, methods=['post'])
+    def emitir_masivo(self, request):
+        """
+        Emitir un concepto a todos los residentes activos (o a una lista) para un periodo
+        
+        Idempotente por (concepto, residente, periodo): repetir la emisión solo
+        crea los cargos que falten.
+        """
+        user = request.user
+        if not (hasattr(user, 'role') and user.role == 'admin') and not user.is_superuser:
+            return Response(
+                {'error': 'No tiene permisos para emitir cargos'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        serializer = EmitirCargosSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        datos = serializer.validated_data
+        
+        residentes = None
+        if datos.get('residentes'):
+            ids_solicitados = set(datos['residentes'])
+            residentes = User.objects.filter(id__in=ids_solicitados, is_active=True)
+            no_encontrados = ids_solicitados - set(residentes.values_list('id', flat=True))
+            if no_encontrados:
+                return Response(
+                    {'error': 'Residentes inexistentes o inactivos', 'residentes': sorted(no_encontrados)},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        
+        resumen = emision_cargos_service.emitir_cargos(
+            concepto=datos['concepto'],
+            periodo=datos['periodo'],
+            usuario=user,
+            residentes=residentes,
+            monto=datos.get('monto'),
+            fecha_aplicacion=datos.get('fecha_aplicacion'),
+            fecha_vencimiento=datos.get('fecha_vencimiento'),
+            observaciones=datos.get('observaciones', '')
+        )
+        
+        return Response(
+            resumen,
+            status=status.HTTP_201_CREATED if resumen['cargos_creados'] else status.HTTP_200_OK
+        )
+
     @action(detail=False, methods=['get'])
     def mis_cargos(self, request):
-        """Obtener cargos del usuario actual"""
+        """Obtener cargos del usuario actual (paginado por cursor, más recientes primero)"""
         cargos = CargoFinanciero.objects.filter(
             residente=request.user
-        ).select_related('concepto').order_by('-fecha_aplicacion')
+        ).select_related('concepto', 'residente')
         
-        serializer = CargoFinancieroListSerializer(cargos, many=True)
-        return Response(serializer.data)
+        paginator = CursorPaginacion()
+        page = paginator.paginate_queryset(cargos, request, view=self)
+        serializer = CargoFinancieroListSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
     @action(detail=True, methods=['post'])
     def pagar(self, request, pk=None):
@@ -253,7 +307,7 @@ class CargoFinancieroViewSet(viewsets.ModelViewSet):
             )
         
         # Validar estado del cargo
-        if cargo.estado != EstadoCargo.PENDIENTE:
+        if cargo.estado not in ESTADOS_POR_COBRAR:
             return Response({
                 'error': f'No se puede pagar un cargo en estado "{cargo.get_estado_display()}"',
                 'estado_actual': cargo.estado,
@@ -282,13 +336,7 @@ class CargoFinancieroViewSet(viewsets.ModelViewSet):
             monto_original = cargo.monto
             monto_final = cargo.calcular_monto_con_recargo() if hasattr(cargo, 'calcular_monto_con_recargo') else monto_original
             
-            # Procesar pago
-            cargo.marcar_como_pagado(
-                referencia_pago=referencia,
-                usuario_proceso=request.user
-            )
-            
-            # Añadir observaciones
+            # Observaciones del pago
             observaciones_completas = []
             if es_pago_admin:
                 observaciones_completas.append(f"Pago procesado por admin: {request.user.username}")
@@ -299,10 +347,13 @@ class CargoFinancieroViewSet(viewsets.ModelViewSet):
             if observaciones:
                 observaciones_completas.append(f"Nota: {observaciones}")
             
-            if observaciones_completas:
-                nueva_observacion = "\n".join(observaciones_completas)
-                cargo.observaciones = f"{cargo.observaciones}\n{nueva_observacion}".strip()
-                cargo.save()
+            # Procesar pago (una sola escritura)
+            estado_anterior = cargo.estado
+            cargo.marcar_como_pagado(
+                referencia_pago=referencia,
+                usuario_proceso=request.user,
+                observaciones="\n".join(observaciones_completas)
+            )
             
             # Preparar respuesta
             response_data = {
@@ -318,7 +369,7 @@ class CargoFinancieroViewSet(viewsets.ModelViewSet):
                     'referencia_pago': cargo.referencia_pago,
                     'procesado_por': request.user.username,
                     'es_pago_admin': es_pago_admin,
-                    'estado_anterior': 'pendiente',
+                    'estado_anterior': estado_anterior,
                     'estado_actual': cargo.get_estado_display()
                 },
                 'cargo': CargoFinancieroSerializer(cargo).data
@@ -328,15 +379,57 @@ class CargoFinancieroViewSet(viewsets.ModelViewSet):
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-    @action(detail=False, methods=['get'])
-    def pagos(self, request):
+    @action(detail=False, methods=['post'])
+    def conciliar_pagos(self, request):
         """
-        Historial de pagos
-        T3: Pagar cuota en línea - Módulo 2 Gestión Financiera Básica
+        Conciliación masiva de pagos desde un extracto bancario (solo admins)
         
-        Proporciona el historial completo de pagos realizados.
-        Para residentes: Solo sus propios pagos
-        Para admins: Todos los pagos o filtrado por residente
+        Acepta un archivo CSV (campo 'archivo') o JSON {"pagos": [...]}.
+        Columnas: referencia, monto, cargo_id o residente (username), fecha opcional.
+        Con ?simular=true devuelve el reporte sin aplicar los pagos.
+        """
+        user = request.user
+        if not (hasattr(user, 'role') and user.role == 'admin') and not user.is_superuser:
+            return Response(
+                {'error': 'No tiene permisos para conciliar pagos'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        archivo = request.FILES.get('archivo')
+        if archivo:
+            try:
+                lineas = conciliacion_pagos_service.leer_csv(archivo.read().decode('utf-8-sig'))
+            except (UnicodeDecodeError, csv.Error):
+                return Response(
+                    {'error': 'No se pudo leer el archivo CSV (use UTF-8)'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        elif isinstance(request.data, list):
+            lineas = request.data
+        else:
+            lineas = request.data.get('pagos')
+        
+        if not isinstance(lineas, list) or not lineas:
+            return Response(
+                {'error': 'Envíe un archivo CSV en "archivo" o una lista de pagos en "pagos"'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        simular = str(request.query_params.get('simular', '')).lower() == 'true'
+        try:
+            reporte = conciliacion_pagos_service.conciliar(lineas, user, simular=simular)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(reporte)
+
+    def _filtrar_pagos(self, request):
+        """
+        Cargos pagados visibles para el usuario según los filtros de la query
+        (residente, fecha_desde, fecha_hasta, concepto)
+        
+        Returns:
+            tuple: (queryset, None) o (None, Response de error)
         """
         user = request.user
         queryset = CargoFinanciero.objects.filter(estado=EstadoCargo.PAGADO).select_related('concepto', 'residente')
@@ -349,7 +442,7 @@ class CargoFinancieroViewSet(viewsets.ModelViewSet):
                 try:
                     queryset = queryset.filter(residente_id=int(residente_id))
                 except (ValueError, TypeError):
-                    return Response(
+                    return None, Response(
                         {'error': 'ID de residente inválido'},
                         status=status.HTTP_400_BAD_REQUEST
                     )
@@ -368,7 +461,7 @@ class CargoFinancieroViewSet(viewsets.ModelViewSet):
                 fecha_desde_obj = datetime.strptime(fecha_desde, '%Y-%m-%d').date()
                 queryset = queryset.filter(fecha_pago__date__gte=fecha_desde_obj)
             except ValueError:
-                return Response(
+                return None, Response(
                     {'error': 'Formato de fecha_desde inválido. Use YYYY-MM-DD'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
@@ -379,7 +472,7 @@ class CargoFinancieroViewSet(viewsets.ModelViewSet):
                 fecha_hasta_obj = datetime.strptime(fecha_hasta, '%Y-%m-%d').date()
                 queryset = queryset.filter(fecha_pago__date__lte=fecha_hasta_obj)
             except ValueError:
-                return Response(
+                return None, Response(
                     {'error': 'Formato de fecha_hasta inválido. Use YYYY-MM-DD'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
@@ -388,48 +481,49 @@ class CargoFinancieroViewSet(viewsets.ModelViewSet):
             try:
                 queryset = queryset.filter(concepto_id=int(concepto_id))
             except (ValueError, TypeError):
-                return Response(
+                return None, Response(
                     {'error': 'ID de concepto inválido'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
         
         # Ordenar por fecha de pago más reciente
-        queryset = queryset.order_by('-fecha_pago')
-        
-        # Estadísticas del período consultado
-        total_pagos = queryset.count()
-        from django.db import models
-        monto_total = queryset.aggregate(
-            total=models.Sum('monto')
-        )['total'] or 0
-        
-        # Paginar resultados
-        page = self.paginate_queryset(queryset)
-        if page is not None:
-            serializer = CargoFinancieroListSerializer(page, many=True)
-            response = self.get_paginated_response(serializer.data)
-            response.data['estadisticas'] = {
-                'total_pagos': total_pagos,
-                'monto_total': float(monto_total),
-                'periodo_consultado': {
-                    'fecha_desde': fecha_desde,
-                    'fecha_hasta': fecha_hasta
-                }
-            }
-            return response
+        return queryset.order_by('-fecha_pago'), None
+
+    @action(detail=False, methods=['get'])
+    def pagos(self, request):
+        """
+        Historial de pagos
+        T3: Pagar cuota en línea - Módulo 2 Gestión Financiera Básica
         
-        serializer = CargoFinancieroListSerializer(queryset, many=True)
-        return Response({
-            'pagos': serializer.data,
-            'estadisticas': {
-                'total_pagos': total_pagos,
-                'monto_total': float(monto_total),
+        Proporciona el historial completo de pagos realizados.
+        Para residentes: Solo sus propios pagos
+        Para admins: Todos los pagos o filtrado por residente
+        """
+        queryset, error = self._filtrar_pagos(request)
+        if error:
+            return error
+        fecha_desde = request.query_params.get('fecha_desde')
+        fecha_hasta = request.query_params.get('fecha_hasta')
+        
+        # Estadísticas del período consultado (una consulta, en caché por filtros)
+        totales = estado_cuenta_service.totales_cargos(queryset)
+        
+        # Paginar resultados por cursor (?cursor=, ?page_size=)
+        paginator = PagosCursorPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = CargoFinancieroListSerializer(page, many=True)
+        return paginator.get_paginated_response(
+            serializer.data,
+            clave='pagos',
+            estadisticas={
+                'total_pagos': totales['cantidad'],
+                'monto_total': float(totales['monto_total']),
                 'periodo_consultado': {
                     'fecha_desde': fecha_desde,
                     'fecha_hasta': fecha_hasta
                 }
             }
-        })
+        )
 
     @action(detail=True, methods=['get'])
     def comprobante(self, request, pk=None):
@@ -441,18 +535,13 @@ class CargoFinancieroViewSet(viewsets.ModelViewSet):
         Para residentes: Solo pueden generar comprobantes de sus propios pagos
         Para admins: Pueden generar comprobantes de cualquier pago
         """
-        from django.http import HttpResponse
+        from django.core.files.storage import default_storage
+        from django.http import FileResponse, HttpResponseNotModified
         from .services import comprobante_service
         
-        cargo = get_object_or_404(CargoFinanciero, pk=pk)
-        
-        # Verificar que el cargo está pagado
-        if cargo.estado != EstadoCargo.PAGADO:
-            return Response({
-                'error': 'Solo se pueden generar comprobantes de cargos pagados',
-                'estado_actual': cargo.estado,
-                'cargo_id': cargo.id
-            }, status=status.HTTP_400_BAD_REQUEST)
+        cargo = get_object_or_404(
+            CargoFinanciero.objects.select_related('concepto', 'residente'), pk=pk
+        )
         
         # Verificar permisos: admin o el propio residente
         if not ((hasattr(request.user, 'role') and request.user.role == 'admin') or 
@@ -463,23 +552,41 @@ class CargoFinancieroViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
+        # Verificar que el cargo está pagado
+        if cargo.estado != EstadoCargo.PAGADO:
+            return Response({
+                'error': 'Solo se pueden generar comprobantes de cargos pagados',
+                'estado_actual': cargo.estado,
+                'cargo_id': cargo.id
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        # El ETag es el hash de los datos del comprobante: si el cliente ya lo tiene, no se lee nada
+        etag = f'"{comprobante_service.clave_comprobante(cargo)}"'
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH', '')
+        etags_cliente = {valor.strip().removeprefix('W/') for valor in if_none_match.split(',')}
+        if etag in etags_cliente or '*' in etags_cliente:
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            response['Cache-Control'] = 'private, no-cache'
+            return response
+        
         try:
-            # Generar PDF del comprobante
-            pdf_buffer = comprobante_service.generar_comprobante(cargo)
-            
-            # Crear respuesta HTTP con el PDF
-            response = HttpResponse(
-                pdf_buffer.getvalue(),
-                content_type='application/pdf'
-            )
+            # Renderiza solo la primera vez; luego es una lectura del archivo guardado
+            ruta, _ = comprobante_service.obtener_comprobante(cargo)
             
             # Nombre del archivo
             numero_comprobante = comprobante_service._generar_numero_comprobante(cargo)
             filename = f"Comprobante_{numero_comprobante}_{cargo.residente.username}.pdf"
             
-            # Headers para descarga
-            response['Content-Disposition'] = f'attachment; filename="{filename}"'
-            response['Content-Length'] = len(pdf_buffer.getvalue())
+            # FileResponse envía el archivo por bloques y calcula Content-Length
+            response = FileResponse(
+                default_storage.open(ruta, 'rb'),
+                as_attachment=True,
+                filename=filename,
+                content_type='application/pdf'
+            )
+            response['ETag'] = etag
+            response['Cache-Control'] = 'private, no-cache'
             
             # Metadata adicional en headers personalizados
             response['X-Cargo-ID'] = str(cargo.id)
@@ -506,107 +613,85 @@ class CargoFinancieroViewSet(viewsets.ModelViewSet):
         Para residentes: Solo sus propios pagos
         Para admins: Todos los pagos o filtrado por residente
         """
-        user = request.user
-        queryset = CargoFinanciero.objects.filter(estado=EstadoCargo.PAGADO).select_related('concepto', 'residente')
-        
-        # Aplicar filtros según permisos
-        if hasattr(user, 'role') and user.role == 'admin' or user.is_superuser:
-            # Admin puede ver todos los pagos
-            residente_id = request.query_params.get('residente')
-            if residente_id:
-                try:
-                    queryset = queryset.filter(residente_id=int(residente_id))
-                except (ValueError, TypeError):
-                    return Response(
-                        {'error': 'ID de residente inválido'},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-        else:
-            # Residentes solo ven sus propios pagos
-            queryset = queryset.filter(residente=user)
-        
-        # Filtros adicionales
+        queryset, error = self._filtrar_pagos(request)
+        if error:
+            return error
         fecha_desde = request.query_params.get('fecha_desde')
         fecha_hasta = request.query_params.get('fecha_hasta')
-        concepto_id = request.query_params.get('concepto')
         
-        if fecha_desde:
-            try:
-                from datetime import datetime
-                fecha_desde_obj = datetime.strptime(fecha_desde, '%Y-%m-%d').date()
-                queryset = queryset.filter(fecha_pago__date__gte=fecha_desde_obj)
-            except ValueError:
-                return Response(
-                    {'error': 'Formato de fecha_desde inválido. Use YYYY-MM-DD'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
+        # Estadísticas (una consulta, en caché por filtros)
+        totales = estado_cuenta_service.totales_cargos(queryset)
+        estadisticas = {
+            'total_comprobantes_disponibles': totales['cantidad'],
+            'monto_total_comprobantes': float(totales['monto_total']),
+            'periodo_consultado': {
+                'fecha_desde': fecha_desde,
+                'fecha_hasta': fecha_hasta
+            }
+        }
         
-        if fecha_hasta:
-            try:
-                from datetime import datetime
-                fecha_hasta_obj = datetime.strptime(fecha_hasta, '%Y-%m-%d').date()
-                queryset = queryset.filter(fecha_pago__date__lte=fecha_hasta_obj)
-            except ValueError:
-                return Response(
-                    {'error': 'Formato de fecha_hasta inválido. Use YYYY-MM-DD'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
+        # Paginar resultados por cursor (?cursor=, ?page_size=)
+        paginator = PagosCursorPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = ComprobanteListSerializer(page, many=True)
+        return paginator.get_paginated_response(
+            serializer.data, clave='comprobantes', estadisticas=estadisticas
+        )
+
+    @action(detail=False, methods=['get'])
+    def exportar_comprobantes(self, request):
+        """
+        Descargar varios comprobantes de pago de una vez
+        T4: Generar comprobante de pago - Módulo 2 Gestión Financiera Básica
         
-        if concepto_id:
-            try:
-                queryset = queryset.filter(concepto_id=int(concepto_id))
-            except (ValueError, TypeError):
-                return Response(
-                    {'error': 'ID de concepto inválido'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
+        Acepta los mismos filtros que `comprobantes`.
+        ?formato=zip (por defecto): ZIP con un PDF por pago, enviado por bloques
+        ?formato=pdf: un solo PDF con un comprobante por página (hasta MAX_COMPROBANTES_PDF_UNIDO)
+        """
+        from django.http import FileResponse, StreamingHttpResponse
+        from .services import comprobante_service
         
-        # Ordenar por fecha de pago más reciente
-        queryset = queryset.order_by('-fecha_pago')
-        
-        # Estadísticas
-        total_comprobantes = queryset.count()
-        from django.db import models
-        monto_total = queryset.aggregate(
-            total=models.Sum('monto')
-        )['total'] or 0
-        
-        # Agregar información adicional para comprobantes
-        def enriquecer_cargo(cargo):
-            from .services import comprobante_service
-            data = CargoFinancieroListSerializer(cargo).data
-            data['numero_comprobante'] = comprobante_service._generar_numero_comprobante(cargo)
-            data['puede_generar_comprobante'] = True
-            data['url_comprobante'] = f'/api/finances/cargos/{cargo.id}/comprobante/'
-            return data
-        
-        # Paginar resultados
-        page = self.paginate_queryset(queryset)
-        if page is not None:
-            comprobantes_data = [enriquecer_cargo(cargo) for cargo in page]
-            response = self.get_paginated_response(comprobantes_data)
-            response.data['estadisticas'] = {
-                'total_comprobantes_disponibles': total_comprobantes,
-                'monto_total_comprobantes': float(monto_total),
-                'periodo_consultado': {
-                    'fecha_desde': fecha_desde,
-                    'fecha_hasta': fecha_hasta
-                }
-            }
-            return response
+        formato = request.query_params.get('formato', 'zip')
+        if formato not in ('zip', 'pdf'):
+            return Response(
+                {'error': 'Formato inválido. Use zip o pdf'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        comprobantes_data = [enriquecer_cargo(cargo) for cargo in queryset]
-        return Response({
-            'comprobantes': comprobantes_data,
-            'estadisticas': {
-                'total_comprobantes_disponibles': total_comprobantes,
-                'monto_total_comprobantes': float(monto_total),
-                'periodo_consultado': {
-                    'fecha_desde': fecha_desde,
-                    'fecha_hasta': fecha_hasta
-                }
-            }
-        })
+        queryset, error = self._filtrar_pagos(request)
+        if error:
+            return error
+        
+        if not queryset.exists():
+            return Response(
+                {'error': 'No hay comprobantes para los filtros indicados'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        fecha = timezone.localdate().strftime('%Y%m%d')
+        
+        if formato == 'pdf':
+            cantidad = queryset.count()
+            if cantidad > self.MAX_COMPROBANTES_PDF_UNIDO:
+                return Response({
+                    'error': f'Demasiados comprobantes para un solo PDF ({cantidad}). Use formato=zip o acote los filtros',
+                    'maximo': self.MAX_COMPROBANTES_PDF_UNIDO
+                }, status=status.HTTP_400_BAD_REQUEST)
+            pdf_buffer = comprobante_service.generar_comprobantes_unidos(queryset)
+            return FileResponse(
+                pdf_buffer,
+                as_attachment=True,
+                filename=f'Comprobantes_{fecha}.pdf',
+                content_type='application/pdf'
+            )
+        
+        # iterator(): los cargos se leen por bloques mientras se envía el ZIP
+        response = StreamingHttpResponse(
+            comprobante_service.exportar_zip(queryset.iterator(chunk_size=200)),
+            content_type='application/zip'
+        )
+        response['Content-Disposition'] = f'attachment; filename="Comprobantes_{fecha}.zip"'
+        return response
 
     @action(detail=False, methods=['get'])
     def vencidos(self, request):
@@ -618,8 +703,7 @@ class CargoFinancieroViewSet(viewsets.ModelViewSet):
             )
         
         cargos_vencidos = CargoFinanciero.objects.filter(
-            estado=EstadoCargo.PENDIENTE,
-            fecha_vencimiento__lt=date.today()
+            estado=EstadoCargo.VENCIDO
         ).select_related('concepto', 'residente').order_by('fecha_vencimiento')
         
         serializer = CargoFinancieroListSerializer(cargos_vencidos, many=True)
@@ -641,34 +725,17 @@ class CargoFinancieroViewSet(viewsets.ModelViewSet):
         
         residente = get_object_or_404(User, id=user_id)
         
-        # Calcular resumen
-        cargos_pendientes = CargoFinanciero.objects.filter(
-            residente=residente,
-            estado=EstadoCargo.PENDIENTE
-        )
-        
-        cargos_vencidos = cargos_pendientes.filter(fecha_vencimiento__lt=date.today())
-        
-        mes_actual = date.today().replace(day=1)
-        cargos_pagados_mes = CargoFinanciero.objects.filter(
-            residente=residente,
-            estado=EstadoCargo.PAGADO,
-            fecha_pago__gte=mes_actual
-        )
-        
-        ultimo_pago = CargoFinanciero.objects.filter(
-            residente=residente,
-            estado=EstadoCargo.PAGADO
-        ).order_by('-fecha_pago').first()
+        # Leer el saldo materializado (una fila) en lugar de agregar el libro de cargos
+        saldo = estado_cuenta_service.obtener_saldo(residente)
         
         resumen = {
             'residente_info': ResidenteBasicoSerializer(residente).data,
-            'total_pendiente': cargos_pendientes.aggregate(Sum('monto'))['monto__sum'] or Decimal('0.00'),
-            'total_vencido': cargos_vencidos.aggregate(Sum('monto'))['monto__sum'] or Decimal('0.00'),
-            'total_pagado_mes': cargos_pagados_mes.aggregate(Sum('monto'))['monto__sum'] or Decimal('0.00'),
-            'cantidad_cargos_pendientes': cargos_pendientes.count(),
-            'cantidad_cargos_vencidos': cargos_vencidos.count(),
-            'ultimo_pago': ultimo_pago.fecha_pago if ultimo_pago else None
+            'total_pendiente': saldo.total_pendiente,
+            'total_vencido': saldo.total_vencido,
+            'total_pagado_mes': saldo.total_pagado_mes,
+            'cantidad_cargos_pendientes': saldo.cantidad_cargos_pendientes,
+            'cantidad_cargos_vencidos': saldo.cantidad_cargos_vencidos,
+            'ultimo_pago': saldo.ultimo_pago_fecha
         }
         
         return Response(resumen)
@@ -705,96 +772,8 @@ class CargoFinancieroViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_403_FORBIDDEN
                 )
         
-        # Obtener fechas para filtros
-        hoy = date.today()
-        mes_actual = hoy.replace(day=1)
-        hace_6_meses = hoy - timedelta(days=180)
-        
-        # CARGOS PENDIENTES
-        cargos_pendientes = CargoFinanciero.objects.filter(
-            residente=residente,
-            estado=EstadoCargo.PENDIENTE
-        ).select_related('concepto').order_by('fecha_vencimiento')
-        
-        # CARGOS VENCIDOS
-        cargos_vencidos = cargos_pendientes.filter(fecha_vencimiento__lt=hoy)
-        
-        # HISTORIAL DE PAGOS (últimos 6 meses)
-        historial_pagos = CargoFinanciero.objects.filter(
-            residente=residente,
-            estado=EstadoCargo.PAGADO,
-            fecha_pago__gte=hace_6_meses
-        ).select_related('concepto').order_by('-fecha_pago')
-        
-        # CARGOS PAGADOS ESTE MES
-        pagos_mes_actual = CargoFinanciero.objects.filter(
-            residente=residente,
-            estado=EstadoCargo.PAGADO,
-            fecha_pago__gte=mes_actual
-        ).select_related('concepto')
-        
-        # TOTALES Y ESTADÍSTICAS
-        total_pendiente = cargos_pendientes.aggregate(Sum('monto'))['monto__sum'] or Decimal('0.00')
-        total_vencido = cargos_vencidos.aggregate(Sum('monto'))['monto__sum'] or Decimal('0.00')
-        total_pagado_mes = pagos_mes_actual.aggregate(Sum('monto'))['monto__sum'] or Decimal('0.00')
-        total_pagado_6_meses = historial_pagos.aggregate(Sum('monto'))['monto__sum'] or Decimal('0.00')
-        
-        # PRÓXIMO VENCIMIENTO
-        proximo_vencimiento = cargos_pendientes.filter(fecha_vencimiento__gte=hoy).first()
-        
-        # ÚLTIMO PAGO
-        ultimo_pago = CargoFinanciero.objects.filter(
-            residente=residente,
-            estado=EstadoCargo.PAGADO
-        ).select_related('concepto').order_by('-fecha_pago').first()
-        
-        # DESGLOSE POR TIPO DE CONCEPTO
-        desglose_pendiente = cargos_pendientes.values(
-            'concepto__tipo',
-            'concepto__nombre'
-        ).annotate(
-            cantidad=Count('id'),
-            total=Sum('monto')
-        ).order_by('concepto__tipo')
-        
-        # ESTRUCTURA DEL ESTADO DE CUENTA
-        estado_cuenta = {
-            'residente_info': {
-                'id': residente.id,
-                'username': residente.username,
-                'email': residente.email,
-                'nombre_completo': f"{residente.first_name} {residente.last_name}".strip() or residente.username,
-                'first_name': residente.first_name,
-                'last_name': residente.last_name
-            },
-            'fecha_consulta': hoy,
-            'resumen_general': {
-                'total_pendiente': total_pendiente,
-                'total_vencido': total_vencido,
-                'total_al_dia': total_pendiente - total_vencido,
-                'cantidad_cargos_pendientes': cargos_pendientes.count(),
-                'cantidad_cargos_vencidos': cargos_vencidos.count(),
-                'total_pagado_mes_actual': total_pagado_mes,
-                'total_pagado_6_meses': total_pagado_6_meses
-            },
-            'cargos_pendientes': CargoFinancieroListSerializer(cargos_pendientes, many=True).data,
-            'cargos_vencidos': CargoFinancieroListSerializer(cargos_vencidos, many=True).data,
-            'historial_pagos': CargoFinancieroListSerializer(historial_pagos[:20], many=True).data,  # Últimos 20
-            'desglose_por_tipo': list(desglose_pendiente),
-            'proximo_vencimiento': {
-                'cargo': CargoFinancieroListSerializer(proximo_vencimiento).data if proximo_vencimiento else None,
-                'fecha': proximo_vencimiento.fecha_vencimiento if proximo_vencimiento else None,
-                'dias_restantes': (proximo_vencimiento.fecha_vencimiento - hoy).days if proximo_vencimiento else None
-            },
-            'ultimo_pago': {
-                'cargo': CargoFinancieroListSerializer(ultimo_pago).data if ultimo_pago else None,
-                'fecha': ultimo_pago.fecha_pago if ultimo_pago else None,
-                'hace_dias': (hoy - ultimo_pago.fecha_pago.date()).days if ultimo_pago and ultimo_pago.fecha_pago else None
-            },
-            'alertas': self._generar_alertas_estado_cuenta(cargos_vencidos, proximo_vencimiento)
-        }
-        
-        return Response(estado_cuenta)
+        # Una lectura de cargos, en caché por residente hasta que cambie su libro
+        return Response(estado_cuenta_service.estado_cuenta(residente))
 
     @action(detail=False, methods=['get'], url_path='estado_cuenta/(?P<user_id>[^/.]+)')
     def estado_cuenta_usuario(self, request, user_id=None):
@@ -815,96 +794,8 @@ class CargoFinancieroViewSet(viewsets.ModelViewSet):
         # Obtener el residente
         residente = get_object_or_404(User, id=user_id)
         
-        # Obtener fechas para filtros
-        hoy = date.today()
-        mes_actual = hoy.replace(day=1)
-        hace_6_meses = hoy - timedelta(days=180)
-        
-        # CARGOS PENDIENTES
-        cargos_pendientes = CargoFinanciero.objects.filter(
-            residente=residente,
-            estado=EstadoCargo.PENDIENTE
-        ).select_related('concepto').order_by('fecha_vencimiento')
-        
-        # CARGOS VENCIDOS
-        cargos_vencidos = cargos_pendientes.filter(fecha_vencimiento__lt=hoy)
-        
-        # HISTORIAL DE PAGOS (últimos 6 meses)
-        historial_pagos = CargoFinanciero.objects.filter(
-            residente=residente,
-            estado=EstadoCargo.PAGADO,
-            fecha_pago__gte=hace_6_meses
-        ).select_related('concepto').order_by('-fecha_pago')
-        
-        # CARGOS PAGADOS ESTE MES
-        pagos_mes_actual = CargoFinanciero.objects.filter(
-            residente=residente,
-            estado=EstadoCargo.PAGADO,
-            fecha_pago__gte=mes_actual
-        ).select_related('concepto')
-        
-        # TOTALES Y ESTADÍSTICAS
-        total_pendiente = cargos_pendientes.aggregate(Sum('monto'))['monto__sum'] or Decimal('0.00')
-        total_vencido = cargos_vencidos.aggregate(Sum('monto'))['monto__sum'] or Decimal('0.00')
-        total_pagado_mes = pagos_mes_actual.aggregate(Sum('monto'))['monto__sum'] or Decimal('0.00')
-        total_pagado_6_meses = historial_pagos.aggregate(Sum('monto'))['monto__sum'] or Decimal('0.00')
-        
-        # PRÓXIMO VENCIMIENTO
-        proximo_vencimiento = cargos_pendientes.filter(fecha_vencimiento__gte=hoy).first()
-        
-        # ÚLTIMO PAGO
-        ultimo_pago = CargoFinanciero.objects.filter(
-            residente=residente,
-            estado=EstadoCargo.PAGADO
-        ).select_related('concepto').order_by('-fecha_pago').first()
-        
-        # DESGLOSE POR TIPO DE CONCEPTO
-        desglose_pendiente = cargos_pendientes.values(
-            'concepto__tipo',
-            'concepto__nombre'
-        ).annotate(
-            cantidad=Count('id'),
-            total=Sum('monto')
-        ).order_by('concepto__tipo')
-        
-        # ESTRUCTURA DEL ESTADO DE CUENTA
-        estado_cuenta = {
-            'residente_info': {
-                'id': residente.id,
-                'username': residente.username,
-                'email': residente.email,
-                'nombre_completo': f"{residente.first_name} {residente.last_name}".strip() or residente.username,
-                'first_name': residente.first_name,
-                'last_name': residente.last_name
-            },
-            'fecha_consulta': hoy,
-            'resumen_general': {
-                'total_pendiente': total_pendiente,
-                'total_vencido': total_vencido,
-                'total_al_dia': total_pendiente - total_vencido,
-                'cantidad_cargos_pendientes': cargos_pendientes.count(),
-                'cantidad_cargos_vencidos': cargos_vencidos.count(),
-                'total_pagado_mes_actual': total_pagado_mes,
-                'total_pagado_6_meses': total_pagado_6_meses
-            },
-            'cargos_pendientes': CargoFinancieroListSerializer(cargos_pendientes, many=True).data,
-            'cargos_vencidos': CargoFinancieroListSerializer(cargos_vencidos, many=True).data,
-            'historial_pagos': CargoFinancieroListSerializer(historial_pagos[:20], many=True).data,  # Últimos 20
-            'desglose_por_tipo': list(desglose_pendiente),
-            'proximo_vencimiento': {
-                'cargo': CargoFinancieroListSerializer(proximo_vencimiento).data if proximo_vencimiento else None,
-                'fecha': proximo_vencimiento.fecha_vencimiento if proximo_vencimiento else None,
-                'dias_restantes': (proximo_vencimiento.fecha_vencimiento - hoy).days if proximo_vencimiento else None
-            },
-            'ultimo_pago': {
-                'cargo': CargoFinancieroListSerializer(ultimo_pago).data if ultimo_pago else None,
-                'fecha': ultimo_pago.fecha_pago if ultimo_pago else None,
-                'hace_dias': (hoy - ultimo_pago.fecha_pago.date()).days if ultimo_pago and ultimo_pago.fecha_pago else None
-            },
-            'alertas': self._generar_alertas_estado_cuenta(cargos_vencidos, proximo_vencimiento)
-        }
-        
-        return Response(estado_cuenta)
+        # Una lectura de cargos, en caché por residente hasta que cambie su libro
+        return Response(estado_cuenta_service.estado_cuenta(residente))
 
     @action(detail=False, methods=['get'])
     def estados_cuenta_usuarios(self, request):
@@ -941,102 +832,53 @@ class CargoFinancieroViewSet(viewsets.ModelViewSet):
                 Q(email__icontains=search)
             )
         
-        # Obtener datos financieros para cada residente
+        # Calcular saldos de todos los residentes en una sola consulta agrupada
         hoy = date.today()
-        estados_cuenta = []
+        residentes = estado_cuenta_service.anotar_estado_financiero(residentes, hoy)
         
-        for residente in residentes:
-            # CARGOS PENDIENTES
-            cargos_pendientes = CargoFinanciero.objects.filter(
-                residente=residente,
-                estado=EstadoCargo.PENDIENTE
-            )
-            
-            # CARGOS VENCIDOS
-            cargos_vencidos = cargos_pendientes.filter(fecha_vencimiento__lt=hoy)
-            
-            # TOTALES
-            total_pendiente = cargos_pendientes.aggregate(Sum('monto'))['monto__sum'] or Decimal('0.00')
-            total_vencido = cargos_vencidos.aggregate(Sum('monto'))['monto__sum'] or Decimal('0.00')
-            
-            # DETERMINAR ESTADO GENERAL
-            if total_vencido > 0:
-                estado_general = 'vencido'
-            elif total_pendiente > 0:
-                estado_general = 'pendiente'
-            else:
-                estado_general = 'al_dia'
-            
-            # Aplicar filtro de estado si se especifica
-            if estado and estado_general != estado:
-                continue
-            
-            # PRÓXIMO VENCIMIENTO
-            proximo_vencimiento = cargos_pendientes.filter(fecha_vencimiento__gte=hoy).first()
-            
-            # ÚLTIMO PAGO
-            ultimo_pago = CargoFinanciero.objects.filter(
-                residente=residente,
-                estado=EstadoCargo.PAGADO
-            ).order_by('-fecha_pago').first()
-            
-            estados_cuenta.append({
-                'residente_info': {
-                    'id': residente.id,
-                    'username': residente.username,
-                    'email': residente.email,
-                    'nombre_completo': f"{residente.first_name} {residente.last_name}".strip() or residente.username,
-                    'first_name': residente.first_name,
-                    'last_name': residente.last_name
-                },
-                'estado_financiero': {
-                    'estado_general': estado_general,
-                    'total_pendiente': total_pendiente,
-                    'total_vencido': total_vencido,
-                    'cantidad_cargos_pendientes': cargos_pendientes.count(),
-                    'cantidad_cargos_vencidos': cargos_vencidos.count(),
-                    'proximo_vencimiento': {
-                        'fecha': proximo_vencimiento.fecha_vencimiento if proximo_vencimiento else None,
-                        'dias_restantes': (proximo_vencimiento.fecha_vencimiento - hoy).days if proximo_vencimiento else None,
-                        'concepto': proximo_vencimiento.concepto.nombre if proximo_vencimiento else None
-                    },
-                    'ultimo_pago': {
-                        'fecha': ultimo_pago.fecha_pago if ultimo_pago else None,
-                        'monto': ultimo_pago.monto if ultimo_pago else None,
-                        'concepto': ultimo_pago.concepto.nombre if ultimo_pago else None
-                    }
-                }
-            })
+        # Aplicar filtro de estado en la base de datos
+        if estado:
+            residentes = residentes.filter(estado_general=estado)
+        
+        # Estadísticas generales (una sola consulta sobre el conjunto filtrado)
+        estadisticas = estado_cuenta_service.estadisticas_generales(residentes)
         
         # Ordenar por estado de urgencia: vencidos primero, luego pendientes, luego al día
-        def ordenar_por_urgencia(item):
-            estado = item['estado_financiero']['estado_general']
-            if estado == 'vencido':
-                return 0
-            elif estado == 'pendiente':
-                return 1
-            else:
-                return 2
-        
-        estados_cuenta.sort(key=ordenar_por_urgencia)
-        
-        # Estadísticas generales
-        total_residentes = len(estados_cuenta)
-        total_residentes_vencidos = sum(1 for item in estados_cuenta if item['estado_financiero']['estado_general'] == 'vencido')
-        total_residentes_pendientes = sum(1 for item in estados_cuenta if item['estado_financiero']['estado_general'] == 'pendiente')
-        total_residentes_al_dia = sum(1 for item in estados_cuenta if item['estado_financiero']['estado_general'] == 'al_dia')
-        
-        total_monto_pendiente = sum(float(item['estado_financiero']['total_pendiente']) for item in estados_cuenta)
-        total_monto_vencido = sum(float(item['estado_financiero']['total_vencido']) for item in estados_cuenta)
+        residentes = residentes.order_by('urgencia', 'username')
+        
+        # Paginación opcional en SQL (?page=1&page_size=50)
+        paginacion = None
+        page_size = request.query_params.get('page_size')
+        if page_size:
+            try:
+                page_size = max(1, min(int(page_size), 500))
+                page = max(1, int(request.query_params.get('page', 1)))
+            except (ValueError, TypeError):
+                return Response(
+                    {'error': 'Parámetros de paginación inválidos'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            offset = (page - 1) * page_size
+            residentes = residentes[offset:offset + page_size]
+            paginacion = {
+                'page': page,
+                'page_size': page_size,
+                'total_paginas': -(-estadisticas['total_residentes'] // page_size)
+            }
+        
+        estados_cuenta = [
+            estado_cuenta_service.serializar_estado_financiero(residente, hoy)
+            for residente in residentes
+        ]
         
         resultado = {
             'estadisticas_generales': {
-                'total_residentes': total_residentes,
-                'residentes_vencidos': total_residentes_vencidos,
-                'residentes_pendientes': total_residentes_pendientes,
-                'residentes_al_dia': total_residentes_al_dia,
-                'total_monto_pendiente': total_monto_pendiente,
-                'total_monto_vencido': total_monto_vencido
+                'total_residentes': estadisticas['total_residentes'],
+                'residentes_vencidos': estadisticas['residentes_vencidos'],
+                'residentes_pendientes': estadisticas['residentes_pendientes'],
+                'residentes_al_dia': estadisticas['residentes_al_dia'],
+                'total_monto_pendiente': float(estadisticas['total_monto_pendiente']),
+                'total_monto_vencido': float(estadisticas['total_monto_vencido'])
             },
             'estados_cuenta': estados_cuenta,
             'filtros_aplicados': {
@@ -1044,35 +886,10 @@ class CargoFinancieroViewSet(viewsets.ModelViewSet):
                 'estado': estado
             }
         }
+        if paginacion:
+            resultado['paginacion'] = paginacion
         
         return Response(resultado)
-    
-    def _generar_alertas_estado_cuenta(self, cargos_vencidos, proximo_vencimiento):
-        """Generar alertas relevantes para el estado de cuenta"""
-        alertas = []
-        
-        if cargos_vencidos.exists():
-            total_vencido = cargos_vencidos.aggregate(Sum('monto'))['monto__sum'] or Decimal('0.00')
-            alertas.append({
-                'tipo': 'vencido',
-                'severidad': 'alta',
-                'titulo': f'Tiene {cargos_vencidos.count()} cargo(s) vencido(s)',
-                'mensaje': f'Total vencido: ${total_vencido}. Se recomienda realizar el pago lo antes posible.',
-                'accion': 'Pagar cargos vencidos'
-            })
-        
-        if proximo_vencimiento:
-            dias_restantes = (proximo_vencimiento.fecha_vencimiento - date.today()).days
-            if dias_restantes <= 7:
-                alertas.append({
-                    'tipo': 'vencimiento_proximo',
-                    'severidad': 'media' if dias_restantes > 3 else 'alta',
-                    'titulo': f'Cargo próximo a vencer',
-                    'mensaje': f'{proximo_vencimiento.concepto.nombre} vence en {dias_restantes} día(s)',
-                    'accion': 'Revisar y programar pago'
-                })
-        
-        return alertas
 
 
 class EstadisticasFinancierasViewSet(viewsets.ViewSet):
@@ -1098,14 +915,8 @@ class EstadisticasFinancierasViewSet(viewsets.ViewSet):
             estado=EstadoConcepto.ACTIVO
         ).count()
         
-        cargos_pendientes = CargoFinanciero.objects.filter(estado=EstadoCargo.PENDIENTE)
-        cargos_vencidos = cargos_pendientes.filter(fecha_vencimiento__lt=date.today())
-        
-        mes_actual = date.today().replace(day=1)
-        pagos_mes_actual = CargoFinanciero.objects.filter(
-            estado=EstadoCargo.PAGADO,
-            fecha_pago__gte=mes_actual
-        ).aggregate(Sum('monto'))['monto__sum'] or Decimal('0.00')
+        # Totales desde los saldos materializados (una fila por residente)
+        totales = estado_cuenta_service.totales_condominio()
         
         # Conceptos más aplicados
         conceptos_mas_aplicados = CargoFinanciero.objects.values(
@@ -1116,11 +927,11 @@ class EstadisticasFinancierasViewSet(viewsets.ViewSet):
         
         estadisticas = {
             'total_conceptos_activos': total_conceptos_activos,
-            'total_cargos_pendientes': cargos_pendientes.count(),
-            'monto_total_pendiente': cargos_pendientes.aggregate(Sum('monto'))['monto__sum'] or Decimal('0.00'),
-            'total_cargos_vencidos': cargos_vencidos.count(),
-            'monto_total_vencido': cargos_vencidos.aggregate(Sum('monto'))['monto__sum'] or Decimal('0.00'),
-            'total_pagos_mes_actual': pagos_mes_actual,
+            'total_cargos_pendientes': totales['total_cargos_pendientes'],
+            'monto_total_pendiente': totales['monto_total_pendiente'],
+            'total_cargos_vencidos': totales['total_cargos_vencidos'],
+            'monto_total_vencido': totales['monto_total_vencido'],
+            'total_pagos_mes_actual': totales['total_pagos_mes_actual'],
             'conceptos_mas_aplicados': list(conceptos_mas_aplicados)
         }
         
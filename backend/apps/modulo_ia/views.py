@@ -33,21 +33,16 @@ User = get_user_model()
 # Initialize Grok client (using xAI's Grok)
 try:
     if settings.GROK_API_KEY:
-        # Solución final: crear cliente manualmente para evitar problemas de proxies
-        import httpx
-        from openai import OpenAI
+        # Cliente httpx compartido de la integración (pool, límite por host, reintentos y circuito)
+        from backend.integraciones import obtener_cliente
 
-        # Crear cliente httpx personalizado sin configuración de proxies
-        http_client = httpx.Client(
-            timeout=60.0,
-            follow_redirects=True
-        )
-
-        # Crear cliente OpenAI con cliente httpx personalizado
+        # Los reintentos los hace la capa de integración, no el SDK
         grok_client = OpenAI(
             api_key=settings.GROK_API_KEY,
             base_url=settings.GROK_API_BASE,
-            http_client=http_client
+            http_client=obtener_cliente('grok'),
+            timeout=60.0,
+            max_retries=0
         )
         print("Grok client initialized successfully with custom HTTP client")
     else:
@@ -1,12 +1,12 @@
-import requests
 import json
-import requests
+import httpx
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from google.auth import default
 from google.auth.transport.requests import Request
 from google.oauth2 import service_account
+from backend.integraciones import obtener_cliente
 from .models import Notificacion, Dispositivo, PreferenciasNotificacion
 
 User = get_user_model()
@@ -256,7 +256,8 @@ class NotificacionService:
         }
 
         try:
-            response = requests.post(url, headers=headers, json=data, timeout=10)
+            # Cliente compartido: una conexión keep-alive para todos los dispositivos
+            response = obtener_cliente('fcm').post(url, headers=headers, json=data)
 
             if response.status_code == 200:
                 result = response.json()
@@ -270,7 +271,7 @@ class NotificacionService:
                 error_data = response.json() if response.content else {}
                 print(f"Error FCM: {response.status_code} - {error_data}")
 
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             print(f"Error de conexión FCM: {e}")
 
         return False
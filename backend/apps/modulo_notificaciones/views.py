@@ -5,6 +5,7 @@ from rest_framework.response import Response
 from django.contrib.auth import get_user_model
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from backend.pagination import CursorPaginacion
 from .models import Dispositivo, PreferenciasNotificacion, Notificacion
 from .serializers import (
     DispositivoSerializer, DispositivoRegistroSerializer,
@@ -90,9 +91,11 @@ class NotificacionViewSet(viewsets.ReadOnlyModelViewSet):
     """ViewSet para consultar notificaciones"""
     serializer_class = NotificacionSerializer
     permission_classes = [IsAuthenticated]
+    # Cursor sobre -fecha_creacion (índice usuario, -fecha_creacion)
+    pagination_class = CursorPaginacion
 
     def get_queryset(self):
-        queryset = Notificacion.objects.filter(usuario=self.request.user)
+        queryset = Notificacion.objects.filter(usuario=self.request.user).select_related('dispositivo')
 
         # Filtros opcionales
         tipo = self.request.query_params.get('tipo')
@@ -137,8 +140,9 @@ class NotificacionViewSet(viewsets.ReadOnlyModelViewSet):
     def no_leidas(self, request):
         """Obtener solo notificaciones no leídas"""
         queryset = self.get_queryset().filter(fecha_lectura__isnull=True)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
 
 @api_view(['POST'])
@@ -4,4 +4,8 @@ from django.apps import AppConfig
 class ReservationsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'backend.apps.reservations'
-    verbose_name = 'Reservas de Áreas Comunes'
\ No newline at end of file
+    verbose_name = 'Reservas de Áreas Comunes'
+
+    def ready(self):
+        """Importar las señales que invalidan la caché de disponibilidad"""
+        import backend.apps.reservations.signals
@@ -0,0 +1,277 @@
+"""
+Cálculo de disponibilidad de áreas comunes por intervalos
+
+Las reservas que bloquean el área en el rango pedido se leen con una sola consulta
+y se fusionan, por día, en una lista ordenada de intervalos ocupados (minutos desde
+medianoche). Cada slot se resuelve con una búsqueda binaria sobre esa lista, así que
+el número de consultas no depende de la cantidad de slots ni de días.
+
+El calendario (varias áreas y días) codifica cada área-día como celdas de tamaño fijo
+(L libre, O ocupada, C cerrada) en texto plano o run-length. Sus respuestas se
+cachean bajo una versión de los datos de reservas que las señales incrementan.
+"""
+
+import hashlib
+import json
+from bisect import bisect_right
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+
+from backend.cache_versiones import incrementar_versiones, obtener_version
+
+from .models import ESTADOS_BLOQUEANTES, HorarioDisponible, Reserva
+
+DIAS_SEMANA = ['lunes', 'martes', 'miercoles', 'jueves', 'viernes', 'sabado', 'domingo']
+
+MINUTOS_DIA = 24 * 60
+
+
+def _minutos(hora):
+    return hora.hour * 60 + hora.minute
+
+
+def _hora(minutos):
+    return f'{minutos // 60:02d}:{minutos % 60:02d}'
+
+
+class DisponibilidadService:
+    """Intervalos ocupados y slots disponibles de un área en un rango de días"""
+
+    ESTADOS_BLOQUEANTES = ESTADOS_BLOQUEANTES
+    MAX_DIAS = 31
+
+    # Calendario
+    RESOLUCIONES = (15, 30, 60)
+    CODIFICACIONES = ('rle', 'mapa')
+    LIBRE, OCUPADA, CERRADA = 'L', 'O', 'C'
+    CLAVE_VERSION = 'reservas:disponibilidad:version'
+    TIMEOUT_CALENDARIO = 3600
+
+    @staticmethod
+    def fusionar(intervalos):
+        """Unir intervalos (inicio, fin) solapados o contiguos; devuelve (inicios, fines) ordenados"""
+        inicios, fines = [], []
+        for inicio, fin in sorted(intervalos):
+            if fines and inicio <= fines[-1]:
+                fines[-1] = max(fines[-1], fin)
+            else:
+                inicios.append(inicio)
+                fines.append(fin)
+        return inicios, fines
+
+    @staticmethod
+    def ocupado(fusionados, inicio, fin):
+        """Si [inicio, fin) se solapa con algún intervalo fusionado (búsqueda binaria)"""
+        inicios, fines = fusionados
+        # Primer intervalo que termina después del inicio del slot
+        i = bisect_right(fines, inicio)
+        return i < len(inicios) and inicios[i] < fin
+
+    def reservas_bloqueantes(self, areas, fecha_inicio, fecha_fin):
+        """Reservas que ocupan las áreas en el rango (índice parcial reserva_bloqueante_idx)"""
+        return Reserva.objects.filter(
+            area_comun__in=areas,
+            fecha__range=(fecha_inicio, fecha_fin),
+            estado__in=self.ESTADOS_BLOQUEANTES
+        ).order_by()
+
+    def intervalos_ocupados(self, areas, fecha_inicio, fecha_fin):
+        """
+        Intervalos ocupados por área y día, con una consulta
+
+        Las reservas que cruzan la medianoche (hora_fin <= hora_inicio) ocupan el final
+        de su día y el inicio del siguiente, por eso se lee también el día anterior.
+
+        Returns:
+            dict: (area_id, fecha) -> (inicios, fines) fusionados, en minutos
+        """
+        por_dia = {}
+        reservas = self.reservas_bloqueantes(
+            areas, fecha_inicio - timedelta(days=1), fecha_fin
+        ).values_list('area_comun_id', 'fecha', 'hora_inicio', 'hora_fin')
+        for area_id, fecha, hora_inicio, hora_fin in reservas:
+            for dia, inicio, fin in self.tramos(fecha, hora_inicio, hora_fin):
+                por_dia.setdefault((area_id, dia), []).append((inicio, fin))
+        return {clave: self.fusionar(intervalos) for clave, intervalos in por_dia.items()}
+
+    @staticmethod
+    def tramos(fecha, hora_inicio, hora_fin):
+        """
+        Tramos (día, inicio, fin) en minutos que ocupa un horario
+
+        Un horario con hora_fin <= hora_inicio termina al día siguiente y ocupa dos días.
+        """
+        inicio, fin = _minutos(hora_inicio), _minutos(hora_fin)
+        if fin > inicio:
+            return [(fecha, inicio, fin)]
+        tramos = [(fecha, inicio, MINUTOS_DIA)]
+        if fin:
+            tramos.append((fecha + timedelta(days=1), 0, fin))
+        return tramos
+
+    def conflicto(self, area, fecha, hora_inicio, hora_fin):
+        """Si el horario pedido se solapa con una reserva que bloquea el área"""
+        tramos = self.tramos(fecha, hora_inicio, hora_fin)
+        ocupados = self.intervalos_ocupados([area], fecha, tramos[-1][0])
+        return any(
+            self.ocupado(ocupados.get((area.pk, dia), ([], [])), inicio, fin)
+            for dia, inicio, fin in tramos
+        )
+
+    @staticmethod
+    def horarios(areas):
+        """Horarios activos por (area_id, dia_semana), con una consulta"""
+        return {
+            (horario.area_comun_id, horario.dia_semana): horario
+            for horario in HorarioDisponible.objects.filter(area_comun__in=areas, activo=True)
+        }
+
+    def calcular(self, area, fecha_inicio, fecha_fin, duracion_horas=None, paso_minutos=None):
+        """
+        Slots de cada día del rango
+
+        Args:
+            duracion_horas: Duración de cada slot (por defecto area.tiempo_minimo_reserva)
+            paso_minutos: Separación entre inicios de slot (por defecto la duración)
+
+        Returns:
+            list: Un dict por día con fecha, dia_semana, horario_disponible y slots_disponibles
+            (horario_disponible es None si el área no abre ese día)
+        """
+        duracion_horas = Decimal(str(duracion_horas or area.tiempo_minimo_reserva))
+        duracion = int(duracion_horas * 60)
+        paso = int(paso_minutos or duracion)
+        duracion_salida = int(duracion_horas) if duracion_horas == int(duracion_horas) else float(duracion_horas)
+        # El costo es el mismo para todos los slots de igual duración
+        costo = str(area.calcular_costo_total(duracion_horas).quantize(Decimal('0.01')))
+
+        horarios = self.horarios([area])
+        ocupados = self.intervalos_ocupados([area], fecha_inicio, fecha_fin)
+        sin_reservas = ([], [])
+
+        dias = []
+        fecha = fecha_inicio
+        while fecha <= fecha_fin:
+            dia_semana = DIAS_SEMANA[fecha.weekday()]
+            horario = horarios.get((area.pk, dia_semana))
+            dia = {'fecha': fecha.isoformat(), 'dia_semana': dia_semana, 'horario_disponible': None, 'slots_disponibles': []}
+            if horario:
+                apertura = _minutos(horario.hora_apertura)
+                # Un cierre a medianoche (00:00) es el final del día
+                cierre = _minutos(horario.hora_cierre) or MINUTOS_DIA
+                fusionados = ocupados.get((area.pk, fecha), sin_reservas)
+                dia['horario_disponible'] = {
+                    'hora_apertura': horario.hora_apertura.strftime('%H:%M'),
+                    'hora_cierre': horario.hora_cierre.strftime('%H:%M')
+                }
+                dia['slots_disponibles'] = [
+                    {
+                        'hora_inicio': _hora(inicio),
+                        'hora_fin': _hora((inicio + duracion) % MINUTOS_DIA),
+                        'disponible': not self.ocupado(fusionados, inicio, inicio + duracion),
+                        'duracion_horas': duracion_salida,
+                        'costo_total': costo,
+                    }
+                    for inicio in range(apertura, cierre - duracion + 1, paso)
+                ]
+            dias.append(dia)
+            fecha += timedelta(days=1)
+        return dias
+
+    def version(self):
+        """Versión actual de los datos de reservas, horarios y áreas"""
+        return obtener_version(self.CLAVE_VERSION)
+
+    def invalidar(self):
+        """Incrementar la versión (reservas, horarios o áreas cambiaron)"""
+        incrementar_versiones([self.CLAVE_VERSION])
+
+    def etag_calendario(self, parametros):
+        """ETag de una consulta de calendario: versión de los datos y parámetros normalizados"""
+        huella = hashlib.sha256(json.dumps(parametros, sort_keys=True, default=str).encode()).hexdigest()[:16]
+        return f'"{self.version()}-{huella}"'
+
+    def _celdas(self, fusionados, apertura, cierre, resolucion):
+        """
+        Estado de cada celda del día con un barrido simultáneo de celdas e intervalos
+
+        Una celda que no cae entera dentro del horario queda cerrada.
+        """
+        inicios, fines = fusionados
+        j = 0
+        celdas = []
+        for inicio in range(0, MINUTOS_DIA, resolucion):
+            fin = inicio + resolucion
+            if inicio < apertura or fin > cierre:
+                celdas.append(self.CERRADA)
+                continue
+            while j < len(fines) and fines[j] <= inicio:
+                j += 1
+            celdas.append(self.OCUPADA if j < len(inicios) and inicios[j] < fin else self.LIBRE)
+        return celdas
+
+    @staticmethod
+    def _rle(celdas):
+        """'CCCLLO' -> '3C2L1O'"""
+        partes = []
+        anterior, cuenta = None, 0
+        for celda in celdas:
+            if celda == anterior:
+                cuenta += 1
+            else:
+                if anterior:
+                    partes.append(f'{cuenta}{anterior}')
+                anterior, cuenta = celda, 1
+        if anterior:
+            partes.append(f'{cuenta}{anterior}')
+        return ''.join(partes)
+
+    def calendario(self, areas, fecha_inicio, fecha_fin, resolucion=30, codificacion='rle'):
+        """
+        Disponibilidad de varias áreas en un rango de días
+
+        Una consulta para horarios y otra para reservas, sin importar cuántas áreas o días.
+
+        Returns:
+            list: Por área, id, nombre, tipo y 'dias' (fecha ISO -> celdas codificadas)
+        """
+        areas = list(areas)
+        horarios = self.horarios(areas)
+        ocupados = self.intervalos_ocupados(areas, fecha_inicio, fecha_fin)
+        sin_reservas = ([], [])
+        dia_cerrado = [self.CERRADA] * (MINUTOS_DIA // resolucion)
+
+        resultado = []
+        for area in areas:
+            dias = {}
+            fecha = fecha_inicio
+            while fecha <= fecha_fin:
+                horario = horarios.get((area.pk, DIAS_SEMANA[fecha.weekday()]))
+                if horario:
+                    celdas = self._celdas(
+                        ocupados.get((area.pk, fecha), sin_reservas),
+                        _minutos(horario.hora_apertura),
+                        _minutos(horario.hora_cierre) or MINUTOS_DIA,
+                        resolucion
+                    )
+                else:
+                    celdas = dia_cerrado
+                dias[fecha.isoformat()] = self._rle(celdas) if codificacion == 'rle' else ''.join(celdas)
+                fecha += timedelta(days=1)
+            resultado.append({'id': area.pk, 'nombre': area.nombre, 'tipo': area.tipo, 'dias': dias})
+        return resultado
+
+    def calendario_cacheado(self, areas, fecha_inicio, fecha_fin, resolucion, codificacion, etag):
+        """calendario() guardado en caché bajo su ETag (cambia con la versión de los datos)"""
+        clave = f'reservas:calendario:{etag.strip(chr(34))}'
+        resultado = cache.get(clave)
+        if resultado is None:
+            resultado = self.calendario(areas, fecha_inicio, fecha_fin, resolucion, codificacion)
+            cache.set(clave, resultado, self.TIMEOUT_CALENDARIO)
+        return resultado
+
+
+# Instancia global del servicio
+disponibilidad_service = DisponibilidadService()
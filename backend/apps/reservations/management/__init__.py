@@ -0,0 +1 @@
+# Management commands for reservations app
\ No newline at end of file
@@ -0,0 +1,66 @@
+"""
+Management command para el barrido de estados de reservas
+Pensado para ejecutarse cada pocos minutos (cron / Programador de tareas) o con --continuo
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from backend.apps.reservations.services import barrido_reservas_service
+
+
+class Command(BaseCommand):
+    help = 'Expirar pendientes vencidas, cancelar confirmadas sin pago y marcar como usadas las reservas terminadas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--horas-limite-pago',
+            type=int,
+            help='Horas antes del inicio para pagar una reserva confirmada (por defecto RESERVAS_HORAS_LIMITE_PAGO)'
+        )
+        parser.add_argument(
+            '--continuo',
+            action='store_true',
+            help='Quedarse en ejecución y repetir el barrido cada --intervalo minutos'
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=int,
+            default=15,
+            help='Minutos entre barridos en modo --continuo (por defecto 15)'
+        )
+
+    def handle(self, *args, **options):
+        horas_limite_pago = options['horas_limite_pago']
+        if horas_limite_pago is not None and horas_limite_pago < 0:
+            raise CommandError('--horas-limite-pago no puede ser negativo')
+
+        if not options['continuo']:
+            self.stdout.write(self.style.SUCCESS('⏰ BARRIENDO ESTADOS DE RESERVAS'))
+            self.mostrar(barrido_reservas_service.barrer(horas_limite_pago=horas_limite_pago))
+            return
+
+        if options['intervalo'] < 1:
+            raise CommandError('--intervalo debe ser al menos 1 minuto')
+        self.stdout.write(self.style.SUCCESS(
+            f"⏰ Barrido de reservas cada {options['intervalo']} minuto(s) (Ctrl+C para salir)"
+        ))
+        try:
+            while True:
+                close_old_connections()
+                try:
+                    self.mostrar(barrido_reservas_service.barrer(horas_limite_pago=horas_limite_pago))
+                except Exception as e:
+                    # Un error puntual (p. ej. la base caída) no detiene el programador
+                    self.stderr.write(f'❌ Error en el barrido: {e}')
+                time.sleep(options['intervalo'] * 60)
+        except KeyboardInterrupt:
+            self.stdout.write('👋 Barrido detenido')
+
+    def mostrar(self, resultado):
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {resultado['expiradas']} expirada(s), {resultado['canceladas']} cancelada(s), "
+            f"{resultado['usadas']} usada(s) - {resultado['duracion_ms']}ms"
+        ))
@@ -0,0 +1,125 @@
+"""
+Management command para probar la reserva bajo contención (picos de feriados)
+
+Lanza N solicitudes simultáneas por el mismo horario de un área y verifica que
+solo una quede confirmada. Usar contra una base de pruebas o de staging: las
+reservas creadas se eliminan al terminar salvo con --conservar.
+"""
+
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from django.utils import timezone
+
+from backend.apps.reservations.disponibilidad import DisponibilidadService
+from backend.apps.reservations.models import AreaComun, Reserva
+from backend.apps.reservations.services import ErrorReserva, HorarioNoDisponible, reserva_service
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Simular solicitudes de reserva simultáneas por el mismo horario y verificar que no haya doble reserva'
+
+    REINTENTOS_BLOQUEO = 5
+
+    def add_arguments(self, parser):
+        parser.add_argument('--area', type=int, required=True, help='ID del área común')
+        parser.add_argument('--solicitudes', type=int, default=20, help='Solicitudes simultáneas (por defecto 20)')
+        parser.add_argument('--fecha', help='Fecha YYYY-MM-DD (por defecto la primera que cumple la anticipación)')
+        parser.add_argument('--hora-inicio', default='10:00', help='Hora de inicio HH:MM (por defecto 10:00)')
+        parser.add_argument('--conservar', action='store_true', help='No eliminar las reservas creadas')
+
+    def handle(self, *args, **options):
+        try:
+            area = AreaComun.objects.get(pk=options['area'])
+        except AreaComun.DoesNotExist:
+            raise CommandError(f"No existe el área {options['area']}")
+
+        try:
+            hora_inicio = datetime.strptime(options['hora_inicio'], '%H:%M').time()
+            fecha = (
+                datetime.strptime(options['fecha'], '%Y-%m-%d').date() if options['fecha']
+                else timezone.localdate() + timedelta(days=math.ceil(area.anticipo_minimo_horas / 24) + 1)
+            )
+        except ValueError:
+            raise CommandError('Formato inválido. Use --fecha YYYY-MM-DD y --hora-inicio HH:MM')
+        hora_fin = (datetime.combine(fecha, hora_inicio) + timedelta(hours=area.tiempo_minimo_reserva)).time()
+
+        usuarios = list(User.objects.filter(is_active=True, role__in=['resident', 'admin'])[:options['solicitudes']])
+        if not usuarios:
+            raise CommandError('❌ No hay residentes activos para simular las solicitudes')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'🏁 {options["solicitudes"]} SOLICITUDES SIMULTÁNEAS: {area.nombre} {fecha} '
+            f'{hora_inicio:%H:%M}-{hora_fin:%H:%M}'
+        ))
+
+        resultados = {'creadas': [], 'conflictos': 0, 'rechazadas': 0, 'errores': 0, 'reintentos': 0}
+        latencias = []
+        lock = threading.Lock()
+        barrera = threading.Barrier(options['solicitudes'])
+
+        def solicitar(usuario):
+            barrera.wait()
+            inicio = time.monotonic()
+            try:
+                for intento in range(self.REINTENTOS_BLOQUEO):
+                    try:
+                        reserva = reserva_service.reservar(area, usuario, fecha, hora_inicio, hora_fin)
+                        clave, valor = 'creadas', reserva.pk
+                        break
+                    except HorarioNoDisponible:
+                        clave, valor = 'conflictos', None
+                        break
+                    except ErrorReserva:
+                        clave, valor = 'rechazadas', None
+                        break
+                    except OperationalError:
+                        # Bloqueo de la base (p. ej. SQLite); PostgreSQL espera en el FOR UPDATE
+                        clave, valor = 'errores', None
+                        with lock:
+                            resultados['reintentos'] += 1
+                        time.sleep(0.05 * (intento + 1))
+                with lock:
+                    latencias.append(time.monotonic() - inicio)
+                    if valor is None:
+                        resultados[clave] += 1
+                    else:
+                        resultados[clave].append(valor)
+            finally:
+                connection.close()
+
+        hilos = [
+            threading.Thread(target=solicitar, args=(usuarios[i % len(usuarios)],))
+            for i in range(options['solicitudes'])
+        ]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        latencias.sort()
+        p95 = latencias[max(0, math.ceil(len(latencias) * 0.95) - 1)]
+        self.stdout.write(
+            f"✅ {len(resultados['creadas'])} creada(s), ⛔ {resultados['conflictos']} conflicto(s) 409, "
+            f"⚠️ {resultados['rechazadas']} rechazada(s), ❌ {resultados['errores']} error(es), "
+            f"🔁 {resultados['reintentos']} reintento(s)"
+        )
+        self.stdout.write(
+            f'⏱️ Latencia p50 {latencias[len(latencias) // 2] * 1000:.0f} ms, '
+            f'p95 {p95 * 1000:.0f} ms, máx {latencias[-1] * 1000:.0f} ms'
+        )
+
+        creadas = Reserva.objects.filter(pk__in=resultados['creadas'])
+        bloqueantes = creadas.filter(estado__in=DisponibilidadService.ESTADOS_BLOQUEANTES).count()
+        if not options['conservar']:
+            creadas.delete()
+        if bloqueantes > 1:
+            raise CommandError(f'❌ DOBLE RESERVA: {bloqueantes} reservas confirmadas para el mismo horario')
+        self.stdout.write(self.style.SUCCESS('🔒 Sin dobles reservas'))
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-19 12:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0005_resumen_financiero_diario'),
+        ('reservations', '0002_alter_reserva_unique_together'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['area_comun', 'fecha', 'estado'], name='reserva_area_fecha_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(condition=models.Q(('estado__in', ['confirmada', 'pagada', 'usada'])), fields=['area_comun', 'fecha', 'hora_inicio', 'hora_fin'], name='reserva_bloqueante_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['usuario', '-fecha', '-hora_inicio'], name='reserva_usuario_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['fecha', 'estado'], name='reserva_fecha_estado_idx'),
+        ),
+    ]
@@ -0,0 +1,88 @@
+"""
+Restricción de exclusión contra reservas solapadas (solo PostgreSQL)
+
+Dos reservas de la misma área en estado confirmada, pagada o usada no pueden
+compartir tiempo. El rango de cada reserva es [fecha + hora_inicio, fecha + hora_fin)
+y termina al día siguiente si hora_fin <= hora_inicio, igual que en
+DisponibilidadService.tramos. btree_gist permite combinar la igualdad del área con
+el solapamiento de rangos en un solo índice GiST.
+
+Si ya hay reservas solapadas (anteriores al bloqueo por área o reservas nocturnas
+que la validación antigua no detectaba) la migración se detiene listándolas: hay que
+cancelar o mover una de cada par y volver a ejecutar migrate.
+
+En otros motores (SQLite en desarrollo) la migración no hace nada; el bloqueo por
+área de ReservaService sigue evitando los solapamientos.
+"""
+
+from django.db import migrations
+
+RESTRICCION = 'reserva_sin_solapamiento'
+
+EXTENSION = 'CREATE EXTENSION IF NOT EXISTS btree_gist'
+
+# Rango de una reserva; {t} es el prefijo de tabla ('' en la restricción, 'a.' en la consulta)
+RANGO = """tsrange(
+        {t}fecha + {t}hora_inicio,
+        {t}fecha + {t}hora_fin + CASE WHEN {t}hora_fin <= {t}hora_inicio THEN interval '1 day' ELSE interval '0' END,
+        '[)'
+    )"""
+
+ESTADOS = "('confirmada', 'pagada', 'usada')"
+
+CREAR = f"""
+ALTER TABLE reservations_reserva ADD CONSTRAINT {RESTRICCION} EXCLUDE USING gist (
+    area_comun_id WITH =,
+    {RANGO.format(t='')} WITH &&
+) WHERE (estado IN {ESTADOS})
+"""
+
+SOLAPADAS = f"""
+SELECT a.id, b.id, a.area_comun_id, a.fecha, a.hora_inicio, a.hora_fin, b.fecha, b.hora_inicio, b.hora_fin
+FROM reservations_reserva a
+JOIN reservations_reserva b ON b.area_comun_id = a.area_comun_id AND b.id > a.id
+WHERE a.estado IN {ESTADOS} AND b.estado IN {ESTADOS}
+  AND {RANGO.format(t='a.')} && {RANGO.format(t='b.')}
+ORDER BY a.area_comun_id, a.fecha, a.id
+"""
+
+ELIMINAR = f'ALTER TABLE reservations_reserva DROP CONSTRAINT IF EXISTS {RESTRICCION}'
+
+
+def verificar_solapadas(cursor):
+    """Detener la migración con la lista de pares solapados, si los hay"""
+    cursor.execute(SOLAPADAS)
+    pares = cursor.fetchall()
+    if pares:
+        detalle = '\n'.join(
+            f'  área {area}: reserva {a} ({fecha_a} {inicio_a}-{fin_a}) y reserva {b} ({fecha_b} {inicio_b}-{fin_b})'
+            for a, b, area, fecha_a, inicio_a, fin_a, fecha_b, inicio_b, fin_b in pares
+        )
+        raise RuntimeError(
+            f'No se puede crear {RESTRICCION}: {len(pares)} par(es) de reservas confirmadas, pagadas '
+            f'o usadas se solapan. Cancele o mueva una de cada par y vuelva a ejecutar migrate:\n{detalle}'
+        )
+
+
+def crear_restriccion(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        with schema_editor.connection.cursor() as cursor:
+            verificar_solapadas(cursor)
+        schema_editor.execute(EXTENSION, params=None)
+        schema_editor.execute(CREAR, params=None)
+
+
+def eliminar_restriccion(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(ELIMINAR, params=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0003_reserva_indices'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_restriccion, eliminar_restriccion),
+    ]
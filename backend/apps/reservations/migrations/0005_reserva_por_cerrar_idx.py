@@ -0,0 +1,20 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0005_resumen_financiero_diario'),
+        ('reservations', '0004_reserva_sin_solapamiento'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(condition=models.Q(('estado__in', ['pendiente', 'confirmada', 'pagada'])), fields=['fecha', 'hora_inicio'], name='reserva_por_cerrar_idx'),
+        ),
+    ]
@@ -46,6 +46,12 @@ class EstadoReserva(models.TextChoices):
     USADA = 'usada', 'Usada'
 
 
+# Estados que ocupan el área (bloquean otras reservas del mismo horario)
+ESTADOS_BLOQUEANTES = [EstadoReserva.CONFIRMADA, EstadoReserva.PAGADA, EstadoReserva.USADA]
+
+# Estados que el barrido periódico cierra (expirada, cancelada o usada) cuando pasa su horario
+ESTADOS_POR_CERRAR = [EstadoReserva.PENDIENTE, EstadoReserva.CONFIRMADA, EstadoReserva.PAGADA]
+
 class AreaComun(models.Model):
     """
     Modelo para definir áreas comunes disponibles para reserva
@@ -124,7 +130,7 @@ class AreaComun(models.Model):
         reservas_conflictivas = Reserva.objects.filter(
             area_comun=self,
             fecha=fecha,
-            estado__in=[EstadoReserva.CONFIRMADA, EstadoReserva.PAGADA, EstadoReserva.USADA]
+            estado__in=ESTADOS_BLOQUEANTES
         ).filter(
             models.Q(hora_inicio__lt=hora_fin, hora_fin__gt=hora_inicio)
         )
@@ -262,6 +268,27 @@ class Reserva(models.Model):
         verbose_name = "Reserva"
         verbose_name_plural = "Reservas"
         ordering = ['-fecha', '-hora_inicio']
+        indexes = [
+            models.Index(fields=['area_comun', 'fecha', 'estado'], name='reserva_area_fecha_estado_idx'),
+            # Disponibilidad: solo reservas que bloquean, con el horario para leerlo desde el índice
+            models.Index(
+                fields=['area_comun', 'fecha', 'hora_inicio', 'hora_fin'],
+                condition=models.Q(estado__in=ESTADOS_BLOQUEANTES),
+                name='reserva_bloqueante_idx',
+            ),
+            # Listado del usuario en el orden del modelo
+            models.Index(fields=['usuario', '-fecha', '-hora_inicio'], name='reserva_usuario_fecha_idx'),
+            # Reportes por rango de fechas
+            models.Index(fields=['fecha', 'estado'], name='reserva_fecha_estado_idx'),
+            # Barrido de estados: solo las reservas que aún pueden cambiar
+            models.Index(
+                fields=['fecha', 'hora_inicio'],
+                condition=models.Q(estado__in=ESTADOS_POR_CERRAR),
+                name='reserva_por_cerrar_idx',
+            ),
+        ]
+        # En PostgreSQL, la migración 0004 agrega además la restricción de exclusión
+        # reserva_sin_solapamiento (GiST) sobre los mismos estados
 
     def __str__(self):
         return f"Reserva {self.area_comun.nombre} - {self.usuario.username} - {self.fecha}"
@@ -234,6 +234,46 @@ class CrearReservaSerializer(serializers.Serializer):
         return data
 
 
+class CrearReservaRecurrenteSerializer(serializers.Serializer):
+    """Serializer para crear reservas semanales recurrentes (p. ej. clases del gimnasio)"""
+
+    DIAS_SEMANA = ['lunes', 'martes', 'miercoles', 'jueves', 'viernes', 'sabado', 'domingo']
+    MAX_SEMANAS = 26
+
+    fecha_inicio = serializers.DateField()
+    dias_semana = serializers.ListField(
+        child=serializers.ChoiceField(choices=DIAS_SEMANA), min_length=1, max_length=7
+    )
+    semanas = serializers.IntegerField(min_value=1, max_value=MAX_SEMANAS, required=False)
+    fecha_fin = serializers.DateField(required=False)
+    hora_inicio = serializers.TimeField()
+    hora_fin = serializers.TimeField()
+    numero_personas = serializers.IntegerField(min_value=1, default=1)
+    observaciones = serializers.CharField(max_length=500, required=False, allow_blank=True)
+    todo_o_nada = serializers.BooleanField(
+        default=False,
+        help_text="Si es True y alguna fecha tiene conflicto no se crea ninguna reserva"
+    )
+
+    def validate_fecha_inicio(self, value):
+        """Validar que la fecha no sea en el pasado"""
+        if value < date.today():
+            raise serializers.ValidationError("No se pueden hacer reservas para fechas pasadas")
+        return value
+
+    def validate(self, data):
+        """Exactamente uno de semanas o fecha_fin, dentro de MAX_SEMANAS"""
+        if ('semanas' in data) == ('fecha_fin' in data):
+            raise serializers.ValidationError("Indique semanas o fecha_fin (solo uno)")
+        if 'fecha_fin' in data:
+            dias = (data['fecha_fin'] - data['fecha_inicio']).days
+            if dias < 0 or dias >= self.MAX_SEMANAS * 7:
+                raise serializers.ValidationError(
+                    f"fecha_fin debe estar entre fecha_inicio y {self.MAX_SEMANAS} semanas después"
+                )
+        return data
+
+
 class DisponibilidadSerializer(serializers.Serializer):
     """Serializer para consultar disponibilidad"""
 
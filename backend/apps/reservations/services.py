@@ -0,0 +1,367 @@
+"""
+Servicios del Módulo de Reservas
+
+La creación de reservas valida las reglas del área y luego, dentro de una
+transacción, bloquea la fila del área (select_for_update) antes de comprobar
+solapamientos e insertar: dos reservas simultáneas de la misma área se ejecutan
+una tras otra y la segunda ve a la primera, así que no pueden confirmarse ambas.
+En PostgreSQL la restricción reserva_sin_solapamiento lo garantiza también para
+escrituras que no pasan por este servicio; su IntegrityError se informa como
+HorarioNoDisponible.
+
+El barrido periódico (BarridoReservasService) cierra con UPDATEs por conjunto las
+reservas cuyo horario ya pasó, para que el estado guardado refleje la realidad.
+"""
+
+import logging
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .disponibilidad import DIAS_SEMANA, disponibilidad_service
+from .models import AreaComun, EstadoAreaComun, EstadoReserva, Reserva
+from .signals import notificar_reservas_modificadas
+
+logger = logging.getLogger(__name__)
+
+
+class ErrorReserva(ValueError):
+    """Reserva rechazada por una regla del área; codigo es el estado HTTP de la respuesta"""
+
+    codigo = 400
+
+    def __init__(self, mensaje, codigo=None):
+        super().__init__(mensaje)
+        if codigo:
+            self.codigo = codigo
+
+
+class HorarioNoDisponible(ErrorReserva):
+    """El horario se solapa con otra reserva (o el área dejó de estar activa)"""
+
+    codigo = 409
+
+
+class ReservaService:
+    """Validar y crear reservas sin carreras entre solicitudes simultáneas"""
+
+    @staticmethod
+    def duracion_horas(fecha, hora_inicio, hora_fin):
+        """Duración en horas; hora_fin <= hora_inicio termina al día siguiente"""
+        inicio = datetime.combine(fecha, hora_inicio)
+        fin = datetime.combine(fecha, hora_fin)
+        if fin <= inicio:
+            fin += timedelta(days=1)
+        return (fin - inicio).total_seconds() / 3600
+
+    def validar_reglas(self, area, usuario, fecha, hora_inicio, hora_fin, numero_personas=1):
+        """
+        Reglas del área que no dependen de la fecha ni de otras reservas
+
+        Returns:
+            float: Duración en horas
+
+        Raises:
+            ErrorReserva: Con el mensaje y el código HTTP de la regla incumplida
+        """
+        if not area.puede_reservar_usuario(usuario):
+            raise ErrorReserva('No tiene permisos para reservar esta área', 403)
+
+        if numero_personas > area.capacidad_maxima:
+            raise ErrorReserva(
+                f'El número de personas ({numero_personas}) excede la capacidad máxima ({area.capacidad_maxima})'
+            )
+
+        duracion = self.duracion_horas(fecha, hora_inicio, hora_fin)
+        if duracion < area.tiempo_minimo_reserva or duracion > area.tiempo_maximo_reserva:
+            raise ErrorReserva(
+                f'La duración debe estar entre {area.tiempo_minimo_reserva} y {area.tiempo_maximo_reserva} horas'
+            )
+        return duracion
+
+    @staticmethod
+    def validar_anticipacion(area, fecha, hora_inicio, ahora=None):
+        """Raises ErrorReserva si la reserva no respeta la anticipación mínima del área"""
+        # Interpretar la fecha/hora de reserva en la zona horaria actual (no UTC)
+        # para que coincida con el cálculo del frontend
+        inicio = timezone.make_aware(datetime.combine(fecha, hora_inicio), timezone.get_current_timezone())
+        horas_anticipacion = (inicio - (ahora or timezone.now())).total_seconds() / 3600
+        if horas_anticipacion < area.anticipo_minimo_horas:
+            raise ErrorReserva(f'Se requiere reserva con al menos {area.anticipo_minimo_horas} horas de anticipación')
+
+    def validar(self, area, usuario, fecha, hora_inicio, hora_fin, numero_personas=1, ahora=None):
+        """
+        Reglas del área que no dependen de otras reservas
+
+        Returns:
+            float: Duración en horas
+
+        Raises:
+            ErrorReserva: Con el mensaje y el código HTTP de la regla incumplida
+        """
+        duracion = self.validar_reglas(area, usuario, fecha, hora_inicio, hora_fin, numero_personas)
+        self.validar_anticipacion(area, fecha, hora_inicio, ahora)
+        return duracion
+
+    def reservar(self, area, usuario, fecha, hora_inicio, hora_fin, numero_personas=1, observaciones=''):
+        """
+        Crear una reserva de forma atómica
+
+        Raises:
+            ErrorReserva: Regla del área incumplida
+            HorarioNoDisponible: Solapamiento con una reserva confirmada, pagada o usada
+        """
+        duracion = self.validar(area, usuario, fecha, hora_inicio, hora_fin, numero_personas)
+
+        try:
+            with transaction.atomic():
+                # Bloqueo por área: las reservas simultáneas del área esperan aquí su turno
+                estado_area = AreaComun.objects.select_for_update().values_list(
+                    'estado', flat=True
+                ).get(pk=area.pk)
+                if estado_area != EstadoAreaComun.ACTIVA or disponibilidad_service.conflicto(
+                    area, fecha, hora_inicio, hora_fin
+                ):
+                    logger.info(
+                        'Reserva rechazada por conflicto: área=%s fecha=%s %s-%s usuario=%s',
+                        area.pk, fecha, hora_inicio, hora_fin, usuario.pk
+                    )
+                    raise HorarioNoDisponible('El horario solicitado no está disponible')
+
+                reserva = Reserva.objects.create(
+                    area_comun=area,
+                    usuario=usuario,
+                    fecha=fecha,
+                    hora_inicio=hora_inicio,
+                    hora_fin=hora_fin,
+                    duracion_horas=Decimal(str(duracion)),
+                    costo_total=area.calcular_costo_total(duracion),
+                    numero_personas=numero_personas,
+                    observaciones=observaciones,
+                    estado=EstadoReserva.PENDIENTE if area.requiere_aprobacion else EstadoReserva.CONFIRMADA
+                )
+        except IntegrityError:
+            # Solapamiento detectado por la restricción de exclusión
+            raise HorarioNoDisponible('El horario solicitado no está disponible')
+
+        logger.info(
+            'Reserva %s creada: área=%s fecha=%s %s-%s usuario=%s estado=%s',
+            reserva.pk, area.pk, fecha, hora_inicio, hora_fin, usuario.pk, reserva.estado
+        )
+        return reserva
+
+    @staticmethod
+    def fechas_recurrencia(fecha_inicio, dias_semana, semanas=None, fecha_fin=None):
+        """
+        Fechas de una recurrencia semanal (como RRULE FREQ=WEEKLY;BYDAY=...;COUNT/UNTIL)
+
+        Args:
+            dias_semana: Nombres de DIAS_SEMANA ('lunes', 'miercoles', ...)
+            semanas: Número de semanas desde fecha_inicio (excluyente con fecha_fin)
+            fecha_fin: Última fecha posible (incluida)
+        """
+        indices = {DIAS_SEMANA.index(dia) for dia in dias_semana}
+        ultima = fecha_fin or fecha_inicio + timedelta(weeks=semanas) - timedelta(days=1)
+        return [
+            fecha_inicio + timedelta(days=n)
+            for n in range((ultima - fecha_inicio).days + 1)
+            if (fecha_inicio + timedelta(days=n)).weekday() in indices
+        ]
+
+    def reservar_recurrente(self, area, usuario, fechas, hora_inicio, hora_fin, numero_personas=1,
+                            observaciones='', todo_o_nada=False):
+        """
+        Crear las reservas de varias fechas con el mismo horario en una transacción
+
+        Las reglas del área se validan una vez; la anticipación y los solapamientos, por
+        fecha, contra los intervalos ocupados leídos en una consulta. Las fechas sin
+        conflicto se insertan con bulk_create.
+
+        Returns:
+            dict: 'creadas' (reservas) y 'conflictos' (fecha y motivo de cada fecha omitida)
+
+        Raises:
+            ErrorReserva: Regla del área incumplida (se rechaza todo el lote)
+            HorarioNoDisponible: Con todo_o_nada, si alguna fecha tiene conflicto
+        """
+        fechas = sorted(set(fechas))
+        if not fechas:
+            raise ErrorReserva('La recurrencia no produce ninguna fecha')
+        duracion = self.validar_reglas(area, usuario, fechas[0], hora_inicio, hora_fin, numero_personas)
+        costo_total = area.calcular_costo_total(duracion)
+        estado = EstadoReserva.PENDIENTE if area.requiere_aprobacion else EstadoReserva.CONFIRMADA
+        ahora = timezone.now()
+
+        conflictos, nuevas = [], []
+        try:
+            with transaction.atomic():
+                estado_area = AreaComun.objects.select_for_update().values_list(
+                    'estado', flat=True
+                ).get(pk=area.pk)
+                if estado_area != EstadoAreaComun.ACTIVA:
+                    raise HorarioNoDisponible('El área no está disponible para reservas')
+
+                ocupados = disponibilidad_service.intervalos_ocupados(
+                    [area], fechas[0], fechas[-1] + timedelta(days=1)
+                )
+                # Con la misma hora de inicio y menos de 24 h, las fechas del lote no se solapan entre sí
+                for fecha in fechas:
+                    try:
+                        self.validar_anticipacion(area, fecha, hora_inicio, ahora)
+                    except ErrorReserva as e:
+                        conflictos.append({'fecha': fecha.isoformat(), 'motivo': str(e)})
+                        continue
+
+                    if any(
+                        disponibilidad_service.ocupado(ocupados.get((area.pk, dia), ([], [])), inicio, fin)
+                        for dia, inicio, fin in disponibilidad_service.tramos(fecha, hora_inicio, hora_fin)
+                    ):
+                        conflictos.append({'fecha': fecha.isoformat(), 'motivo': 'El horario solicitado no está disponible'})
+                        continue
+
+                    nuevas.append(Reserva(
+                        area_comun=area,
+                        usuario=usuario,
+                        fecha=fecha,
+                        hora_inicio=hora_inicio,
+                        hora_fin=hora_fin,
+                        duracion_horas=Decimal(str(round(duracion, 2))),
+                        costo_total=costo_total,
+                        numero_personas=numero_personas,
+                        observaciones=observaciones,
+                        estado=estado
+                    ))
+
+                if todo_o_nada and conflictos:
+                    raise HorarioNoDisponible(f'{len(conflictos)} de {len(fechas)} fecha(s) no están disponibles')
+
+                # bulk_create no llama a save() ni emite post_save: duración y costo ya vienen calculados
+                creadas = Reserva.objects.bulk_create(nuevas, batch_size=500)
+                notificar_reservas_modificadas([reserva.fecha for reserva in creadas], [usuario.pk])
+        except IntegrityError:
+            raise HorarioNoDisponible('El horario solicitado no está disponible')
+
+        logger.info(
+            'Reserva recurrente: área=%s usuario=%s %s-%s creadas=%s conflictos=%s',
+            area.pk, usuario.pk, hora_inicio, hora_fin, len(creadas), len(conflictos)
+        )
+        return {'creadas': creadas, 'conflictos': conflictos}
+
+
+class BarridoReservasService:
+    """
+    Transiciones automáticas de estado según la hora actual
+
+    - pendiente cuyo inicio pasó -> expirada (nunca se aprobó ni pagó a tiempo)
+    - confirmada con costo sin pagar al llegar el límite de pago -> cancelada
+    - confirmada sin costo o pagada cuyo horario terminó -> usada
+
+    Cada transición es un UPDATE filtrado por el estado de origen, así que volver a
+    ejecutar el barrido no cambia nada (idempotente) y varios procesos pueden
+    ejecutarlo a la vez. Las consultas usan el índice parcial reserva_por_cerrar_idx.
+    """
+
+    MOTIVO_SIN_PAGO = 'Cancelada automáticamente: no se pagó antes del límite'
+
+    @staticmethod
+    def _antes_de(momento, campo):
+        """Reservas cuyo fecha + campo (hora) es anterior a momento (hora local)"""
+        return Q(fecha__lt=momento.date()) | Q(fecha=momento.date(), **{f'{campo}__lt': momento.time()})
+
+    def _terminadas(self, ahora):
+        """Reservas cuyo horario terminó; hora_fin <= hora_inicio termina al día siguiente"""
+        return (
+            Q(hora_fin__gt=F('hora_inicio')) & self._antes_de(ahora, 'hora_fin')
+        ) | (
+            Q(hora_fin__lte=F('hora_inicio')) & self._antes_de(ahora - timedelta(days=1), 'hora_fin')
+        )
+
+    def transiciones(self, ahora, horas_limite_pago):
+        """(nombre, filtro, valores del UPDATE) en el orden en que se aplican"""
+        return [
+            ('expiradas', Q(estado=EstadoReserva.PENDIENTE) & self._antes_de(ahora, 'hora_inicio'), {
+                'estado': EstadoReserva.EXPIRADA,
+            }),
+            ('canceladas', Q(estado=EstadoReserva.CONFIRMADA, costo_total__gt=0) & self._antes_de(
+                ahora + timedelta(hours=horas_limite_pago), 'hora_inicio'
+            ), {
+                'estado': EstadoReserva.CANCELADA,
+                'motivo_cancelacion': self.MOTIVO_SIN_PAGO,
+                'fecha_cancelacion': ahora,
+            }),
+            ('usadas', (
+                Q(estado=EstadoReserva.PAGADA) | Q(estado=EstadoReserva.CONFIRMADA, costo_total=0)
+            ) & self._terminadas(ahora), {
+                'estado': EstadoReserva.USADA,
+            }),
+        ]
+
+    def barrer(self, ahora=None, horas_limite_pago=None):
+        """
+        Aplicar las transiciones en una transacción
+
+        update() no emite post_save: al final se llama a notificar_reservas_modificadas
+        con los días y usuarios afectados (disponibilidad y reportes).
+
+        Args:
+            ahora: Momento de referencia (por defecto ahora)
+            horas_limite_pago: Horas antes del inicio para pagar una confirmada con costo
+                (por defecto settings.RESERVAS_HORAS_LIMITE_PAGO)
+
+        Returns:
+            dict: fecha_hora, expiradas, canceladas, usadas, total y duracion_ms
+        """
+        inicio = time.monotonic()
+        ahora = timezone.localtime(ahora or timezone.now())
+        if horas_limite_pago is None:
+            horas_limite_pago = settings.RESERVAS_HORAS_LIMITE_PAGO
+
+        resultado = {'fecha_hora': ahora.isoformat()}
+        fechas, usuario_ids = set(), set()
+        with transaction.atomic():
+            for nombre, filtro, valores in self.transiciones(ahora, horas_limite_pago):
+                consulta = Reserva.objects.filter(filtro)
+                # Bloquear las filas y conocer los días y usuarios afectados antes del UPDATE
+                afectadas = list(consulta.select_for_update().order_by().values_list('fecha', 'usuario_id'))
+                resultado[nombre] = consulta.update(**valores, updated_at=ahora) if afectadas else 0
+                fechas.update(fecha for fecha, _ in afectadas)
+                usuario_ids.update(usuario_id for _, usuario_id in afectadas)
+
+            resultado['total'] = resultado['expiradas'] + resultado['canceladas'] + resultado['usadas']
+            if resultado['total']:
+                notificar_reservas_modificadas(fechas, usuario_ids)
+                self._registrar_auditoria(resultado)
+
+        resultado['duracion_ms'] = round((time.monotonic() - inicio) * 1000, 1)
+        logger.info(
+            'Barrido de reservas %s: %s expirada(s), %s cancelada(s), %s usada(s) en %sms',
+            resultado['fecha_hora'], resultado['expiradas'], resultado['canceladas'],
+            resultado['usadas'], resultado['duracion_ms']
+        )
+        return resultado
+
+    @staticmethod
+    def _registrar_auditoria(resultado):
+        """Registrar el barrido como una sola entrada de auditoría"""
+        from backend.apps.audit.models import TipoActividad, NivelImportancia
+        from backend.apps.audit.utils import AuditoriaLogger
+
+        AuditoriaLogger.registrar_actividad(
+            tipo_actividad=TipoActividad.ACTUALIZAR,
+            descripcion=(
+                f"Barrido de reservas: {resultado['expiradas']} expirada(s), "
+                f"{resultado['canceladas']} cancelada(s), {resultado['usadas']} usada(s)"
+            ),
+            nivel_importancia=NivelImportancia.BAJO,
+            datos_adicionales=resultado
+        )
+
+
+# Instancias globales de los servicios
+reserva_service = ReservaService()
+barrido_reservas_service = BarridoReservasService()
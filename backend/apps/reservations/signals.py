@@ -0,0 +1,45 @@
+"""
+Señales del Módulo de Reservas
+Incrementan la versión de disponibilidad (ETag y caché del calendario) cuando cambian
+reservas, horarios o áreas. Los cambios masivos (bulk_create, update) no emiten
+post_save: quien los haga debe llamar a notificar_reservas_modificadas().
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver, Signal
+
+from .disponibilidad import disponibilidad_service
+from .models import AreaComun, HorarioDisponible, Reserva
+
+
+# Emitida tras el commit de un cambio masivo de reservas
+# kwargs: fechas (días de las reservas afectadas), usuario_ids
+reservas_modificadas = Signal()
+
+
+def notificar_reservas_modificadas(fechas, usuario_ids=()):
+    """Emitir reservas_modificadas con los días y usuarios afectados cuando la transacción confirme"""
+    fechas = set(fechas)
+    usuario_ids = set(usuario_ids) - {None}
+    if fechas:
+        transaction.on_commit(lambda: reservas_modificadas.send(
+            sender=Reserva, fechas=fechas, usuario_ids=usuario_ids
+        ))
+
+
+@receiver(post_save, sender=Reserva)
+@receiver(post_delete, sender=Reserva)
+@receiver(post_save, sender=HorarioDisponible)
+@receiver(post_delete, sender=HorarioDisponible)
+@receiver(post_save, sender=AreaComun)
+@receiver(post_delete, sender=AreaComun)
+def invalidar_disponibilidad(sender, instance, **kwargs):
+    # Tras el commit, para que nadie guarde en caché datos viejos con la versión nueva
+    transaction.on_commit(disponibilidad_service.invalidar)
+
+
+@receiver(reservas_modificadas)
+def invalidar_disponibilidad_masiva(sender, **kwargs):
+    """Cambios masivos de reservas (emitida tras el commit)"""
+    disponibilidad_service.invalidar()
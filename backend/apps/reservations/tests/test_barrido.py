@@ -0,0 +1,121 @@
+"""
+Tests for the periodic reservation state sweep
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.utils import timezone
+
+from backend.apps.audit.models import RegistroAuditoria
+from backend.apps.reservations.disponibilidad import disponibilidad_service
+from backend.apps.reservations.models import AreaComun, EstadoReserva, Reserva
+from backend.apps.reservations.services import BarridoReservasService, barrido_reservas_service
+from backend.apps.reservations.signals import reservas_modificadas
+from .test_base import ReservationsTestBase
+
+
+class BarridoReservasTest(ReservationsTestBase):
+    """Test the set-based expiry, cancellation and used transitions"""
+
+    def setUp(self):
+        super().setUp()
+        self.hoy = timezone.localdate()
+        self.ayer = self.hoy - timedelta(days=1)
+        self.gratis = AreaComun.objects.create(
+            nombre='Gimnasio', tipo='gimnasio', capacidad_maxima=10,
+            costo_por_hora=Decimal('0.00'), costo_reserva=Decimal('0.00')
+        )
+
+    def momento(self, fecha, hora):
+        return timezone.make_aware(datetime.combine(fecha, time(hora)))
+
+    def barrer(self, hora=12, **opciones):
+        return barrido_reservas_service.barrer(ahora=self.momento(self.hoy, hora), **opciones)
+
+    def test_transitions_by_state_and_time(self):
+        """Past pending expire, unpaid confirmed are cancelled at start, finished ones become used"""
+        pendiente_pasada = self.crear_reserva(self.ayer, time(10), time(11), EstadoReserva.PENDIENTE)
+        pendiente_futura = self.crear_reserva(self.manana, time(10), time(11), EstadoReserva.PENDIENTE)
+        sin_pago = self.crear_reserva(self.hoy, time(9), time(10))
+        sin_pago_futura = self.crear_reserva(self.hoy, time(14), time(15))
+        pagada_terminada = self.crear_reserva(self.ayer, time(14), time(16), EstadoReserva.PAGADA)
+        pagada_en_curso = self.crear_reserva(self.hoy, time(11), time(13), EstadoReserva.PAGADA)
+        gratis_terminada = self.crear_reserva(self.ayer, time(10), time(11), area=self.gratis)
+
+        resultado = self.barrer()
+
+        self.assertEqual(
+            (resultado['expiradas'], resultado['canceladas'], resultado['usadas'], resultado['total']),
+            (1, 1, 2, 4)
+        )
+        estados = dict(Reserva.objects.values_list('pk', 'estado'))
+        self.assertEqual(estados[pendiente_pasada.pk], EstadoReserva.EXPIRADA)
+        self.assertEqual(estados[pendiente_futura.pk], EstadoReserva.PENDIENTE)
+        self.assertEqual(estados[sin_pago.pk], EstadoReserva.CANCELADA)
+        self.assertEqual(estados[sin_pago_futura.pk], EstadoReserva.CONFIRMADA)
+        self.assertEqual(estados[pagada_terminada.pk], EstadoReserva.USADA)
+        self.assertEqual(estados[pagada_en_curso.pk], EstadoReserva.PAGADA)
+        self.assertEqual(estados[gratis_terminada.pk], EstadoReserva.USADA)
+
+        sin_pago.refresh_from_db()
+        self.assertEqual(sin_pago.motivo_cancelacion, BarridoReservasService.MOTIVO_SIN_PAGO)
+        self.assertEqual(sin_pago.fecha_cancelacion, self.momento(self.hoy, 12))
+
+    def test_sweep_is_idempotent(self):
+        """A second run changes nothing and writes no audit entry"""
+        self.crear_reserva(self.ayer, time(10), time(11), EstadoReserva.PENDIENTE)
+        self.barrer()
+        auditoria_antes = RegistroAuditoria.objects.count()
+
+        resultado = self.barrer()
+        self.assertEqual(resultado['total'], 0)
+        self.assertEqual(RegistroAuditoria.objects.count(), auditoria_antes)
+
+    def test_overnight_reservation_used_after_next_day_end(self):
+        """A paid 22:00-02:00 booking stays paid until 02:00 of the following day"""
+        reserva = self.crear_reserva(self.ayer, time(22), time(2), EstadoReserva.PAGADA)
+
+        self.assertEqual(self.barrer(hora=1)['usadas'], 0)
+        self.assertEqual(self.barrer(hora=3)['usadas'], 1)
+        reserva.refresh_from_db()
+        self.assertEqual(reserva.estado, EstadoReserva.USADA)
+
+    def test_payment_deadline_before_start(self):
+        """With horas_limite_pago, unpaid bookings are released that many hours before they start"""
+        reserva = self.crear_reserva(self.manana, time(10), time(11))
+
+        self.assertEqual(self.barrer(horas_limite_pago=12)['canceladas'], 0)
+        self.assertEqual(self.barrer(horas_limite_pago=24)['canceladas'], 1)
+        reserva.refresh_from_db()
+        self.assertEqual(reserva.estado, EstadoReserva.CANCELADA)
+
+    def test_sweep_notifies_after_commit(self):
+        """update() emits no post_save, so the sweep notifies availability, reports and audit"""
+        recibidos = []
+
+        def receptor(sender, **kwargs):
+            recibidos.append(kwargs)
+
+        reservas_modificadas.connect(receptor)
+        self.addCleanup(reservas_modificadas.disconnect, receptor)
+        self.crear_reserva(self.ayer, time(10), time(11), EstadoReserva.PENDIENTE)
+        version = disponibilidad_service.version()
+        auditoria_antes = RegistroAuditoria.objects.count()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.barrer()
+
+        self.assertNotEqual(disponibilidad_service.version(), version)
+        self.assertEqual(RegistroAuditoria.objects.count(), auditoria_antes + 1)
+        self.assertEqual(len(recibidos), 1)
+        self.assertEqual(recibidos[0]['fechas'], {self.ayer})
+        self.assertEqual(recibidos[0]['usuario_ids'], {self.user_resident.pk})
+
+    def test_management_command(self):
+        """The command reports the counts of each transition"""
+        self.crear_reserva(self.ayer, time(10), time(11), EstadoReserva.PENDIENTE)
+        salida = StringIO()
+        call_command('barrer_reservas', stdout=salida)
+        self.assertIn('1 expirada(s), 0 cancelada(s), 0 usada(s)', salida.getvalue())
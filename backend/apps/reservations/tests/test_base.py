@@ -0,0 +1,65 @@
+"""
+Base classes and utilities for reservations tests
+"""
+from datetime import time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from backend.apps.reservations.disponibilidad import DIAS_SEMANA
+from backend.apps.reservations.models import AreaComun, EstadoReserva, HorarioDisponible, Reserva
+
+
+class ReservationsTestBase(APITestCase):
+    """Base class for reservations tests with an area open every day from 08:00 to 20:00"""
+
+    def setUp(self):
+        """Set up test users, a common area with its schedule and authentication helpers"""
+        User = get_user_model()
+
+        self.user_admin = User.objects.create_user(
+            username='admin_test',
+            email='admin@test.com',
+            password='password123',
+            role='admin'
+        )
+
+        self.user_resident = User.objects.create_user(
+            username='resident_test',
+            email='resident@test.com',
+            password='password123',
+            role='resident'
+        )
+
+        self.area = AreaComun.objects.create(
+            nombre='Salón de Eventos',
+            tipo='salon_eventos',
+            capacidad_maxima=50,
+            costo_por_hora=Decimal('10.00'),
+            costo_reserva=Decimal('5.00'),
+            tiempo_minimo_reserva=1,
+            tiempo_maximo_reserva=4,
+            anticipo_minimo_horas=0
+        )
+        HorarioDisponible.objects.bulk_create([
+            HorarioDisponible(area_comun=self.area, dia_semana=dia, hora_apertura=time(8), hora_cierre=time(20))
+            for dia in DIAS_SEMANA
+        ])
+        self.manana = timezone.localdate() + timedelta(days=1)
+
+    def authenticate_as_admin(self):
+        """Authenticate as admin user"""
+        self.client.force_authenticate(user=self.user_admin)
+
+    def authenticate_as_resident(self):
+        """Authenticate as resident user"""
+        self.client.force_authenticate(user=self.user_resident)
+
+    def crear_reserva(self, fecha, hora_inicio, hora_fin, estado=EstadoReserva.CONFIRMADA, area=None):
+        """Create a reservation for the resident without going through the API"""
+        return Reserva.objects.create(
+            area_comun=area or self.area, usuario=self.user_resident, fecha=fecha,
+            hora_inicio=hora_inicio, hora_fin=hora_fin, estado=estado
+        )
@@ -0,0 +1,120 @@
+"""
+Tests for the multi-area availability calendar
+"""
+from datetime import time, timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from backend.apps.reservations.disponibilidad import disponibilidad_service
+from backend.apps.reservations.models import AreaComun, HorarioDisponible
+from backend.settings_test import CACHE_LOCAL
+from .test_base import ReservationsTestBase
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class CalendarioTest(ReservationsTestBase):
+    """Test the cell encoding, constant query count and ETag revalidation"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.authenticate_as_resident()
+        self.url = reverse('reservations:area-comun-calendario')
+        self.gimnasio = AreaComun.objects.create(
+            nombre='Gimnasio', tipo='gimnasio', capacidad_maxima=10, costo_por_hora=Decimal('0.00')
+        )
+        HorarioDisponible.objects.create(
+            area_comun=self.gimnasio, dia_semana='lunes', hora_apertura=time(6), hora_cierre=time(12)
+        )
+        self.rango = {
+            'fecha_inicio': self.manana.isoformat(),
+            'fecha_fin': (self.manana + timedelta(days=6)).isoformat(),
+        }
+
+    def obtener(self, **params):
+        return self.client.get(self.url, {**self.rango, **params})
+
+    def test_cells_are_run_length_encoded(self):
+        """Closed, free and busy hours come out as runs per area-day"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.crear_reserva(self.manana, time(10), time(11, 30))
+        response = self.obtener(areas=str(self.area.pk))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['areas']), 1)
+        dias = response.data['areas'][0]['dias']
+        self.assertEqual(len(dias), 7)
+        self.assertEqual(dias[self.manana.isoformat()], '16C4L3O17L8C')
+        self.assertEqual(dias[(self.manana + timedelta(days=1)).isoformat()], '16C24L8C')
+
+    def test_bitmap_encoding_and_hourly_resolution(self):
+        """codificacion=mapa returns one letter per cell of the day"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.crear_reserva(self.manana, time(10), time(11, 30))
+        response = self.obtener(areas=str(self.area.pk), codificacion='mapa', resolucion=60)
+
+        mapa = response.data['areas'][0]['dias'][self.manana.isoformat()]
+        self.assertEqual(mapa, 'C' * 8 + 'LL' + 'OO' + 'L' * 8 + 'CCCC')
+
+    def test_areas_without_schedule_are_closed(self):
+        """The gym only opens on Mondays; every other day is fully closed"""
+        response = self.obtener(areas=str(self.gimnasio.pk))
+        dias = response.data['areas'][0]['dias']
+        for offset in range(7):
+            fecha = self.manana + timedelta(days=offset)
+            self.assertEqual(dias[fecha.isoformat()], '12C12L24C' if fecha.weekday() == 0 else '48C')
+
+    def test_query_count_does_not_grow_with_areas_or_reservations(self):
+        """Areas, schedules and reservations are read with one query each"""
+        with CaptureQueriesContext(connection) as inicial:
+            self.obtener(areas=str(self.area.pk))
+        for dia in range(7):
+            self.crear_reserva(self.manana + timedelta(days=dia), time(9), time(10), area=self.gimnasio)
+        for i in range(3):
+            AreaComun.objects.create(nombre=f'Cancha {i}', tipo='cancha_tenis', capacidad_maxima=4)
+
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.obtener()
+        self.assertEqual(len(response.data['areas']), 5)
+        self.assertEqual(len(consultas.captured_queries), len(inicial.captured_queries))
+
+    def test_etag_revalidates_until_reservations_change(self):
+        """A matching If-None-Match gets 304 with no queries until a reservation is saved"""
+        primera = self.obtener()
+        etag = primera['ETag']
+        self.assertEqual(primera['Cache-Control'], 'private, no-cache')
+
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(self.url, self.rango, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(len(consultas.captured_queries), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.crear_reserva(self.manana, time(14), time(15))
+        response = self.client.get(self.url, self.rango, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn('O', response.data['areas'][0]['dias'][self.manana.isoformat()])
+
+    def test_invalid_parameters_are_rejected(self):
+        """Missing dates, long ranges and unknown resolutions return 400"""
+        for params in (
+            {'fecha_inicio': self.manana.isoformat()},
+            {**self.rango, 'fecha_fin': (self.manana + timedelta(days=60)).isoformat()},
+            {**self.rango, 'resolucion': 45},
+            {**self.rango, 'codificacion': 'png'},
+            {**self.rango, 'areas': 'x'},
+        ):
+            self.assertEqual(self.client.get(self.url, params).status_code, status.HTTP_400_BAD_REQUEST, params)
+
+    def test_version_increments_on_invalidation(self):
+        """invalidar() moves the data version forward"""
+        version = disponibilidad_service.version()
+        disponibilidad_service.invalidar()
+        self.assertGreater(disponibilidad_service.version(), version)
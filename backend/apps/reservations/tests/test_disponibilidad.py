@@ -0,0 +1,108 @@
+"""
+Tests for the interval-based availability endpoint
+"""
+from datetime import time, timedelta
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from backend.apps.reservations.disponibilidad import disponibilidad_service
+from backend.apps.reservations.models import EstadoReserva, HorarioDisponible
+from .test_base import ReservationsTestBase
+
+
+class DisponibilidadTest(ReservationsTestBase):
+    """Test merged intervals, slot resolution, variable slots and multi-day ranges"""
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate_as_resident()
+        self.url = reverse('reservations:area-comun-disponibilidad', args=[self.area.pk])
+
+    def slots(self, response):
+        return {slot['hora_inicio']: slot['disponible'] for slot in response.data['slots_disponibles']}
+
+    def test_intervals_are_merged_and_searched(self):
+        """Overlapping and adjacent intervals merge; a slot is busy only if it overlaps one"""
+        fusionados = disponibilidad_service.fusionar([(600, 660), (540, 600), (630, 700), (800, 860)])
+        self.assertEqual(fusionados, ([540, 800], [700, 860]))
+        self.assertTrue(disponibilidad_service.ocupado(fusionados, 690, 750))
+        self.assertFalse(disponibilidad_service.ocupado(fusionados, 700, 800))
+        self.assertFalse(disponibilidad_service.ocupado(([], []), 0, 60))
+
+    def test_single_day_keeps_response_shape(self):
+        """Blocking reservations mark their slots busy; cancelled ones do not"""
+        self.crear_reserva(self.manana, time(10), time(12))
+        self.crear_reserva(self.manana, time(15), time(16), estado=EstadoReserva.CANCELADA)
+
+        response = self.client.get(self.url, {'fecha': self.manana.isoformat()})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        slots = self.slots(response)
+        self.assertEqual(len(slots), 12)
+        self.assertEqual([hora for hora, libre in slots.items() if not libre], ['10:00', '11:00'])
+        self.assertEqual(response.data['slots_disponibles'][0]['costo_total'], '15.00')
+        self.assertEqual(response.data['horario_disponible'], {'hora_apertura': '08:00', 'hora_cierre': '20:00'})
+
+    def test_variable_slot_length_and_step(self):
+        """duracion and paso produce overlapping 90-minute slots every 30 minutes"""
+        self.crear_reserva(self.manana, time(9), time(10))
+        response = self.client.get(self.url, {'fecha': self.manana.isoformat(), 'duracion': '1.5', 'paso': 30})
+
+        slots = response.data['slots_disponibles']
+        self.assertEqual(slots[0], {
+            'hora_inicio': '08:00', 'hora_fin': '09:30', 'disponible': False,
+            'duracion_horas': 1.5, 'costo_total': '20.00'
+        })
+        self.assertEqual(slots[-1]['hora_inicio'], '18:30')
+        libres = self.slots(response)
+        self.assertFalse(libres['09:30'])
+        self.assertTrue(libres['10:00'])
+
+    def test_overnight_reservation_blocks_next_morning(self):
+        """A reservation ending after midnight blocks the start of the following day"""
+        HorarioDisponible.objects.filter(area_comun=self.area).update(hora_apertura=time(0), hora_cierre=time(0))
+        self.crear_reserva(self.manana, time(22), time(2))
+        response = self.client.get(self.url, {
+            'fecha': self.manana.isoformat(), 'fecha_fin': (self.manana + timedelta(days=1)).isoformat()
+        })
+
+        primero, segundo = response.data['dias']
+        self.assertEqual(len(primero['slots_disponibles']), 24)
+        self.assertFalse(primero['slots_disponibles'][23]['disponible'])
+        self.assertEqual([s['disponible'] for s in segundo['slots_disponibles'][:3]], [False, False, True])
+
+    def test_week_view_uses_constant_queries(self):
+        """A seven-day range is one call whose query count does not grow with reservations"""
+        semana = {'fecha': self.manana.isoformat(), 'fecha_fin': (self.manana + timedelta(days=6)).isoformat()}
+        HorarioDisponible.objects.filter(area_comun=self.area, dia_semana='domingo').delete()
+
+        with CaptureQueriesContext(connection) as inicial:
+            self.client.get(self.url, semana)
+        for dia in range(7):
+            self.crear_reserva(self.manana + timedelta(days=dia), time(8), time(9))
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(self.url, semana)
+
+        self.assertEqual(len(consultas.captured_queries), len(inicial.captured_queries))
+        self.assertEqual(len(response.data['dias']), 7)
+        for dia in response.data['dias']:
+            if dia['dia_semana'] == 'domingo':
+                self.assertIsNone(dia['horario_disponible'])
+                self.assertEqual(dia['slots_disponibles'], [])
+            else:
+                self.assertFalse(dia['slots_disponibles'][0]['disponible'])
+
+    def test_invalid_parameters_are_rejected(self):
+        """Out-of-range durations, long ranges and tiny steps return 400"""
+        fecha = self.manana.isoformat()
+        for params in (
+            {'fecha': fecha, 'duracion': '6'},
+            {'fecha': fecha, 'duracion': 'abc'},
+            {'fecha': fecha, 'paso': '5'},
+            {'fecha': fecha, 'fecha_fin': (self.manana + timedelta(days=40)).isoformat()},
+            {'fecha': fecha, 'fecha_fin': (self.manana - timedelta(days=1)).isoformat()},
+        ):
+            self.assertEqual(self.client.get(self.url, params).status_code, status.HTTP_400_BAD_REQUEST, params)
@@ -0,0 +1,86 @@
+"""
+Query plan regression tests for the Reserva indexes on a large reservation history
+"""
+from datetime import time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from backend.apps.reservations.disponibilidad import disponibilidad_service
+from backend.apps.reservations.models import AreaComun, ESTADOS_BLOQUEANTES, EstadoReserva, Reserva
+
+TOTAL_RESERVAS = 100_000
+AREAS = 20
+USUARIOS = 50
+HORAS = range(8, 20)
+ESTADOS = [
+    EstadoReserva.CONFIRMADA, EstadoReserva.PAGADA, EstadoReserva.USADA,
+    EstadoReserva.CANCELADA, EstadoReserva.PENDIENTE, EstadoReserva.EXPIRADA,
+]
+
+
+class IndicesReservaTest(TestCase):
+    """Availability, per-user and date-range queries are index scans with 100k reservations"""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.usuarios = User.objects.bulk_create([
+            User(username=f'residente{i}', email=f'residente{i}@test.com', role='resident') for i in range(USUARIOS)
+        ])
+        cls.areas = AreaComun.objects.bulk_create([
+            AreaComun(nombre=f'Área {i}', tipo='salon_eventos', capacidad_maxima=20) for i in range(AREAS)
+        ])
+        cls.hoy = timezone.localdate()
+
+        # Una reserva por área, día y hora, hacia atrás desde hoy (sin solapamientos)
+        reservas = []
+        dia = 0
+        while len(reservas) < TOTAL_RESERVAS:
+            fecha = cls.hoy - timedelta(days=dia)
+            for area in cls.areas:
+                for hora in HORAS:
+                    n = len(reservas)
+                    reservas.append(Reserva(
+                        area_comun=area, usuario=cls.usuarios[n % USUARIOS], fecha=fecha,
+                        hora_inicio=time(hora), hora_fin=time(hora + 1), duracion_horas=Decimal('1'),
+                        costo_total=Decimal('10'), estado=ESTADOS[n % len(ESTADOS)]
+                    ))
+            dia += 1
+        Reserva.objects.bulk_create(reservas, batch_size=5000)
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE reservations_reserva')
+
+    def assertUsaIndice(self, queryset, indice):
+        plan = queryset.explain()
+        self.assertIn(indice, plan, f'Plan sin {indice}:\n{plan}')
+
+    def test_history_size(self):
+        """The fixture holds at least 100k reservations"""
+        self.assertGreaterEqual(Reserva.objects.count(), TOTAL_RESERVAS)
+
+    def test_availability_uses_partial_index(self):
+        """Blocking reservations of an area in a week come from the partial index"""
+        queryset = disponibilidad_service.reservas_bloqueantes(
+            [self.areas[3]], self.hoy - timedelta(days=7), self.hoy
+        ).values_list('area_comun_id', 'fecha', 'hora_inicio', 'hora_fin')
+        # SQLite no usa un índice parcial cuando los estados llegan como parámetros
+        indice = 'reserva_bloqueante_idx' if connection.vendor == 'postgresql' else 'reserva_area_fecha_estado_idx'
+        self.assertUsaIndice(queryset, indice)
+
+    def test_user_list_uses_user_date_index(self):
+        """A resident's reservations in model order use the (usuario, -fecha, -hora_inicio) index"""
+        queryset = Reserva.objects.filter(usuario=self.usuarios[7])
+        self.assertUsaIndice(queryset, 'reserva_usuario_fecha_idx')
+
+    def test_report_date_range_uses_date_index(self):
+        """Occupancy reports over a month read the (fecha, estado) index"""
+        queryset = Reserva.objects.filter(
+            fecha__range=(self.hoy - timedelta(days=30), self.hoy), estado__in=ESTADOS_BLOQUEANTES
+        ).values('fecha')
+        self.assertUsaIndice(queryset, 'reserva_fecha_estado_idx')
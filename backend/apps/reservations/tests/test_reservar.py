@@ -0,0 +1,129 @@
+"""
+Tests for the atomic booking path and the concurrent booking simulation
+"""
+import importlib
+import io
+from contextlib import redirect_stdout
+from datetime import time, timedelta
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.test import TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from backend.apps.reservations.models import AreaComun, EstadoReserva, Reserva
+from .test_base import ReservationsTestBase
+
+
+class ReservarTest(ReservationsTestBase):
+    """Test booking validation, clean 409 conflicts and the per-area lock"""
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate_as_resident()
+        self.url = reverse('reservations:area-comun-reservar', args=[self.area.pk])
+
+    def reservar(self, hora_inicio, hora_fin, fecha=None, **extra):
+        return self.client.post(self.url, {
+            'fecha': (fecha or self.manana).isoformat(), 'hora_inicio': hora_inicio, 'hora_fin': hora_fin, **extra
+        }, format='json')
+
+    def test_booking_is_created_without_console_output(self):
+        """A valid booking returns 201 and prints nothing to stdout"""
+        salida = io.StringIO()
+        with redirect_stdout(salida):
+            response = self.reservar('10:00', '12:00')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(salida.getvalue(), '')
+        reserva = Reserva.objects.get()
+        self.assertEqual((reserva.estado, reserva.costo_total), (EstadoReserva.CONFIRMADA, 25))
+
+    def test_overlap_returns_clean_conflict(self):
+        """An overlapping request gets 409 with an error message and creates nothing"""
+        self.crear_reserva(self.manana, time(11), time(13))
+        response = self.reservar('10:00', '12:00')
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data, {'error': 'El horario solicitado no está disponible'})
+        self.assertEqual(Reserva.objects.count(), 1)
+
+    def test_overnight_reservation_conflicts_next_day(self):
+        """A booking that crosses midnight blocks the early hours of the next day"""
+        self.area.tiempo_maximo_reserva = 6
+        self.area.save()
+        self.crear_reserva(self.manana, time(22), time(2))
+        response = self.reservar('01:00', '02:00', fecha=self.manana + timedelta(days=1))
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+    def test_rule_violations_keep_their_status(self):
+        """Capacity and duration rules return 400; non-resident roles return 403"""
+        self.assertEqual(self.reservar('10:00', '16:00').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            self.reservar('10:00', '11:00', numero_personas=51).status_code, status.HTTP_400_BAD_REQUEST
+        )
+        guardia = get_user_model().objects.create_user(username='guardia', password='x', role='security')
+        self.client.force_authenticate(user=guardia)
+        self.assertEqual(self.reservar('10:00', '11:00').status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_area_row_is_locked_before_checking_overlaps(self):
+        """The availability check runs after select_for_update on the area"""
+        with patch.object(AreaComun.objects, 'select_for_update', wraps=AreaComun.objects.select_for_update) as bloqueo:
+            response = self.reservar('10:00', '11:00')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        bloqueo.assert_called_once_with()
+
+
+    def test_admin_update_conflict_returns_409(self):
+        """An admin PATCH rejected by the overlap constraint is a 409, not a 500"""
+        reserva = self.crear_reserva(self.manana, time(10), time(11), estado=EstadoReserva.PENDIENTE)
+        self.authenticate_as_admin()
+        url = reverse('reservations:reserva-detail', args=[reserva.pk])
+        with patch.object(Reserva, 'save', side_effect=IntegrityError('reserva_sin_solapamiento')):
+            response = self.client.patch(url, {'estado': EstadoReserva.CONFIRMADA}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        reserva.refresh_from_db()
+        self.assertEqual(reserva.estado, EstadoReserva.PENDIENTE)
+
+    @skipUnless(connection.vendor == 'postgresql', 'tsrange solo existe en PostgreSQL')
+    def test_migration_lists_existing_overlaps(self):
+        """The exclusion constraint migration stops with the overlapping pairs instead of a raw error"""
+        migracion = importlib.import_module('backend.apps.reservations.migrations.0004_reserva_sin_solapamiento')
+        primera = self.crear_reserva(self.manana, time(22), time(2))
+        segunda = self.crear_reserva(self.manana + timedelta(days=1), time(1), time(3), estado=EstadoReserva.PENDIENTE)
+        with connection.cursor() as cursor:
+            migracion.verificar_solapadas(cursor)
+
+            Reserva.objects.filter(pk=segunda.pk).update(estado=EstadoReserva.PAGADA)
+            with self.assertRaisesMessage(RuntimeError, f'reserva {primera.pk}'):
+                migracion.verificar_solapadas(cursor)
+
+
+class ReservaConcurrenteTest(TransactionTestCase):
+    """Burst of simultaneous requests for the same slot"""
+
+    def test_burst_confirms_a_single_booking(self):
+        """Only one of the simultaneous requests is confirmed; the rest get a conflict"""
+        User = get_user_model()
+        for i in range(6):
+            User.objects.create_user(username=f'vecino{i}', password='x', role='resident')
+        area = AreaComun.objects.create(
+            nombre='Piscina', tipo='piscina', capacidad_maxima=20, anticipo_minimo_horas=0
+        )
+        manana = timezone.localdate() + timedelta(days=1)
+
+        salida = io.StringIO()
+        call_command(
+            'simular_reservas_concurrentes', area=area.pk, solicitudes=6,
+            fecha=manana.isoformat(), conservar=True, stdout=salida
+        )
+
+        self.assertIn('1 creada(s)', salida.getvalue())
+        self.assertIn('Sin dobles reservas', salida.getvalue())
+        self.assertEqual(Reserva.objects.filter(area_comun=area, estado=EstadoReserva.CONFIRMADA).count(), 1)
@@ -0,0 +1,106 @@
+"""
+Tests for recurring (weekly) bulk reservation creation
+"""
+from datetime import time, timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from backend.apps.reservations.disponibilidad import DIAS_SEMANA, disponibilidad_service
+from backend.apps.reservations.models import EstadoReserva, Reserva
+from backend.apps.reservations.services import reserva_service
+from backend.settings_test import CACHE_LOCAL
+from .test_base import ReservationsTestBase
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class ReservaRecurrenteTest(ReservationsTestBase):
+    """Test occurrence expansion, per-date conflicts, all-or-nothing and query count"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.authenticate_as_resident()
+        self.url = reverse('reservations:area-comun-reservar-recurrente', args=[self.area.pk])
+        # Próximo lunes
+        self.lunes = self.manana + timedelta(days=(7 - self.manana.weekday()) % 7)
+
+    def reservar(self, **datos):
+        return self.client.post(self.url, {
+            'fecha_inicio': self.lunes.isoformat(), 'dias_semana': ['lunes', 'miercoles'],
+            'hora_inicio': '18:00', 'hora_fin': '19:00', **datos
+        }, format='json')
+
+    def test_weekly_occurrences(self):
+        """Mondays and Wednesdays for three weeks are six dates"""
+        fechas = reserva_service.fechas_recurrencia(self.lunes, ['lunes', 'miercoles'], semanas=3)
+        self.assertEqual(len(fechas), 6)
+        self.assertEqual({DIAS_SEMANA[fecha.weekday()] for fecha in fechas}, {'lunes', 'miercoles'})
+        self.assertEqual(fechas[-1], self.lunes + timedelta(days=16))
+
+    def test_semester_is_created_with_constant_queries(self):
+        """Twenty-six weeks of bookings are one bulk insert with a handful of queries"""
+        with CaptureQueriesContext(connection) as consultas:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.reservar(semanas=26)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['total_creadas'], 52)
+        self.assertEqual(response.data['conflictos'], [])
+        self.assertLess(len(consultas.captured_queries), 12)
+        reserva = Reserva.objects.filter(area_comun=self.area).first()
+        self.assertEqual((reserva.duracion_horas, reserva.costo_total, reserva.estado), (1, 15, EstadoReserva.CONFIRMADA))
+
+    def test_conflicting_dates_are_reported_and_skipped(self):
+        """Occupied dates come back with a reason; the others are created"""
+        ocupada = self.lunes + timedelta(days=9)
+        self.crear_reserva(ocupada, time(18, 30), time(20))
+        response = self.reservar(semanas=2)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['total_creadas'], 3)
+        self.assertEqual(response.data['conflictos'], [
+            {'fecha': ocupada.isoformat(), 'motivo': 'El horario solicitado no está disponible'}
+        ])
+
+    def test_all_or_nothing_rolls_back(self):
+        """With todo_o_nada a single conflict creates nothing and returns 409"""
+        self.crear_reserva(self.lunes, time(18), time(19))
+        response = self.reservar(semanas=4, todo_o_nada=True)
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(Reserva.objects.count(), 1)
+
+    def test_overnight_occurrences_check_the_next_day(self):
+        """A 23:00-00:30 occurrence conflicts with a booking early the following morning"""
+        self.area.tiempo_maximo_reserva = 2
+        self.area.save()
+        self.crear_reserva(self.lunes + timedelta(days=1), time(0), time(1))
+        response = self.reservar(
+            semanas=1, dias_semana=['lunes', 'martes'], hora_inicio='23:00', hora_fin='00:30'
+        )
+
+        self.assertEqual(response.data['total_creadas'], 1)
+        self.assertEqual([c['fecha'] for c in response.data['conflictos']], [self.lunes.isoformat()])
+
+    def test_bulk_insert_bumps_availability_version(self):
+        """bulk_create emits reservas_modificadas after commit, which invalidates the calendar"""
+        version = disponibilidad_service.version()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.reservar(semanas=1)
+        self.assertGreater(disponibilidad_service.version(), version)
+
+    def test_invalid_recurrence_is_rejected(self):
+        """semanas and fecha_fin are mutually exclusive; area rules reject the whole batch"""
+        self.assertEqual(self.reservar().status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            self.reservar(semanas=2, fecha_fin=self.lunes.isoformat()).status_code, status.HTTP_400_BAD_REQUEST
+        )
+        self.assertEqual(self.reservar(semanas=27).status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.reservar(semanas=2, hora_fin='23:00')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('duración', response.data['error'])
@@ -30,7 +30,9 @@ Endpoints disponibles:
 - PATCH  /api/reservations/areas/{id}/                - Actualizar área común parcial (admin)
 - DELETE /api/reservations/areas/{id}/                - Eliminar área común (admin)
 - GET    /api/reservations/areas/{id}/disponibilidad/ - Consultar disponibilidad (T1)
+- GET    /api/reservations/areas/calendario/          - Calendario de varias áreas y días (RLE, ETag)
 - POST   /api/reservations/areas/{id}/reservar/       - Reservar área común (T2)
+- POST   /api/reservations/areas/{id}/reservar_recurrente/ - Reservas semanales en lote
 
 RESERVAS:
 - GET    /api/reservations/reservas/                  - Listar reservas (filtrado por permisos)
@@ -8,19 +8,24 @@ Permisos:
 - Seguridad: Solo lectura de áreas comunes y reservas
 """
 
+import logging
+
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
 from django.db.models import Q
-from django.utils import timezone
-from datetime import date, time, datetime, timedelta, timezone as dt_timezone
-from decimal import Decimal
+from django.http import HttpResponseNotModified
+from datetime import date, time, datetime, timezone as dt_timezone
+from decimal import Decimal, InvalidOperation
 
+from .disponibilidad import DisponibilidadService, disponibilidad_service
+from .services import ErrorReserva, reserva_service
 from .models import (
     AreaComun, Reserva, HorarioDisponible,
-    EstadoAreaComun, EstadoReserva, TipoAreaComun
+    EstadoAreaComun, TipoAreaComun
 )
 from .serializers import (
     AreaComunSerializer,
@@ -28,6 +33,7 @@ from .serializers import (
     ReservaSerializer,
     ReservaListSerializer,
     CrearReservaSerializer,
+    CrearReservaRecurrenteSerializer,
     DisponibilidadSerializer,
     ConfirmarReservaSerializer,
     CancelarReservaSerializer,
@@ -35,6 +41,7 @@ from .serializers import (
 )
 
 User = get_user_model()
+logger = logging.getLogger(__name__)
 
 
 class IsAdminOrResident(permissions.BasePermission):
@@ -107,6 +114,13 @@ class AreaComunViewSet(viewsets.ModelViewSet):
         T1: Consultar Disponibilidad de Área Común
 
         GET /api/reservations/areas/{id}/disponibilidad/?fecha=2025-09-25
+
+        Parámetros opcionales:
+        - fecha_fin: último día del rango (vista semanal), hasta 31 días
+        - duracion: horas de cada slot (por defecto tiempo_minimo_reserva)
+        - paso: minutos entre inicios de slot (por defecto la duración)
+
+        Con fecha_fin la respuesta trae un elemento por día en 'dias'.
         """
         area = self.get_object()
         fecha_str = request.query_params.get('fecha', None)
@@ -117,8 +131,10 @@ class AreaComunViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        fecha_fin_str = request.query_params.get('fecha_fin', None)
         try:
             fecha = datetime.strptime(fecha_str, '%Y-%m-%d').date()
+            fecha_fin = datetime.strptime(fecha_fin_str, '%Y-%m-%d').date() if fecha_fin_str else fecha
         except ValueError:
             return Response(
                 {'error': 'Formato de fecha inválido. Use YYYY-MM-DD'},
@@ -132,56 +148,135 @@ class AreaComunViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Obtener horarios disponibles para este día de la semana
-        dia_semana = ['lunes', 'martes', 'miercoles', 'jueves', 'viernes', 'sabado', 'domingo'][fecha.weekday()]
+        if fecha_fin < fecha or (fecha_fin - fecha).days >= DisponibilidadService.MAX_DIAS:
+            return Response(
+                {'error': f'fecha_fin debe estar entre fecha y {DisponibilidadService.MAX_DIAS} días después'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
         try:
-            horario = HorarioDisponible.objects.get(
-                area_comun=area,
-                dia_semana=dia_semana,
-                activo=True
+            duracion = Decimal(request.query_params.get('duracion') or area.tiempo_minimo_reserva)
+            paso = int(request.query_params['paso']) if request.query_params.get('paso') else None
+            if not duracion.is_finite():
+                raise ValueError
+        except (InvalidOperation, ValueError):
+            return Response(
+                {'error': 'duracion (horas) y paso (minutos) deben ser numéricos'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if not area.tiempo_minimo_reserva <= duracion <= area.tiempo_maximo_reserva or (duracion * 60) % 1:
+            return Response(
+                {'error': f'La duración debe estar entre {area.tiempo_minimo_reserva} y {area.tiempo_maximo_reserva} horas'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if paso is not None and paso < 15:
+            return Response(
+                {'error': 'El paso mínimo entre slots es de 15 minutos'},
+                status=status.HTTP_400_BAD_REQUEST
             )
-        except HorarioDisponible.DoesNotExist:
+
+        dias = disponibilidad_service.calcular(area, fecha, fecha_fin, duracion, paso)
+
+        if fecha_fin_str:
+            return Response({
+                'area_comun': AreaComunListSerializer(area).data,
+                'fecha_inicio': fecha.isoformat(),
+                'fecha_fin': fecha_fin.isoformat(),
+                'dias': dias,
+                'tiempo_minimo_reserva': area.tiempo_minimo_reserva,
+                'anticipacion_minima_horas': area.anticipo_minimo_horas
+            })
+
+        dia = dias[0]
+        if dia['horario_disponible'] is None:
             return Response({
                 'disponible': False,
                 'mensaje': f'El área no está disponible este día de la semana',
                 'horarios_disponibles': []
             })
 
-        # Generar slots de tiempo disponibles (cada tiempo_minimo_reserva horas)
-        slots_disponibles = []
-        hora_actual = horario.hora_apertura
-
-        while hora_actual < horario.hora_cierre:
-            hora_fin_slot = (datetime.combine(date.today(), hora_actual) + timedelta(hours=area.tiempo_minimo_reserva)).time()
-
-            if hora_fin_slot <= horario.hora_cierre:
-                disponible = area.esta_disponible_en_fecha(fecha, hora_actual, hora_fin_slot)
-
-                slots_disponibles.append({
-                    'hora_inicio': hora_actual.strftime('%H:%M'),
-                    'hora_fin': hora_fin_slot.strftime('%H:%M'),
-                    'disponible': disponible,
-                    'duracion_horas': area.tiempo_minimo_reserva,
-                    'costo_total': str(area.calcular_costo_total(area.tiempo_minimo_reserva))
-                })
-
-            # Avanzar el tiempo mínimo de reserva (no 30 minutos fijos)
-            hora_actual = (datetime.combine(date.today(), hora_actual) + timedelta(hours=area.tiempo_minimo_reserva)).time()
-
         return Response({
             'area_comun': AreaComunListSerializer(area).data,
             'fecha': fecha_str,
-            'dia_semana': dia_semana,
-            'horario_disponible': {
-                'hora_apertura': horario.hora_apertura.strftime('%H:%M'),
-                'hora_cierre': horario.hora_cierre.strftime('%H:%M')
-            },
-            'slots_disponibles': slots_disponibles,
+            'dia_semana': dia['dia_semana'],
+            'horario_disponible': dia['horario_disponible'],
+            'slots_disponibles': dia['slots_disponibles'],
             'tiempo_minimo_reserva': area.tiempo_minimo_reserva,
             'anticipacion_minima_horas': area.anticipo_minimo_horas
         })
 
+    @action(detail=False, methods=['get'])
+    def calendario(self, request):
+        """
+        Calendario de disponibilidad de varias áreas y días en una respuesta
+
+        GET /api/reservations/areas/calendario/?fecha_inicio=2025-09-22&fecha_fin=2025-10-21&areas=1,2
+
+        Parámetros opcionales:
+        - areas: ids separados por coma (por defecto todas las activas, con el filtro tipo)
+        - resolucion: minutos por celda (15, 30 o 60; por defecto 30)
+        - codificacion: 'rle' (por defecto, p. ej. '16C4L2O20L6C') o 'mapa' (una letra por celda)
+
+        Cada área-día es una cadena de celdas del día completo: L libre, O ocupada, C cerrada.
+        La respuesta lleva ETag según la versión de los datos de reservas (304 si no cambió).
+        """
+        try:
+            fecha_inicio = datetime.strptime(request.query_params.get('fecha_inicio', ''), '%Y-%m-%d').date()
+            fecha_fin = datetime.strptime(request.query_params.get('fecha_fin', ''), '%Y-%m-%d').date()
+            area_ids = sorted({int(valor) for valor in request.query_params.get('areas', '').split(',') if valor.strip()})
+            resolucion = int(request.query_params.get('resolucion', 30))
+        except ValueError:
+            return Response(
+                {'error': 'Parámetros requeridos: fecha_inicio y fecha_fin (YYYY-MM-DD); areas y resolucion numéricos'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        codificacion = request.query_params.get('codificacion', 'rle')
+        if fecha_fin < fecha_inicio or (fecha_fin - fecha_inicio).days >= DisponibilidadService.MAX_DIAS:
+            return Response(
+                {'error': f'El rango debe ser de 1 a {DisponibilidadService.MAX_DIAS} días'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if resolucion not in DisponibilidadService.RESOLUCIONES or codificacion not in DisponibilidadService.CODIFICACIONES:
+            return Response(
+                {'error': f'resolucion debe ser {DisponibilidadService.RESOLUCIONES} y codificacion {DisponibilidadService.CODIFICACIONES}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        areas = self.get_queryset()
+        if area_ids:
+            areas = areas.filter(pk__in=area_ids)
+        parametros = {
+            'fecha_inicio': fecha_inicio, 'fecha_fin': fecha_fin, 'areas': area_ids,
+            'tipo': request.query_params.get('tipo'), 'capacidad_minima': request.query_params.get('capacidad_minima'),
+            'resolucion': resolucion, 'codificacion': codificacion,
+        }
+        etag = disponibilidad_service.etag_calendario(parametros)
+
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH', '')
+        etags_cliente = {valor.strip().removeprefix('W/') for valor in if_none_match.split(',')}
+        if etag in etags_cliente:
+            response = HttpResponseNotModified()
+        else:
+            response = Response({
+                'fecha_inicio': fecha_inicio.isoformat(),
+                'fecha_fin': fecha_fin.isoformat(),
+                'resolucion_minutos': resolucion,
+                'codificacion': codificacion,
+                'leyenda': {
+                    DisponibilidadService.LIBRE: 'libre',
+                    DisponibilidadService.OCUPADA: 'ocupada',
+                    DisponibilidadService.CERRADA: 'cerrada'
+                },
+                'areas': disponibilidad_service.calendario_cacheado(
+                    areas.order_by('pk'), fecha_inicio, fecha_fin, resolucion, codificacion, etag
+                )
+            })
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
     @action(detail=True, methods=['post'])
     def reservar(self, request, pk=None):
         """
@@ -195,119 +290,89 @@ class AreaComunViewSet(viewsets.ModelViewSet):
             "numero_personas": 10,
             "observaciones": "Fiesta de cumpleaños"
         }
-        """
-        print(f"DEBUG: Starting reservation request")
-        print(f"DEBUG: Request data: {request.data}")
-        print(f"DEBUG: Request user: {request.user}")
-        print(f"DEBUG: User authenticated: {request.user.is_authenticated}")
-        if hasattr(request.user, 'role'):
-            print(f"DEBUG: User role: {request.user.role}")
 
+        Responde 409 si el horario ya está ocupado (también ante reservas simultáneas).
+        """
         area = self.get_object()
-        print(f"DEBUG: Area found: {area.nombre}")
-
-        # Verificar permisos del usuario
-        if not area.puede_reservar_usuario(request.user):
-            print(f"DEBUG: Permission denied for user {request.user}")
-            return Response(
-                {'error': 'No tiene permisos para reservar esta área'},
-                status=status.HTTP_403_FORBIDDEN
-            )
 
-        print(f"DEBUG: Permissions OK, validating serializer")
         serializer = CrearReservaSerializer(data=request.data)
-        print(f"DEBUG: Serializer is valid: {serializer.is_valid()}")
         if not serializer.is_valid():
-            print(f"DEBUG: Serializer errors: {serializer.errors}")
+            logger.debug('Reserva inválida para área %s: %s', area.pk, serializer.errors)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-        # Validar fecha y hora
-        fecha = serializer.validated_data['fecha']
-        hora_inicio = serializer.validated_data['hora_inicio']
-        hora_fin = serializer.validated_data['hora_fin']
-
-        print(f"DEBUG: Fecha: {fecha}, Hora inicio: {hora_inicio}, Hora fin: {hora_fin}")
 
-        # Verificar anticipación mínima
-        fecha_hora_reserva = datetime.combine(fecha, hora_inicio)
-        ahora = timezone.now()
-        # Interpretar la fecha/hora de reserva en la zona horaria actual (no UTC)
-        # para que coincida con el cálculo del frontend
-        current_tz = timezone.get_current_timezone()
-        fecha_hora_reserva_aware = timezone.make_aware(fecha_hora_reserva, timezone=current_tz)
-        horas_anticipacion = (fecha_hora_reserva_aware - ahora).total_seconds() / 3600
-
-        print(f"DEBUG: Horas anticipacion: {horas_anticipacion}, Min required: {area.anticipo_minimo_horas}")
-
-        if horas_anticipacion < area.anticipo_minimo_horas:
-            return Response(
-                {'error': f'Se requiere reserva con al menos {area.anticipo_minimo_horas} horas de anticipación'},
-                status=status.HTTP_400_BAD_REQUEST
+        datos = serializer.validated_data
+        try:
+            reserva = reserva_service.reservar(
+                area,
+                request.user,
+                datos['fecha'],
+                datos['hora_inicio'],
+                datos['hora_fin'],
+                numero_personas=datos.get('numero_personas', 1),
+                observaciones=datos.get('observaciones', '')
             )
-
-        # Verificar disponibilidad
-        print(f"DEBUG: Checking availability")
-        if not area.esta_disponible_en_fecha(fecha, hora_inicio, hora_fin):
-            print(f"DEBUG: Area not available")
+        except ErrorReserva as e:
+            logger.debug('Reserva rechazada para área %s (%s): %s', area.pk, e.codigo, e)
+            return Response({'error': str(e)}, status=e.codigo)
+        except Exception as e:
+            logger.exception('Error creando reserva para área %s', area.pk)
             return Response(
-                {'error': 'El horario solicitado no está disponible'},
-                status=status.HTTP_409_CONFLICT
+                {'error': f'Error creando reserva: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-        print(f"DEBUG: Area available, checking capacity")
-        # Verificar capacidad
-        numero_personas = serializer.validated_data.get('numero_personas', 1)
-        if numero_personas > area.capacidad_maxima:
-            return Response(
-                {'error': f'El número de personas ({numero_personas}) excede la capacidad máxima ({area.capacidad_maxima})'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        return Response(ReservaSerializer(reserva).data, status=status.HTTP_201_CREATED)
 
-        print(f"DEBUG: Capacity OK, calculating duration and cost")
-        inicio = datetime.combine(fecha, hora_inicio)
-        fin = datetime.combine(fecha, hora_fin)
-        if fin <= inicio:
-            fin = datetime.combine(fecha + timedelta(days=1), hora_fin)
-        duracion = (fin - inicio).total_seconds() / 3600
+    @action(detail=True, methods=['post'])
+    def reservar_recurrente(self, request, pk=None):
+        """
+        Reservar el mismo horario en varias fechas (semanal)
 
-        print(f"DEBUG: Duration: {duracion} hours")
+        POST /api/reservations/areas/{id}/reservar_recurrente/
+        {
+            "fecha_inicio": "2025-09-01",
+            "dias_semana": ["lunes", "miercoles"],
+            "semanas": 16,
+            "hora_inicio": "18:00",
+            "hora_fin": "19:00",
+            "todo_o_nada": false
+        }
 
-        if duracion < area.tiempo_minimo_reserva or duracion > area.tiempo_maximo_reserva:
-            return Response(
-                {'error': f'La duración debe estar entre {area.tiempo_minimo_reserva} y {area.tiempo_maximo_reserva} horas'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        Crea las fechas sin conflicto y devuelve el motivo de cada fecha omitida.
+        Responde 409 si ninguna fecha está disponible (o alguna, con todo_o_nada).
+        """
+        area = self.get_object()
 
-        costo_total = area.calcular_costo_total(duracion)
-        print(f"DEBUG: Cost: {costo_total}")
+        serializer = CrearReservaRecurrenteSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        print(f"DEBUG: Creating reservation object")
+        datos = serializer.validated_data
+        fechas = reserva_service.fechas_recurrencia(
+            datos['fecha_inicio'], datos['dias_semana'], datos.get('semanas'), datos.get('fecha_fin')
+        )
         try:
-            reserva = Reserva.objects.create(
-                area_comun=area,
-                usuario=request.user,
-                fecha=fecha,
-                hora_inicio=hora_inicio,
-                hora_fin=hora_fin,
-                duracion_horas=Decimal(str(duracion)),
-                costo_total=costo_total,
-                numero_personas=numero_personas,
-                observaciones=serializer.validated_data.get('observaciones', ''),
-                estado=EstadoReserva.PENDIENTE if area.requiere_aprobacion else EstadoReserva.CONFIRMADA
-            )
-            print(f"DEBUG: Reservation created successfully: {reserva.id}")
-        except Exception as e:
-            print(f"DEBUG: Error creating reservation: {str(e)}")
-            print(f"DEBUG: Exception type: {type(e)}")
-            import traceback
-            traceback.print_exc()
-            return Response(
-                {'error': f'Error creando reserva: {str(e)}'},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            resultado = reserva_service.reservar_recurrente(
+                area,
+                request.user,
+                fechas,
+                datos['hora_inicio'],
+                datos['hora_fin'],
+                numero_personas=datos['numero_personas'],
+                observaciones=datos.get('observaciones', ''),
+                todo_o_nada=datos['todo_o_nada']
             )
+        except ErrorReserva as e:
+            logger.debug('Reserva recurrente rechazada para área %s (%s): %s', area.pk, e.codigo, e)
+            return Response({'error': str(e)}, status=e.codigo)
 
-        serializer_respuesta = ReservaSerializer(reserva)
-        print(f"DEBUG: Returning response")
-        return Response(serializer_respuesta.data, status=status.HTTP_201_CREATED)
+        creadas = resultado['creadas']
+        return Response({
+            'total_fechas': len(fechas),
+            'total_creadas': len(creadas),
+            'reservas': ReservaListSerializer(creadas, many=True, context={'request': request}).data,
+            'conflictos': resultado['conflictos']
+        }, status=status.HTTP_201_CREATED if creadas else status.HTTP_409_CONFLICT)
 
 
 class ReservaViewSet(viewsets.ModelViewSet):
@@ -356,6 +421,17 @@ class ReservaViewSet(viewsets.ModelViewSet):
         # Las reservas se crean a través del endpoint de áreas comunes
         pass
 
+    def update(self, request, *args, **kwargs):
+        # Un cambio de estado o de horario puede chocar con reserva_sin_solapamiento
+        try:
+            with transaction.atomic():
+                return super().update(request, *args, **kwargs)
+        except IntegrityError:
+            return Response(
+                {'error': 'El horario de esta reserva ya no está disponible'},
+                status=status.HTTP_409_CONFLICT
+            )
+
     @action(detail=True, methods=['post'])
     def confirmar(self, request, pk=None):
         """
@@ -391,7 +467,8 @@ class ReservaViewSet(viewsets.ModelViewSet):
         # Aquí se integraría con el módulo financiero para procesar el pago
         # Por ahora, solo marcamos como pagada
         try:
-            reserva.marcar_pagada()
+            with transaction.atomic():
+                reserva.marcar_pagada()
 
             # TODO: Integrar con módulo financiero
             # - Crear cargo financiero
@@ -405,6 +482,12 @@ class ReservaViewSet(viewsets.ModelViewSet):
 
         except ValueError as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except IntegrityError:
+            # Una pendiente que se solapa con otra reserva que ya ocupa el horario
+            return Response(
+                {'error': 'El horario de esta reserva ya no está disponible'},
+                status=status.HTTP_409_CONFLICT
+            )
 
     @action(detail=True, methods=['post'])
     def cancelar(self, request, pk=None):
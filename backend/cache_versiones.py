@@ -0,0 +1,46 @@
+"""
+Versiones de datos en caché compartidas por los módulos que cachean resultados
+
+Una versión es un entero guardado sin expiración bajo una clave (por ejemplo
+'finanzas:libro:version'); las claves de caché de los resultados la incluyen, así
+que incrementarla invalida de una vez todo lo cacheado con la versión anterior sin
+tener que borrar entradas. Lo usan el libro de cargos (finances), la caché de
+reportes (analytics) y el calendario de disponibilidad (reservations).
+"""
+
+import time
+
+from django.core.cache import cache
+
+
+def obtener_versiones(claves):
+    """
+    Versión actual de cada clave (una lectura get_many)
+
+    Returns:
+        dict: {clave: versión}
+    """
+    claves = list(claves)
+    versiones = cache.get_many(claves)
+    for clave in claves:
+        if clave not in versiones:
+            # Valor nuevo, por si la clave se perdió y quedan entradas con versiones anteriores;
+            # add no pisa el valor que otro proceso haya creado entre la lectura y aquí
+            cache.add(clave, time.time_ns(), None)
+            versiones[clave] = cache.get(clave)
+    return versiones
+
+
+def obtener_version(clave):
+    """Versión actual de una clave"""
+    return obtener_versiones([clave])[clave]
+
+
+def incrementar_versiones(claves):
+    """Invalidar lo cacheado con la versión actual de cada clave"""
+    for clave in claves:
+        try:
+            cache.incr(clave)
+        except ValueError:
+            # La clave no existe (expulsada o nunca leída): cualquier valor nuevo sirve
+            cache.set(clave, time.time_ns(), None)
@@ -0,0 +1,284 @@
+"""
+Cliente HTTP compartido para las integraciones externas (Grok/OpenRouter, FCM)
+
+Cada integración obtiene un httpx.Client único por proceso (obtener_cliente), con
+conexiones keep-alive reutilizadas entre peticiones e hilos y HTTP/2 si el paquete
+h2 está instalado. Todas las peticiones pasan por TransporteIntegracion, que por
+host aplica:
+
+- un límite de peticiones simultáneas (las que exceden esperan, sin crear más conexiones),
+- reintentos con backoff exponencial y jitter ante errores de red, 429 y 5xx; los
+  métodos no idempotentes (POST, PATCH) solo se reintentan si la petición no llegó a
+  enviarse (error de conexión) o ante 429 y 503, que indican que no se procesó,
+- un circuito que deja de llamar al proveedor tras varios fallos seguidos y
+  prueba de nuevo pasado un tiempo,
+- un histograma de latencias (metricas_integraciones()).
+"""
+
+import logging
+import random
+import threading
+import time
+
+import httpx
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+class ErrorIntegracion(httpx.TransportError):
+    """Petición rechazada por la capa de integración (circuito abierto o sin cupo)"""
+
+
+class CircuitoAbierto(ErrorIntegracion):
+    """El proveedor falló repetidamente y no se le envían peticiones por ahora"""
+
+
+class HistogramaLatencia:
+    """Conteo de latencias por intervalos fijos (milisegundos)"""
+
+    LIMITES_MS = (25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._conteos = [0] * (len(self.LIMITES_MS) + 1)
+        self._total = 0
+        self._suma_ms = 0.0
+
+    def registrar(self, segundos):
+        ms = segundos * 1000
+        indice = next((i for i, limite in enumerate(self.LIMITES_MS) if ms <= limite), len(self.LIMITES_MS))
+        with self._lock:
+            self._conteos[indice] += 1
+            self._total += 1
+            self._suma_ms += ms
+
+    def _percentil(self, conteos, total, fraccion):
+        """Límite superior del intervalo que alcanza la fracción pedida"""
+        acumulado = 0
+        for limite, conteo in zip(self.LIMITES_MS + (None,), conteos):
+            acumulado += conteo
+            if acumulado >= total * fraccion:
+                return limite
+        return None
+
+    def resumen(self):
+        with self._lock:
+            conteos, total, suma = list(self._conteos), self._total, self._suma_ms
+        etiquetas = [f'<={limite}' for limite in self.LIMITES_MS] + [f'>{self.LIMITES_MS[-1]}']
+        return {
+            'total': total,
+            'promedio_ms': round(suma / total, 1) if total else None,
+            'p50_ms': self._percentil(conteos, total, 0.5) if total else None,
+            'p95_ms': self._percentil(conteos, total, 0.95) if total else None,
+            'intervalos_ms': dict(zip(etiquetas, conteos)),
+        }
+
+
+class Circuito:
+    """Circuit breaker: cerrado -> abierto tras umbral_fallos seguidos -> semiabierto (una prueba)"""
+
+    CERRADO = 'cerrado'
+    ABIERTO = 'abierto'
+    SEMIABIERTO = 'semiabierto'
+
+    def __init__(self, umbral_fallos=5, tiempo_apertura=30.0):
+        self.umbral_fallos = umbral_fallos
+        self.tiempo_apertura = tiempo_apertura
+        self._lock = threading.Lock()
+        self.estado = self.CERRADO
+        self.fallos = 0
+        self._abierto_desde = 0.0
+
+    def permitir(self):
+        """Si se puede enviar una petición ahora (en semiabierto, solo la de prueba)"""
+        with self._lock:
+            if self.estado == self.CERRADO:
+                return True
+            if self.estado == self.ABIERTO and time.monotonic() - self._abierto_desde >= self.tiempo_apertura:
+                self.estado = self.SEMIABIERTO
+                return True
+            return False
+
+    def registrar_exito(self):
+        with self._lock:
+            self.estado = self.CERRADO
+            self.fallos = 0
+
+    def registrar_fallo(self):
+        with self._lock:
+            self.fallos += 1
+            if self.estado == self.SEMIABIERTO or self.fallos >= self.umbral_fallos:
+                if self.estado != self.ABIERTO:
+                    logger.warning(f"Circuito abierto tras {self.fallos} fallo(s) seguidos")
+                self.estado = self.ABIERTO
+                self._abierto_desde = time.monotonic()
+
+
+class TransporteIntegracion(httpx.BaseTransport):
+    """Transporte httpx con límite de concurrencia, reintentos, circuito y métricas por host"""
+
+    CODIGOS_REINTENTO = frozenset({429, 500, 502, 503, 504})
+    METODOS_IDEMPOTENTES = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE', 'TRACE'})
+    # Para métodos no idempotentes: respuestas y errores que garantizan que no se procesó
+    CODIGOS_REINTENTO_NO_IDEMPOTENTE = frozenset({429, 503})
+    ERRORES_SIN_ENVIO = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+    def __init__(self, max_conexiones=10, max_concurrentes=None, reintentos=2, backoff=0.5,
+                 backoff_max=8.0, umbral_fallos=5, tiempo_apertura=30.0, espera_cupo=30.0, transporte=None):
+        self._transporte = transporte or httpx.HTTPTransport(
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(max_connections=max_conexiones, max_keepalive_connections=max_conexiones),
+        )
+        self.max_concurrentes = max_concurrentes or max_conexiones
+        self.reintentos = reintentos
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.umbral_fallos = umbral_fallos
+        self.tiempo_apertura = tiempo_apertura
+        self.espera_cupo = espera_cupo
+        self._lock = threading.Lock()
+        self._hosts = {}
+
+    def _estado_host(self, host):
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = {
+                    'cupo': threading.BoundedSemaphore(self.max_concurrentes),
+                    'circuito': Circuito(self.umbral_fallos, self.tiempo_apertura),
+                    'latencia': HistogramaLatencia(),
+                    'reintentos': 0,
+                }
+            return self._hosts[host]
+
+    def _espera(self, intento, response):
+        """Backoff exponencial con jitter completo; respeta Retry-After si viene en segundos"""
+        espera = random.uniform(0, min(self.backoff_max, self.backoff * 2 ** intento))
+        retry_after = response.headers.get('Retry-After', '') if response is not None else ''
+        if retry_after.isdigit():
+            espera = max(espera, min(self.backoff_max, float(retry_after)))
+        return espera
+
+    def _reintentable(self, request, response, error):
+        """Si repetir la petición no puede duplicar su efecto en el proveedor"""
+        if request.method in self.METODOS_IDEMPOTENTES:
+            return True
+        if response is not None:
+            return response.status_code in self.CODIGOS_REINTENTO_NO_IDEMPOTENTE
+        return isinstance(error, self.ERRORES_SIN_ENVIO)
+
+    def handle_request(self, request):
+        host = request.url.host
+        estado = self._estado_host(host)
+        circuito = estado['circuito']
+        if not circuito.permitir():
+            raise CircuitoAbierto(f"Circuito abierto para {host}", request=request)
+
+        # Toda salida sin respuesta exitosa cuenta como fallo, también las excepciones:
+        # si la petición era la prueba del circuito semiabierto, este vuelve a abrirse
+        exito = False
+        try:
+            if not estado['cupo'].acquire(timeout=self.espera_cupo):
+                raise ErrorIntegracion(f"Sin cupo de concurrencia para {host}", request=request)
+            try:
+                for intento in range(self.reintentos + 1):
+                    response, error = None, None
+                    inicio = time.monotonic()
+                    try:
+                        response = self._transporte.handle_request(request)
+                    except httpx.TransportError as e:
+                        error = e
+                    estado['latencia'].registrar(time.monotonic() - inicio)
+
+                    if response is not None and response.status_code not in self.CODIGOS_REINTENTO:
+                        exito = True
+                        return response
+                    if intento == self.reintentos or not self._reintentable(request, response, error):
+                        break
+                    espera = self._espera(intento, response)
+                    if response is not None:
+                        response.close()
+                    estado['reintentos'] += 1
+                    logger.info(f"Reintentando {request.method} {host} en {espera:.2f}s (intento {intento + 2})")
+                    time.sleep(espera)
+            finally:
+                estado['cupo'].release()
+
+            if response is not None:
+                return response
+            raise error
+        finally:
+            if exito:
+                circuito.registrar_exito()
+            else:
+                circuito.registrar_fallo()
+
+    def metricas(self):
+        with self._lock:
+            hosts = dict(self._hosts)
+        return {
+            host: {
+                'circuito': estado['circuito'].estado,
+                'fallos_seguidos': estado['circuito'].fallos,
+                'reintentos': estado['reintentos'],
+                'latencia': estado['latencia'].resumen(),
+            }
+            for host, estado in hosts.items()
+        }
+
+    def close(self):
+        self._transporte.close()
+
+
+# Configuración de cada integración: timeout por defecto y parámetros de TransporteIntegracion
+INTEGRACIONES = {
+    'grok': {'timeout': 30.0, 'max_conexiones': 8, 'reintentos': 2, 'umbral_fallos': 5, 'tiempo_apertura': 60.0},
+    'fcm': {'timeout': 10.0, 'max_conexiones': 20, 'reintentos': 3, 'umbral_fallos': 10, 'tiempo_apertura': 30.0},
+}
+
+_clientes = {}
+_lock_clientes = threading.Lock()
+
+
+def obtener_cliente(nombre, **opciones):
+    """
+    Cliente compartido de una integración (se crea en la primera llamada)
+
+    Args:
+        nombre: Clave de INTEGRACIONES ('grok', 'fcm') u otro identificador
+        opciones: Reemplazan la configuración de INTEGRACIONES al crear el cliente
+
+    Returns:
+        httpx.Client
+    """
+    with _lock_clientes:
+        if nombre not in _clientes:
+            configuracion = {**INTEGRACIONES.get(nombre, {}), **opciones}
+            timeout = configuracion.pop('timeout', 10.0)
+            _clientes[nombre] = httpx.Client(
+                transport=TransporteIntegracion(**configuracion),
+                timeout=timeout,
+                follow_redirects=True,
+            )
+        return _clientes[nombre]
+
+
+def metricas_integraciones():
+    """Estado del circuito, reintentos e histograma de latencias de cada integración y host"""
+    with _lock_clientes:
+        clientes = dict(_clientes)
+    return {nombre: cliente._transport.metricas() for nombre, cliente in clientes.items()}
+
+
+def cerrar_clientes():
+    """Cerrar los pools de conexiones (al terminar el proceso o entre tests)"""
+    with _lock_clientes:
+        clientes = list(_clientes.values())
+        _clientes.clear()
+    for cliente in clientes:
+        cliente.close()
@@ -0,0 +1,49 @@
+"""
+Paginación por cursor compartida por los listados que crecen sin límite
+(pagos, comprobantes, cargos, auditoría y notificaciones)
+
+A diferencia de PageNumberPagination no usa OFFSET ni COUNT(*): el cursor (opaco,
+en ?cursor=) guarda la posición dentro de un orden indexado, así que una página
+profunda cuesta lo mismo que la primera y nunca se lee la tabla completa.
+"""
+
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+
+class CursorPaginacion(CursorPagination):
+    """Paginación por cursor sobre -fecha_creacion (cargos, notificaciones)"""
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    # El cursor guarda solo el valor del primer campo y cuántos registros con ese mismo
+    # valor ya se mostraron (un OFFSET dentro del empate). El id no entra en el cursor:
+    # solo fija el orden entre empates para que ese desplazamiento salte siempre los
+    # mismos registros. Muchas filas con la misma fecha hacen crecer el desplazamiento.
+    ordering = ('-fecha_creacion', '-id')
+
+    def get_paginated_response(self, data, clave='results', **extra):
+        """
+        Respuesta paginada con los enlaces next/previous
+
+        Args:
+            data: Resultados serializados de la página
+            clave: Nombre de la lista en la respuesta (para conservar 'pagos', 'comprobantes', etc.)
+            extra: Claves adicionales (por ejemplo 'estadisticas')
+        """
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            clave: data,
+            **extra
+        })
+
+
+class PagosCursorPagination(CursorPaginacion):
+    """Historial de pagos y comprobantes, del más reciente al más antiguo"""
+    ordering = ('-fecha_pago', '-id')
+
+
+class AuditoriaCursorPagination(CursorPaginacion):
+    """Registros de auditoría, del más reciente al más antiguo"""
+    ordering = ('-timestamp', '-id')
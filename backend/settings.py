@@ -204,6 +204,29 @@ DATABASES = {
     }
 }
 
+# Caché compartida por todos los procesos (web, procesar_trabajos_reporte, barridos)
+# Las versiones de datos que invalidan las señales (libro de cargos, reportes,
+# disponibilidad) deben verse en todos los procesos; una caché en memoria por proceso
+# seguiría sirviendo datos viejos en los demás. Con REDIS_URL se usa Redis (paquete
+# redis, recomendado en producción); si no, una tabla de la base de datos que crea la
+# migración finances 0006 (equivale a "python manage.py createcachetable").
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'cache_compartida',
+            'OPTIONS': {'MAX_ENTRIES': 20000},
+        }
+    }
+
 
 
 # Password validation
@@ -262,6 +285,17 @@ FCM_CREDENTIALS_PATH = config('FCM_CREDENTIALS_PATH', default='')
 VAPID_PRIVATE_KEY = config('VAPID_PRIVATE_KEY', default='')
 VAPID_CLAIMS_SUB = config('VAPID_CLAIMS_SUB', default='')
 
+# Barrido diario de cargos vencidos (finances): cron con "python manage.py marcar_cargos_vencidos"
+# o un único proceso dedicado con "python manage.py marcar_cargos_vencidos --continuo"
+FINANZAS_BARRIDO_HORA = config('FINANZAS_BARRIDO_HORA', default='00:05')
+
+# Barrido de estados de reservas ("python manage.py barrer_reservas", cron cada pocos minutos)
+# Horas antes del inicio en que se cancela una reserva confirmada con costo que no se pagó
+RESERVAS_HORAS_LIMITE_PAGO = config('RESERVAS_HORAS_LIMITE_PAGO', default=0, cast=int)
+
+# Hilos para renderizar comprobantes en la exportación masiva (ZIP)
+FINANZAS_COMPROBANTES_WORKERS = config('FINANZAS_COMPROBANTES_WORKERS', default=4, cast=int)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -312,6 +346,11 @@ LOGGING = {
             'level': 'ERROR',  # Suprimir warnings de JWT
             'propagate': False,
         },
+        'backend.apps.reservations': {
+            'handlers': ['console'],
+            'level': config('RESERVAS_LOG_LEVEL', default='WARNING'),  # INFO/DEBUG para seguir cada reserva
+            'propagate': False,
+        },
     },
 }
 
@@ -0,0 +1,7 @@
+"""
+Ajustes compartidos por los tests (se aplican con override_settings)
+"""
+
+# Caché en memoria para los tests que cuentan consultas: con la caché compartida en
+# base de datos cada lectura de caché sería una consulta más
+CACHE_LOCAL = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
@@ -0,0 +1,178 @@
+"""
+Tests for the shared outbound HTTP client against a local stub server
+"""
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import httpx
+from django.test import SimpleTestCase, override_settings
+
+from backend.apps.analytics.services import GrokMorosidadService
+from backend.integraciones import (
+    CircuitoAbierto, cerrar_clientes, metricas_integraciones, obtener_cliente
+)
+
+
+class ServidorStub(ThreadingHTTPServer):
+    """Servidor local que responde con una secuencia de códigos y registra conexiones"""
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), ManejadorStub)
+        self.codigos = []
+        self.peticiones = 0
+        self.conexiones = set()
+        self.demora = 0
+        self.en_curso = 0
+        self.max_en_curso = 0
+        self.lock = threading.Lock()
+
+    def handle_error(self, request, client_address):
+        # El cliente cierra la conexión antes de la respuesta en los tests de timeout
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+
+class ManejadorStub(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        servidor = self.server
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        with servidor.lock:
+            servidor.peticiones += 1
+            servidor.conexiones.add(self.client_address)
+            servidor.en_curso += 1
+            servidor.max_en_curso = max(servidor.max_en_curso, servidor.en_curso)
+            codigo = servidor.codigos.pop(0) if servidor.codigos else 200
+        time.sleep(servidor.demora)
+        with servidor.lock:
+            servidor.en_curso -= 1
+
+        cuerpo = json.dumps({'choices': [{'message': {'content': 'Sin riesgos relevantes.'}}]}).encode()
+        self.send_response(codigo)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+
+class IntegracionesTest(SimpleTestCase):
+    """Test keep-alive pooling, retries, circuit breaking, per-host limits and metrics"""
+
+    def setUp(self):
+        self.servidor = ServidorStub()
+        threading.Thread(target=self.servidor.serve_forever, daemon=True).start()
+        self.addCleanup(self.servidor.server_close)
+        self.addCleanup(self.servidor.shutdown)
+        self.addCleanup(cerrar_clientes)
+
+    def cliente(self, **opciones):
+        return obtener_cliente('stub', backoff=0.01, **opciones)
+
+    def test_connections_are_reused(self):
+        """Sequential requests travel over one keep-alive connection"""
+        for _ in range(5):
+            self.assertEqual(self.cliente().post(self.servidor.url, json={}).status_code, 200)
+        self.assertEqual(self.servidor.peticiones, 5)
+        self.assertEqual(len(self.servidor.conexiones), 1)
+
+    def test_retries_transient_errors(self):
+        """503 and 429 are retried with backoff until a success"""
+        self.servidor.codigos = [503, 429]
+        response = self.cliente(reintentos=2).post(self.servidor.url, json={})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.servidor.peticiones, 3)
+        metricas = metricas_integraciones()['stub']['127.0.0.1']
+        self.assertEqual(metricas['reintentos'], 2)
+        self.assertEqual(metricas['latencia']['total'], 3)
+
+    def test_circuit_opens_after_repeated_failures(self):
+        """Once the failure threshold is reached the provider is no longer called"""
+        self.servidor.codigos = [500] * 10
+        cliente = self.cliente(reintentos=0, umbral_fallos=2, tiempo_apertura=60)
+        for _ in range(2):
+            self.assertEqual(cliente.post(self.servidor.url, json={}).status_code, 500)
+
+        with self.assertRaises(CircuitoAbierto):
+            cliente.post(self.servidor.url, json={})
+        self.assertEqual(self.servidor.peticiones, 2)
+        self.assertEqual(metricas_integraciones()['stub']['127.0.0.1']['circuito'], 'abierto')
+
+    def test_half_open_probe_closes_circuit(self):
+        """After the open period one probe is sent and a success closes the circuit"""
+        self.servidor.codigos = [500]
+        cliente = self.cliente(reintentos=0, umbral_fallos=1, tiempo_apertura=0.05)
+        cliente.post(self.servidor.url, json={})
+        time.sleep(0.06)
+
+        self.assertEqual(cliente.post(self.servidor.url, json={}).status_code, 200)
+        self.assertEqual(metricas_integraciones()['stub']['127.0.0.1']['circuito'], 'cerrado')
+
+    def test_failed_probe_reopens_circuit(self):
+        """A half-open probe that ends in an unexpected exception opens the circuit again"""
+        self.servidor.codigos = [500]
+        cliente = self.cliente(reintentos=0, umbral_fallos=1, tiempo_apertura=0.05)
+        cliente.post(self.servidor.url, json={})
+        time.sleep(0.06)
+
+        with patch.object(httpx.HTTPTransport, 'handle_request', side_effect=RuntimeError('fallo')):
+            with self.assertRaises(RuntimeError):
+                cliente.post(self.servidor.url, json={})
+        self.assertEqual(metricas_integraciones()['stub']['127.0.0.1']['circuito'], 'abierto')
+
+    def test_post_not_retried_after_it_may_have_been_processed(self):
+        """POST is not repeated on 5xx other than 503 nor on read timeouts"""
+        self.servidor.codigos = [502, 502]
+        cliente = self.cliente(reintentos=2)
+        self.assertEqual(cliente.post(self.servidor.url, json={}).status_code, 502)
+        self.assertEqual(self.servidor.peticiones, 1)
+
+        self.servidor.demora = 0.2
+        with self.assertRaises(httpx.ReadTimeout):
+            cliente.post(self.servidor.url, json={}, timeout=0.05)
+        self.assertEqual(self.servidor.peticiones, 2)
+
+    def test_post_retried_when_not_sent(self):
+        """A connection error means the POST never reached the provider, so it is retried"""
+        cliente = self.cliente(reintentos=1)
+        with patch.object(httpx.HTTPTransport, 'handle_request', side_effect=httpx.ConnectError('rechazada')) as envio:
+            with self.assertRaises(httpx.ConnectError):
+                cliente.post(self.servidor.url, json={})
+        self.assertEqual(envio.call_count, 2)
+
+    def test_concurrency_is_limited_per_host(self):
+        """No more than max_concurrentes requests are in flight to one host"""
+        self.servidor.demora = 0.1
+        cliente = self.cliente(max_conexiones=4, max_concurrentes=2)
+        hilos = [threading.Thread(target=cliente.post, args=(self.servidor.url,), kwargs={'json': {}}) for _ in range(6)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        self.assertEqual(self.servidor.peticiones, 6)
+        self.assertEqual(self.servidor.max_en_curso, 2)
+
+    def test_grok_service_routes_through_shared_client(self):
+        """The morosidad insights call goes through the pooled client and survives a 503"""
+        self.servidor.codigos = [503]
+        with override_settings(GROK_API_KEY='clave', GROK_API_BASE=self.servidor.url), \
+                patch('backend.integraciones.random.uniform', return_value=0):
+            respuesta = GrokMorosidadService()._make_api_call([{'role': 'user', 'content': 'hola'}])
+
+        self.assertEqual(respuesta, {'response': 'Sin riesgos relevantes.'})
+        self.assertEqual(self.servidor.peticiones, 2)
+        self.assertIsInstance(obtener_cliente('grok'), httpx.Client)